@@ -0,0 +1,123 @@
+"""GSTR-2A import and reconciliation API.
+
+POST /api/gstr2a/import/ (multipart) with one or more `files`, optional
+`dry_run` and `jobs`. Same service as `manage.py import_gstr2a`: files are
+parsed in `jobs` worker processes and written one file (one transaction)
+at a time. `async=1` stores the uploads and queues a `gstr2a_import` job
+instead; poll /api/jobs/<id>/ for the result.
+
+/api/reconciliation-runs/ — POST a 2A/2B `file` (optional `business_id`,
+`amount_tolerance`, `date_window_days`) to reconcile it against the booked
+inward invoices (billing/services/reconciliation.py); GET lists past runs,
+and /<id>/items/?status= pages through one run's classified rows.
+"""
+
+from dataclasses import asdict
+from decimal import Decimal, InvalidOperation
+
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.parsers import JSONParser, MultiPartParser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from billing.models import ReconciliationRun
+from billing.services import reconciliation
+from billing.services.gstr2a_import import enqueue_import, import_files, merge_results
+
+from .jobs import wants_async
+from .pagination import StandardResultsSetPagination
+from .permissions import RoleBasedPermission
+from .serializers import JobSerializer, ReconciliationItemSerializer, ReconciliationRunSerializer
+
+_TRUTHY = ("1", "true", "yes", "on")
+
+
+class GSTR2AImportView(APIView):
+    permission_classes = [RoleBasedPermission]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request):
+        uploads = request.FILES.getlist("files")
+        if not uploads:
+            return Response(
+                {"error": "No files provided"}, status=status.HTTP_400_BAD_REQUEST
+            )
+        dry_run = str(request.data.get("dry_run", "")).strip().lower() in _TRUTHY
+        try:
+            jobs = int(request.data.get("jobs") or 1)
+            if jobs < 0:
+                raise ValueError
+        except (TypeError, ValueError):
+            return Response(
+                {"error": "jobs must be a non-negative integer"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        if wants_async(request):
+            job = enqueue_import(
+                [(f.name, f) for f in uploads], dry_run=dry_run, jobs=jobs, user=request.user
+            )
+            return Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+        results = import_files(
+            uploads, dry_run=dry_run, jobs=jobs, filenames=[f.name for f in uploads]
+        )
+        return Response({
+            "dry_run": dry_run,
+            "files": [asdict(r) for r in results],
+            "total": asdict(merge_results(results)),
+        })
+
+
+class ReconciliationRunViewSet(viewsets.ReadOnlyModelViewSet):
+    queryset = ReconciliationRun.objects.select_related("business")
+    serializer_class = ReconciliationRunSerializer
+    permission_classes = [RoleBasedPermission]
+    pagination_class = StandardResultsSetPagination
+    parser_classes = [MultiPartParser, JSONParser]
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        business_id = self.request.query_params.get("business_id")
+        if business_id:
+            queryset = queryset.filter(business_id=business_id)
+        return queryset
+
+    def create(self, request):
+        upload = request.FILES.get("file")
+        if upload is None:
+            return Response({"error": "No file provided"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            business_id = int(request.data["business_id"]) if request.data.get("business_id") else None
+            tolerance = Decimal(str(request.data.get("amount_tolerance") or reconciliation.AMOUNT_TOLERANCE))
+            window = int(request.data.get("date_window_days") or reconciliation.DATE_WINDOW_DAYS)
+            if tolerance < 0 or window < 0:
+                raise ValueError
+        except (TypeError, ValueError, InvalidOperation):
+            return Response(
+                {"error": "business_id, amount_tolerance and date_window_days must be non-negative numbers"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            run = reconciliation.reconcile_file(
+                upload,
+                filename=upload.name,
+                business_id=business_id,
+                user=request.user,
+                amount_tolerance=tolerance,
+                date_window_days=window,
+            )
+        except reconciliation.ReconciliationError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(self.get_serializer(run).data, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=["get"])
+    def items(self, request, pk=None):
+        """GET /api/reconciliation-runs/<id>/items/?status=missing_in_books"""
+        items = self.get_object().items.all()
+        item_status = request.query_params.get("status")
+        if item_status and item_status != "all":
+            items = items.filter(status=item_status)
+        page = self.paginate_queryset(items)
+        return self.get_paginated_response(ReconciliationItemSerializer(page, many=True).data)
@@ -22,6 +22,7 @@ from rest_framework.views import APIView
 
 from billing.constants import INVOICE_TYPE_INWARD
 from billing.models import Business, Customer, Invoice, LineItem
+from billing.services import rollups
 from billing.utils import AIInvoiceProcessor
 
 from billing.tax_rules import is_interstate
@@ -48,10 +49,11 @@ class InwardBillPagination(PageNumberPagination):
 
 
 def _inward_qs():
+    # Tax breakup comes from the invoice's stored line totals; only the
+    # detail view loads the lines themselves.
     return (
         Invoice.objects.filter(type_of_invoice=INVOICE_TYPE_INWARD)
         .select_related("business", "customer")
-        .prefetch_related("lineitem_set")
         .order_by("-invoice_date", "-id")
     )
 
@@ -178,29 +180,31 @@ class InwardBillListCreateView(APIView):
         bill_total = Decimal(str(bill_total)) if bill_total not in (None, "") else None
         computed, total = compute_lines(service_lines, intra=intra, bill_total=bill_total)
 
-        invoice = Invoice.objects.create(
-            workspace_id=WORKSPACE_ID, business=business, customer=supplier,
-            invoice_number=invoice_number, invoice_date=invoice_date,
-            type_of_invoice=INVOICE_TYPE_INWARD, total_amount=Decimal("0"),
-        )
-        # bulk_create skips the per-line signal; compute_lines already returned
-        # the round-off-adjusted total, so store that instead of re-summing.
-        LineItem.objects.bulk_create(
-            [
-                LineItem(
-                    workspace_id=WORKSPACE_ID, customer=supplier, invoice=invoice,
-                    product_name=c["product_name"], hsn_code=c["hsn_code"],
-                    gst_tax_rate=c["gst_tax_rate"], quantity=c["quantity"], rate=c["price_rate"],
-                    cgst=c["cgst"], sgst=c["sgst"], igst=c["igst"], amount=c["amount"], unit=c["unit"],
-                )
-                for c in computed
-            ],
-            batch_size=100,
-        )
-        # In-memory too: _store_file_and_preview saves the instance (file
-        # field), and a stale 0 here would clobber the total just written.
-        invoice.total_amount = total
-        Invoice.objects.filter(pk=invoice.pk).update(total_amount=total)
+        with rollups.resync() as rollup:
+            invoice = Invoice.objects.create(
+                workspace_id=WORKSPACE_ID, business=business, customer=supplier,
+                invoice_number=invoice_number, invoice_date=invoice_date,
+                type_of_invoice=INVOICE_TYPE_INWARD, total_amount=Decimal("0"),
+            )
+            rollup.add(invoice.pk)
+            # bulk_create skips the per-line signal; compute_lines already returned
+            # the round-off-adjusted total, so store that instead of re-summing.
+            LineItem.objects.bulk_create(
+                [
+                    LineItem(
+                        workspace_id=WORKSPACE_ID, customer=supplier, invoice=invoice,
+                        product_name=c["product_name"], hsn_code=c["hsn_code"],
+                        gst_tax_rate=c["gst_tax_rate"], quantity=c["quantity"], rate=c["price_rate"],
+                        cgst=c["cgst"], sgst=c["sgst"], igst=c["igst"], amount=c["amount"], unit=c["unit"],
+                    )
+                    for c in computed
+                ],
+                batch_size=100,
+            )
+            # In-memory too: _store_file_and_preview saves the instance (file
+            # field), and a stale 0 here would clobber the total just written.
+            invoice.total_amount = total
+            Invoice.objects.filter(pk=invoice.pk).update(total_amount=total)
         _store_file_and_preview(invoice, request.FILES.get("file"))
         invoice.refresh_from_db()
         return Response(
@@ -237,7 +241,7 @@ class InwardBillDetailView(APIView):
     permission_classes = [RoleBasedPermission]
 
     def get(self, request, pk):
-        invoice = _inward_qs().filter(pk=pk).first()
+        invoice = _inward_qs().prefetch_related("lineitem_set").filter(pk=pk).first()
         if invoice is None:
             return Response({"error": "Inward bill not found."}, status=status.HTTP_404_NOT_FOUND)
         return Response(InwardBillSerializer(invoice, context={"request": request}).data)
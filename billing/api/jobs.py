@@ -0,0 +1,191 @@
+"""Background-job API: the `async=1` hand-off, the status endpoint, and the
+handlers that run the slow endpoints inside the `run_jobs` worker.
+
+The view-backed handlers replay the original request against the same view,
+as the same user, minus the `async` flag. That keeps one implementation of
+each export/import (filters, validation, permissions and audit logging
+included) instead of a parallel "job version" that drifts from the endpoint.
+"""
+
+import io
+import json
+import re
+from urllib.parse import urlencode
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.shortcuts import get_object_or_404
+from django.test import RequestFactory
+from rest_framework import status
+from rest_framework.authentication import BaseAuthentication
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from billing.models import Job
+from billing.services import jobs
+
+from .permissions import get_user_role
+from .serializers import JobSerializer
+
+_TRUTHY = ("1", "true", "yes", "on")
+
+
+def wants_async(request):
+    """True when the caller asked for `async=1` (query string or JSON body)."""
+    flag = request.query_params.get("async")
+    if flag is None and isinstance(request.data, dict):
+        flag = request.data.get("async")
+    return str(flag).strip().lower() in _TRUTHY
+
+
+def enqueue_request(request, kind, extra_params=None):
+    """Queue `request` for replay by the worker and answer 202 with the job id."""
+    query = {
+        key: values for key, values in request.query_params.lists() if key != "async"
+    }
+    data = None
+    if request.method != "GET" and isinstance(request.data, dict):
+        data = {key: value for key, value in request.data.items() if key != "async"}
+    job = jobs.enqueue(
+        kind,
+        {"path": request.path, "query": query, "data": data, **(extra_params or {})},
+        user=request.user if request.user.is_authenticated else None,
+    )
+    return Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+class ReplayAuthentication(BaseAuthentication):
+    """Authenticates a replayed request as the `user` `_replay` set on it.
+
+    The worker has no token for the requester; the job row is the proof of
+    who queued it. An account deleted (job.user now None) or deactivated
+    since leaves the request unauthenticated, so the view refuses it.
+    """
+
+    def authenticate(self, request):
+        user = getattr(request._request, "user", None)
+        if user is None or not user.is_active:
+            return None
+        return (user, None)
+
+
+def _replay(job, view_class, action=None, method="get"):
+    """Run `view_class` (its `action`, for a viewset) for the job's stored
+    request and return the response."""
+    actions = ({method: action},) if action else ()
+    view = view_class.as_view(*actions, authentication_classes=[ReplayAuthentication])
+    params = job.params
+    path = params.get("path") or "/"
+    factory = RequestFactory()
+    if method == "get":
+        request = factory.get(path, params.get("query") or {})
+    else:
+        query = urlencode(params.get("query") or {}, doseq=True)
+        request = factory.post(
+            f"{path}?{query}" if query else path,
+            json.dumps(params.get("data") or {}),
+            content_type="application/json",
+        )
+    request.user = job.user or AnonymousUser()
+    response = view(request)
+    if response.status_code >= 400:
+        data = getattr(response, "data", None)
+        if isinstance(data, dict):
+            message = data.get("error") or data.get("detail") or data
+        else:
+            message = data or f"HTTP {response.status_code}"
+        raise jobs.JobError(str(message))
+    return response
+
+
+def _store_file_response(job, response):
+    """Save a FileResponse body as the job's artifact; result is its metadata."""
+    match = re.search(r'filename="([^"]+)"', response.get("Content-Disposition", ""))
+    filename = match.group(1) if match else f"job-{job.pk}"
+    try:
+        job.artifact.save(filename, File(response.file_to_stream), save=False)
+    finally:
+        response.close()
+    return {"filename": filename, "content_type": response["Content-Type"]}
+
+
+@jobs.handler("report")
+def run_report(job):
+    from .views import ReportView
+
+    return _store_file_response(job, _replay(job, ReportView, method="post"))
+
+
+@jobs.handler("gstr_export")
+def run_gstr_export(job):
+    from .views import InvoiceViewSet
+
+    return _replay(job, InvoiceViewSet, "gstr_export").data
+
+
+@jobs.handler("gstr1_portal_json")
+def run_gstr1_portal_json(job):
+    from .views import InvoiceViewSet
+
+    return _replay(job, InvoiceViewSet, "gstr1_portal_json").data
+
+
+@jobs.handler("bulk_invoice_import")
+def run_bulk_invoice_import(job):
+    from .views import BulkInvoiceImportView
+
+    return _replay(job, BulkInvoiceImportView, method="post").data
+
+
+@jobs.handler("gstr2a_import")
+def run_gstr2a_import(job):
+    """Import stored 2A files; progress moves per file.
+
+    `params["files"]` are storage names saved when the job was queued and
+    `params["jobs"]` the parse-pool size (see `import_files`). Each file is
+    its own transaction (import_file is atomic), so a bad file fails alone
+    and its error lands in that file's result.
+    """
+    from dataclasses import asdict
+
+    from billing.services.gstr2a_import import import_files, merge_results
+
+    names = job.params.get("files") or []
+    labels = job.params.get("labels") or {}
+    dry_run = bool(job.params.get("dry_run"))
+    contents = []
+    for name in names:
+        with default_storage.open(name, "rb") as fh:
+            contents.append(fh.read())
+    done = []
+
+    def progress(result):
+        done.append(result)
+        jobs.report_progress(len(done), len(names))
+
+    results = import_files(
+        [io.BytesIO(c) for c in contents],
+        dry_run=dry_run,
+        jobs=job.params.get("jobs") or 1,
+        filenames=[labels.get(name, name) for name in names],
+        on_result=progress,
+    )
+    return {
+        "dry_run": dry_run,
+        "files": [asdict(r) for r in results],
+        "total": asdict(merge_results(results)),
+    }
+
+
+class JobDetailView(APIView):
+    """GET /api/jobs/<id>/ — status, progress and result of a queued job.
+
+    Users see their own jobs; admins see everyone's.
+    """
+
+    def get(self, request, pk):
+        job = get_object_or_404(Job, pk=pk)
+        if job.user_id != request.user.pk and get_user_role(request.user) != "admin":
+            return Response({"error": "Not found."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(JobSerializer(job).data)
@@ -0,0 +1,242 @@
+"""List pagination.
+
+`StandardResultsSetPagination` is the page-number paginator every list
+endpoint uses (`?page=`, `?page_size=` / `?limit=`).
+
+`KeysetPagination` adds two opt-ins on top of it for the big lists
+(invoices, customers, products, audit log):
+
+  ?cursor=           keyset mode. The first request passes an empty
+                     cursor; the response carries `next` / `previous`
+                     links instead of page numbers. Each page is a
+                     `WHERE (ordering) < (last row)` range scan on the
+                     ordering's index, so page 500 costs what page 1 does
+                     and no COUNT(*) runs. The view's ordering (including
+                     `?ordering=`) is kept, with the primary key appended
+                     as a tiebreaker so rows sharing a date never repeat
+                     or go missing between pages.
+  ?count=estimate    the planner's row estimate instead of COUNT(*) —
+                     `pg_class.reltuples` for an unfiltered table, the
+                     EXPLAIN estimate for a filtered one. Small results
+                     and non-PostgreSQL databases still get the exact
+                     count. In keyset mode a count is only returned when
+                     asked for.
+"""
+
+import base64
+import binascii
+import datetime as dt
+import json
+
+from django.core.exceptions import FieldDoesNotExist
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.paginator import Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+# Below this many rows an exact COUNT(*) is cheap and the planner's
+# estimate (stale until the next ANALYZE) isn't worth the imprecision.
+ESTIMATE_EXACT_BELOW = 10_000
+
+
+class StandardResultsSetPagination(PageNumberPagination):
+    page_size = 15
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+
+    def get_page_size(self, request):
+        limit = request.query_params.get("limit")
+        if limit:
+            try:
+                return min(int(limit), self.max_page_size)
+            except ValueError:
+                pass
+        return super().get_page_size(request)
+
+
+def estimated_count(queryset) -> int:
+    """Row count of `queryset` from planner statistics (PostgreSQL).
+
+    Falls back to `queryset.count()` elsewhere, when the table has never
+    been analysed, or when the estimate is small enough to count exactly.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor == "postgresql":
+        estimate = -1
+        if not queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                    [queryset.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+            estimate = row[0] if row else -1
+        else:
+            plan = json.loads(queryset.explain(format="json"))
+            estimate = int(plan[0]["Plan"]["Plan Rows"])
+        if estimate >= ESTIMATE_EXACT_BELOW:
+            return estimate
+    return queryset.count()
+
+
+class EstimatedCountPaginator(Paginator):
+    @cached_property
+    def count(self):
+        return estimated_count(self.object_list)
+
+
+def _resolve_field(model, path):
+    """Model field at the end of a `customer__name` style path, and
+    whether any step of it can be NULL."""
+    nullable = False
+    field = None
+    for part in path.split("__"):
+        if field is not None:
+            model = field.related_model
+        field = model._meta.pk if part == "pk" else model._meta.get_field(part)
+        nullable = nullable or field.null
+    return field, nullable
+
+
+class _CursorEncoder(DjangoJSONEncoder):
+    # DjangoJSONEncoder trims datetimes to milliseconds; a cursor needs the
+    # exact value or rows in the same millisecond get skipped.
+    def default(self, o):
+        if isinstance(o, dt.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def _row_value(obj, path):
+    for part in path.split("__"):
+        obj = getattr(obj, part)
+    return obj
+
+
+class KeysetPagination(StandardResultsSetPagination):
+    cursor_query_param = "cursor"
+    count_query_param = "count"
+    invalid_cursor_message = "Invalid cursor"
+
+    def wants_estimate(self, request):
+        return request.query_params.get(self.count_query_param) == "estimate"
+
+    @property
+    def django_paginator_class(self):
+        if self.wants_estimate(self.request):
+            return EstimatedCountPaginator
+        return Paginator
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.keyset = self.cursor_query_param in request.query_params
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.page_size = self.get_page_size(request)
+        self.model = queryset.model
+        self.key_fields = self.get_key_fields(queryset)
+        self.count = estimated_count(queryset) if self.wants_estimate(request) else None
+
+        position, reverse = self.decode_cursor(request.query_params[self.cursor_query_param])
+        ordering = [
+            ("-" if desc != reverse else "") + name for name, desc in self.key_fields
+        ]
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.after(position, reverse))
+        rows = list(queryset[: self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[: self.page_size]
+        if reverse:
+            rows.reverse()
+
+        # Walking forward, rows before the cursor exist; walking back from a
+        # `previous` link, the rows we came from lie after this page.
+        self.has_next = has_more if not reverse else True
+        self.has_previous = position is not None if not reverse else has_more
+        self.page = rows
+        return rows
+
+    def get_key_fields(self, queryset):
+        """[(field path, descending)] — the queryset's ordering, plus pk."""
+        ordering = list(queryset.query.order_by) or list(queryset.model._meta.ordering)
+        fields = []
+        for term in ordering:
+            if not isinstance(term, str):
+                raise ValidationError({"cursor": "This ordering can't be paged by cursor."})
+            desc = term.startswith("-")
+            name = term.lstrip("-+")
+            try:
+                field, nullable = _resolve_field(queryset.model, name)
+            except FieldDoesNotExist:
+                raise ValidationError({"cursor": f"Can't page by cursor on '{name}'."})
+            if nullable:
+                # NULLs don't compare; a keyset over them would skip rows.
+                raise ValidationError({"cursor": f"Can't page by cursor on nullable '{name}'."})
+            fields.append((name, desc))
+            if field.primary_key:
+                break
+        else:
+            fields.append(("pk", fields[-1][1] if fields else False))
+        return fields
+
+    def after(self, position, reverse):
+        """Rows strictly past `position` in (possibly reversed) key order."""
+        condition = Q()
+        equal = {}
+        for (name, desc), value in zip(self.key_fields, position, strict=True):
+            lookup = "lt" if desc != reverse else "gt"
+            condition |= Q(**equal, **{f"{name}__{lookup}": value})
+            equal[name] = value
+        return condition
+
+    def encode_cursor(self, row, reverse):
+        payload = {
+            "k": [name for name, _ in self.key_fields],
+            "p": [_row_value(row, name) for name, _ in self.key_fields],
+            "r": int(reverse),
+        }
+        data = json.dumps(payload, cls=_CursorEncoder, separators=(",", ":"))
+        token = base64.urlsafe_b64encode(data.encode()).decode().rstrip("=")
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, token)
+
+    def decode_cursor(self, token):
+        """(position values, reverse) — (None, False) for the first page."""
+        if not token:
+            return None, False
+        try:
+            raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+            payload = json.loads(raw)
+            names = [name for name, _ in self.key_fields]
+            if payload["k"] != names:
+                raise ValueError("cursor is for a different ordering")
+            # strict: a cursor short of (or past) the key columns is invalid.
+            position = [
+                _resolve_field(self.model, name)[0].to_python(value)
+                for name, value in zip(names, payload["p"], strict=True)
+            ]
+            return position, bool(payload["r"])
+        except (TypeError, ValueError, KeyError, binascii.Error, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+
+        body = {
+            "next": self.encode_cursor(self.page[-1], False) if self.page and self.has_next else None,
+            "previous": self.encode_cursor(self.page[0], True) if self.page and self.has_previous else None,
+            "results": data,
+        }
+        if self.count is not None:
+            body = {"count": self.count, **body}
+        return Response(body)
@@ -0,0 +1,46 @@
+"""Command-palette search.
+
+GET /api/search/?q=<term> — customers, products and invoices matching the
+term in one ranked list (billing/services/search.py). Optional `types`
+(comma-separated: customer,product,invoice), `limit` per type (default 5,
+max 20) and `business_id` to scope invoices.
+"""
+
+from dataclasses import asdict
+
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from billing.services import search
+
+from .permissions import RoleBasedPermission
+
+
+class SearchView(APIView):
+    permission_classes = [RoleBasedPermission]
+
+    def get(self, request):
+        term = request.query_params.get("q", "")
+        types = [t for t in request.query_params.get("types", "").split(",") if t]
+        unknown = set(types) - set(search.SEARCHERS)
+        if unknown:
+            return Response(
+                {"error": f"Unknown types: {', '.join(sorted(unknown))}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            limit = int(request.query_params.get("limit") or search.DEFAULT_LIMIT)
+        except ValueError:
+            return Response(
+                {"error": "limit must be an integer"}, status=status.HTTP_400_BAD_REQUEST
+            )
+        business_id = request.query_params.get("business_id") or None
+        try:
+            business_id = business_id and int(business_id)
+        except ValueError:
+            return Response(
+                {"error": "business_id must be an integer"}, status=status.HTTP_400_BAD_REQUEST
+            )
+        hits = search.search(term, types=types, limit=limit, business_id=business_id)
+        return Response({"query": term.strip(), "results": [asdict(h) for h in hits]})
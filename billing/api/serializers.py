@@ -5,7 +5,17 @@ from decimal import Decimal
 from rest_framework import serializers
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 
-from billing.models import Business, Customer, Invoice, ITCReclaimLedger, LineItem, Product
+from billing.models import (
+    Business,
+    Customer,
+    Invoice,
+    ITCReclaimLedger,
+    Job,
+    LineItem,
+    Product,
+    ReconciliationItem,
+    ReconciliationRun,
+)
 
 
 class BusinessSerializer(serializers.ModelSerializer):
@@ -168,23 +178,22 @@ class InwardBillListSerializer(serializers.ModelSerializer):
         c = obj.customer
         return {"id": c.id, "name": c.name, "gst_number": c.gst_number} if c else None
 
-    def _lines(self, obj):
-        return obj.lineitem_set.all()
-
-    def _sum(self, values):
-        return str(sum(values, Decimal("0")).quantize(Decimal("0.01")))
+    # Denormalised on Invoice (billing/services/invoice_totals.py), so the
+    # register needs no line items.
+    def _total(self, value):
+        return str(Decimal(value).quantize(Decimal("0.01")))
 
     def get_taxable(self, obj):
-        return self._sum([li.quantity * li.rate for li in self._lines(obj)])
+        return self._total(obj.taxable_total)
 
     def get_cgst(self, obj):
-        return self._sum([li.cgst for li in self._lines(obj)])
+        return self._total(obj.cgst_total)
 
     def get_sgst(self, obj):
-        return self._sum([li.sgst for li in self._lines(obj)])
+        return self._total(obj.sgst_total)
 
     def get_igst(self, obj):
-        return self._sum([li.igst for li in self._lines(obj)])
+        return self._total(obj.igst_total)
 
     def get_has_file(self, obj):
         return bool(obj.source_file)
@@ -288,6 +297,49 @@ class ITCReclaimLedgerSerializer(serializers.ModelSerializer):
         read_only_fields = ["id", "created_at", "updated_at"]
 
 
+class JobSerializer(serializers.ModelSerializer):
+    """Status view of a background job; the artifact comes back as a signed URL."""
+
+    artifact_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Job
+        fields = [
+            "id", "kind", "status", "progress", "result", "error",
+            "artifact_url", "created_at", "started_at", "finished_at",
+        ]
+        read_only_fields = fields
+
+    def get_artifact_url(self, obj):
+        from billing.api.media import sign_media_path
+
+        return sign_media_path(obj.artifact.name) if obj.artifact else None
+
+
+class ReconciliationRunSerializer(serializers.ModelSerializer):
+    business_name = serializers.CharField(source="business.name", read_only=True)
+
+    class Meta:
+        model = ReconciliationRun
+        fields = [
+            "id", "business", "business_name", "source_filename",
+            "period_start", "period_end", "amount_tolerance", "date_window_days",
+            "matched", "mismatched_amount", "missing_in_books", "missing_in_2b",
+            "created_at",
+        ]
+        read_only_fields = fields
+
+
+class ReconciliationItemSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ReconciliationItem
+        fields = [
+            "id", "status", "supplier_gstin", "supplier_name", "invoice_number",
+            "invoice_date", "portal_amount", "books_amount", "invoice", "note",
+        ]
+        read_only_fields = fields
+
+
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     @classmethod
     def get_token(cls, user):
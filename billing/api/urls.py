@@ -5,12 +5,15 @@ from rest_framework_simplejwt.views import TokenVerifyView
 from .auth import ThrottledTokenObtainPairView, ThrottledTokenRefreshView
 
 from .gstin_lookup import GstinLookupView
+from .gstr2a import GSTR2AImportView, ReconciliationRunViewSet
+from .jobs import JobDetailView
 from .inward_bills import (
     InwardBillDetailView,
     InwardBillExtractView,
     InwardBillListCreateView,
 )
 from .views import (
+    AIInvoiceBatchProcessingView,
     AIInvoiceCreateView,
     AIInvoiceProcessingView,
     AuditLogViewSet,
@@ -24,10 +27,12 @@ from .views import (
     ProductViewSet,
     ProfileView,
     ReportView,
+    ResponseCacheStatsView,
     UserManagementView,
 )
 from .media import SignedMediaView
 from .preferences import PreferencesView
+from .search import SearchView
 
 router = DefaultRouter()
 router.register(r"businesses", BusinessViewSet)
@@ -36,12 +41,16 @@ router.register(r"invoices", InvoiceViewSet)
 router.register(r"line-items", LineItemViewSet)
 router.register(r"products", ProductViewSet)
 router.register(r"audit-logs", AuditLogViewSet)
+router.register(r"reconciliation-runs", ReconciliationRunViewSet)
 
 urlpatterns = [
     # Explicit paths BEFORE router to avoid router's <pk> catching them
     path("invoices/bulk-import/", BulkInvoiceImportView.as_view(), name="bulk-invoice-import"),
     path("reports/generate/", ReportView.as_view(), name="generate-report"),
     path("csv/import/", CSVImportView.as_view(), name="csv-import"),
+    path("gstr2a/import/", GSTR2AImportView.as_view(), name="gstr2a-import"),
+    path("jobs/<int:pk>/", JobDetailView.as_view(), name="job-detail"),
+    path("search/", SearchView.as_view(), name="search"),
     # Inward Bills module (explicit paths BEFORE router)
     path("inward-bills/", InwardBillListCreateView.as_view(), name="inward-bill-list"),
     path("inward-bills/extract/", InwardBillExtractView.as_view(), name="inward-bill-extract"),
@@ -52,6 +61,11 @@ urlpatterns = [
         AIInvoiceProcessingView.as_view(),
         name="ai-invoice-process",
     ),
+    path(
+        "ai/invoice/process-batch/",
+        AIInvoiceBatchProcessingView.as_view(),
+        name="ai-invoice-process-batch",
+    ),
     path("ai/invoice/create/", AIInvoiceCreateView.as_view(), name="ai-invoice-create"),
     path(
         "invoices/<int:invoice_id>/line-items/",
@@ -69,6 +83,7 @@ urlpatterns = [
     path("gstin/<str:gstin>/", GstinLookupView.as_view(), name="gstin-lookup"),
     path("profile/", ProfileView.as_view(), name="profile"),
     path("users/", UserManagementView.as_view(), name="user-management"),
+    path("cache-stats/", ResponseCacheStatsView.as_view(), name="response-cache-stats"),
     path("preferences/", PreferencesView.as_view(), name="preferences"),
     path("media/<path:subpath>", SignedMediaView.as_view(), name="signed-media"),
     # JWT Authentication endpoints
@@ -1,10 +1,13 @@
 import csv
 import json
 import logging
+import tempfile
 from calendar import monthrange
 from datetime import datetime
 from decimal import Decimal
+from itertools import chain, groupby
 
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import IntegrityError, transaction
 from django.db.models import (
     Count,
@@ -14,7 +17,7 @@ from django.db.models import (
     Sum,
 )
 from django.db.models.functions import Cast, Coalesce, ExtractMonth, ExtractYear
-from django.http import HttpResponse
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
 from django.utils import timezone
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
@@ -22,19 +25,18 @@ from num2words import num2words
 from openpyxl import Workbook
 from rest_framework import filters, status, viewsets
 from rest_framework.decorators import action
-from rest_framework.pagination import PageNumberPagination
 from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from billing.constants import (
-    B2CL_THRESHOLD,
     DOWNLOAD_SHEET_FIELD_NAMES,
     INVOICE_TYPE_INWARD,
     INVOICE_TYPE_OUTWARD,
 )
 from billing.models import AuditLog, Business, Customer, Invoice, LineItem, Product
-from billing.tax_rules import is_interstate, normalize_tax_heads, state_code
+from billing.services import gstr1_portal, gstr_export, itc_aging, jobs, response_cache, rollups, typeahead
+from billing.tax_rules import is_interstate, normalize_tax_heads
 from billing.utils import (
     AIInvoiceProcessingError,
     AIInvoiceProcessor,
@@ -44,7 +46,9 @@ from billing.utils import (
     process_product_csv,
 )
 
+from .jobs import enqueue_request, wants_async
 from .mixins import AuditLogMixin
+from .pagination import KeysetPagination, StandardResultsSetPagination
 from .permissions import RoleBasedPermission, AdminOnlyPermission, get_user_role
 from .serializers import (
     AuditLogSerializer,
@@ -60,19 +64,16 @@ from .serializers import (
 logger = logging.getLogger(__name__)
 
 
-class StandardResultsSetPagination(PageNumberPagination):
-    page_size = 15
-    page_size_query_param = "page_size"
-    max_page_size = 1000
-
-    def get_page_size(self, request):
-        limit = request.query_params.get("limit")
-        if limit:
-            try:
-                return min(int(limit), self.max_page_size)
-            except ValueError:
-                pass
-        return super().get_page_size(request)
+def _amount_in_words(total_amount):
+    """"One Thousand One Hundred Eighty Rupees Only" for the print payload."""
+    try:
+        # Convert to integer rupees for cleaner output
+        rupees = int(total_amount)
+        # Convert to words and capitalize first letter
+        return num2words(rupees, lang="en_IN").title() + " Rupees Only"
+    except Exception:
+        # Fallback if num2words fails
+        return f"{total_amount} Rupees Only"
 
 
 @method_decorator(csrf_exempt, name="dispatch")
@@ -91,7 +92,7 @@ class BusinessViewSet(AuditLogMixin, viewsets.ModelViewSet):
     ordering = ["name"]
     pagination_class = StandardResultsSetPagination
 
-    # Removed caching to ensure fresh data
+    @response_cache.conditional("businesses.list")
     def list(self, request, *args, **kwargs):
         response = super().list(request, *args, **kwargs)
 
@@ -163,46 +164,53 @@ class BusinessViewSet(AuditLogMixin, viewsets.ModelViewSet):
     @action(detail=False, methods=["get"])
     def performance(self, request):
         """Get performance metrics for each business"""
-        from django.db.models import Count, Q, Sum
+        from datetime import date as _date
 
         # Get query parameters
-        start_date = request.query_params.get("start_date")
-        end_date = request.query_params.get("end_date")
-
-        # Base query
-        query = Invoice.objects.all()
-
-        # Apply filters
-        if start_date:
-            query = query.filter(invoice_date__gte=start_date)
-        if end_date:
-            query = query.filter(invoice_date__lte=end_date)
-
-        # Group by business, calculate totals
-        business_data = (
-            query.values("business", "business__name")
-            .annotate(
-                outward_total=Sum("total_amount", filter=Q(type_of_invoice="outward")),
-                inward_total=Sum("total_amount", filter=Q(type_of_invoice="inward")),
-                outward_count=Count("id", filter=Q(type_of_invoice="outward")),
-                inward_count=Count("id", filter=Q(type_of_invoice="inward")),
+        try:
+            start_date = _date.fromisoformat(request.query_params["start_date"]) \
+                if request.query_params.get("start_date") else None
+            end_date = _date.fromisoformat(request.query_params["end_date"]) \
+                if request.query_params.get("end_date") else None
+        except ValueError:
+            return Response(
+                {"error": "start_date / end_date must be YYYY-MM-DD"},
+                status=status.HTTP_400_BAD_REQUEST,
             )
-            .order_by("-outward_total")
+
+        # Per-(business, type) totals straight off MonthlyTaxRollup — the
+        # invoice-level counters there are booked once per invoice, so these
+        # match Sum(total_amount) / Count(id) over Invoice.
+        by_business = {}
+        for r in rollups.rollup_totals(
+            ("business_id", "type_of_invoice"), start_date=start_date, end_date=end_date
+        ):
+            b = by_business.setdefault(r["business_id"], {
+                "outward_total": None, "inward_total": None,
+                "outward_count": 0, "inward_count": 0,
+            })
+            inv_type = r["type_of_invoice"]
+            if inv_type in (INVOICE_TYPE_OUTWARD, INVOICE_TYPE_INWARD):
+                b[f"{inv_type}_total"] = (b[f"{inv_type}_total"] or 0) + r["invoice_total"]
+                b[f"{inv_type}_count"] += r["invoice_count"]
+        names = dict(
+            Business.objects.filter(id__in=by_business).values_list("id", "name")
         )
 
         # Format the response
         result = []
-        for business in business_data:
+        for business_id, business in by_business.items():
             result.append(
                 {
-                    "id": business["business"],
-                    "name": business["business__name"],
+                    "id": business_id,
+                    "name": names.get(business_id, ""),
                     "outward_total": business["outward_total"] or 0,
                     "inward_total": business["inward_total"] or 0,
                     "outward_count": business["outward_count"] or 0,
                     "inward_count": business["inward_count"] or 0,
                 }
             )
+        result.sort(key=lambda b: b["outward_total"], reverse=True)
 
         return Response(result)
 
@@ -229,9 +237,9 @@ class CustomerViewSet(AuditLogMixin, viewsets.ModelViewSet):
     search_fields = ["name", "gst_number", "mobile_number"]
     ordering_fields = ["name", "gst_number", "mobile_number", "pan_number"]
     ordering = ["name"]
-    pagination_class = StandardResultsSetPagination
+    pagination_class = KeysetPagination
 
-    # Removed caching to ensure fresh data
+    @response_cache.conditional("customers.list")
     def list(self, request, *args, **kwargs):
         response = super().list(request, *args, **kwargs)
 
@@ -299,14 +307,14 @@ class CustomerViewSet(AuditLogMixin, viewsets.ModelViewSet):
         """Search customers by name"""
         query = request.query_params.get("customer_name", "")
         if query and len(query) >= 2:
-            customers = Customer.objects.filter(name__icontains=query).prefetch_related(
-                "businesses"
-            )[:10]
+            # Served from the in-memory index; matches name or GSTIN.
+            customers = typeahead.search_customers(query, limit=10)
             serializer = self.get_serializer(customers, many=True)
             return Response(serializer.data)
         return Response([])
 
     @action(detail=False, methods=["get"])
+    @response_cache.cached("customers.top", business_param="business")
     def top(self, request):
         """Get top customers by revenue"""
         from django.db.models import Count, F, Sum
@@ -515,8 +523,9 @@ class ProductViewSet(AuditLogMixin, viewsets.ModelViewSet):
     search_fields = ["name", "hsn_code"]
     ordering_fields = ["name", "hsn_code", "gst_tax_rate"]
     ordering = ["name"]
-    pagination_class = StandardResultsSetPagination
+    pagination_class = KeysetPagination
 
+    @response_cache.conditional("products.list")
     def list(self, request, *args, **kwargs):
         response = super().list(request, *args, **kwargs)
 
@@ -589,20 +598,19 @@ class ProductViewSet(AuditLogMixin, viewsets.ModelViewSet):
 
         # If query is empty or too short, return all products (limited to 20)
         if not query:
-            products = Product.objects.all().order_by("name")[:20]
+            products = typeahead.first_products(20)
             serializer = self.get_serializer(products, many=True)
             return Response(serializer.data)
         # If query is provided and at least 2 characters, filter by it
         elif len(query) >= 2:
-            products = Product.objects.filter(name__icontains=query).order_by("name")[
-                :20
-            ]
+            products = typeahead.search_products(query, limit=20)
             serializer = self.get_serializer(products, many=True)
             return Response(serializer.data)
         # If query is too short, return empty list
         return Response([])
 
     @action(detail=False, methods=["get"])
+    @response_cache.cached("products.top", business_param="business")
     def top(self, request):
         """Get top products by sales volume or amount"""
         from django.db.models import Count, Sum
@@ -762,9 +770,9 @@ class InvoiceViewSet(AuditLogMixin, viewsets.ModelViewSet):
         "business__name",
     ]
     ordering = ["-invoice_date", "-created_at"]
-    pagination_class = StandardResultsSetPagination
+    pagination_class = KeysetPagination
 
-    # Removed caching to ensure fresh data
+    @response_cache.conditional("invoices.list", business_param="business_id")
     def list(self, request, *args, **kwargs):
         return super().list(request, *args, **kwargs)
 
@@ -807,7 +815,7 @@ class InvoiceViewSet(AuditLogMixin, viewsets.ModelViewSet):
         #   ?dups=1       → invoices whose (business, number, FY, type)
         #                   collides with another row
         if self.request.query_params.get("empty") == "1":
-            queryset = queryset.filter(lineitem__isnull=True)
+            queryset = queryset.filter(line_count=0)
 
         if self.request.query_params.get("no_hsn") == "1":
             # An invoice qualifies if it has at least one line item whose
@@ -837,42 +845,14 @@ class InvoiceViewSet(AuditLogMixin, viewsets.ModelViewSet):
             dup_ids = [i for ids in buckets.values() if len(ids) > 1 for i in ids]
             queryset = queryset.filter(id__in=dup_ids)
 
-        # Annotate via correlated Subqueries instead of a JOIN+GROUP BY.
-        #
-        # The previous version chained
-        #     .annotate(total_tax=Sum(F("lineitem__cgst")+...),
-        #               line_item_count=Count("lineitem"))
-        # which:
-        #   (a) returned WRONG numbers — joining lineitem once and then
-        #       both Sum-ing and Count-ing across that same join causes
-        #       row-multiplication: total_tax = real_tax × line_item_count.
-        #   (b) baked the join into every consumer of get_queryset()
-        #       (stats / gst_summary / gstr_export / etc.), so even
-        #       endpoints that don't need these annotations paid for the
-        #       join. With dev DB at ~900 invoices that's tolerable; at
-        #       prod scale it gets noticeable.
-        #
-        # Subqueries are independent per-row, no row inflation, and
-        # downstream actions that don't reference total_tax / line_item_count
-        # don't pay for them at all (Postgres skips uncorrelated
-        # subqueries that aren't selected).
-        from django.db.models import OuterRef, Subquery, DecimalField, IntegerField
-        line_items_per_invoice = LineItem.objects.filter(invoice=OuterRef("pk"))
-        tax_sum = (
-            line_items_per_invoice
-            .values("invoice")
-            .annotate(t=Sum(F("cgst") + F("sgst") + F("igst")))
-            .values("t")
-        )
-        item_count = (
-            line_items_per_invoice
-            .values("invoice")
-            .annotate(c=Count("id"))
-            .values("c")
-        )
+        # total_tax / line_item_count read the denormalised line totals on
+        # Invoice (billing/services/invoice_totals.py), so the list is a
+        # single-table scan. They used to be correlated subqueries over
+        # LineItem per row, and before that a JOIN + GROUP BY that
+        # multiplied the tax by the line count.
         queryset = queryset.annotate(
-            total_tax=Coalesce(Subquery(tax_sum, output_field=DecimalField()), Decimal("0.00")),
-            line_item_count=Coalesce(Subquery(item_count, output_field=IntegerField()), 0),
+            total_tax=F("cgst_total") + F("sgst_total") + F("igst_total"),
+            line_item_count=F("line_count"),
         )
 
         return queryset
@@ -897,9 +877,10 @@ class InvoiceViewSet(AuditLogMixin, viewsets.ModelViewSet):
         serializer.is_valid(raise_exception=True)
 
         try:
-            with transaction.atomic():
+            with transaction.atomic(), rollups.resync() as rollup:
                 self.perform_create(serializer)  # saves invoice + writes audit log
                 invoice = serializer.instance
+                rollup.add(invoice.pk)
 
                 if line_items_data:
                     interstate = is_interstate(invoice.business, invoice.customer)
@@ -979,7 +960,9 @@ class InvoiceViewSet(AuditLogMixin, viewsets.ModelViewSet):
         old_inv_number = invoice.invoice_number
         old_inv_date = invoice.invoice_date
 
-        with transaction.atomic():
+        # resync() books the old lines/header out of MonthlyTaxRollup on entry
+        # and the new ones in on exit — the bulk writes below skip signals.
+        with transaction.atomic(), rollups.resync([invoice.pk]):
             # 1. Patch invoice-level fields if provided (in-memory only)
             if invoice_data:
                 if "customer" in invoice_data and invoice_data["customer"]:
@@ -1095,42 +1078,36 @@ class InvoiceViewSet(AuditLogMixin, viewsets.ModelViewSet):
     def print(self, request, pk=None):
         """Get printable invoice data"""
         invoice = self.get_object()
+        etag = response_cache.etag("invoices.print", request.query_params, invoice.business_id, invoice.pk)
+        if response_cache.matches(request, etag):
+            self._log_print(request, invoice)
+            return response_cache.not_modified(etag)
         line_items = LineItem.objects.filter(invoice_id=invoice.id)
         summary = LineItem.get_invoice_summary(invoice_id=invoice.id)
 
-        # Convert amount to words using num2words
-        total_amount = summary.get("total_amount", 0)
-        try:
-            # Convert to integer rupees for cleaner output
-            rupees = int(total_amount)
-            # Convert to words and capitalize first letter
-            amount_in_words = num2words(rupees, lang="en_IN").title() + " Rupees Only"
-        except Exception:
-            # Fallback if num2words fails
-            amount_in_words = f"{total_amount} Rupees Only"
-
         data = {
             "invoice": InvoiceSerializer(invoice).data,
             "line_items": LineItemSerializer(line_items, many=True).data,
-            "amount_in_words": amount_in_words,
+            "amount_in_words": _amount_in_words(summary.get("total_amount", 0)),
             **summary,
         }
+        self._log_print(request, invoice)
+        return response_cache.with_etag(Response(data), etag)
 
-        # Log print action
+    def _log_print(self, request, invoice):
+        # Logged on a 304 too: the user still printed it.
         try:
             AuditLog.objects.create(
                 action="printed",
                 entity="invoice",
                 entity_id=invoice.pk,
                 entity_name=f"#{invoice.invoice_number} - {invoice.customer.name}",
-                user=request.user if request.user and request.user.is_authenticated else None,
+                user=self._audit_user(request),
                 details=f"Printed invoice (total: {invoice.total_amount})",
             )
         except Exception:
             pass
 
-        return Response(data)
-
     @action(detail=True, methods=["get", "post"])
     def eway_bill(self, request, pk=None):
         """Get or update e-way bill details for an invoice."""
@@ -1172,6 +1149,7 @@ class InvoiceViewSet(AuditLogMixin, viewsets.ModelViewSet):
         return Response({"message": "E-way bill details saved", "eway_bill_number": invoice.eway_bill_number})
 
     @action(detail=False, methods=["get"])
+    @response_cache.cached("invoices.totals")
     def totals(self, request):
         """Get total amounts for invoices with the same filters as list"""
         queryset = self.get_queryset()
@@ -1210,11 +1188,163 @@ class InvoiceViewSet(AuditLogMixin, viewsets.ModelViewSet):
 
         return Response(data)
 
+    # ── Bulk actions for the list's multi-select ──
+    # Each takes `ids` (a list) in the body, or `all_matching: true` to act
+    # on everything the list filters in the query string select — the same
+    # params as GET /invoices/. One transaction, one AuditLog bulk_create.
+
+    BULK_PRINT_MAX = 500
+
+    def _bulk_selection(self, request):
+        """(queryset, None) for the invoices a bulk action targets, or
+        (None, 400 response) when the request doesn't name any."""
+        queryset = self.filter_queryset(self.get_queryset())
+        ids = request.data.get("ids")
+        if ids is not None:
+            try:
+                ids = [int(i) for i in ids]
+            except (TypeError, ValueError):
+                ids = None
+            if not isinstance(request.data.get("ids"), list) or ids is None:
+                return None, Response(
+                    {"error": "ids must be a list of invoice ids."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            return queryset.filter(id__in=ids), None
+        if str(request.data.get("all_matching", "")).lower() in ("1", "true"):
+            return queryset, None
+        return None, Response(
+            {"error": "Pass ids, or all_matching=true with the list filters."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    def _audit_user(self, request):
+        return request.user if request.user and request.user.is_authenticated else None
+
+    @action(detail=False, methods=["post"])
+    def bulk_delete(self, request):
+        """Delete the selected invoices and their line items. Admin only —
+        it's a DELETE behind a POST, so RoleBasedPermission lets editors in."""
+        if get_user_role(request.user) != "admin":
+            return Response(
+                {"error": "Only admins can delete invoices."},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+        queryset, error = self._bulk_selection(request)
+        if error:
+            return error
+        invoices = list(queryset)
+        ids = [invoice.pk for invoice in invoices]
+        user = self._audit_user(request)
+        logs = [
+            AuditLog(
+                action="deleted", entity="invoice", entity_id=invoice.pk,
+                entity_name=self.get_entity_name(invoice), user=user,
+                details=f"Deleted invoice: {self.get_entity_name(invoice)} (bulk)",
+                snapshot=self._full_snapshot(invoice),
+            )
+            for invoice in invoices
+        ]
+        with transaction.atomic(), rollups.resync(ids):
+            # Lines go in one statement; the per-line signals would re-total
+            # each invoice on its way out.
+            lines = LineItem.objects.filter(invoice_id__in=ids)
+            lines._raw_delete(lines.db)
+            Invoice.objects.filter(id__in=ids).delete()
+            AuditLog.objects.bulk_create(logs, batch_size=200)
+        return Response({"deleted": len(ids), "ids": ids})
+
+    @action(detail=False, methods=["post"])
+    def bulk_print(self, request):
+        """Print payloads (same shape as /invoices/<id>/print/) for the
+        selection, in list order — customer, business and lines prefetched
+        once instead of four queries per invoice."""
+        queryset, error = self._bulk_selection(request)
+        if error:
+            return error
+        invoices = list(queryset.prefetch_related("lineitem_set")[: self.BULK_PRINT_MAX + 1])
+        if len(invoices) > self.BULK_PRINT_MAX:
+            return Response(
+                {"error": f"At most {self.BULK_PRINT_MAX} invoices can be printed at once."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        payloads = []
+        for invoice in invoices:
+            lines = list(invoice.lineitem_set.all())
+            summary = LineItem.summarize(lines)
+            payloads.append({
+                "invoice": InvoiceSerializer(invoice).data,
+                "line_items": LineItemSerializer(lines, many=True).data,
+                "amount_in_words": _amount_in_words(summary["total_amount"]),
+                **summary,
+            })
+        user = self._audit_user(request)
+        AuditLog.objects.bulk_create(
+            [
+                AuditLog(
+                    action="printed", entity="invoice", entity_id=invoice.pk,
+                    entity_name=f"#{invoice.invoice_number} - {invoice.customer.name}", user=user,
+                    details=f"Printed invoice (total: {invoice.total_amount}, bulk)",
+                )
+                for invoice in invoices
+            ],
+            batch_size=200,
+        )
+        return Response({"count": len(payloads), "invoices": payloads})
+
+    @action(detail=False, methods=["post"])
+    def bulk_export(self, request):
+        """CSV of the selection: one row per invoice with its tax breakup."""
+        queryset, error = self._bulk_selection(request)
+        if error:
+            return error
+        rows = list(queryset.values_list(
+            "invoice_number", "invoice_date", "customer__name", "customer__gst_number",
+            "business__name", "type_of_invoice", "taxable_total", "cgst_total",
+            "sgst_total", "igst_total", "total_amount", "line_count",
+        ))
+        response = HttpResponse(content_type="text/csv")
+        response["Content-Disposition"] = 'attachment; filename="selected-invoices.csv"'
+        writer = csv.writer(response)
+        writer.writerow([
+            "Invoice Number", "Invoice Date", "Customer", "Customer GSTIN", "Business",
+            "Type", "Taxable Value", "CGST", "SGST", "IGST", "Total Amount", "Line Items",
+        ])
+        cents = Decimal("0.01")
+        for row in rows:
+            writer.writerow([
+                *row[:2], row[2], row[3] or "", *row[4:6],
+                *(Decimal(v).quantize(cents) for v in row[6:11]), row[11],
+            ])
+        AuditLog.objects.create(
+            action="exported", entity="invoice", entity_id=0,
+            entity_name=f"Invoice CSV ({len(rows)} records)", user=self._audit_user(request),
+            details=f"Exported {len(rows)} selected invoices to CSV",
+        )
+        return response
+
     @action(detail=False, methods=["get"])
+    @response_cache.cached("invoices.monthly_totals")
     def monthly_totals(self, request):
         """Get monthly totals for invoices (outward and inward)"""
         from django.db.models.functions import ExtractMonth, ExtractYear
 
+        scope = self._rollup_scope()
+        if scope is not None:
+            months = {}
+            for r in rollups.rollup_totals(("month", "type_of_invoice"), **scope):
+                key = (r["month"].year, r["month"].month)
+                m = months.setdefault(key, {
+                    "month": key[1], "year": key[0],
+                    "outward_total": None, "inward_total": None,
+                    "outward_count": 0, "inward_count": 0,
+                })
+                inv_type = r["type_of_invoice"]
+                if inv_type in (INVOICE_TYPE_OUTWARD, INVOICE_TYPE_INWARD):
+                    m[f"{inv_type}_total"] = (m[f"{inv_type}_total"] or 0) + r["invoice_total"]
+                    m[f"{inv_type}_count"] += r["invoice_count"]
+            return Response(sorted(months.values(), key=lambda m: (m["year"], m["month"])))
+
         # Use the same queryset as list to apply filters
         queryset = self.get_queryset()
 
@@ -1240,6 +1370,7 @@ class InvoiceViewSet(AuditLogMixin, viewsets.ModelViewSet):
         return Response(monthly_data)
 
     @action(detail=False, methods=["get"])
+    @response_cache.cached("invoices.distribution")
     def distribution(self, request):
         """Get distribution of invoices by type"""
         # Use the same queryset as list to apply filters
@@ -1271,12 +1402,74 @@ class InvoiceViewSet(AuditLogMixin, viewsets.ModelViewSet):
 
         return Response(distribution)
 
-    @action(detail=False, methods=["get"])
-    def stats(self, request):
-        """Get consolidated dashboard stats"""
-        queryset = self.get_queryset()
+    # Query params that narrow the invoice set below what MonthlyTaxRollup is
+    # keyed on. With any of them present the aggregate endpoints fall back to
+    # aggregating LineItem live.
+    ROLLUP_UNSUPPORTED_PARAMS = (
+        "invoice_number", "customer_id", "empty", "no_hsn", "dups",
+    )
 
-        results = {}
+    def _rollup_scope(self):
+        """Translate the list filters into rollup_totals() kwargs, or None
+        when the request filters on something the rollup can't answer."""
+        from datetime import date as _date
+
+        params = self.request.query_params
+        if any(params.get(p) for p in self.ROLLUP_UNSUPPORTED_PARAMS):
+            return None
+        scope = {
+            "business_id": None,
+            "type_of_invoice": params.get("type_of_invoice") or None,
+            "start_date": None,
+            "end_date": None,
+        }
+        try:
+            if params.get("business_id"):
+                scope["business_id"] = int(params["business_id"])
+            # Same rule as get_queryset(): dates only apply as a pair.
+            if params.get("start_date") and params.get("end_date"):
+                scope["start_date"] = _date.fromisoformat(params["start_date"])
+                scope["end_date"] = _date.fromisoformat(params["end_date"])
+        except ValueError:
+            return None
+        return scope
+
+    @staticmethod
+    def _stats_from_rollup(scope):
+        """stats() figures from MonthlyTaxRollup — a few dozen bucket rows
+        instead of every line item in range."""
+        zero = Decimal("0.00")
+        totals = {"outward": zero, "inward": zero, "count": 0,
+                  "outward_tax": zero, "inward_tax": zero}
+        tax_agg = {"cgst": zero, "sgst": zero, "igst": zero}
+        months = {}
+        monthly_tax = {}
+        for r in rollups.rollup_totals(("month", "type_of_invoice"), **scope):
+            inv_type = r["type_of_invoice"]
+            tax = r["cgst"] + r["sgst"] + r["igst"]
+            totals["count"] += r["invoice_count"]
+            for head in tax_agg:
+                tax_agg[head] += r[head]
+            key = (r["month"].year, r["month"].month)
+            m = months.setdefault(key, {
+                "year": key[0], "month": key[1],
+                "outward_total": zero, "inward_total": zero,
+                "outward_count": 0, "inward_count": 0,
+            })
+            if inv_type not in (INVOICE_TYPE_OUTWARD, INVOICE_TYPE_INWARD):
+                continue
+            totals[inv_type] += r["invoice_total"]
+            totals[f"{inv_type}_tax"] += tax
+            m[f"{inv_type}_total"] += r["invoice_total"]
+            m[f"{inv_type}_count"] += r["invoice_count"]
+            if inv_type == INVOICE_TYPE_OUTWARD:
+                monthly_tax[key] = monthly_tax.get(key, 0.0) + float(tax)
+        monthly_raw = sorted(months.values(), key=lambda m: (m["year"], m["month"]), reverse=True)
+        return totals, monthly_raw, monthly_tax, tax_agg
+
+    @staticmethod
+    def _stats_from_line_items(queryset):
+        """stats() figures aggregated live, for filters the rollup can't serve."""
         # 1. Totals
         #
         # Invoice-level sums and line-item tax sums MUST come from separate
@@ -1339,14 +1532,6 @@ class InvoiceViewSet(AuditLogMixin, viewsets.ModelViewSet):
             .order_by("-year", "-month")
         )
 
-        results["totals"] = {
-            "outward": float(totals["outward"]),
-            "inward": float(totals["inward"]),
-            "net": float(totals["outward"] - totals["inward"]),
-            "tax": float(totals["outward_tax"]),
-            "inward_tax": float(totals["inward_tax"]),
-            "count": totals["count"],
-        }
         # Per-month output tax, aggregated on LineItem directly — joining the
         # tax into monthly_raw's invoice-level query would re-introduce the
         # row-multiplication bug fixed in `totals` above. The Easy-mode GST
@@ -1362,6 +1547,34 @@ class InvoiceViewSet(AuditLogMixin, viewsets.ModelViewSet):
             .values("y", "m")
             .annotate(tax=Sum(F("cgst") + F("sgst") + F("igst")))
         }
+        tax_agg = LineItem.objects.filter(invoice__in=queryset).aggregate(
+            cgst=Coalesce(Sum("cgst"), Decimal("0.00")),
+            sgst=Coalesce(Sum("sgst"), Decimal("0.00")),
+            igst=Coalesce(Sum("igst"), Decimal("0.00")),
+        )
+        return totals, monthly_raw, monthly_tax, tax_agg
+
+    @action(detail=False, methods=["get"])
+    @response_cache.cached("invoices.stats")
+    def stats(self, request):
+        """Get consolidated dashboard stats"""
+        queryset = self.get_queryset()
+
+        results = {}
+        scope = self._rollup_scope()
+        if scope is not None:
+            totals, monthly_raw, monthly_tax, tax_agg = self._stats_from_rollup(scope)
+        else:
+            totals, monthly_raw, monthly_tax, tax_agg = self._stats_from_line_items(queryset)
+
+        results["totals"] = {
+            "outward": float(totals["outward"]),
+            "inward": float(totals["inward"]),
+            "net": float(totals["outward"] - totals["inward"]),
+            "tax": float(totals["outward_tax"]),
+            "inward_tax": float(totals["inward_tax"]),
+            "count": totals["count"],
+        }
         results["monthly"] = [
             {
                 "month": m["month"],
@@ -1432,11 +1645,6 @@ class InvoiceViewSet(AuditLogMixin, viewsets.ModelViewSet):
         results["recent_invoices"] = recent_invoices
 
         # 6. Tax Distribution (CGST/SGST/IGST breakdown)
-        tax_agg = LineItem.objects.filter(invoice__in=queryset).aggregate(
-            cgst=Coalesce(Sum("cgst"), Decimal("0.00")),
-            sgst=Coalesce(Sum("sgst"), Decimal("0.00")),
-            igst=Coalesce(Sum("igst"), Decimal("0.00")),
-        )
         results["tax_distribution"] = {
             "cgst": float(tax_agg["cgst"]),
             "sgst": float(tax_agg["sgst"]),
@@ -1510,6 +1718,7 @@ class InvoiceViewSet(AuditLogMixin, viewsets.ModelViewSet):
         })
 
     @action(detail=False, methods=["get"])
+    @response_cache.cached("invoices.data_quality")
     def data_quality(self, request):
         """Snapshot of common data-hygiene issues that will bite at filing time.
 
@@ -1526,7 +1735,7 @@ class InvoiceViewSet(AuditLogMixin, viewsets.ModelViewSet):
         """
         from django.db.models import Case, When
         from django.db.models.functions import ExtractYear
-        empty_inv = Invoice.objects.filter(lineitem__isnull=True).count()
+        empty_inv = Invoice.objects.filter(line_count=0).count()
         no_hsn = LineItem.objects.filter(
             Q(hsn_code__isnull=True) | Q(hsn_code="")
         ).count()
@@ -1560,11 +1769,18 @@ class InvoiceViewSet(AuditLogMixin, viewsets.ModelViewSet):
         })
 
     @action(detail=False, methods=["get"])
+    @response_cache.cached("invoices.gst_summary")
     def gst_summary(self, request):
         """Server-side GST summary for GSTR-1/3B — grouped by rate slab and HSN."""
         queryset = self.get_queryset()
-        invoice_ids = list(queryset.values_list("id", flat=True))
-        items = LineItem.objects.filter(invoice_id__in=invoice_ids)
+        # With plain business/type/date filters the slab, HSN and 3B sums come
+        # from MonthlyTaxRollup; anything narrower aggregates LineItem live.
+        scope = self._rollup_scope()
+        if scope is not None:
+            items = LineItem.objects.filter(invoice_id__in=queryset.values("id"))
+        else:
+            invoice_ids = list(queryset.values_list("id", flat=True))
+            items = LineItem.objects.filter(invoice_id__in=invoice_ids)
         # business_id from query string — used for the per-business ECRRS ledger
         # below. None when querying across all businesses.
         try:
@@ -1581,19 +1797,46 @@ class InvoiceViewSet(AuditLogMixin, viewsets.ModelViewSet):
         # Now: a single GROUP-BY on (type_of_invoice, gst_tax_rate). One
         # query, bucketed into outward/inward in Python.
         rate_slabs = {"outward": [], "inward": []}
-        slab_data = (
-            items
-            .values("invoice__type_of_invoice", "gst_tax_rate")
-            .annotate(
-                taxable=Coalesce(Sum(F("quantity") * F("rate")), Decimal("0")),
-                cgst=Coalesce(Sum("cgst"), Decimal("0")),
-                sgst=Coalesce(Sum("sgst"), Decimal("0")),
-                igst=Coalesce(Sum("igst"), Decimal("0")),
-                total=Coalesce(Sum("amount"), Decimal("0")),
-                count=Count("invoice", distinct=True),
+        if scope is not None:
+            # Distinct invoices per slab isn't additive across rollup buckets,
+            # so that one figure stays a (sum-free) COUNT query.
+            slab_counts = {
+                (c["invoice__type_of_invoice"], c["gst_tax_rate"]): c["count"]
+                for c in items.values("invoice__type_of_invoice", "gst_tax_rate")
+                .annotate(count=Count("invoice", distinct=True))
+                .order_by()
+            }
+            slab_data = sorted(
+                (
+                    {
+                        "invoice__type_of_invoice": r["type_of_invoice"],
+                        "gst_tax_rate": r["gst_tax_rate"],
+                        "taxable": r["taxable"],
+                        "cgst": r["cgst"],
+                        "sgst": r["sgst"],
+                        "igst": r["igst"],
+                        "total": r["amount"],
+                        "count": slab_counts.get((r["type_of_invoice"], r["gst_tax_rate"]), 0),
+                    }
+                    for r in rollups.rollup_totals(("type_of_invoice", "gst_tax_rate"), **scope)
+                    if r["line_count"]
+                ),
+                key=lambda r: (r["invoice__type_of_invoice"], r["gst_tax_rate"]),
+            )
+        else:
+            slab_data = (
+                items
+                .values("invoice__type_of_invoice", "gst_tax_rate")
+                .annotate(
+                    taxable=Coalesce(Sum(F("quantity") * F("rate")), Decimal("0")),
+                    cgst=Coalesce(Sum("cgst"), Decimal("0")),
+                    sgst=Coalesce(Sum("sgst"), Decimal("0")),
+                    igst=Coalesce(Sum("igst"), Decimal("0")),
+                    total=Coalesce(Sum("amount"), Decimal("0")),
+                    count=Count("invoice", distinct=True),
+                )
+                .order_by("invoice__type_of_invoice", "gst_tax_rate")
             )
-            .order_by("invoice__type_of_invoice", "gst_tax_rate")
-        )
         for s in slab_data:
             inv_type = s["invoice__type_of_invoice"]
             if inv_type not in rate_slabs:
@@ -1609,20 +1852,39 @@ class InvoiceViewSet(AuditLogMixin, viewsets.ModelViewSet):
             })
 
         # 2. HSN-wise breakdown
-        hsn_data = (
-            items
-            .values("hsn_code")
-            .annotate(
-                taxable=Coalesce(Sum(F("quantity") * F("rate")), Decimal("0")),
-                cgst=Coalesce(Sum("cgst"), Decimal("0")),
-                sgst=Coalesce(Sum("sgst"), Decimal("0")),
-                igst=Coalesce(Sum("igst"), Decimal("0")),
-                total=Coalesce(Sum("amount"), Decimal("0")),
-                total_qty=Coalesce(Sum("quantity"), Decimal("0")),
-                count=Count("id"),
+        if scope is not None:
+            hsn_data = sorted(
+                (
+                    {
+                        "hsn_code": r["hsn_code"],
+                        "taxable": r["taxable"],
+                        "cgst": r["cgst"],
+                        "sgst": r["sgst"],
+                        "igst": r["igst"],
+                        "total": r["amount"],
+                        "total_qty": r["quantity"],
+                        "count": r["line_count"],
+                    }
+                    for r in rollups.rollup_totals(("hsn_code",), **scope)
+                    if r["line_count"]
+                ),
+                key=lambda h: -h["taxable"],
+            )
+        else:
+            hsn_data = (
+                items
+                .values("hsn_code")
+                .annotate(
+                    taxable=Coalesce(Sum(F("quantity") * F("rate")), Decimal("0")),
+                    cgst=Coalesce(Sum("cgst"), Decimal("0")),
+                    sgst=Coalesce(Sum("sgst"), Decimal("0")),
+                    igst=Coalesce(Sum("igst"), Decimal("0")),
+                    total=Coalesce(Sum("amount"), Decimal("0")),
+                    total_qty=Coalesce(Sum("quantity"), Decimal("0")),
+                    count=Count("id"),
+                )
+                .order_by("-taxable")
             )
-            .order_by("-taxable")
-        )
         hsn_summary = [
             {
                 "hsn_code": h["hsn_code"] or "N/A",
@@ -1640,14 +1902,24 @@ class InvoiceViewSet(AuditLogMixin, viewsets.ModelViewSet):
         # 3. GSTR-3B summary (net tax) — one aggregate with Q-filter
         #    pairs instead of two .filter().aggregate() round-trips.
         from django.db.models import Q as _Q
-        combined = items.aggregate(
-            outward_cgst=Coalesce(Sum("cgst", filter=_Q(invoice__type_of_invoice="outward")), Decimal("0")),
-            outward_sgst=Coalesce(Sum("sgst", filter=_Q(invoice__type_of_invoice="outward")), Decimal("0")),
-            outward_igst=Coalesce(Sum("igst", filter=_Q(invoice__type_of_invoice="outward")), Decimal("0")),
-            inward_cgst=Coalesce(Sum("cgst", filter=_Q(invoice__type_of_invoice="inward")), Decimal("0")),
-            inward_sgst=Coalesce(Sum("sgst", filter=_Q(invoice__type_of_invoice="inward")), Decimal("0")),
-            inward_igst=Coalesce(Sum("igst", filter=_Q(invoice__type_of_invoice="inward")), Decimal("0")),
-        )
+        if scope is not None:
+            combined = {
+                f"{t}_{head}": sum(
+                    (r[head] for r in slab_data if r["invoice__type_of_invoice"] == t),
+                    Decimal("0"),
+                )
+                for t in ("outward", "inward")
+                for head in ("cgst", "sgst", "igst")
+            }
+        else:
+            combined = items.aggregate(
+                outward_cgst=Coalesce(Sum("cgst", filter=_Q(invoice__type_of_invoice="outward")), Decimal("0")),
+                outward_sgst=Coalesce(Sum("sgst", filter=_Q(invoice__type_of_invoice="outward")), Decimal("0")),
+                outward_igst=Coalesce(Sum("igst", filter=_Q(invoice__type_of_invoice="outward")), Decimal("0")),
+                inward_cgst=Coalesce(Sum("cgst", filter=_Q(invoice__type_of_invoice="inward")), Decimal("0")),
+                inward_sgst=Coalesce(Sum("sgst", filter=_Q(invoice__type_of_invoice="inward")), Decimal("0")),
+                inward_igst=Coalesce(Sum("igst", filter=_Q(invoice__type_of_invoice="inward")), Decimal("0")),
+            )
         outward_tax = {"cgst": combined["outward_cgst"], "sgst": combined["outward_sgst"], "igst": combined["outward_igst"]}
         inward_tax = {"cgst": combined["inward_cgst"], "sgst": combined["inward_sgst"], "igst": combined["inward_igst"]}
         gstr3b = {
@@ -1761,60 +2033,9 @@ class InvoiceViewSet(AuditLogMixin, viewsets.ModelViewSet):
             "ecrrs_closing_balance": opening_balance,  # opening + 4(B)(2) - 4(D)(1); both 0 for now
         }
 
-        # ── ITC Aging (Sec 16(4) cut-off) ──
-        # ITC must be claimed by Nov 30 of the FY *following* the invoice date,
-        # else it's forfeit. Bucket inward invoices by days-until-cutoff and
-        # surface anything within 60 days as urgent.
-        from datetime import date as _date, timedelta
-        today = _date.today()
-        inward_with_dates = (
-            queryset.filter(type_of_invoice="inward")
-            .values("id", "invoice_number", "invoice_date", "total_amount")
-            .annotate(
-                tax=Coalesce(
-                    Sum(F("lineitem__cgst") + F("lineitem__sgst") + F("lineitem__igst")),
-                    Decimal("0"),
-                ),
-            )
-        )
-        aging_buckets = {
-            "fresh": {"label": "≤ 60 days to cutoff", "count": 0, "tax": 0.0},
-            "warning": {"label": "60–180 days", "count": 0, "tax": 0.0},
-            "stale": {"label": "180+ days (still claimable)", "count": 0, "tax": 0.0},
-            "expired": {"label": "Past Sec 16(4) cutoff (forfeit)", "count": 0, "tax": 0.0},
-        }
-        urgent_invoices = []
-        for inv in inward_with_dates:
-            inv_date = inv["invoice_date"]
-            if not inv_date:
-                continue
-            # FY of invoice: Apr-Mar
-            fy_start = inv_date.year if inv_date.month >= 4 else inv_date.year - 1
-            cutoff = _date(fy_start + 1, 11, 30)  # Nov 30 of following FY
-            days_left = (cutoff - today).days
-            tax_amt = float(inv["tax"])
-            if days_left < 0:
-                bucket = "expired"
-            elif days_left <= 60:
-                bucket = "fresh"
-            elif days_left <= 180:
-                bucket = "warning"
-            else:
-                bucket = "stale"
-            aging_buckets[bucket]["count"] += 1
-            aging_buckets[bucket]["tax"] += tax_amt
-            if bucket in ("fresh", "expired") and len(urgent_invoices) < 50:
-                urgent_invoices.append({
-                    "id": inv["id"],
-                    "invoice_number": inv["invoice_number"],
-                    "invoice_date": inv_date.isoformat(),
-                    "total_amount": float(inv["total_amount"]),
-                    "tax": tax_amt,
-                    "cutoff": cutoff.isoformat(),
-                    "days_left": days_left,
-                    "bucket": bucket,
-                })
-        urgent_invoices.sort(key=lambda x: x["days_left"])
+        # ITC aging (Sec 16(4)) moved to its own paged endpoint, itc_aging
+        # below — the GST page fetches it only for the Aging tab and the
+        # compliance scan.
 
         # ── GSTR-1 vs GSTR-3B reconciliation ──
         # In a clean book, the rate-slab tax (cgst+sgst+igst per rate) should
@@ -1854,10 +2075,6 @@ class InvoiceViewSet(AuditLogMixin, viewsets.ModelViewSet):
             "hsn_summary": hsn_summary,
             "gstr3b": gstr3b,
             "gstr3b_table4": gstr3b_table4,
-            "itc_aging": {
-                "buckets": aging_buckets,
-                "urgent_invoices": urgent_invoices,
-            },
             "gstr1_3b_recon": gstr1_3b_recon,
             # Promoted to top-level so the Summary view doesn't have to
             # reach into gstr3b_table4.ecrrs_opening_balance. Keeps the old
@@ -1867,196 +2084,45 @@ class InvoiceViewSet(AuditLogMixin, viewsets.ModelViewSet):
         })
 
     @action(detail=False, methods=["get"])
-    def gstr_export(self, request):
-        """Export GSTR-1, GSTR-3B, and 2B matching data in GST portal format."""
-        queryset = self.get_queryset()
-        invoice_ids = list(queryset.values_list("id", flat=True))
-
-        # Prefetch line items so the per-invoice loops below don't fire one
-        # query per invoice (the previous N+1 made this endpoint take ~12s
-        # for ~95 invoices over a remote-DB connection).
-        outward_invoices = list(
-            queryset.filter(type_of_invoice="outward")
-            .select_related("customer", "business")
-            .prefetch_related("lineitem_set")
-        )
-        inward_invoices = list(
-            queryset.filter(type_of_invoice="inward")
-            .select_related("customer", "business")
-            .prefetch_related("lineitem_set")
-        )
-
-        # ── GSTR-1 ──
-
-        # B2B: Invoices to registered dealers (customer has GSTIN)
-        b2b_data = {}
-        for inv in outward_invoices:
-            cust_gst = inv.customer.gst_number.strip() if inv.customer.gst_number else ""
-            if not cust_gst or len(cust_gst) < 15:
-                continue  # Skip unregistered
-            items = inv.lineitem_set.all()
-            inv_items = []
-            for li in items:
-                inv_items.append({
-                    "num": int(li.id),
-                    "itm_det": {
-                        "txval": float(li.quantity * li.rate),
-                        "rt": float(li.gst_tax_rate) * 100 if li.gst_tax_rate <= 1 else float(li.gst_tax_rate),
-                        "camt": float(li.cgst),
-                        "samt": float(li.sgst),
-                        "iamt": float(li.igst),
-                    },
-                })
-            if cust_gst not in b2b_data:
-                b2b_data[cust_gst] = {"ctin": cust_gst, "inv": []}
-            b2b_data[cust_gst]["inv"].append({
-                "inum": inv.invoice_number,
-                "idt": inv.invoice_date.strftime("%d-%m-%Y") if inv.invoice_date else "",
-                "val": float(inv.total_amount),
-                "pos": inv.customer.gst_number[:2] if inv.customer.gst_number else "",
-                "rchrg": "N",
-                "inv_typ": "R",
-                "itms": inv_items,
-            })
-        b2b = list(b2b_data.values())
-
-        # B2CS: Invoices to unregistered (no GSTIN, intra-state, <=2.5L)
-        b2cs = []
-        b2cs_agg = {}
-        for inv in outward_invoices:
-            cust_gst = inv.customer.gst_number.strip() if inv.customer.gst_number else ""
-            if cust_gst and len(cust_gst) >= 15:
-                continue  # Skip registered
-            # One rule decides direction everywhere (is_interstate compares
-            # like with like: GSTINs when both sides have one, else state
-            # names). The old code read the customer's state off their GSTIN
-            # and fell back to the SELLER's state when they had none — so an
-            # interstate B2C sale was filed here as a local supply.
-            if is_interstate(inv.business, inv.customer):
-                continue  # Inter-state goes to B2CL
-            biz_state = state_code(inv.business)
-            items = inv.lineitem_set.all()
-            for li in items:
-                rate = float(li.gst_tax_rate) * 100 if li.gst_tax_rate <= 1 else float(li.gst_tax_rate)
-                key = f"{biz_state}-{rate}"
-                if key not in b2cs_agg:
-                    b2cs_agg[key] = {"pos": biz_state, "rt": rate, "txval": 0, "camt": 0, "samt": 0, "typ": "OE"}
-                b2cs_agg[key]["txval"] += float(li.quantity * li.rate)
-                b2cs_agg[key]["camt"] += float(li.cgst)
-                b2cs_agg[key]["samt"] += float(li.sgst)
-        b2cs = list(b2cs_agg.values())
-
-        # B2CL: Large invoices to unregistered (> B2CL_THRESHOLD, inter-state)
-        b2cl = []
-        for inv in outward_invoices:
-            if float(inv.total_amount) <= B2CL_THRESHOLD:
-                continue
-            cust_gst = inv.customer.gst_number.strip() if inv.customer.gst_number else ""
-            if cust_gst and len(cust_gst) >= 15:
-                continue
-            # Every invoice reaching this point has no customer GSTIN, so the
-            # old "GSTIN prefix else seller's state" fallback made the customer
-            # look local every single time — B2CL was structurally unreachable
-            # and these sales silently went to B2CS instead.
-            if not is_interstate(inv.business, inv.customer):
-                continue  # Intra-state goes to B2CS
-            cust_state = state_code(inv.customer)
-            if not cust_state:
-                continue  # No place of supply to report against
-            items = inv.lineitem_set.all()
-            inv_items = [{
-                "num": int(li.id),
-                "itm_det": {
-                    "txval": float(li.quantity * li.rate),
-                    "rt": float(li.gst_tax_rate) * 100 if li.gst_tax_rate <= 1 else float(li.gst_tax_rate),
-                    "iamt": float(li.igst),
-                },
-            } for li in items]
-            b2cl.append({
-                "pos": cust_state,
-                "inv": [{
-                    "inum": inv.invoice_number,
-                    "idt": inv.invoice_date.strftime("%d-%m-%Y") if inv.invoice_date else "",
-                    "val": float(inv.total_amount),
-                    "itms": inv_items,
-                }],
-            })
+    def itc_aging(self, request):
+        """Inward invoices against the Sec 16(4) ITC cut-off, paged.
+
+        Same filters as the list (business_id, start_date/end_date, …).
+        `buckets` counts and sums tax for every bucket; `results` lists
+        invoices most-overdue first, optionally narrowed with
+        `?bucket=fresh|warning|stale|expired|urgent` (urgent = fresh +
+        expired, the "Action needed" list). See billing/services/itc_aging.py.
+        """
+        from datetime import date as _date
 
-        # HSN Summary
-        items_all = LineItem.objects.filter(invoice_id__in=invoice_ids)
-        hsn_agg = {}
-        for li in items_all.filter(invoice__type_of_invoice="outward"):
-            hsn = li.hsn_code or "0"
-            if hsn not in hsn_agg:
-                hsn_agg[hsn] = {"hsn_sc": hsn, "qty": 0, "txval": 0, "camt": 0, "samt": 0, "iamt": 0}
-            hsn_agg[hsn]["qty"] += float(li.quantity)
-            hsn_agg[hsn]["txval"] += float(li.quantity * li.rate)
-            hsn_agg[hsn]["camt"] += float(li.cgst)
-            hsn_agg[hsn]["samt"] += float(li.sgst)
-            hsn_agg[hsn]["iamt"] += float(li.igst)
-        hsn = list(hsn_agg.values())
-
-        gstr1 = {"b2b": b2b, "b2cs": b2cs, "b2cl": b2cl, "hsn": {"data": hsn}}
-
-        # ── GSTR-3B ──
-        outward_items = items_all.filter(invoice__type_of_invoice="outward")
-        inward_items = items_all.filter(invoice__type_of_invoice="inward")
-
-        ot = outward_items.aggregate(
-            txval=Coalesce(Sum(F("quantity") * F("rate")), Decimal("0")),
-            cgst=Coalesce(Sum("cgst"), Decimal("0")),
-            sgst=Coalesce(Sum("sgst"), Decimal("0")),
-            igst=Coalesce(Sum("igst"), Decimal("0")),
-        )
-        it = inward_items.aggregate(
-            txval=Coalesce(Sum(F("quantity") * F("rate")), Decimal("0")),
-            cgst=Coalesce(Sum("cgst"), Decimal("0")),
-            sgst=Coalesce(Sum("sgst"), Decimal("0")),
-            igst=Coalesce(Sum("igst"), Decimal("0")),
+        bucket = request.query_params.get("bucket") or None
+        if bucket and bucket != "urgent" and bucket not in itc_aging.BUCKETS:
+            return Response(
+                {"error": f"Unknown bucket '{bucket}'."}, status=status.HTTP_400_BAD_REQUEST
+            )
+        today = _date.today()
+        queryset = self.get_queryset()
+        paginator = StandardResultsSetPagination()
+        page = paginator.paginate_queryset(
+            itc_aging.rows(queryset, today, bucket), request, view=self
         )
+        response = paginator.get_paginated_response([itc_aging.row(r, today) for r in page])
+        response.data["as_of"] = today.isoformat()
+        response.data["buckets"] = itc_aging.buckets(queryset, today)
+        return response
 
-        gstr3b = {
-            "sup_details": {
-                "osup_det": {"txval": float(ot["txval"]), "camt": float(ot["cgst"]), "samt": float(ot["sgst"]), "iamt": float(ot["igst"])},
-            },
-            "itc_elg": {
-                # "OTH" = all other ITC (GSTR-3B table 4(A)(5)). This used to say
-                # "IMPG" (import of goods), which files every rupee of domestic
-                # purchase tax under imports.
-                "itc_avl": [{"ty": "OTH", "iamt": float(it["igst"]), "camt": float(it["cgst"]), "samt": float(it["sgst"])}],
-            },
-            "intr_ltfee": {
-                "intr_details": {"iamt": 0, "camt": 0, "samt": 0},
-            },
-            "tax_pmt": {
-                "cgst": float(ot["cgst"] - it["cgst"]),
-                "sgst": float(ot["sgst"] - it["sgst"]),
-                "igst": float(ot["igst"] - it["igst"]),
-            },
-        }
+    @action(detail=False, methods=["get"])
+    def gstr_export(self, request):
+        """Export GSTR-1, GSTR-3B, and 2B matching data in GST portal format.
 
-        # ── GSTR-2B Matching (basic) ──
-        # Compare inward invoices against expected data
-        inward_list = []
-        for inv in inward_invoices:
-            items = inv.lineitem_set.all()
-            total_tax = sum(float(li.cgst + li.sgst + li.igst) for li in items)
-            total_taxable = sum(float(li.quantity * li.rate) for li in items)
-            inward_list.append({
-                "invoice_number": inv.invoice_number,
-                "invoice_date": inv.invoice_date.strftime("%d-%m-%Y") if inv.invoice_date else "",
-                "supplier_name": inv.customer.name,
-                "supplier_gstin": inv.customer.gst_number or "",
-                "taxable_value": total_taxable,
-                "tax_amount": total_tax,
-                "total": float(inv.total_amount),
-            })
+        With `async=1` the export is queued and a job is returned instead;
+        poll /api/jobs/<id>/ for the same payload as `result`.
+        """
+        if wants_async(request):
+            return enqueue_request(request, "gstr_export")
 
-        return Response({
-            "gstr1": gstr1,
-            "gstr3b": gstr3b,
-            "gstr2b": {"inward_invoices": inward_list},
-        })
+        # Section by section in SQL — see billing/services/gstr_export.py.
+        return Response(gstr_export.build(self.get_queryset()))
 
     @action(detail=False, methods=["get"], url_path="gstr1-portal-json")
     def gstr1_portal_json(self, request):
@@ -2089,187 +2155,57 @@ class InvoiceViewSet(AuditLogMixin, viewsets.ModelViewSet):
         except (ValueError, AssertionError):
             return Response({"error": "month (1-12) and year are required."}, status=400)
 
-        gstin = (business.gst_number or "").strip().upper()
-        if len(gstin) != 15:
-            return Response(
-                {"error": f"Business '{business.name}' has no 15-character GSTIN — "
-                          "set it before generating a portal file."},
-                status=400,
-            )
-
-        TWO = Decimal("0.01")
-
-        def r2(x):
-            return float(Decimal(x or 0).quantize(TWO))
-
-        def rate_pct(li):
-            r = li.gst_tax_rate or Decimal(0)
-            return float(r * 100 if r <= 1 else r)
-
-        UQC = {"gms": "GMS", "gm": "GMS", "g": "GMS", "kg": "KGS", "kgs": "KGS",
-               "pcs": "PCS", "pc": "PCS", "nos": "NOS", "carat": "CTM", "ct": "CTM"}
-
-        invoices = (
-            Invoice.objects.filter(
-                business=business, type_of_invoice="outward",
-                invoice_date__year=year, invoice_date__month=month,
+        try:
+            gstr1_portal.business_gstin(business)
+        except gstr1_portal.PortalFileError as e:
+            return Response({"error": str(e)}, status=400)
+
+        # Parameters are valid — hand the build to the worker if asked to.
+        if wants_async(request):
+            return enqueue_request(request, "gstr1_portal_json")
+
+        # Built by billing/services/gstr1_portal.py, shared with the batch
+        # endpoint below.
+        return Response(gstr1_portal.build([gstr1_portal.Period(business, year, month)])[0])
+
+    @action(detail=False, methods=["get"], url_path="gstr1-portal-batch")
+    def gstr1_portal_batch(self, request):
+        """GSTR-1 portal files for several businesses and months as one ZIP.
+
+        `business_ids` (comma-separated; default every business) and
+        `from_month` / `to_month` as YYYY-MM, inclusive. The ZIP holds one
+        GSTR1_<gstin>_<MMYYYY>.json per business-month — each the `file` the
+        single-period endpoint returns — and meta.json with every period's
+        meta plus businesses that couldn't be filed.
+        """
+        businesses = Business.objects.order_by("id")
+        raw_ids = request.query_params.get("business_ids")
+        if raw_ids:
+            try:
+                ids = [int(i) for i in raw_ids.split(",") if i.strip()]
+            except ValueError:
+                return Response({"error": "business_ids must be comma-separated ids."}, status=400)
+            businesses = businesses.filter(id__in=ids)
+        try:
+            months = gstr1_portal.month_span(
+                request.query_params.get("from_month"), request.query_params.get("to_month")
             )
-            .select_related("customer")
-            .prefetch_related("lineitem_set")
-            .order_by("invoice_date", "id")
+            content, report = gstr1_portal.bundle(list(businesses), months)
+        except gstr1_portal.PortalFileError as e:
+            return Response({"error": str(e)}, status=400)
+
+        AuditLog.objects.create(
+            action="exported", entity="invoice", entity_id=0,
+            entity_name=f"GSTR-1 portal batch ({len(report['periods'])} files)",
+            user=request.user if request.user and request.user.is_authenticated else None,
+            details=f"GSTR-1 portal JSON for {months[0][1]:02d}/{months[0][0]}–{months[-1][1]:02d}/{months[-1][0]}",
         )
-
-        skipped, warnings = [], []
-        b2b_data, b2cl_data, b2cs_agg, hsn_agg = {}, {}, {}, {}
-        biz_pos = state_code(business)
-        counts = {"b2b": 0, "b2cl": 0, "b2cs": 0}
-
-        def slabs(items):
-            """Aggregate an invoice's lines into per-rate slabs (portal itms)."""
-            agg = {}
-            for li in items:
-                rt = rate_pct(li)
-                s = agg.setdefault(rt, {"txval": Decimal(0), "camt": Decimal(0),
-                                        "samt": Decimal(0), "iamt": Decimal(0)})
-                s["txval"] += (li.quantity or 0) * (li.rate or 0)
-                s["camt"] += li.cgst or 0
-                s["samt"] += li.sgst or 0
-                s["iamt"] += li.igst or 0
-            return agg
-
-        for inv in invoices:
-            items = list(inv.lineitem_set.all())
-            label = f"{inv.invoice_number or '(no number)'} / {inv.invoice_date}"
-            if not inv.invoice_number or not inv.invoice_date:
-                skipped.append(f"{label}: missing invoice number or date")
-                continue
-            if not items:
-                skipped.append(f"{label}: no line items")
-                continue
-
-            agg = slabs(items)
-            idt = inv.invoice_date.strftime("%d-%m-%Y")
-            val = r2(inv.total_amount)
-            cust_gstin = (inv.customer.gst_number or "").strip().upper()
-
-            if len(cust_gstin) == 15:
-                itms = [
-                    {"num": i + 1, "itm_det": {
-                        "txval": r2(s["txval"]), "rt": rt,
-                        "camt": r2(s["camt"]), "samt": r2(s["samt"]),
-                        "iamt": r2(s["iamt"]), "csamt": 0,
-                    }}
-                    for i, (rt, s) in enumerate(sorted(agg.items()))
-                ]
-                b2b_data.setdefault(cust_gstin, {"ctin": cust_gstin, "inv": []})["inv"].append({
-                    "inum": inv.invoice_number, "idt": idt, "val": val,
-                    "pos": cust_gstin[:2], "rchrg": "N", "inv_typ": "R", "itms": itms,
-                })
-                counts["b2b"] += 1
-                continue
-
-            inter = is_interstate(business, inv.customer)
-            cust_pos = state_code(inv.customer)
-
-            if inter and not cust_pos:
-                warnings.append(f"{label}: inter-state but customer state unknown — filed as intra-state")
-                inter = False
-
-            if inter and float(inv.total_amount) > B2CL_THRESHOLD:
-                itms = [
-                    {"num": i + 1, "itm_det": {
-                        "txval": r2(s["txval"]), "rt": rt,
-                        "iamt": r2(s["iamt"]), "csamt": 0,
-                    }}
-                    for i, (rt, s) in enumerate(sorted(agg.items()))
-                ]
-                b2cl_data.setdefault(cust_pos, {"pos": cust_pos, "inv": []})["inv"].append({
-                    "inum": inv.invoice_number, "idt": idt, "val": val, "itms": itms,
-                })
-                counts["b2cl"] += 1
-                continue
-
-            # Consolidated B2C: intra-state at any value, inter-state <= threshold.
-            pos = cust_pos if inter else (biz_pos or gstin[:2])
-            sply = "INTER" if inter else "INTRA"
-            for rt, s in agg.items():
-                b = b2cs_agg.setdefault((sply, pos, rt), {
-                    "sply_ty": sply, "pos": pos, "typ": "OE", "rt": rt,
-                    "txval": Decimal(0), "camt": Decimal(0),
-                    "samt": Decimal(0), "iamt": Decimal(0),
-                })
-                b["txval"] += s["txval"]
-                b["camt"] += s["camt"]
-                b["samt"] += s["samt"]
-                b["iamt"] += s["iamt"]
-                if sply == "INTRA" and s["iamt"]:
-                    warnings.append(f"{label}: intra-state supply carries IGST — run fix_tax_heads")
-                if sply == "INTER" and (s["camt"] or s["samt"]):
-                    warnings.append(f"{label}: inter-state supply carries CGST/SGST — run fix_tax_heads")
-            counts["b2cs"] += 1
-
-        # HSN summary (table 12) over everything that made it into the file.
-        for inv in invoices:
-            if not inv.invoice_number or not inv.invoice_date:
-                continue
-            for li in inv.lineitem_set.all():
-                hsn = (li.hsn_code or "").strip()
-                uqc = UQC.get((li.unit or "").strip().lower(), "OTH")
-                rt = rate_pct(li)
-                h = hsn_agg.setdefault((hsn, uqc, rt), {
-                    "hsn_sc": hsn, "desc": (li.product_name or "")[:30], "uqc": uqc,
-                    "rt": rt, "qty": Decimal(0), "txval": Decimal(0),
-                    "camt": Decimal(0), "samt": Decimal(0), "iamt": Decimal(0),
-                })
-                h["qty"] += li.quantity or 0
-                h["txval"] += (li.quantity or 0) * (li.rate or 0)
-                h["camt"] += li.cgst or 0
-                h["samt"] += li.sgst or 0
-                h["iamt"] += li.igst or 0
-                if not hsn:
-                    warnings.append(f"{inv.invoice_number}: line '{li.product_name}' has no HSN")
-
-        fp = f"{month:02d}{year}"
-        file_obj = {"gstin": gstin, "fp": fp, "version": "GST3.2.1", "hash": "hash"}
-        if b2b_data:
-            file_obj["b2b"] = list(b2b_data.values())
-        if b2cl_data:
-            file_obj["b2cl"] = list(b2cl_data.values())
-        if b2cs_agg:
-            file_obj["b2cs"] = [
-                {"sply_ty": b["sply_ty"], "pos": b["pos"], "typ": b["typ"], "rt": b["rt"],
-                 "txval": r2(b["txval"]),
-                 **({"iamt": r2(b["iamt"])} if b["sply_ty"] == "INTER"
-                    else {"camt": r2(b["camt"]), "samt": r2(b["samt"])}),
-                 "csamt": 0}
-                for b in b2cs_agg.values()
-            ]
-        if hsn_agg:
-            file_obj["hsn"] = {"data": [
-                {"num": i + 1, "hsn_sc": h["hsn_sc"], "desc": h["desc"], "uqc": h["uqc"],
-                 "qty": r2(h["qty"]), "rt": h["rt"], "txval": r2(h["txval"]),
-                 "camt": r2(h["camt"]), "samt": r2(h["samt"]),
-                 "iamt": r2(h["iamt"]), "csamt": 0}
-                for i, h in enumerate(hsn_agg.values())
-            ]}
-
-        total_txval = sum(
-            r2(b["txval"]) for b in b2cs_agg.values()
-        ) + sum(
-            i["itm_det"]["txval"] for g in b2b_data.values() for v in g["inv"] for i in v["itms"]
-        ) + sum(
-            i["itm_det"]["txval"] for g in b2cl_data.values() for v in g["inv"] for i in v["itms"]
+        response = HttpResponse(content, content_type="application/zip")
+        response["Content-Disposition"] = (
+            f'attachment; filename="gstr1-{months[0][0]}{months[0][1]:02d}-'
+            f'{months[-1][0]}{months[-1][1]:02d}.zip"'
         )
-
-        return Response({
-            "file": file_obj,
-            "meta": {
-                "business": business.name, "gstin": gstin, "fp": fp,
-                "invoice_counts": counts,
-                "taxable_total": round(total_txval, 2),
-                "skipped": skipped, "warnings": warnings,
-            },
-        })
+        return response
 
     @action(detail=False, methods=["get"])
     def next_invoice_number(self, request):
@@ -2479,6 +2415,11 @@ class ReportView(APIView):
     filtered by date range and invoice type.
     """
 
+    # Rows fetched per round-trip while streaming line items into the sheet.
+    ROW_CHUNK_SIZE = 2000
+    # The finished workbook stays in memory up to this size, then spills to disk.
+    SPOOL_MAX_SIZE = 8 * 1024 * 1024
+
     def get(self, request, *args, **kwargs):
         # Just return a simple response for API health check
         return Response({"message": "Report API ready"})
@@ -2512,8 +2453,11 @@ class ReportView(APIView):
         def create_row_with_spacing(data):
             return ([""]) * 5 + [data]
 
-        # Return zeros if no data
-        if not line_items:
+        # line_items may be a lazy iterator straight off the cursor, so peek
+        # at the first row instead of len()/truthiness. No data -> no section.
+        line_items = iter(line_items)
+        first = next(line_items, None)
+        if first is None:
             return (
                 Decimal("0"),
                 Decimal("0"),
@@ -2536,7 +2480,7 @@ class ReportView(APIView):
         sheet.append(DOWNLOAD_SHEET_FIELD_NAMES)
 
         # Add data rows and calculate totals
-        for idx, item in enumerate(line_items, start=1):
+        for idx, item in enumerate(chain([first], line_items), start=1):
             # Exclude the metadata fields (invoice_type and invoice_id_for_filter)
             sheet.append([idx] + list(item[:14]))
 
@@ -2625,26 +2569,22 @@ class ReportView(APIView):
         sheet,
         overall_totals,
     ):
-        """Process invoice data for a specific type (inward or outward)."""
-        # Filter items by invoice type
+        """Process invoice data for a specific type (inward or outward).
+
+        ``line_items`` is one month's rows of both types, as split off the
+        range query by ``generate_report_for_business``.
+        """
         if invoice_type == INVOICE_TYPE_OUTWARD:
-            filtered_items = [
-                item for item in line_items if item[14] == INVOICE_TYPE_OUTWARD
-            ]
             supply_type = "Outward Supply"
             totals_key = "outward"
         else:  # INVOICE_TYPE_INWARD
-            filtered_items = [
-                item for item in line_items if item[14] == INVOICE_TYPE_INWARD
-            ]
             supply_type = "Inward Supply"
             totals_key = "inward"
 
-        # Skip if no data for this type
-        if not filtered_items:
-            return
+        # Filter items by invoice type
+        filtered_items = (item for item in line_items if item[14] == invoice_type)
 
-        # Add data to sheet and get totals
+        # Add data to sheet and get totals (all zero when there was no data)
         totals = cls.add_invoice_data_to_sheet(
             business,
             business_name,
@@ -2754,16 +2694,30 @@ class ReportView(APIView):
         # Get monthly date ranges
         monthly_ranges = cls.get_monthly_date_ranges(start_date, end_date)
 
+        # One ordered query for the whole range, split into months here.
+        # This used to query once per month, so a 12-month, 5-firm report
+        # was 60 round-trips. Rows come back ordered by invoice date, so each
+        # month is a contiguous run; item[16] is the raw invoice date.
+        rows = LineItem.get_line_item_data_for_download(
+            start_date=start_date, end_date=end_date, business=business
+        ).iterator(chunk_size=cls.ROW_CHUNK_SIZE)
+        months = groupby(rows, key=lambda item: (item[16].year, item[16].month))
+        pending = next(months, None)
+
         # Process each month separately
         for month_start_date, month_end_date in monthly_ranges:
             date_range_string = cls.get_date_range_string(
                 month_start_date, month_end_date
             )
 
-            # Get all line item data for the month in a single query
-            line_items = LineItem.get_line_item_data_for_download(
-                start_date=month_start_date, end_date=month_end_date, business=business
-            )
+            # Take this month's run off the stream (if it has any rows). Only
+            # one month is held at a time, since the outward section has to
+            # be written before the inward one.
+            month_key = (int(month_start_date[:4]), int(month_start_date[5:7]))
+            line_items = []
+            if pending is not None and pending[0] == month_key:
+                line_items = list(pending[1])
+                pending = next(months, None)
 
             # Process outward invoices if requested
             if invoice_type in [INVOICE_TYPE_OUTWARD, "both"]:
@@ -2795,30 +2749,43 @@ class ReportView(APIView):
 
     @classmethod
     def generate_csv_response(cls, start_date, end_date, invoice_type):
-        """Generate an Excel file and return as an HTTP response."""
-        # Create workbook and remove default sheet
-        workbook = Workbook()
-        workbook.remove(workbook.active)
+        """Generate an Excel file and return as a streamed HTTP response.
+
+        The workbook is write-only: openpyxl flushes each sheet's rows to a
+        temp file as they are appended instead of keeping a cell object per
+        value, so a year of line items no longer has to fit in memory. The
+        finished .xlsx goes into a spooled temp file (in memory while small,
+        on disk past SPOOL_MAX_SIZE) and is streamed back from there.
+        """
+        # Write-only workbooks start with no sheets, so there is no default
+        # sheet to remove.
+        workbook = Workbook(write_only=True)
 
         # Generate a sheet for each business
-        for business in Business.objects.all():
+        businesses = list(Business.objects.all())
+        for done, business in enumerate(businesses):
             cls.generate_report_for_business(
                 workbook, business, start_date, end_date, invoice_type
             )
+            jobs.report_progress(done + 1, len(businesses))
 
-        # Prepare HTTP response with Excel file
-        response = HttpResponse(
-            content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        )
+        output = tempfile.SpooledTemporaryFile(max_size=cls.SPOOL_MAX_SIZE)
+        workbook.save(output)
+        output.seek(0)
 
         # Set filename with date range
         date_range = cls.get_date_range_string(start_date, end_date)
         filename = f"invoices_{date_range}.xlsx"
+
+        # FileResponse streams the spooled file in blocks and closes it when
+        # the response is done.
+        response = FileResponse(
+            output,
+            content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        )
         response["Content-Disposition"] = (
             f"attachment; filename=\"{filename}\"; filename*=UTF-8''{filename}"
         )
-
-        workbook.save(response)
         return response
 
     def post(self, request, *args, **kwargs):
@@ -2835,6 +2802,10 @@ class ReportView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
+        # async=1: queue it; the workbook becomes the job's artifact.
+        if wants_async(request):
+            return enqueue_request(request, "report")
+
         # Generate and return the Excel file
         return self.generate_csv_response(start_date, end_date, invoice_type)
 
@@ -2892,21 +2863,36 @@ class CSVImportView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        # Process the CSV file
+        # Resuming a partial invoice import: the data-row offset the last
+        # run reported as `next_row`.
         try:
-            # Read the file content
-            file_content = csv_file.read()
-            logger.info(f"File content length: {len(file_content)}")
+            start_row = int(request.data.get("start_row") or 0)
+            if start_row < 0:
+                raise ValueError
+        except (TypeError, ValueError):
+            return Response(
+                {"error": "start_row must be a non-negative integer"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
+        # Process the CSV file
+        try:
             # Process the CSV file based on import type
             if import_type == "invoice":
-                result = process_invoice_csv(file_content, int(business_id))
-            elif import_type == "customer":
-                result = process_customer_csv(file_content, int(business_id))
-            elif import_type == "product":
-                result = process_product_csv(file_content)
+                # Streamed from the upload's (temp) file in chunks — never
+                # read whole, exports from other tools run to hundreds of MB.
+                result = process_invoice_csv(csv_file, int(business_id), start_row=start_row)
+            else:
+                file_content = csv_file.read()
+                logger.info(f"File content length: {len(file_content)}")
+                if import_type == "customer":
+                    result = process_customer_csv(file_content, int(business_id))
+                else:
+                    result = process_product_csv(file_content)
 
-            logger.info(f"Import result for {import_type}: {result}")
+            # Counts only — the error list and per-chunk stats can be long.
+            summary = {k: v for k, v in result.items() if k not in ("errors", "chunks")}
+            logger.info(f"Import result for {import_type}: {summary}")
 
             return Response(result, status=status.HTTP_201_CREATED)
         except CSVImportError as e:
@@ -2943,6 +2929,11 @@ class BulkInvoiceImportView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
+        # Large imports can outlive the gunicorn timeout; async=1 queues the
+        # same payload for the run_jobs worker.
+        if wants_async(request):
+            return enqueue_request(request, "bulk_invoice_import")
+
         created_count = 0
         skipped_count = 0
         errors = []
@@ -3032,6 +3023,7 @@ class BulkInvoiceImportView(APIView):
                 ) for info in needed_new.values()
             ]
             Customer.objects.bulk_create(new_objs, batch_size=200)
+            typeahead.invalidate(typeahead.CUSTOMERS)
             # Update caches with the freshly-created customers
             for c in new_objs:
                 cust_by_name[c.name.lower()] = c
@@ -3072,7 +3064,7 @@ class BulkInvoiceImportView(APIView):
         pending_invoice_audits: list[dict] = []
         new_customers_added_to_biz = []  # (customer, business) pairs
 
-        with transaction.atomic():
+        with transaction.atomic(), rollups.resync() as rollup:
             for inv_data in invoices_data:
                 try:
                     firm_name = (inv_data.get("firmName") or "").strip()
@@ -3216,6 +3208,7 @@ class BulkInvoiceImportView(APIView):
                     invoices_to_create = surviving
                     invoice_objs = [pair[0] for pair in surviving]
                 # Now invoice.pk is populated; build line items + audit logs.
+                rollup.add(*(invoice.pk for invoice in invoice_objs))
                 for invoice, inv_data in invoices_to_create:
                     items = inv_data.get("items", [])
                     is_igst = invoice.is_igst_applicable
@@ -3404,6 +3397,7 @@ class BulkInvoiceImportView(APIView):
                     m2m_rows.append(Through(customer_id=cust.pk, business_id=biz.pk))
                 if m2m_rows:
                     Through.objects.bulk_create(m2m_rows, ignore_conflicts=True, batch_size=200)
+                    typeahead.invalidate(typeahead.CUSTOMERS)
 
         return Response(
             {
@@ -3437,39 +3431,9 @@ class AIInvoiceProcessingView(APIView):
 
             image_file = request.FILES["image"]
 
-            # HEIC added for iPhone photo uploads — pillow-heif registered
-            # an opener on Pillow, and AIInvoiceProcessor._normalize_image
-            # always re-encodes to JPEG before going to Gemini (which only
-            # accepts JPEG/PNG inline). Browsers send `image/heic` or
-            # `image/heif`; some HEIC files come through as
-            # `application/octet-stream` because the browser couldn't
-            # sniff them — we let those through and rely on PIL to
-            # validate during normalization.
-            allowed_types = [
-                "image/jpeg", "image/jpg", "image/png",
-                "image/heic", "image/heif",
-                "application/octet-stream",  # fallback for .heic from some browsers
-            ]
-            if image_file.content_type not in allowed_types:
-                return Response(
-                    {
-                        "error": (
-                            f"Unsupported image type '{image_file.content_type}'. "
-                            "Upload a JPEG, PNG, or HEIC."
-                        )
-                    },
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-
-            # Validate file size (max 20MB — bumped from 10MB to handle
-            # modern iPhone HEIC photos which routinely hit 10-15MB).
-            if image_file.size > 20 * 1024 * 1024:
-                return Response(
-                    {
-                        "error": "File too large. Maximum size is 20MB."
-                    },
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
+            error = self.validate_image(image_file)
+            if error:
+                return Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
 
             # business_id is OPTIONAL — when omitted, the AI extracts the
             # recipient GSTIN from the invoice and the frontend looks up
@@ -3484,178 +3448,7 @@ class AIInvoiceProcessingView(APIView):
                 image_file, business_id=business_id
             )
 
-            # Auto-detect which Business this invoice belongs to AND the
-            # invoice direction. We check EVERY GSTIN the AI extracted
-            # (buyer, seller, AND the legacy customer_gst_number),
-            # because in practice the AI sometimes ignores the
-            # buyer/seller split and only fills the legacy customer
-            # field — particularly on Indian invoices where the "Bill
-            # To" block is the most visually prominent block.
-            #
-            # Routing:
-            #   - GSTIN matches on buyer or customer side → our business
-            #     bought from someone → INWARD. The "customer" (in the
-            #     app's data-model sense, i.e. the OTHER party) is the
-            #     seller.
-            #   - GSTIN matches on seller side → our business sold to
-            #     someone → OUTWARD. The "customer" is the buyer.
-            #
-            # If the AI confused itself and put our business's data into
-            # the customer_* fields, we'll detect this here and clear
-            # them — user fills in the actual supplier/buyer manually
-            # rather than seeing their own business listed as the
-            # customer (the previous behaviour, which the user flagged
-            # as wrong).
-            matched_business = None
-            detected_type = None
-            our_role: str | None = None  # "buyer" or "seller"
-            inter_firm_buyer = None      # set when BOTH parties are our firms
-
-            buyer_gstin = (extracted_data.get("buyer_gst_number") or "").strip().upper()
-            seller_gstin = (extracted_data.get("seller_gst_number") or "").strip().upper()
-            customer_gstin = (extracted_data.get("customer_gst_number") or "").strip().upper()
-
-            buyer_biz = (
-                Business.objects.filter(gst_number=buyer_gstin).first()
-                if buyer_gstin else None
-            )
-            seller_biz = (
-                Business.objects.filter(gst_number=seller_gstin).first()
-                if seller_gstin else None
-            )
-            # Legacy fallback: the AI sometimes only fills the customer_*
-            # fields (usually the buyer — the "Bill To" block is the most
-            # prominent on Indian invoices).
-            if buyer_biz is None and seller_biz is None and customer_gstin:
-                buyer_biz = Business.objects.filter(gst_number=customer_gstin).first()
-
-            if buyer_biz and seller_biz and buyer_biz.id != seller_biz.id:
-                # ── INTER-FIRM: both parties are our businesses. One
-                # physical bill = two ledger entries. Primary is the
-                # OUTWARD for the seller firm; the create endpoint also
-                # writes the INWARD mirror for the buyer firm (see
-                # AIInvoiceCreateView inter_firm handling). Detected
-                # this way, the sale AND the purchase/ITC side both
-                # land without the user importing the bill twice.
-                matched_business = {
-                    "id": seller_biz.id, "name": seller_biz.name,
-                    "gst_number": seller_biz.gst_number,
-                }
-                inter_firm_buyer = {
-                    "id": buyer_biz.id, "name": buyer_biz.name,
-                    "gst_number": buyer_biz.gst_number,
-                }
-                our_role = "seller"
-                detected_type = INVOICE_TYPE_OUTWARD
-                # The outward entry's customer is the buyer firm.
-                extracted_data["customer_name"] = buyer_biz.name
-                extracted_data["customer_gst_number"] = buyer_biz.gst_number
-            elif seller_biz:
-                matched_business = {
-                    "id": seller_biz.id, "name": seller_biz.name,
-                    "gst_number": seller_biz.gst_number,
-                }
-                our_role = "seller"
-                detected_type = INVOICE_TYPE_OUTWARD
-            elif buyer_biz:
-                matched_business = {
-                    "id": buyer_biz.id, "name": buyer_biz.name,
-                    "gst_number": buyer_biz.gst_number,
-                }
-                our_role = "buyer"
-                detected_type = INVOICE_TYPE_INWARD
-
-            if matched_business and not inter_firm_buyer:
-                # Promote the OTHER party into the legacy customer_*
-                # fields the review form binds against. Preference
-                # order: the explicit field for that side → the legacy
-                # customer field if it's not our own business name.
-                our_gstin = matched_business["gst_number"]
-                our_name_upper = matched_business["name"].upper()
-                if our_role == "buyer":
-                    other_name = extracted_data.get("seller_name") or ""
-                    other_gstin = seller_gstin
-                else:
-                    other_name = extracted_data.get("buyer_name") or ""
-                    other_gstin = buyer_gstin
-
-                # Fall back to the legacy customer_* fields ONLY if they
-                # don't refer to our own business (avoids the AI's
-                # mistake leaking through to the review form).
-                legacy_name = extracted_data.get("customer_name") or ""
-                if not other_name and legacy_name and legacy_name.upper() != our_name_upper:
-                    other_name = legacy_name
-                if not other_gstin and customer_gstin and customer_gstin != our_gstin:
-                    other_gstin = customer_gstin
-
-                extracted_data["customer_name"] = other_name
-                extracted_data["customer_gst_number"] = other_gstin
-
-                # ── Backfill from existing Customer if we can find one ──
-                # AI vision often misses small text like GSTINs (15
-                # alphanumeric chars in fine print). The Customer table
-                # is the source of truth — if a Customer matches the
-                # extracted name and/or GSTIN, copy the missing fields
-                # (GSTIN, address, PAN, mobile) from the DB record so
-                # the review form is fully populated.
-                # Match priority:
-                #   1. Exact GSTIN match (most reliable identifier)
-                #   2. Case-insensitive name match scoped to the
-                #      matched business (multi-state suppliers have
-                #      distinct rows; we want the one this business
-                #      actually transacts with)
-                existing = None
-                if other_gstin:
-                    existing = Customer.objects.filter(gst_number=other_gstin).first()
-                if existing is None and other_name:
-                    existing = (
-                        Customer.objects.filter(
-                            businesses__id=matched_business["id"],
-                            name__iexact=other_name,
-                        ).first()
-                    )
-                if existing:
-                    # Always trust DB for canonical name (handles AI
-                    # casing/whitespace differences). Backfill the rest
-                    # only when AI didn't extract them.
-                    extracted_data["customer_name"] = existing.name
-                    if not extracted_data.get("customer_gst_number") and existing.gst_number:
-                        extracted_data["customer_gst_number"] = existing.gst_number
-                    for db_field, ai_key in (
-                        ("address", "customer_address"),
-                        ("pan_number", "customer_pan_number"),
-                        ("mobile_number", "customer_mobile_number"),
-                    ):
-                        if not extracted_data.get(ai_key) and getattr(existing, db_field, ""):
-                            extracted_data[ai_key] = getattr(existing, db_field)
-
-            # Strip internal-only fields before responding. _key_index
-            # / _key_total are re-surfaced at the top level so the UI
-            # can show "Gemini #2/3" during a bulk import.
-            extracted_data.pop("_provider", None)
-            key_index = extracted_data.pop("_key_index", None)  # 1-indexed
-            key_total = extracted_data.pop("_key_total", None)
-
-            return Response(
-                {
-                    "success": True,
-                    "data": extracted_data,
-                    "matched_business": matched_business,  # null if no DB match
-                    "detected_type": detected_type,        # "inward" / "outward" / null
-                    # Inter-firm: both GSTINs on the bill are OUR firms.
-                    # matched_business is the seller (outward side);
-                    # this is the buyer firm that gets the inward mirror.
-                    "inter_firm": inter_firm_buyer is not None,
-                    "inter_firm_buyer_business": inter_firm_buyer,
-                    # Which of the N rotated Gemini keys handled this
-                    # request. Lets the UI show "Gemini #2/3" so the
-                    # user can see when they're burning through the
-                    # key pool.
-                    "key_index": key_index,
-                    "key_total": key_total,
-                    "message": "Invoice data extracted successfully",
-                }
-            )
+            return Response(self.build_result(extracted_data))
 
         except AIInvoiceProcessingError as e:
             logger.error(f"AI invoice processing error: {e}")
@@ -3669,6 +3462,301 @@ class AIInvoiceProcessingView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
 
+    @staticmethod
+    def validate_image(image_file):
+        """Return an error message for an upload we won't send to the model, else None."""
+        # HEIC added for iPhone photo uploads — pillow-heif registered
+        # an opener on Pillow, and AIInvoiceProcessor._normalize_image
+        # always re-encodes to JPEG before going to Gemini (which only
+        # accepts JPEG/PNG inline). Browsers send `image/heic` or
+        # `image/heif`; some HEIC files come through as
+        # `application/octet-stream` because the browser couldn't
+        # sniff them — we let those through and rely on PIL to
+        # validate during normalization.
+        allowed_types = [
+            "image/jpeg", "image/jpg", "image/png",
+            "image/heic", "image/heif",
+            "application/octet-stream",  # fallback for .heic from some browsers
+        ]
+        if image_file.content_type not in allowed_types:
+            return (
+                f"Unsupported image type '{image_file.content_type}'. "
+                "Upload a JPEG, PNG, or HEIC."
+            )
+
+        # Validate file size (max 20MB — bumped from 10MB to handle
+        # modern iPhone HEIC photos which routinely hit 10-15MB).
+        if image_file.size > 20 * 1024 * 1024:
+            return "File too large. Maximum size is 20MB."
+        return None
+
+    @staticmethod
+    def build_result(extracted_data):
+        """Match the extraction against our businesses/customers and shape
+        the response body the review form binds to."""
+        # Auto-detect which Business this invoice belongs to AND the
+        # invoice direction. We check EVERY GSTIN the AI extracted
+        # (buyer, seller, AND the legacy customer_gst_number),
+        # because in practice the AI sometimes ignores the
+        # buyer/seller split and only fills the legacy customer
+        # field — particularly on Indian invoices where the "Bill
+        # To" block is the most visually prominent block.
+        #
+        # Routing:
+        #   - GSTIN matches on buyer or customer side → our business
+        #     bought from someone → INWARD. The "customer" (in the
+        #     app's data-model sense, i.e. the OTHER party) is the
+        #     seller.
+        #   - GSTIN matches on seller side → our business sold to
+        #     someone → OUTWARD. The "customer" is the buyer.
+        #
+        # If the AI confused itself and put our business's data into
+        # the customer_* fields, we'll detect this here and clear
+        # them — user fills in the actual supplier/buyer manually
+        # rather than seeing their own business listed as the
+        # customer (the previous behaviour, which the user flagged
+        # as wrong).
+        matched_business = None
+        detected_type = None
+        our_role: str | None = None  # "buyer" or "seller"
+        inter_firm_buyer = None      # set when BOTH parties are our firms
+
+        buyer_gstin = (extracted_data.get("buyer_gst_number") or "").strip().upper()
+        seller_gstin = (extracted_data.get("seller_gst_number") or "").strip().upper()
+        customer_gstin = (extracted_data.get("customer_gst_number") or "").strip().upper()
+
+        buyer_biz = (
+            Business.objects.filter(gst_number=buyer_gstin).first()
+            if buyer_gstin else None
+        )
+        seller_biz = (
+            Business.objects.filter(gst_number=seller_gstin).first()
+            if seller_gstin else None
+        )
+        # Legacy fallback: the AI sometimes only fills the customer_*
+        # fields (usually the buyer — the "Bill To" block is the most
+        # prominent on Indian invoices).
+        if buyer_biz is None and seller_biz is None and customer_gstin:
+            buyer_biz = Business.objects.filter(gst_number=customer_gstin).first()
+
+        if buyer_biz and seller_biz and buyer_biz.id != seller_biz.id:
+            # ── INTER-FIRM: both parties are our businesses. One
+            # physical bill = two ledger entries. Primary is the
+            # OUTWARD for the seller firm; the create endpoint also
+            # writes the INWARD mirror for the buyer firm (see
+            # AIInvoiceCreateView inter_firm handling). Detected
+            # this way, the sale AND the purchase/ITC side both
+            # land without the user importing the bill twice.
+            matched_business = {
+                "id": seller_biz.id, "name": seller_biz.name,
+                "gst_number": seller_biz.gst_number,
+            }
+            inter_firm_buyer = {
+                "id": buyer_biz.id, "name": buyer_biz.name,
+                "gst_number": buyer_biz.gst_number,
+            }
+            our_role = "seller"
+            detected_type = INVOICE_TYPE_OUTWARD
+            # The outward entry's customer is the buyer firm.
+            extracted_data["customer_name"] = buyer_biz.name
+            extracted_data["customer_gst_number"] = buyer_biz.gst_number
+        elif seller_biz:
+            matched_business = {
+                "id": seller_biz.id, "name": seller_biz.name,
+                "gst_number": seller_biz.gst_number,
+            }
+            our_role = "seller"
+            detected_type = INVOICE_TYPE_OUTWARD
+        elif buyer_biz:
+            matched_business = {
+                "id": buyer_biz.id, "name": buyer_biz.name,
+                "gst_number": buyer_biz.gst_number,
+            }
+            our_role = "buyer"
+            detected_type = INVOICE_TYPE_INWARD
+
+        if matched_business and not inter_firm_buyer:
+            # Promote the OTHER party into the legacy customer_*
+            # fields the review form binds against. Preference
+            # order: the explicit field for that side → the legacy
+            # customer field if it's not our own business name.
+            our_gstin = matched_business["gst_number"]
+            our_name_upper = matched_business["name"].upper()
+            if our_role == "buyer":
+                other_name = extracted_data.get("seller_name") or ""
+                other_gstin = seller_gstin
+            else:
+                other_name = extracted_data.get("buyer_name") or ""
+                other_gstin = buyer_gstin
+
+            # Fall back to the legacy customer_* fields ONLY if they
+            # don't refer to our own business (avoids the AI's
+            # mistake leaking through to the review form).
+            legacy_name = extracted_data.get("customer_name") or ""
+            if not other_name and legacy_name and legacy_name.upper() != our_name_upper:
+                other_name = legacy_name
+            if not other_gstin and customer_gstin and customer_gstin != our_gstin:
+                other_gstin = customer_gstin
+
+            extracted_data["customer_name"] = other_name
+            extracted_data["customer_gst_number"] = other_gstin
+
+            # ── Backfill from existing Customer if we can find one ──
+            # AI vision often misses small text like GSTINs (15
+            # alphanumeric chars in fine print). The Customer table
+            # is the source of truth — if a Customer matches the
+            # extracted name and/or GSTIN, copy the missing fields
+            # (GSTIN, address, PAN, mobile) from the DB record so
+            # the review form is fully populated.
+            # Match priority:
+            #   1. Exact GSTIN match (most reliable identifier)
+            #   2. Case-insensitive name match scoped to the
+            #      matched business (multi-state suppliers have
+            #      distinct rows; we want the one this business
+            #      actually transacts with)
+            existing = None
+            if other_gstin:
+                existing = Customer.objects.filter(gst_number=other_gstin).first()
+            if existing is None and other_name:
+                existing = (
+                    Customer.objects.filter(
+                        businesses__id=matched_business["id"],
+                        name__iexact=other_name,
+                    ).first()
+                )
+            if existing:
+                # Always trust DB for canonical name (handles AI
+                # casing/whitespace differences). Backfill the rest
+                # only when AI didn't extract them.
+                extracted_data["customer_name"] = existing.name
+                if not extracted_data.get("customer_gst_number") and existing.gst_number:
+                    extracted_data["customer_gst_number"] = existing.gst_number
+                for db_field, ai_key in (
+                    ("address", "customer_address"),
+                    ("pan_number", "customer_pan_number"),
+                    ("mobile_number", "customer_mobile_number"),
+                ):
+                    if not extracted_data.get(ai_key) and getattr(existing, db_field, ""):
+                        extracted_data[ai_key] = getattr(existing, db_field)
+
+        # Strip internal-only fields before responding. _key_index
+        # / _key_total are re-surfaced at the top level so the UI
+        # can show "Gemini #2/3" during a bulk import.
+        extracted_data.pop("_provider", None)
+        key_index = extracted_data.pop("_key_index", None)  # 1-indexed
+        key_total = extracted_data.pop("_key_total", None)
+        cache = extracted_data.pop("_cache", None)
+
+        return {
+            "success": True,
+            "data": extracted_data,
+            "matched_business": matched_business,  # null if no DB match
+            "detected_type": detected_type,        # "inward" / "outward" / null
+            # Inter-firm: both GSTINs on the bill are OUR firms.
+            # matched_business is the seller (outward side);
+            # this is the buyer firm that gets the inward mirror.
+            "inter_firm": inter_firm_buyer is not None,
+            "inter_firm_buyer_business": inter_firm_buyer,
+            # Which of the N rotated Gemini keys handled this
+            # request. Lets the UI show "Gemini #2/3" so the
+            # user can see when they're burning through the
+            # key pool.
+            "key_index": key_index,
+            "key_total": key_total,
+            # Extraction-cache outcome for this image plus the running
+            # hit rate: {"hit", "hits", "lookups", "hit_rate"}. A hit
+            # spent no key quota (key_index is null).
+            "cache": cache,
+            "message": "Invoice data extracted successfully",
+        }
+
+
+class AIInvoiceBatchProcessingView(AIInvoiceProcessingView):
+    """
+    Extract many invoice images in one request, fanned out over the Gemini
+    key pool (see AIInvoiceProcessor.process_batch).
+
+    Multipart: repeated `images` files plus the optional `business_id`.
+    Responds with NDJSON — one JSON object per line, written as each image
+    finishes (completion order, not upload order):
+
+        {"index": 2, "filename": "b.jpg", "ok": true, ...single-image body}
+        {"index": 0, "filename": "a.jpg", "ok": false, "error": "..."}
+
+    and a final {"done": true, "processed": N, "failed": M} line. Per-image
+    bodies are exactly what /ai/invoice/process/ returns for that image.
+    """
+
+    MAX_BATCH_IMAGES = 50
+
+    def post(self, request):
+        image_files = request.FILES.getlist("images")
+        if not image_files:
+            return Response(
+                {"error": "No image files provided"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(image_files) > self.MAX_BATCH_IMAGES:
+            return Response(
+                {"error": f"Too many images — send at most {self.MAX_BATCH_IMAGES} per batch."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        # Fail the whole request up front for a missing key, rather than
+        # streaming the same error once per image.
+        processor = AIInvoiceProcessor()
+        try:
+            processor._require_keys()
+        except AIInvoiceProcessingError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        business_id = request.data.get("business_id") or None
+        response = StreamingHttpResponse(
+            self._stream(processor, image_files, business_id),
+            content_type="application/x-ndjson",
+        )
+        # Stop nginx buffering the stream into one late response.
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+    def _stream(self, processor, image_files, business_id):
+        def line(payload):
+            return json.dumps(payload, cls=DjangoJSONEncoder) + "\n"
+
+        failed = 0
+        valid = []
+        for index, image_file in enumerate(image_files):
+            error = self.validate_image(image_file)
+            if error:
+                failed += 1
+                yield line({"index": index, "filename": image_file.name, "ok": False, "error": error})
+            else:
+                valid.append((index, image_file))
+
+        for position, result in processor.process_batch(
+            [f for _, f in valid], business_id=business_id
+        ):
+            index, image_file = valid[position]
+            head = {"index": index, "filename": image_file.name}
+            if isinstance(result, AIInvoiceProcessingError):
+                logger.error(f"AI invoice processing error ({image_file.name}): {result}")
+                failed += 1
+                yield line({**head, "ok": False, "error": str(result)})
+                continue
+            try:
+                body = self.build_result(result)
+            except Exception as e:
+                logger.error(f"Unexpected error matching AI result: {e}", exc_info=True)
+                failed += 1
+                yield line({
+                    **head, "ok": False,
+                    "error": "An unexpected error occurred while processing the invoice",
+                })
+                continue
+            yield line({**head, "ok": True, **body})
+
+        yield line({"done": True, "processed": len(image_files), "failed": failed})
+
 
 @method_decorator(csrf_exempt, name="dispatch")
 class AIInvoiceCreateView(APIView):
@@ -3880,37 +3968,39 @@ class AIInvoiceCreateView(APIView):
                 ).first()
                 if mirror_existing is not None:
                     return mirror_existing.id, True
-                mirror = Invoice.objects.create(
-                    customer=supplier_cust,
-                    business=buyer_business,
-                    invoice_number=inv_number,
-                    invoice_date=inv_date,
-                    type_of_invoice=INVOICE_TYPE_INWARD,
-                    total_amount=primary_invoice.total_amount,
-                )
-                # bulk_create: the per-line signal would re-sum the mirror
-                # once per copied line; the total is set explicitly below.
-                LineItem.objects.bulk_create(
-                    [
-                        LineItem(
-                            customer=supplier_cust,
-                            invoice=mirror,
-                            product_name=li.product_name,
-                            hsn_code=li.hsn_code,
-                            gst_tax_rate=li.gst_tax_rate,
-                            quantity=li.quantity,
-                            rate=li.rate,
-                            amount=li.amount,
-                            cgst=li.cgst,
-                            sgst=li.sgst,
-                            igst=li.igst,
-                        )
-                        for li in LineItem.objects.filter(invoice=primary_invoice)
-                    ],
-                    batch_size=100,
-                )
-                mirror.total_amount = primary_invoice.total_amount
-                mirror.save()
+                with rollups.resync() as rollup:
+                    mirror = Invoice.objects.create(
+                        customer=supplier_cust,
+                        business=buyer_business,
+                        invoice_number=inv_number,
+                        invoice_date=inv_date,
+                        type_of_invoice=INVOICE_TYPE_INWARD,
+                        total_amount=primary_invoice.total_amount,
+                    )
+                    rollup.add(mirror.pk)
+                    # bulk_create: the per-line signal would re-sum the mirror
+                    # once per copied line; the total is set explicitly below.
+                    LineItem.objects.bulk_create(
+                        [
+                            LineItem(
+                                customer=supplier_cust,
+                                invoice=mirror,
+                                product_name=li.product_name,
+                                hsn_code=li.hsn_code,
+                                gst_tax_rate=li.gst_tax_rate,
+                                quantity=li.quantity,
+                                rate=li.rate,
+                                amount=li.amount,
+                                cgst=li.cgst,
+                                sgst=li.sgst,
+                                igst=li.igst,
+                            )
+                            for li in LineItem.objects.filter(invoice=primary_invoice)
+                        ],
+                        batch_size=100,
+                    )
+                    mirror.total_amount = primary_invoice.total_amount
+                    mirror.save()
                 # Audit image on the mirror too — same physical document.
                 if source_file is not None:
                     try:
@@ -3963,100 +4053,105 @@ class AIInvoiceCreateView(APIView):
                     }
                 )
 
-            invoice = Invoice.objects.create(
-                customer=customer,
-                business=business,
-                invoice_number=inv_number,
-                invoice_date=inv_date,
-                type_of_invoice=type_of_invoice,
-                total_amount=invoice_data.get("total_amount", 0) or 0,
-            )
+            # The invoice is created, its lines bulk-created and its total
+            # rewritten in three steps; resync() books the end state into
+            # MonthlyTaxRollup once instead of chasing each step's signal.
+            with rollups.resync() as rollup:
+                invoice = Invoice.objects.create(
+                    customer=customer,
+                    business=business,
+                    invoice_number=inv_number,
+                    invoice_date=inv_date,
+                    type_of_invoice=type_of_invoice,
+                    total_amount=invoice_data.get("total_amount", 0) or 0,
+                )
+                rollup.add(invoice.pk)
+
+                # Persist the source image as audit trail. Done AFTER
+                # Invoice.objects.create() because FileField.save() with
+                # save=True triggers another model save — keeps the upload
+                # path deterministic regardless of pre-save signals.
+                #
+                # Also generate a JPEG preview alongside the original.
+                # Chrome/Firefox can't render HEIC inline so without this
+                # the InvoiceDetail page shows a broken-image fallback.
+                # _normalize_image is the same path AIInvoiceProcessor
+                # uses to prep images for Gemini (PIL + pillow-heif decode
+                # → JPEG q=88), so we get a browser-safe preview for free.
+                # Preview generation is best-effort — if it fails the
+                # original is still there and downloadable.
+                if source_file is not None:
+                    invoice.source_file.save(source_file.name, source_file, save=True)
+                    try:
+                        source_file.seek(0)
+                        original_bytes = source_file.read()
+                        jpeg_bytes, _ = AIInvoiceProcessor._normalize_image(
+                            original_bytes,
+                            source_file.content_type or "image/jpeg",
+                        )
+                        from django.core.files.base import ContentFile
+                        base = source_file.name.rsplit(".", 1)[0] or "preview"
+                        invoice.source_preview.save(
+                            f"{base}.jpg", ContentFile(jpeg_bytes), save=True
+                        )
+                    except Exception as e:
+                        logger.warning(
+                            "Could not generate preview for invoice %s: %s",
+                            invoice.pk, e,
+                        )
 
-            # Persist the source image as audit trail. Done AFTER
-            # Invoice.objects.create() because FileField.save() with
-            # save=True triggers another model save — keeps the upload
-            # path deterministic regardless of pre-save signals.
-            #
-            # Also generate a JPEG preview alongside the original.
-            # Chrome/Firefox can't render HEIC inline so without this
-            # the InvoiceDetail page shows a broken-image fallback.
-            # _normalize_image is the same path AIInvoiceProcessor
-            # uses to prep images for Gemini (PIL + pillow-heif decode
-            # → JPEG q=88), so we get a browser-safe preview for free.
-            # Preview generation is best-effort — if it fails the
-            # original is still there and downloadable.
-            if source_file is not None:
-                invoice.source_file.save(source_file.name, source_file, save=True)
-                try:
-                    source_file.seek(0)
-                    original_bytes = source_file.read()
-                    jpeg_bytes, _ = AIInvoiceProcessor._normalize_image(
-                        original_bytes,
-                        source_file.content_type or "image/jpeg",
-                    )
-                    from django.core.files.base import ContentFile
-                    base = source_file.name.rsplit(".", 1)[0] or "preview"
-                    invoice.source_preview.save(
-                        f"{base}.jpg", ContentFile(jpeg_bytes), save=True
-                    )
-                except Exception as e:
-                    logger.warning(
-                        "Could not generate preview for invoice %s: %s",
-                        invoice.pk, e,
-                    )
+                # Compute per-line tax breakdown. Previous version created
+                # LineItems with cgst/sgst/igst all defaulting to 0 — the
+                # invoice showed up in the UI with Total Tax: ₹0 even
+                # when the AI correctly extracted gst_tax_rate=0.03.
+                # User flagged this on a SOLANKI inward invoice.
+                #
+                # Also recompute `amount` from qty * rate * (1 + gst_rate)
+                # because the AI sometimes returns the PRE-tax subtotal in
+                # the supposedly-tax-inclusive `amount` slot. Recomputing
+                # ensures Invoice.total_amount = sum(LineItem.amount) =
+                # actual tax-inclusive total, internally consistent.
+                from decimal import Decimal as _D
+                is_igst = invoice.is_igst_applicable
+                new_lis = []
+                running_total = _D("0")
+                for item_data in invoice_data.get("line_items", []) or []:
+                    qty = _D(str(item_data.get("quantity", 0) or 0))
+                    rate = _D(str(item_data.get("rate", 0) or 0))
+                    gst_rate = _D(str(item_data.get("gst_tax_rate", 0.03) or 0.03))
+                    pre_tax = qty * rate
+                    tax = pre_tax * gst_rate
+                    amount = pre_tax + tax  # tax-inclusive — matches app contract
+                    if is_igst:
+                        igst, cgst, sgst = tax, _D("0"), _D("0")
+                    else:
+                        cgst = sgst = tax / _D("2")
+                        igst = _D("0")
+                    running_total += amount
+                    new_lis.append(LineItem(
+                        customer=customer,
+                        invoice=invoice,
+                        product_name=item_data.get("product_name", "") or "",
+                        hsn_code=item_data.get("hsn_code", "") or "",
+                        gst_tax_rate=gst_rate,
+                        quantity=qty,
+                        rate=rate,
+                        amount=amount,
+                        cgst=cgst,
+                        sgst=sgst,
+                        igst=igst,
+                    ))
+                # bulk_create skips the per-line resync signal (which would re-sum
+                # the invoice once per line); the total is the running sum of the
+                # recomputed amounts, so no post-hoc SELECT is needed either.
+                LineItem.objects.bulk_create(new_lis, batch_size=100)
+                line_items_created = len(new_lis)
 
-            # Compute per-line tax breakdown. Previous version created
-            # LineItems with cgst/sgst/igst all defaulting to 0 — the
-            # invoice showed up in the UI with Total Tax: ₹0 even
-            # when the AI correctly extracted gst_tax_rate=0.03.
-            # User flagged this on a SOLANKI inward invoice.
-            #
-            # Also recompute `amount` from qty * rate * (1 + gst_rate)
-            # because the AI sometimes returns the PRE-tax subtotal in
-            # the supposedly-tax-inclusive `amount` slot. Recomputing
-            # ensures Invoice.total_amount = sum(LineItem.amount) =
-            # actual tax-inclusive total, internally consistent.
-            from decimal import Decimal as _D
-            is_igst = invoice.is_igst_applicable
-            new_lis = []
-            running_total = _D("0")
-            for item_data in invoice_data.get("line_items", []) or []:
-                qty = _D(str(item_data.get("quantity", 0) or 0))
-                rate = _D(str(item_data.get("rate", 0) or 0))
-                gst_rate = _D(str(item_data.get("gst_tax_rate", 0.03) or 0.03))
-                pre_tax = qty * rate
-                tax = pre_tax * gst_rate
-                amount = pre_tax + tax  # tax-inclusive — matches app contract
-                if is_igst:
-                    igst, cgst, sgst = tax, _D("0"), _D("0")
-                else:
-                    cgst = sgst = tax / _D("2")
-                    igst = _D("0")
-                running_total += amount
-                new_lis.append(LineItem(
-                    customer=customer,
-                    invoice=invoice,
-                    product_name=item_data.get("product_name", "") or "",
-                    hsn_code=item_data.get("hsn_code", "") or "",
-                    gst_tax_rate=gst_rate,
-                    quantity=qty,
-                    rate=rate,
-                    amount=amount,
-                    cgst=cgst,
-                    sgst=sgst,
-                    igst=igst,
-                ))
-            # bulk_create skips the per-line resync signal (which would re-sum
-            # the invoice once per line); the total is the running sum of the
-            # recomputed amounts, so no post-hoc SELECT is needed either.
-            LineItem.objects.bulk_create(new_lis, batch_size=100)
-            line_items_created = len(new_lis)
-
-            # `amount` is the tax-inclusive line subtotal (matches
-            # InvoiceForm's contract), so its sum is the true total even if
-            # the AI's `total_amount` was off.
-            invoice.total_amount = running_total
-            invoice.save()
+                # `amount` is the tax-inclusive line subtotal (matches
+                # InvoiceForm's contract), so its sum is the true total even if
+                # the AI's `total_amount` was off.
+                invoice.total_amount = running_total
+                invoice.save()
 
             # Inter-firm: also write the INWARD mirror for the buyer firm
             # (no-op unless inter_firm was requested).
@@ -4106,7 +4201,7 @@ class AuditLogViewSet(viewsets.ReadOnlyModelViewSet):
 
     queryset = AuditLog.objects.all().select_related("user")
     serializer_class = AuditLogSerializer
-    pagination_class = StandardResultsSetPagination
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -4460,3 +4555,16 @@ class UserManagementView(APIView):
             "is_active": user.is_active,
             "message": "User updated",
         })
+
+
+class ResponseCacheStatsView(APIView):
+    """Admin-only hit/miss counters for the cached aggregate endpoints
+    (billing/services/response_cache.py). DELETE resets them."""
+    permission_classes = [AdminOnlyPermission]
+
+    def get(self, request):
+        return Response(response_cache.stats())
+
+    def delete(self, request):
+        response_cache.reset_stats()
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,58 @@
+"""Write GSTR-1 portal JSON for several businesses and months as one ZIP.
+
+    python manage.py export_gstr1_json --from 2026-04 --to 2026-06 -o q1.zip
+    python manage.py export_gstr1_json --from 2026-06 --business 1 --business 3
+
+One GSTR1_<gstin>_<MMYYYY>.json per business-month — the same file
+/invoices/gstr1-portal-json/ returns — plus meta.json with counts, skipped
+invoices and warnings for every period (billing/services/gstr1_portal.py).
+Without --business, every business is included; those without a GSTIN are
+reported and left out.
+"""
+
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from billing.models import Business
+from billing.services import gstr1_portal
+
+
+class Command(BaseCommand):
+    help = "Export GSTR-1 portal JSON for many businesses and months as a ZIP."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--from", dest="from_month", required=True, help="First month, YYYY-MM.")
+        parser.add_argument("--to", dest="to_month", default=None,
+                            help="Last month, YYYY-MM (default: same as --from).")
+        parser.add_argument("--business", type=int, action="append", default=None,
+                            help="Business id; repeat for several (default: all).")
+        parser.add_argument("-o", "--output", default=None,
+                            help="ZIP path (default: gstr1-<from>-<to>.zip).")
+
+    def handle(self, *args, **opts):
+        businesses = Business.objects.order_by("id")
+        if opts["business"]:
+            businesses = businesses.filter(id__in=opts["business"])
+        try:
+            months = gstr1_portal.month_span(opts["from_month"], opts["to_month"])
+            content, report = gstr1_portal.bundle(list(businesses), months)
+        except gstr1_portal.PortalFileError as e:
+            raise CommandError(str(e))
+
+        first, last = months[0], months[-1]
+        path = Path(opts["output"] or f"gstr1-{first[0]}{first[1]:02d}-{last[0]}{last[1]:02d}.zip")
+        path.write_bytes(content)
+
+        for period in report["periods"]:
+            counts = period["invoice_counts"]
+            self.stdout.write(
+                f"  {period['filename']}: b2b {counts['b2b']}, b2cl {counts['b2cl']}, "
+                f"b2cs {counts['b2cs']}, {len(period['skipped'])} skipped, "
+                f"{len(period['warnings'])} warning(s)"
+            )
+        for error in report["errors"]:
+            self.stdout.write(self.style.WARNING(f"  {error['business']}: {error['error']}"))
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {len(report['periods'])} file(s) to {path}."
+        ))
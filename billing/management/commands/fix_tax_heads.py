@@ -24,6 +24,7 @@ from django.db import transaction
 
 from billing.tax_rules import is_interstate, normalize_tax_heads
 from billing.models import Invoice, LineItem
+from billing.services import rollups
 
 
 class Command(BaseCommand):
@@ -83,7 +84,9 @@ class Command(BaseCommand):
             self.stdout.write(self.style.NOTICE("\nDry run. Re-run with --apply to write these changes."))
             return
 
-        with transaction.atomic():
+        # .update() skips the signals, so book the moved heads into the
+        # monthly rollup explicitly.
+        with transaction.atomic(), rollups.resync(seen_invoices):
             for _inv, li, interstate, _total in wrong:
                 li.cgst, li.sgst, li.igst = normalize_tax_heads(
                     li.cgst, li.sgst, li.igst, interstate
@@ -1,14 +1,21 @@
-"""`python manage.py import_gstr2a [--dry-run] file1.xls file2.xls ...`
+"""`python manage.py import_gstr2a [--dry-run] [--async] [--jobs N] file1.xls file2.xls ...`
 
-Thin wrapper around `billing.services.gstr2a_import.import_file` for
+Thin wrapper around `billing.services.gstr2a_import.import_files` for
 operator-driven bulk imports. The frontend page uses the same service.
+
+--jobs N parses the files in N worker processes (0 = one per CPU); the
+DB writes still happen here, one file (one transaction) at a time, in the
+order the files were given.
+
+--async copies the files into storage and queues a `gstr2a_import` job for
+the `run_jobs` worker instead of importing here; follow it at /api/jobs/<id>/.
 """
 
 from __future__ import annotations
 
 from django.core.management.base import BaseCommand, CommandError
 
-from billing.services.gstr2a_import import import_file
+from billing.services.gstr2a_import import enqueue_import, import_files, merge_results
 
 
 class Command(BaseCommand):
@@ -23,6 +30,18 @@ class Command(BaseCommand):
             action="store_true",
             help="Parse + count + show what WOULD happen, without DB writes.",
         )
+        parser.add_argument(
+            "--async",
+            dest="run_async",
+            action="store_true",
+            help="Queue the import as a background job and print its id.",
+        )
+        parser.add_argument(
+            "--jobs",
+            type=int,
+            default=1,
+            help="Parse files in N worker processes (0 = one per CPU; default 1).",
+        )
         parser.add_argument(
             "--verbose-rows",
             action="store_true",
@@ -34,6 +53,10 @@ class Command(BaseCommand):
         verbose: bool = opts["verbose_rows"]
         paths: list[str] = list(opts["files"])
 
+        if opts["run_async"]:
+            self._enqueue(paths, dry_run, opts["jobs"])
+            return
+
         if dry_run:
             self.stdout.write(self.style.WARNING(
                 "═══ DRY RUN — no DB writes ═══"
@@ -43,89 +66,27 @@ class Command(BaseCommand):
                 "═══ LIVE RUN — writes will hit the database ═══"
             ))
 
-        # Aggregate counters for the final tally
+        try:
+            results = import_files(
+                paths,
+                dry_run=dry_run,
+                jobs=opts["jobs"],
+                on_result=lambda result: self._write_result(result, dry_run, verbose),
+            )
+        except Exception as e:
+            raise CommandError(f"Import failed: {e!s}")
+        total = merge_results(results)
         agg = {
-            "created_invoices": 0,
-            "created_line_items": 0,
-            "created_suppliers": 0,
-            "skipped_duplicates": 0,
-            "skipped_no_business": 0,
-            "skipped_credit_noted": 0,
-            "partial_credit_notes": 0,
-            "errors": 0,
-            "not_filed": 0,
+            "created_invoices": total.created_invoices,
+            "created_suppliers": total.created_suppliers,
+            "skipped_duplicates": total.skipped_duplicates,
+            "skipped_no_business": total.skipped_no_business,
+            "skipped_credit_noted": total.skipped_credit_noted,
+            "partial_credit_notes": len(total.partial_credit_notes),
+            "errors": len(total.errors),
+            "not_filed": len(total.not_filed_warnings),
         }
 
-        for path in paths:
-            self.stdout.write(self.style.HTTP_INFO(f"\n┌── {path}"))
-            try:
-                result = import_file(path, dry_run=dry_run)
-            except Exception as e:
-                raise CommandError(f"Import failed for {path}: {e!s}")
-
-            agg["created_invoices"] += result.created_invoices
-            agg["created_line_items"] += result.created_line_items
-            agg["created_suppliers"] += result.created_suppliers
-            agg["skipped_duplicates"] += result.skipped_duplicates
-            agg["skipped_no_business"] += result.skipped_no_business
-            agg["skipped_credit_noted"] += result.skipped_credit_noted
-            agg["partial_credit_notes"] += len(result.partial_credit_notes)
-            agg["errors"] += len(result.errors)
-            agg["not_filed"] += len(result.not_filed_warnings)
-
-            verb = "WOULD CREATE" if dry_run else "Created"
-            self.stdout.write(f"│  {verb:14s} invoices:    {result.created_invoices}")
-            if result.created_line_items:
-                self.stdout.write(f"│  {verb:14s} line items:  {result.created_line_items}")
-            if result.created_suppliers:
-                self.stdout.write(
-                    f"│  {verb:14s} suppliers:   {result.created_suppliers} "
-                    f"{self.style.WARNING('(auto-created from 2A — verify names later)')}"
-                )
-            if result.skipped_duplicates:
-                self.stdout.write(self.style.NOTICE(
-                    f"│  Skipped duplicates:        {result.skipped_duplicates} (already in DB)"
-                ))
-            if result.skipped_credit_noted:
-                self.stdout.write(self.style.NOTICE(
-                    f"│  Skipped — fully credit-noted: {result.skipped_credit_noted} "
-                    "(matching CN in note sheet zeroes out the invoice)"
-                ))
-            if result.partial_credit_notes:
-                self.stdout.write(self.style.WARNING(
-                    f"│  ~ Partial CNs (need manual review): {len(result.partial_credit_notes)}"
-                ))
-                if verbose:
-                    for p in result.partial_credit_notes:
-                        self.stdout.write(f"│  {p}")
-            if result.skipped_no_business:
-                self.stdout.write(self.style.ERROR(
-                    f"│  Skipped — no Business match: {result.skipped_no_business}"
-                ))
-
-            if result.not_filed_warnings:
-                self.stdout.write(self.style.WARNING(
-                    f"│  ⚠ 3B-not-filed (ITC parked): {len(result.not_filed_warnings)}"
-                ))
-                if verbose:
-                    for w in result.not_filed_warnings:
-                        self.stdout.write(f"│  {w}")
-
-            if verbose and result.created_detail:
-                self.stdout.write(f"│  Detail:")
-                for d in result.created_detail:
-                    self.stdout.write(f"│  {d}")
-            if verbose and result.skipped_detail:
-                self.stdout.write(f"│  Skipped rows:")
-                for d in result.skipped_detail[:20]:
-                    self.stdout.write(f"│  {d}")
-                if len(result.skipped_detail) > 20:
-                    self.stdout.write(f"│  … +{len(result.skipped_detail)-20} more")
-
-            for err in result.errors:
-                self.stdout.write(self.style.ERROR(f"│  ERROR: {err}"))
-            self.stdout.write("└──")
-
         # Final tally
         self.stdout.write("\n" + "═" * 60)
         self.stdout.write(self.style.SUCCESS(
@@ -159,3 +120,74 @@ class Command(BaseCommand):
             self.stdout.write(self.style.WARNING(
                 "\nNothing was written. Re-run without --dry-run to apply."
             ))
+
+    def _write_result(self, result, dry_run: bool, verbose: bool) -> None:
+        self.stdout.write(self.style.HTTP_INFO(f"\n┌── {result.filename}"))
+        verb = "WOULD CREATE" if dry_run else "Created"
+        self.stdout.write(f"│  {verb:14s} invoices:    {result.created_invoices}")
+        if result.created_line_items:
+            self.stdout.write(f"│  {verb:14s} line items:  {result.created_line_items}")
+        if result.created_suppliers:
+            self.stdout.write(
+                f"│  {verb:14s} suppliers:   {result.created_suppliers} "
+                f"{self.style.WARNING('(auto-created from 2A — verify names later)')}"
+            )
+        if result.skipped_duplicates:
+            self.stdout.write(self.style.NOTICE(
+                f"│  Skipped duplicates:        {result.skipped_duplicates} (already in DB)"
+            ))
+        if result.skipped_credit_noted:
+            self.stdout.write(self.style.NOTICE(
+                f"│  Skipped — fully credit-noted: {result.skipped_credit_noted} "
+                "(matching CN in note sheet zeroes out the invoice)"
+            ))
+        if result.partial_credit_notes:
+            self.stdout.write(self.style.WARNING(
+                f"│  ~ Partial CNs (need manual review): {len(result.partial_credit_notes)}"
+            ))
+            if verbose:
+                for p in result.partial_credit_notes:
+                    self.stdout.write(f"│  {p}")
+        if result.skipped_no_business:
+            self.stdout.write(self.style.ERROR(
+                f"│  Skipped — no Business match: {result.skipped_no_business}"
+            ))
+
+        if result.not_filed_warnings:
+            self.stdout.write(self.style.WARNING(
+                f"│  ⚠ 3B-not-filed (ITC parked): {len(result.not_filed_warnings)}"
+            ))
+            if verbose:
+                for w in result.not_filed_warnings:
+                    self.stdout.write(f"│  {w}")
+
+        if verbose and result.created_detail:
+            self.stdout.write(f"│  Detail:")
+            for d in result.created_detail:
+                self.stdout.write(f"│  {d}")
+        if verbose and result.skipped_detail:
+            self.stdout.write(f"│  Skipped rows:")
+            for d in result.skipped_detail[:20]:
+                self.stdout.write(f"│  {d}")
+            if len(result.skipped_detail) > 20:
+                self.stdout.write(f"│  … +{len(result.skipped_detail)-20} more")
+
+        for err in result.errors:
+            self.stdout.write(self.style.ERROR(f"│  ERROR: {err}"))
+        self.stdout.write("└──")
+
+    def _enqueue(self, paths: list[str], dry_run: bool, jobs: int) -> None:
+        from contextlib import ExitStack
+
+        with ExitStack() as stack:
+            named = []
+            for path in paths:
+                try:
+                    named.append((path, stack.enter_context(open(path, "rb"))))
+                except OSError as e:
+                    raise CommandError(f"Cannot read {path}: {e!s}")
+            job = enqueue_import(named, dry_run=dry_run, jobs=jobs)
+        self.stdout.write(self.style.SUCCESS(
+            f"Queued gstr2a_import job #{job.pk} for {len(paths)} file(s). "
+            "Run `manage.py run_jobs` to process it."
+        ))
@@ -0,0 +1,50 @@
+"""Backfill (or check) the denormalised line totals on Invoice.
+
+taxable_total / cgst_total / sgst_total / igst_total / line_count are kept
+current by the write paths (billing/services/invoice_totals.py). Migration
+0043 fills them once. This command recomputes them from LineItem. Use it to
+repair drift after a write that bypassed the hooks (a raw SQL fix, a
+restored dump).
+
+    python manage.py rebuild_invoice_totals                  # every invoice
+    python manage.py rebuild_invoice_totals --business 1     # one firm only
+    python manage.py rebuild_invoice_totals --check          # report drift, write nothing
+
+--check exits non-zero when drift is found, so it can run from cron/CI.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from billing.services import invoice_totals
+
+
+class Command(BaseCommand):
+    help = "Recompute Invoice line totals from line items, or with --check report drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--business", type=int, default=None, help="Limit to one business id.")
+        parser.add_argument("--check", action="store_true",
+                            help="Compare against a fresh recomputation without writing.")
+
+    def handle(self, *args, **opts):
+        business_id = opts["business"]
+
+        if opts["check"]:
+            drift = invoice_totals.check(business_id)
+            if not drift:
+                self.stdout.write(self.style.SUCCESS("Invoice totals are consistent with line items."))
+                return
+            for d in drift[:50]:
+                fields = ", ".join(
+                    f"{f} stored {d['stored'][f]} expected {d['expected'][f]}" for f in d["expected"]
+                )
+                self.stdout.write(f"  invoice {d['id']} #{d['invoice_number']}: {fields}")
+            if len(drift) > 50:
+                self.stdout.write(f"  … +{len(drift) - 50} more")
+            raise CommandError(
+                f"{len(drift)} drifted invoice(s). Run without --check to rebuild."
+            )
+
+        written = invoice_totals.rebuild(business_id)
+        scope = f"business {business_id}" if business_id else "all businesses"
+        self.stdout.write(self.style.SUCCESS(f"Recomputed totals on {written} invoice(s) for {scope}."))
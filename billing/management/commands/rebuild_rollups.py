@@ -0,0 +1,51 @@
+"""Rebuild (or check) the MonthlyTaxRollup table from Invoice/LineItem.
+
+The rollup is maintained incrementally by every write path, so this is for
+the initial backfill after migrating, and for repairing drift if a write
+ever bypassed the maintenance hooks (a raw SQL fix, a restored dump).
+
+    python manage.py rebuild_rollups                  # rebuild everything
+    python manage.py rebuild_rollups --business 1     # one firm only
+    python manage.py rebuild_rollups --check          # report drift, write nothing
+
+--check exits non-zero when drift is found, so it can run from cron/CI.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from billing.services import rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild the monthly tax rollup, or with --check report buckets that drifted."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--business", type=int, default=None, help="Limit to one business id.")
+        parser.add_argument("--check", action="store_true",
+                            help="Compare against a fresh recomputation without writing.")
+
+    def handle(self, *args, **opts):
+        business_id = opts["business"]
+
+        if opts["check"]:
+            drift = rollups.check(business_id)
+            if not drift:
+                self.stdout.write(self.style.SUCCESS("Rollup is consistent with line items."))
+                return
+            for d in drift[:50]:
+                fields = ", ".join(
+                    f"{f} stored {d['stored'][f]} expected {d['expected'][f]}" for f in d["expected"]
+                )
+                self.stdout.write(
+                    f"  biz {d['business_id']} {d['month']:%Y-%m} {d['type_of_invoice']:<8} "
+                    f"rate {d['gst_tax_rate']} hsn {d['hsn_code'] or '--'}: {fields}"
+                )
+            if len(drift) > 50:
+                self.stdout.write(f"  … +{len(drift) - 50} more")
+            raise CommandError(
+                f"{len(drift)} drifted bucket(s). Run without --check to rebuild."
+            )
+
+        written = rollups.rebuild(business_id)
+        scope = f"business {business_id}" if business_id else "all businesses"
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {written} rollup bucket(s) for {scope}."))
@@ -0,0 +1,74 @@
+"""`python manage.py reconcile_gstr2a [--business-id N] [--tolerance 1] [--window-days 7] file.xlsx`
+
+Reconcile a GSTR-2A/2B download against the booked inward invoices and
+save the result as a ReconciliationRun (see
+billing/services/reconciliation.py); the frontend pages the same runs
+through /api/reconciliation-runs/.
+"""
+
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+
+from billing.models import ReconciliationItem
+from billing.services import reconciliation
+
+
+class Command(BaseCommand):
+    help = "Reconcile a GSTR-2A/2B file against booked inward invoices."
+
+    def add_arguments(self, parser):
+        parser.add_argument("file", help="Path to the 2A/2B .xlsx download.")
+        parser.add_argument(
+            "--business-id", type=int,
+            help="Business to reconcile (default: matched from the file's recipient GSTIN).",
+        )
+        parser.add_argument(
+            "--tolerance", type=Decimal, default=reconciliation.AMOUNT_TOLERANCE,
+            help="Amount difference still counted as a match, in rupees (default 1).",
+        )
+        parser.add_argument(
+            "--window-days", type=int, default=reconciliation.DATE_WINDOW_DAYS,
+            help="Max days between portal and booked invoice dates (default 7).",
+        )
+        parser.add_argument(
+            "--show", type=int, default=20,
+            help="Rows to list per problem status (default 20; 0 = counts only).",
+        )
+
+    def handle(self, *args, **opts):
+        try:
+            run = reconciliation.reconcile_file(
+                opts["file"],
+                business_id=opts["business_id"],
+                amount_tolerance=opts["tolerance"],
+                date_window_days=opts["window_days"],
+            )
+        except reconciliation.ReconciliationError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Reconciliation #{run.pk}: {run.business} {run.period_start} → {run.period_end}"
+        ))
+        self.stdout.write(f"  Matched:           {run.matched}")
+        self.stdout.write(f"  Amount mismatch:   {run.mismatched_amount}")
+        self.stdout.write(f"  Missing in books:  {run.missing_in_books}")
+        self.stdout.write(f"  Missing in 2B:     {run.missing_in_2b}")
+
+        if not opts["show"]:
+            return
+        for item_status, label in ReconciliationItem.STATUS_CHOICES:
+            if item_status == ReconciliationItem.STATUS_MATCHED:
+                continue
+            items = run.items.filter(status=item_status)[: opts["show"]]
+            if not items:
+                continue
+            self.stdout.write(self.style.WARNING(f"\n{label}:"))
+            for item in items:
+                amounts = " / ".join(
+                    f"₹{v}" if v is not None else "—" for v in (item.portal_amount, item.books_amount)
+                )
+                self.stdout.write(
+                    f"  {item.invoice_date} {item.supplier_gstin} {item.invoice_number:20s} "
+                    f"{amounts}  {item.note}".rstrip()
+                )
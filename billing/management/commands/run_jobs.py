@@ -0,0 +1,82 @@
+"""Run queued background jobs (reports, GSTR exports, bulk imports).
+
+The Job table is the queue, so this needs nothing beyond the database. Run
+one or more of these next to gunicorn (systemd unit, a supervisor program,
+or a second container with the same image):
+
+    python manage.py run_jobs                     # poll forever
+    python manage.py run_jobs --once              # drain the queue and exit (cron)
+    python manage.py run_jobs --poll-interval 5   # idle sleep between polls, seconds
+
+Several workers can share the table; claiming a job is a conditional update,
+so each job runs once. Jobs left `running` by a worker that died are put back
+in the queue after --stale-minutes without progress. Once an hour the worker
+also purges jobs finished more than JOB_RETENTION_DAYS ago, with their files.
+"""
+
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+import billing.api.jobs  # noqa: F401 — registers the job handlers
+from billing.services import jobs
+
+PURGE_INTERVAL = 60 * 60
+
+
+class Command(BaseCommand):
+    help = "Process queued background jobs from the Job table."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true",
+                            help="Run until the queue is empty, then exit.")
+        parser.add_argument("--poll-interval", type=float, default=2.0,
+                            help="Seconds to sleep when the queue is empty (default 2).")
+        parser.add_argument("--max-jobs", type=int, default=None,
+                            help="Exit after this many jobs (lets a supervisor recycle the process).")
+        parser.add_argument("--stale-minutes", type=int, default=30,
+                            help="Requeue running jobs with no progress for this long (default 30).")
+
+    def handle(self, *args, **opts):
+        worker = jobs.worker_name()
+        stale_after = timedelta(minutes=opts["stale_minutes"])
+        remaining = opts["max_jobs"]
+        processed = 0
+        next_purge = 0.0
+
+        self.stdout.write(self.style.NOTICE(f"Job worker {worker} started."))
+        while remaining is None or remaining > 0:
+            # Long-lived process: drop connections the DB (or Neon's pooler)
+            # has closed under us, as Django does between requests.
+            close_old_connections()
+            requeued, failed = jobs.requeue_stale(stale_after)
+            if requeued or failed:
+                self.stdout.write(self.style.WARNING(
+                    f"Requeued {requeued} stale job(s), failed {failed}."
+                ))
+            if time.monotonic() >= next_purge:
+                purged = jobs.purge_finished()
+                if purged:
+                    self.stdout.write(f"Purged {purged} finished job(s).")
+                next_purge = time.monotonic() + PURGE_INTERVAL
+
+            job = jobs.claim(worker)
+            if job is None:
+                if opts["once"]:
+                    break
+                time.sleep(opts["poll_interval"])
+                continue
+
+            self.stdout.write(f"→ {job.kind} #{job.pk}")
+            job = jobs.run(job)
+            processed += 1
+            if remaining is not None:
+                remaining -= 1
+            if job.status == job.STATUS_SUCCEEDED:
+                self.stdout.write(self.style.SUCCESS(f"  done {job.kind} #{job.pk}"))
+            else:
+                self.stdout.write(self.style.ERROR(f"  failed {job.kind} #{job.pk}: {job.error}"))
+
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} job(s)."))
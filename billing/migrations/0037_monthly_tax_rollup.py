@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:13
+#
+# Schema only. Populate the table after migrating with
+#
+#     python manage.py rebuild_rollups
+#
+# Backfilling here would mean running the live rollup service against
+# historical models, which breaks as soon as a later migration changes them.
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0036_schema_parity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyTaxRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('workspace_id', models.IntegerField(default=1)),
+                ('month', models.DateField(help_text='First day of the invoice month.')),
+                ('type_of_invoice', models.CharField(choices=[('outward', 'Outward'), ('inward', 'Inward')], max_length=255, verbose_name='Type of Invoice')),
+                ('gst_tax_rate', models.DecimalField(decimal_places=4, max_digits=13)),
+                ('hsn_code', models.CharField(blank=True, default='', max_length=255)),
+                ('taxable', models.DecimalField(decimal_places=6, default=0, max_digits=22)),
+                ('cgst', models.DecimalField(decimal_places=3, default=0, max_digits=18)),
+                ('sgst', models.DecimalField(decimal_places=3, default=0, max_digits=18)),
+                ('igst', models.DecimalField(decimal_places=3, default=0, max_digits=18)),
+                ('amount', models.DecimalField(decimal_places=3, default=0, max_digits=18)),
+                ('quantity', models.DecimalField(decimal_places=3, default=0, max_digits=18)),
+                ('line_count', models.IntegerField(default=0)),
+                ('invoice_count', models.IntegerField(default=0)),
+                ('invoice_total', models.DecimalField(decimal_places=3, default=0, max_digits=18)),
+                ('business', models.ForeignKey(db_constraint=False, help_text='Business the bucket belongs to.', on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='billing.business', verbose_name='Business')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['month', 'type_of_invoice'], name='billing_mon_month_2e7269_idx')],
+                'constraints': [models.UniqueConstraint(fields=('business', 'month', 'type_of_invoice', 'gst_tax_rate', 'hsn_code'), name='uniq_monthly_tax_rollup_bucket')],
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:20
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0037_monthly_tax_rollup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('workspace_id', models.IntegerField(default=1)),
+                ('kind', models.CharField(choices=[('report', 'Excel report'), ('gstr_export', 'GSTR export'), ('gstr1_portal_json', 'GSTR-1 portal JSON'), ('bulk_invoice_import', 'Bulk invoice import'), ('gstr2a_import', 'GSTR-2A import')], max_length=32)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('succeeded', 'Succeeded'), ('failed', 'Failed')], default='queued', max_length=16)),
+                ('params', models.JSONField(blank=True, default=dict)),
+                ('progress', models.PositiveSmallIntegerField(default=0, help_text='Percent complete, 0-100.')),
+                ('result', models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, null=True)),
+                ('artifact', models.FileField(blank=True, null=True, upload_to='jobs/%Y/%m/')),
+                ('error', models.TextField(blank=True, default='')),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('worker', models.CharField(blank=True, default='', max_length=64)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'created_at'], name='billing_job_status_b568ed_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:13
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0039_extraction_cache'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReconciliationRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('workspace_id', models.IntegerField(default=1)),
+                ('source_filename', models.CharField(blank=True, default='', max_length=255)),
+                ('period_start', models.DateField(blank=True, null=True)),
+                ('period_end', models.DateField(blank=True, null=True)),
+                ('amount_tolerance', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('date_window_days', models.PositiveSmallIntegerField()),
+                ('matched', models.PositiveIntegerField(default=0)),
+                ('mismatched_amount', models.PositiveIntegerField(default=0)),
+                ('missing_in_books', models.PositiveIntegerField(default=0)),
+                ('missing_in_2b', models.PositiveIntegerField(default=0)),
+                ('business', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reconciliation_runs', to='billing.business', verbose_name='Business')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at', '-id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ReconciliationItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('matched', 'Matched'), ('mismatched_amount', 'Amount mismatch'), ('missing_in_books', 'Missing in books'), ('missing_in_2b', 'Missing in 2B')], max_length=20)),
+                ('supplier_gstin', models.CharField(blank=True, default='', max_length=15)),
+                ('supplier_name', models.CharField(blank=True, default='', max_length=255)),
+                ('invoice_number', models.CharField(blank=True, default='', max_length=255)),
+                ('invoice_date', models.DateField(blank=True, null=True)),
+                ('portal_amount', models.DecimalField(blank=True, decimal_places=3, max_digits=12, null=True)),
+                ('books_amount', models.DecimalField(blank=True, decimal_places=3, max_digits=12, null=True)),
+                ('note', models.CharField(blank=True, default='', max_length=255)),
+                ('invoice', models.ForeignKey(blank=True, help_text='The booked inward invoice, when there is one.', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='billing.invoice')),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='billing.reconciliationrun')),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['run', 'status'], name='billing_rec_run_id_16c563_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:17
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0040_reconciliation_run'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['timestamp', 'id'], name='billing_aud_timesta_439023_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(fields=['invoice_date', 'created_at', 'id'], name='billing_inv_invoice_5692d9_idx'),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Trigram indexes for the name / GSTIN / mobile / invoice-number lookups.
+#
+# Every search box in the app filters with `icontains`, which Django renders
+# on PostgreSQL as UPPER(col::text) LIKE UPPER('%term%') — a sequential scan
+# with a plain btree. A GIN index over UPPER(col) with gin_trgm_ops serves
+# exactly that expression, and the `<%` word-similarity operator the
+# /api/search/ endpoint ranks with (billing/services/search.py).
+#
+# PostgreSQL only: SQLite has no pg_trgm, and its LIKE scan over a local
+# file is fast enough for the databases it backs. Not CONCURRENTLY, so each
+# table is write-locked while its index builds — run outside business hours
+# on a large install.
+
+from django.db import migrations
+
+TRIGRAM_INDEXES = [
+    ("billing_customer", "name"),
+    ("billing_customer", "gst_number"),
+    ("billing_customer", "mobile_number"),
+    ("billing_product", "name"),
+    ("billing_invoice", "invoice_number"),
+]
+
+
+def _index_name(table, column):
+    return f"{table}_{column}_trgm"
+
+
+def _create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for table, column in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {_index_name(table, column)} "
+            f"ON {table} USING gin (UPPER({column}::text) gin_trgm_ops)"
+        )
+
+
+def _drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for table, column in TRIGRAM_INDEXES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {_index_name(table, column)}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0041_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(_create_indexes, _drop_indexes),
+    ]
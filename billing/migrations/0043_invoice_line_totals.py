@@ -0,0 +1,90 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:24
+
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, F, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def _backfill(apps, schema_editor):
+    # One UPDATE with a correlated subquery per column; fine for a one-off.
+    # `manage.py rebuild_invoice_totals` does the same from the app code.
+    Invoice = apps.get_model("billing", "Invoice")
+    LineItem = apps.get_model("billing", "LineItem")
+    lines = LineItem.objects.filter(invoice=OuterRef("pk")).order_by().values("invoice")
+
+    def total(expr):
+        return Coalesce(
+            Subquery(lines.annotate(t=Sum(expr)).values("t"), output_field=DecimalField()),
+            Value(0), output_field=DecimalField(),
+        )
+
+    Invoice.objects.update(
+        taxable_total=total(F("quantity") * F("rate")),
+        cgst_total=total("cgst"),
+        sgst_total=total("sgst"),
+        igst_total=total("igst"),
+        line_count=Coalesce(
+            Subquery(lines.annotate(n=Count("id")).values("n"), output_field=IntegerField()), 0,
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0042_trigram_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='historicalinvoice',
+            name='cgst_total',
+            field=models.DecimalField(decimal_places=3, default=0, editable=False, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='historicalinvoice',
+            name='igst_total',
+            field=models.DecimalField(decimal_places=3, default=0, editable=False, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='historicalinvoice',
+            name='line_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='historicalinvoice',
+            name='sgst_total',
+            field=models.DecimalField(decimal_places=3, default=0, editable=False, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='historicalinvoice',
+            name='taxable_total',
+            field=models.DecimalField(decimal_places=3, default=0, editable=False, help_text='Sum of quantity × rate over the line items.', max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='invoice',
+            name='cgst_total',
+            field=models.DecimalField(decimal_places=3, default=0, editable=False, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='invoice',
+            name='igst_total',
+            field=models.DecimalField(decimal_places=3, default=0, editable=False, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='invoice',
+            name='line_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='invoice',
+            name='sgst_total',
+            field=models.DecimalField(decimal_places=3, default=0, editable=False, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='invoice',
+            name='taxable_total',
+            field=models.DecimalField(decimal_places=3, default=0, editable=False, help_text='Sum of quantity × rate over the line items.', max_digits=12),
+        ),
+        migrations.RunPython(_backfill, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,11 @@
 import math
+import time
 from datetime import datetime
 from decimal import Decimal
 
+from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from django.db.models import CharField, Count, F, IntegerField, Sum, Value
 from django.db.models.functions import (
     Cast,
@@ -13,6 +15,7 @@ from django.db.models.functions import (
     ExtractMonth,
     ExtractYear,
 )
+from django.utils import timezone
 from simple_history.models import HistoricalRecords
 
 from billing.constants import (
@@ -258,6 +261,24 @@ class Invoice(AbstractBaseModel):
         verbose_name="Total Amount",
         help_text="Total Amount of the invoice.",
     )
+    # Line totals, denormalised so list views and registers don't aggregate
+    # LineItem per row. Maintained by rollups.resync() for the bulk write
+    # paths and by the LineItem signals otherwise (billing/services/
+    # invoice_totals.py); never written by Invoice.save() on an update.
+    taxable_total = models.DecimalField(
+        max_digits=12, decimal_places=BILLING_DECIMAL_PLACE_PRECISION, default=0,
+        editable=False, help_text="Sum of quantity × rate over the line items.",
+    )
+    cgst_total = models.DecimalField(
+        max_digits=12, decimal_places=BILLING_DECIMAL_PLACE_PRECISION, default=0, editable=False,
+    )
+    sgst_total = models.DecimalField(
+        max_digits=12, decimal_places=BILLING_DECIMAL_PLACE_PRECISION, default=0, editable=False,
+    )
+    igst_total = models.DecimalField(
+        max_digits=12, decimal_places=BILLING_DECIMAL_PLACE_PRECISION, default=0, editable=False,
+    )
+    line_count = models.PositiveIntegerField(default=0, editable=False)
     invoice_date = models.DateField(help_text="Date at which invoice was raised.")
     type_of_invoice = models.CharField(
         max_length=255,
@@ -303,6 +324,8 @@ class Invoice(AbstractBaseModel):
 
     history = HistoricalRecords()
 
+    LINE_TOTAL_FIELDS = ("taxable_total", "cgst_total", "sgst_total", "igst_total", "line_count")
+
     class Meta:
         # Every report filters on some combination of these three, and the
         # table had no indexes at all beyond the implicit FK ones.
@@ -310,6 +333,10 @@ class Invoice(AbstractBaseModel):
             models.Index(fields=["invoice_date"]),
             models.Index(fields=["type_of_invoice", "invoice_date"]),
             models.Index(fields=["business", "invoice_number"]),
+            # Keyset pagination walks the list in (-invoice_date,
+            # -created_at, -id) order; a backward scan of this index
+            # serves it without a sort.
+            models.Index(fields=["invoice_date", "created_at", "id"]),
         ]
         constraints = [
             # One outward number per business per financial year. Scoped to:
@@ -359,6 +386,14 @@ class Invoice(AbstractBaseModel):
             self.total_amount = sum(
                 LineItem.objects.filter(invoice=self).values_list("amount", flat=True)
             )
+        # The line totals belong to the maintenance hooks, which write them
+        # with .update(); an instance loaded before a line write would
+        # otherwise save its stale copy straight back over them.
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.LINE_TOTAL_FIELDS
+            ]
         super().save(*args, **kwargs)
 
     @property
@@ -517,7 +552,9 @@ class LineItem(AbstractBaseModel):
         quantity, rate = Decimal(str(quantity)), Decimal(str(rate))
         # gst_tax_rate_in_decimal = Decimal(str(gst_tax_rate)) / 100
 
-        product = Product.objects.filter(name=product_name).last()
+        from billing.services import typeahead
+
+        product = typeahead.product_by_name(product_name)
 
         hsn_code = product.hsn_code if product else HSN_CODE
         gst_tax_rate_in_decimal = product.gst_tax_rate if product else GST_TAX_RATE
@@ -587,6 +624,27 @@ class LineItem(AbstractBaseModel):
 
         return invoice_summary_data
 
+    @classmethod
+    def summarize(cls, line_items):
+        """`get_invoice_summary` over line items already in memory, for
+        callers that prefetched them (bulk print). Same keys and rounding."""
+        lines = list(line_items)
+
+        def total(values):
+            return sum(values, Decimal(0)) if lines else None
+
+        amount = sum((li.amount for li in lines), Decimal(0))
+        return {
+            "total_amount": cls.custom_round(amount),
+            "total_cgst_tax": total(li.cgst for li in lines),
+            "total_sgst_tax": total(li.sgst for li in lines),
+            "total_igst_tax": total(li.igst for li in lines),
+            "total_items": len(lines),
+            "total_tax": total(li.cgst + li.sgst + li.igst for li in lines),
+            "amount_without_tax": total(li.quantity * li.rate for li in lines),
+            "round_off": cls.custom_round_off(amount),
+        }
+
     @classmethod
     def get_line_item_data_for_download(cls, start_date, end_date, business):
 
@@ -646,6 +704,9 @@ class LineItem(AbstractBaseModel):
                 "amount",
                 "invoice_type",  # Add invoice type to the result
                 "invoice_id_for_filter",  # Add invoice ID to the result
+                # Raw date, so a whole range can be split into months in
+                # Python without re-parsing the display string above.
+                "invoice__invoice_date",
             )
             .order_by("invoice__invoice_date", "invoice__invoice_number")
         )
@@ -753,6 +814,8 @@ class AuditLog(models.Model):
         indexes = [
             models.Index(fields=["entity", "entity_id"]),
             models.Index(fields=["action"]),
+            # (-timestamp, -id) keyset pagination tiebreaker.
+            models.Index(fields=["timestamp", "id"]),
         ]
 
     def __str__(self):
@@ -796,3 +859,283 @@ class ITCReclaimLedger(AbstractBaseModel):
 
     def __str__(self):
         return f"ITC Ledger — {self.business.name}"
+
+
+class MonthlyTaxRollup(AbstractBaseModel):
+    """
+    Pre-aggregated line-item totals per (business, month, invoice type, GST
+    rate, HSN). The dashboard, GST summary and per-business performance
+    endpoints used to re-aggregate every LineItem in the selected range on
+    each request; these rows let them sum a few dozen buckets instead.
+
+    Maintained incrementally by billing/services/rollups.py: every write path
+    subtracts an invoice's old contribution and adds its new one (bulk paths
+    explicitly, one-off saves through billing/signals.py). `rebuild_rollups`
+    recomputes the table from scratch and `rebuild_rollups --check` reports
+    drift without writing.
+
+    Invoice-level figures (invoice_count, invoice_total) are booked against a
+    single bucket per invoice — its lowest (rate, HSN) — so summing them over
+    any grouping of (business, month, type) counts each invoice exactly once.
+    An invoice with no line items books them against the (0, "") bucket.
+    """
+
+    # No DB constraint and no cascade: deleting a business deletes its
+    # invoices first, and their signals drain these rows back to zero. A
+    # cascade here would race those signals and re-insert rows that point
+    # at a business that's about to disappear.
+    business = models.ForeignKey(
+        Business,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name="+",
+        verbose_name="Business",
+        help_text="Business the bucket belongs to.",
+    )
+    month = models.DateField(help_text="First day of the invoice month.")
+    type_of_invoice = models.CharField(
+        max_length=255,
+        choices=INVOICE_TYPE_CHOICES,
+        verbose_name="Type of Invoice",
+    )
+    gst_tax_rate = models.DecimalField(max_digits=13, decimal_places=4)
+    hsn_code = models.CharField(max_length=255, blank=True, default="")
+
+    # quantity × rate carries six places; keep them so the sum is exact.
+    taxable = models.DecimalField(max_digits=22, decimal_places=6, default=0)
+    cgst = models.DecimalField(max_digits=18, decimal_places=BILLING_DECIMAL_PLACE_PRECISION, default=0)
+    sgst = models.DecimalField(max_digits=18, decimal_places=BILLING_DECIMAL_PLACE_PRECISION, default=0)
+    igst = models.DecimalField(max_digits=18, decimal_places=BILLING_DECIMAL_PLACE_PRECISION, default=0)
+    amount = models.DecimalField(max_digits=18, decimal_places=BILLING_DECIMAL_PLACE_PRECISION, default=0)
+    quantity = models.DecimalField(max_digits=18, decimal_places=BILLING_DECIMAL_PLACE_PRECISION, default=0)
+    line_count = models.IntegerField(default=0)
+    invoice_count = models.IntegerField(default=0)
+    invoice_total = models.DecimalField(max_digits=18, decimal_places=BILLING_DECIMAL_PLACE_PRECISION, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["business", "month", "type_of_invoice", "gst_tax_rate", "hsn_code"],
+                name="uniq_monthly_tax_rollup_bucket",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["month", "type_of_invoice"]),
+        ]
+
+    def __str__(self):
+        return f"{self.business_id} {self.month:%Y-%m} {self.type_of_invoice} {self.gst_tax_rate} {self.hsn_code}"
+
+
+class Job(AbstractBaseModel):
+    """
+    A unit of slow work (report, GSTR export, bulk import) run outside the
+    request by the `run_jobs` worker instead of inside a gunicorn worker.
+
+    The table is the queue: endpoints called with `async=1` insert a row and
+    return its id, `run_jobs` claims queued rows one at a time, and
+    `/api/jobs/<id>/` reports status, progress and the result. JSON results
+    live in `result`; file results (the Excel report) in `artifact`, served
+    through the signed media URL. See billing/services/jobs.py.
+    """
+
+    KIND_CHOICES = [
+        ("report", "Excel report"),
+        ("gstr_export", "GSTR export"),
+        ("gstr1_portal_json", "GSTR-1 portal JSON"),
+        ("bulk_invoice_import", "Bulk invoice import"),
+        ("gstr2a_import", "GSTR-2A import"),
+    ]
+    STATUS_QUEUED = "queued"
+    STATUS_RUNNING = "running"
+    STATUS_SUCCEEDED = "succeeded"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, "Queued"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_SUCCEEDED, "Succeeded"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    kind = models.CharField(max_length=32, choices=KIND_CHOICES)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    # Everything the handler needs to redo the request: query params, body,
+    # stored upload names. Must be JSON — the worker is another process.
+    params = models.JSONField(default=dict, blank=True)
+    progress = models.PositiveSmallIntegerField(default=0, help_text="Percent complete, 0-100.")
+    result = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    artifact = models.FileField(upload_to="jobs/%Y/%m/", blank=True, null=True)
+    error = models.TextField(blank=True, default="")
+    user = models.ForeignKey(
+        "auth.User",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    worker = models.CharField(max_length=64, blank=True, default="")
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "created_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
+
+
+class ExtractionCache(models.Model):
+    """
+    Memoised AI extraction results, so re-uploading the same bill (a retry
+    after a form error, the same scan in a later session) doesn't spend
+    another call from a 20-requests/day Gemini key.
+
+    Keyed on a SHA-256 over the normalised JPEG bytes, the prompt and the
+    model name — a different business scope (customer list in the prompt)
+    or model is a different entry. `result` is `_convert_to_dict` output.
+    Entries expire after AI_EXTRACTION_CACHE_TTL_DAYS and the least recently
+    used are evicted past AI_EXTRACTION_CACHE_MAX_ENTRIES; see
+    billing/services/extraction_cache.py.
+    """
+
+    digest = models.CharField(max_length=64, unique=True)
+    model_name = models.CharField(max_length=100)
+    result = models.JSONField()
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"{self.model_name} {self.digest[:12]} ({self.hits} hits)"
+
+
+class DataVersion(models.Model):
+    """
+    Change counters for per-worker caches. The response cache keys on one
+    row per business ("business:<id>") for its invoices and line items and
+    one ("masters") for customers, products and businesses; the typeahead
+    index on "typeahead:product" / "typeahead:customer". Bumped inside the
+    writing transaction, so every worker sees a change exactly when it
+    commits, whatever the Django cache backend. See
+    billing/services/response_cache.py and billing/services/typeahead.py.
+
+    A row starts from the clock, not 0, so a row recreated after a rollback
+    or a wipe can't come back to a value an old cache entry is keyed on.
+    """
+
+    scope = models.CharField(max_length=64, unique=True)
+    version = models.BigIntegerField()
+
+    @classmethod
+    def bump(cls, scopes):
+        # Sorted, so two transactions bumping overlapping scopes lock the rows
+        # in the same order.
+        for scope in sorted(scopes):
+            if cls.objects.filter(scope=scope).update(version=F("version") + 1):
+                continue
+            try:
+                with transaction.atomic():
+                    cls.objects.create(scope=scope, version=time.time_ns())
+            except IntegrityError:
+                # Created by another writer since our UPDATE; bump that one.
+                cls.objects.filter(scope=scope).update(version=F("version") + 1)
+
+    @classmethod
+    def current(cls, scope) -> int:
+        """The version of `scope`, starting it if it has no row yet."""
+        version = cls.objects.filter(scope=scope).values_list("version", flat=True).first()
+        if version is None:
+            version = cls.objects.get_or_create(scope=scope, defaults={"version": time.time_ns()})[0].version
+        return version
+
+    def __str__(self):
+        return f"{self.scope} v{self.version}"
+
+
+class ReconciliationRun(AbstractBaseModel):
+    """
+    One reconciliation of a GSTR-2A/2B download against the business's
+    booked inward invoices. The per-invoice outcome lives in
+    ReconciliationItem so the UI can page and filter it; the counts here are
+    the summary. Built by billing/services/reconciliation.py.
+    """
+
+    business = models.ForeignKey(
+        Business,
+        on_delete=models.CASCADE,
+        related_name="reconciliation_runs",
+        verbose_name="Business",
+    )
+    source_filename = models.CharField(max_length=255, blank=True, default="")
+    # First and last day of the months the portal file covers; books outside
+    # it are not reported as missing from 2B.
+    period_start = models.DateField(null=True, blank=True)
+    period_end = models.DateField(null=True, blank=True)
+    amount_tolerance = models.DecimalField(max_digits=12, decimal_places=2)
+    date_window_days = models.PositiveSmallIntegerField()
+    matched = models.PositiveIntegerField(default=0)
+    mismatched_amount = models.PositiveIntegerField(default=0)
+    missing_in_books = models.PositiveIntegerField(default=0)
+    missing_in_2b = models.PositiveIntegerField(default=0)
+    user = models.ForeignKey(
+        "auth.User",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+    )
+
+    class Meta:
+        ordering = ["-created_at", "-id"]
+
+    def __str__(self):
+        return f"Reconciliation #{self.pk} {self.source_filename} ({self.business_id})"
+
+
+class ReconciliationItem(models.Model):
+    """One portal row and/or booked invoice, classified by a ReconciliationRun."""
+
+    STATUS_MATCHED = "matched"
+    STATUS_MISMATCHED_AMOUNT = "mismatched_amount"
+    STATUS_MISSING_IN_BOOKS = "missing_in_books"
+    STATUS_MISSING_IN_2B = "missing_in_2b"
+    STATUS_CHOICES = [
+        (STATUS_MATCHED, "Matched"),
+        (STATUS_MISMATCHED_AMOUNT, "Amount mismatch"),
+        (STATUS_MISSING_IN_BOOKS, "Missing in books"),
+        (STATUS_MISSING_IN_2B, "Missing in 2B"),
+    ]
+
+    run = models.ForeignKey(ReconciliationRun, on_delete=models.CASCADE, related_name="items")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES)
+    supplier_gstin = models.CharField(max_length=15, blank=True, default="")
+    supplier_name = models.CharField(max_length=255, blank=True, default="")
+    # The portal's number and date when the row is on the portal side,
+    # otherwise the booked ones.
+    invoice_number = models.CharField(max_length=255, blank=True, default="")
+    invoice_date = models.DateField(null=True, blank=True)
+    portal_amount = models.DecimalField(
+        max_digits=12, decimal_places=BILLING_DECIMAL_PLACE_PRECISION, null=True, blank=True
+    )
+    books_amount = models.DecimalField(
+        max_digits=12, decimal_places=BILLING_DECIMAL_PLACE_PRECISION, null=True, blank=True
+    )
+    invoice = models.ForeignKey(
+        Invoice,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+        help_text="The booked inward invoice, when there is one.",
+    )
+    note = models.CharField(max_length=255, blank=True, default="")
+
+    class Meta:
+        ordering = ["id"]
+        indexes = [
+            models.Index(fields=["run", "status"]),
+        ]
+
+    def __str__(self):
+        return f"{self.status} {self.supplier_gstin} {self.invoice_number}"
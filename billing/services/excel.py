@@ -0,0 +1,133 @@
+"""Raw spreadsheet readers for the import paths.
+
+`read_sheets(source, names)` returns the cell values of the named sheets as
+lists of row lists — no header handling, no type coercion beyond what the
+engine does — so the caller can lay out its own frame. Three engines, tried
+in order (READERS):
+
+  - calamine (python-calamine, optional): Rust reader for .xlsx and .xls,
+    several times faster than openpyxl on large sheets;
+  - openpyxl in read-only mode: streams the worksheet XML instead of
+    building the full cell tree, .xlsx only;
+  - pandas' default ExcelFile engines (openpyxl / xlrd): the old path,
+    kept as the fallback for anything the others refuse.
+
+Only the requested sheets are read. An engine that is not installed, or
+that can't open the file, hands over to the next one.
+"""
+
+from __future__ import annotations
+
+import io
+import logging
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SheetData:
+    sheet_names: list[str]   # every sheet in the workbook, in order
+    sheets: dict             # requested name -> list of row lists
+
+
+def _cell(v):
+    # Same normalisation pandas applies on read: empty strings are blanks,
+    # and integral floats come back as ints, so "1030" doesn't turn into
+    # "1030.0" downstream.
+    if v == "":
+        return None
+    if isinstance(v, float):
+        if v != v:  # NaN
+            return None
+        if v.is_integer():
+            return int(v)
+    return v
+
+
+def _rows(raw) -> list[list]:
+    rows = [[_cell(v) for v in row] for row in raw]
+    # Readers disagree on trailing blanks; pad to a rectangle and drop
+    # empty trailing rows, as pandas does.
+    while rows and all(v is None for v in rows[-1]):
+        rows.pop()
+    width = max((len(r) for r in rows), default=0)
+    for r in rows:
+        r.extend([None] * (width - len(r)))
+    return rows
+
+
+def _read_calamine(data: bytes, names) -> SheetData:
+    from python_calamine import CalamineWorkbook
+
+    wb = CalamineWorkbook.from_filelike(io.BytesIO(data))
+    sheet_names = list(wb.sheet_names)
+    sheets = {
+        name: _rows(wb.get_sheet_by_name(name).to_python(skip_empty_area=False))
+        for name in names if name in sheet_names
+    }
+    return SheetData(sheet_names, sheets)
+
+
+def _read_openpyxl(data: bytes, names) -> SheetData:
+    from openpyxl import load_workbook
+
+    if not data.startswith(b"PK"):
+        raise ValueError("not an .xlsx (zip) file")
+    wb = load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+    try:
+        sheets = {}
+        for name in names:
+            if name in wb.sheetnames:
+                ws = wb[name]
+                # Exports often carry a wrong <dimension>; scan the rows.
+                ws.reset_dimensions()
+                sheets[name] = _rows(ws.iter_rows(values_only=True))
+        return SheetData(list(wb.sheetnames), sheets)
+    finally:
+        wb.close()
+
+
+def _read_pandas(data: bytes, names) -> SheetData:
+    import pandas as pd
+
+    xl = pd.ExcelFile(io.BytesIO(data))
+    sheets = {}
+    for name in names:
+        if name in xl.sheet_names:
+            df = xl.parse(name, header=None)
+            sheets[name] = _rows(df.astype(object).where(df.notna(), None).values.tolist())
+    return SheetData(list(xl.sheet_names), sheets)
+
+
+READERS = {
+    "calamine": _read_calamine,
+    "openpyxl": _read_openpyxl,
+    "pandas": _read_pandas,
+}
+
+
+def read_sheets(source, names, engines=None) -> SheetData:
+    """Read sheets `names` from `source` (path or file-like).
+
+    `engines` narrows/reorders READERS (e.g. `["pandas"]` for the old
+    behaviour). Raises the last engine's error if none can read the file.
+    """
+    if hasattr(source, "read"):
+        if hasattr(source, "seek"):
+            source.seek(0)
+        data = source.read()
+    else:
+        with open(source, "rb") as fh:
+            data = fh.read()
+
+    error: Exception | None = None
+    for engine in engines or READERS:
+        try:
+            return READERS[engine](data, names)
+        except ImportError:
+            continue
+        except Exception as e:
+            logger.debug("%s reader could not open the workbook: %s", engine, e)
+            error = e
+    raise error or ValueError("no spreadsheet reader available")
@@ -0,0 +1,119 @@
+"""DB-backed memo of AI invoice extractions (the ExtractionCache table).
+
+`AIInvoiceProcessor` asks here before spending a Gemini call: the key is a
+SHA-256 over the normalised JPEG, the prompt and the model name, so only a
+byte-identical upload under the same business scope and model is a hit. A
+hit returns in one indexed lookup and never touches key quota.
+
+Expiry is by age (AI_EXTRACTION_CACHE_TTL_DAYS from creation); size is held
+at AI_EXTRACTION_CACHE_MAX_ENTRIES by evicting the least recently used rows
+whenever a new result is stored.
+
+Hit/lookup counters are process-wide, like the key cooldowns, and go out
+with each response as the `cache` block so the UI can show the hit rate.
+"""
+
+from __future__ import annotations
+
+import copy
+import hashlib
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from billing.models import ExtractionCache
+
+_lock = threading.Lock()
+_counters = {"hits": 0, "lookups": 0}
+
+
+def digest(image_bytes: bytes, prompt: str, model_name: str) -> str:
+    h = hashlib.sha256()
+    for part in (model_name.encode(), prompt.encode(), image_bytes):
+        # Length-prefix each part so no two different triples hash alike.
+        h.update(len(part).to_bytes(8, "big"))
+        h.update(part)
+    return h.hexdigest()
+
+
+def _ttl_cutoff():
+    return timezone.now() - timedelta(days=settings.AI_EXTRACTION_CACHE_TTL_DAYS)
+
+
+def _count(hits: int, lookups: int) -> None:
+    with _lock:
+        _counters["hits"] += hits
+        _counters["lookups"] += lookups
+
+
+def get_many(digests) -> dict:
+    """{digest: cached result} for the live entries among `digests`.
+
+    Bumps each hit's use count and recency, and counts every digest as a
+    lookup. Results are deep copies — callers mutate them.
+    """
+    digests = list(dict.fromkeys(digests))
+    if not digests:
+        return {}
+    rows = dict(
+        ExtractionCache.objects.filter(
+            digest__in=digests, created_at__gte=_ttl_cutoff()
+        ).values_list("digest", "result")
+    )
+    if rows:
+        ExtractionCache.objects.filter(digest__in=list(rows)).update(
+            hits=F("hits") + 1, last_used_at=timezone.now()
+        )
+    _count(len(rows), len(digests))
+    return {d: copy.deepcopy(r) for d, r in rows.items()}
+
+
+def get(key: str) -> dict | None:
+    return get_many([key]).get(key)
+
+
+def put(key: str, model_name: str, result: dict) -> None:
+    """Store (or refresh an expired) entry, then trim to the size cap."""
+    ExtractionCache.objects.update_or_create(
+        digest=key,
+        defaults={
+            "model_name": model_name,
+            "result": result,
+            "hits": 0,
+            "created_at": timezone.now(),
+            "last_used_at": timezone.now(),
+        },
+    )
+    evict()
+
+
+def evict() -> int:
+    """Drop expired entries and the least recently used beyond the cap."""
+    removed, _ = ExtractionCache.objects.filter(created_at__lt=_ttl_cutoff()).delete()
+    overflow = list(
+        ExtractionCache.objects.order_by("-last_used_at", "-id")
+        .values_list("id", flat=True)[settings.AI_EXTRACTION_CACHE_MAX_ENTRIES:]
+    )
+    if overflow:
+        removed += ExtractionCache.objects.filter(id__in=overflow).delete()[0]
+    return removed
+
+
+def stats(hit: bool | None = None) -> dict:
+    """The response metadata block: this lookup's outcome plus running totals."""
+    with _lock:
+        hits, lookups = _counters["hits"], _counters["lookups"]
+    return {
+        "hit": hit,
+        "hits": hits,
+        "lookups": lookups,
+        "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+    }
+
+
+def reset_stats() -> None:
+    with _lock:
+        _counters["hits"] = _counters["lookups"] = 0
@@ -0,0 +1,129 @@
+"""Process-wide pool of `genai.Client` objects, one per Gemini API key.
+
+`_extract_via_gemini` used to build a fresh client on every call: ~50 ms
+of setup, and a new HTTP connection (TLS handshake included) each time
+because the client's keep-alive session died with it. A client holds an
+httpx session that is safe to share between threads, so one per key,
+created lazily on first use and reused by every request and batch worker
+in the process, keeps those connections warm.
+
+Entries are keyed by a SHA-256 fingerprint of the key — not the display
+fingerprint (`AIInvoiceProcessor._key_fp`), which collapses short keys to
+"***". A key that comes back 401/403 is cooled down by the processor and
+its client dropped here, so whatever replaces the key starts clean.
+
+`client_pool.stats()` reports hits/misses/invalidations, client creation
+time and p50/p95 call latency; `scripts/bench_gemini_client.py` measures the
+per-request overhead against a local stub.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, suppress
+
+import google.genai as genai
+
+# Latency samples kept for the percentiles — enough for a stable p95
+# without the deque growing for the life of the process.
+LATENCY_SAMPLES = 1000
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))]
+
+
+class GeminiClientPool:
+    def __init__(self, factory=None):
+        # factory(api_key) -> client; overridable for the benchmark stub.
+        self._factory = factory or (lambda api_key: genai.Client(api_key=api_key))
+        self._clients: dict = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._invalidations = 0
+        self._create_seconds = 0.0
+        self._calls: deque = deque(maxlen=LATENCY_SAMPLES)
+
+    @staticmethod
+    def fingerprint(api_key: str) -> str:
+        return hashlib.sha256(api_key.encode()).hexdigest()[:16]
+
+    def get(self, api_key: str):
+        """The shared client for `api_key`, created on first use."""
+        fp = self.fingerprint(api_key)
+        client = self._clients.get(fp)
+        if client is None:
+            with self._lock:
+                # Re-check: another thread may have built it while we waited.
+                client = self._clients.get(fp)
+                if client is None:
+                    started = time.perf_counter()
+                    client = self._factory(api_key)
+                    self._create_seconds += time.perf_counter() - started
+                    self._clients[fp] = client
+                    self._misses += 1
+                    return client
+        with self._lock:
+            self._hits += 1
+        return client
+
+    def invalidate(self, api_key: str) -> None:
+        """Drop (and close) the client for a key that stopped authenticating."""
+        with self._lock:
+            client = self._clients.pop(self.fingerprint(api_key), None)
+            if client is not None:
+                self._invalidations += 1
+        if client is not None and hasattr(client, "close"):
+            # Closing can raise if an in-flight call on another thread still
+            # holds the client; it is dropped from the pool either way.
+            with suppress(Exception):
+                client.close()
+
+    def clear(self) -> None:
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+            self._hits = self._misses = self._invalidations = 0
+            self._create_seconds = 0.0
+            self._calls.clear()
+        for client in clients:
+            if hasattr(client, "close"):
+                # Same as invalidate(): a client still in use elsewhere may
+                # fail to close; the pool has let go of it regardless.
+                with suppress(Exception):
+                    client.close()
+
+    @contextmanager
+    def timed_call(self):
+        """Record the wall time of one API call for the latency percentiles."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self._calls.append(elapsed)
+
+    def stats(self) -> dict:
+        with self._lock:
+            calls = list(self._calls)
+            return {
+                "clients": len(self._clients),
+                "hits": self._hits,
+                "misses": self._misses,
+                "invalidations": self._invalidations,
+                "create_ms_total": round(self._create_seconds * 1000, 2),
+                "calls": len(calls),
+                "call_p50_ms": round(_percentile(calls, 50) * 1000, 2),
+                "call_p95_ms": round(_percentile(calls, 95) * 1000, 2),
+            }
+
+
+client_pool = GeminiClientPool()
@@ -0,0 +1,355 @@
+"""GSTR-1 portal JSON — one file per (business, month), built in one pass.
+
+`/invoices/gstr1-portal-json/` files one business for one month. At
+quarter-end that's months × firms calls, each of which loaded the month's
+invoices as model instances and walked them twice: once for the sections,
+once more for the HSN table. `build()` takes any number of periods and
+reads them all with one ordered query. It returns one row per line item,
+invoice fields alongside, LEFT JOINed so an invoice without lines still
+shows up to be reported. It streams that query once, feeding each
+invoice to its period's `_PeriodFile`, which fills the sections and the
+HSN table together.
+
+The single-period endpoint goes through the same builder, so a period's
+file in a batch ZIP (`bundle()`, behind /invoices/gstr1-portal-batch/ and
+`manage.py export_gstr1_json`) is the same file it returns.
+"""
+
+from __future__ import annotations
+
+import io
+import json
+import zipfile
+from collections import namedtuple
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal
+from itertools import groupby
+from operator import itemgetter
+from types import SimpleNamespace
+
+from django.db.models import Q
+
+from billing.constants import B2CL_THRESHOLD, INVOICE_TYPE_OUTWARD
+from billing.models import Invoice
+from billing.tax_rules import is_interstate, state_code
+
+MAX_PERIODS = 120
+
+TWO = Decimal("0.01")
+
+UQC = {"gms": "GMS", "gm": "GMS", "g": "GMS", "kg": "KGS", "kgs": "KGS",
+       "pcs": "PCS", "pc": "PCS", "nos": "NOS", "carat": "CTM", "ct": "CTM"}
+
+_INVOICE_FIELDS = (
+    "id", "business_id", "invoice_number", "invoice_date", "total_amount",
+    "customer__gst_number", "customer__state_name",
+)
+_LINE_FIELDS = (
+    "lineitem__id", "lineitem__hsn_code", "lineitem__unit", "lineitem__product_name",
+    "lineitem__gst_tax_rate", "lineitem__quantity", "lineitem__rate",
+    "lineitem__cgst", "lineitem__sgst", "lineitem__igst",
+)
+_Line = namedtuple(
+    "_Line", "id hsn_code unit product_name gst_tax_rate quantity rate cgst sgst igst",
+)
+
+
+class PortalFileError(ValueError):
+    """A period can't be filed (e.g. the business has no GSTIN)."""
+
+
+@dataclass(frozen=True)
+class Period:
+    business: object
+    year: int
+    month: int
+
+    @property
+    def key(self):
+        return (self.business.pk, self.year, self.month)
+
+    @property
+    def fp(self):
+        return f"{self.month:02d}{self.year}"
+
+    def date_range(self):
+        """[first day, first day of next month)."""
+        start = date(self.year, self.month, 1)
+        end = date(self.year + self.month // 12, self.month % 12 + 1, 1)
+        return start, end
+
+
+def business_gstin(business) -> str:
+    gstin = (business.gst_number or "").strip().upper()
+    if len(gstin) != 15:
+        raise PortalFileError(
+            f"Business '{business.name}' has no 15-character GSTIN — "
+            "set it before generating a portal file."
+        )
+    return gstin
+
+
+def month_span(start: str, end: str | None = None) -> list[tuple[int, int]]:
+    """[(year, month), …] from "YYYY-MM" to "YYYY-MM", inclusive."""
+    invalid = "Months must be given as YYYY-MM (2017 or later)."
+    try:
+        y0, m0 = (int(x) for x in start.split("-"))
+        y1, m1 = (int(x) for x in (end or start).split("-"))
+    except (AttributeError, ValueError):
+        raise PortalFileError(invalid)
+    if not (1 <= m0 <= 12 and 1 <= m1 <= 12 and 2017 <= y0 <= 2099 and 2017 <= y1 <= 2099):
+        raise PortalFileError(invalid)
+    months = [(y, m) for y in range(y0, y1 + 1) for m in range(1, 13)
+              if (y0, m0) <= (y, m) <= (y1, m1)]
+    if not months:
+        raise PortalFileError("The end month is before the start month.")
+    return months
+
+
+def r2(x):
+    return float(Decimal(x or 0).quantize(TWO))
+
+
+def rate_pct(li):
+    r = li.gst_tax_rate or Decimal(0)
+    return float(r * 100 if r <= 1 else r)
+
+
+def slabs(items):
+    """Aggregate an invoice's lines into per-rate slabs (portal itms)."""
+    agg = {}
+    for li in items:
+        rt = rate_pct(li)
+        s = agg.setdefault(rt, {"txval": Decimal(0), "camt": Decimal(0),
+                                "samt": Decimal(0), "iamt": Decimal(0)})
+        s["txval"] += (li.quantity or 0) * (li.rate or 0)
+        s["camt"] += li.cgst or 0
+        s["samt"] += li.sgst or 0
+        s["iamt"] += li.igst or 0
+    return agg
+
+
+class _PeriodFile:
+    """Accumulates one (business, month) file as its invoices stream past."""
+
+    def __init__(self, period: Period):
+        self.period = period
+        self.business = period.business
+        self.gstin = business_gstin(self.business)
+        self.biz_pos = state_code(self.business)
+        self.skipped, self.warnings, self.hsn_warnings = [], [], []
+        self.b2b_data, self.b2cl_data, self.b2cs_agg, self.hsn_agg = {}, {}, {}, {}
+        self.counts = {"b2b": 0, "b2cl": 0, "b2cs": 0}
+
+    def add(self, inv, items):
+        label = f"{inv.invoice_number or '(no number)'} / {inv.invoice_date}"
+        if not inv.invoice_number or not inv.invoice_date:
+            self.skipped.append(f"{label}: missing invoice number or date")
+            return
+        if not items:
+            self.skipped.append(f"{label}: no line items")
+            return
+        self._hsn(inv, items)
+        self._section(inv, items, label)
+
+    def _section(self, inv, items, label):
+        agg = slabs(items)
+        idt = inv.invoice_date.strftime("%d-%m-%Y")
+        val = r2(inv.total_amount)
+        cust_gstin = (inv.customer.gst_number or "").strip().upper()
+
+        if len(cust_gstin) == 15:
+            itms = [
+                {"num": i + 1, "itm_det": {
+                    "txval": r2(s["txval"]), "rt": rt,
+                    "camt": r2(s["camt"]), "samt": r2(s["samt"]),
+                    "iamt": r2(s["iamt"]), "csamt": 0,
+                }}
+                for i, (rt, s) in enumerate(sorted(agg.items()))
+            ]
+            self.b2b_data.setdefault(cust_gstin, {"ctin": cust_gstin, "inv": []})["inv"].append({
+                "inum": inv.invoice_number, "idt": idt, "val": val,
+                "pos": cust_gstin[:2], "rchrg": "N", "inv_typ": "R", "itms": itms,
+            })
+            self.counts["b2b"] += 1
+            return
+
+        inter = is_interstate(self.business, inv.customer)
+        cust_pos = state_code(inv.customer)
+
+        if inter and not cust_pos:
+            self.warnings.append(f"{label}: inter-state but customer state unknown — filed as intra-state")
+            inter = False
+
+        if inter and float(inv.total_amount) > B2CL_THRESHOLD:
+            itms = [
+                {"num": i + 1, "itm_det": {
+                    "txval": r2(s["txval"]), "rt": rt,
+                    "iamt": r2(s["iamt"]), "csamt": 0,
+                }}
+                for i, (rt, s) in enumerate(sorted(agg.items()))
+            ]
+            self.b2cl_data.setdefault(cust_pos, {"pos": cust_pos, "inv": []})["inv"].append({
+                "inum": inv.invoice_number, "idt": idt, "val": val, "itms": itms,
+            })
+            self.counts["b2cl"] += 1
+            return
+
+        # Consolidated B2C: intra-state at any value, inter-state <= threshold.
+        pos = cust_pos if inter else (self.biz_pos or self.gstin[:2])
+        sply = "INTER" if inter else "INTRA"
+        for rt, s in agg.items():
+            b = self.b2cs_agg.setdefault((sply, pos, rt), {
+                "sply_ty": sply, "pos": pos, "typ": "OE", "rt": rt,
+                "txval": Decimal(0), "camt": Decimal(0),
+                "samt": Decimal(0), "iamt": Decimal(0),
+            })
+            b["txval"] += s["txval"]
+            b["camt"] += s["camt"]
+            b["samt"] += s["samt"]
+            b["iamt"] += s["iamt"]
+            if sply == "INTRA" and s["iamt"]:
+                self.warnings.append(f"{label}: intra-state supply carries IGST — run fix_tax_heads")
+            if sply == "INTER" and (s["camt"] or s["samt"]):
+                self.warnings.append(f"{label}: inter-state supply carries CGST/SGST — run fix_tax_heads")
+        self.counts["b2cs"] += 1
+
+    def _hsn(self, inv, items):
+        """HSN summary (table 12) over everything that made it into the file."""
+        for li in items:
+            hsn = (li.hsn_code or "").strip()
+            uqc = UQC.get((li.unit or "").strip().lower(), "OTH")
+            rt = rate_pct(li)
+            h = self.hsn_agg.setdefault((hsn, uqc, rt), {
+                "hsn_sc": hsn, "desc": (li.product_name or "")[:30], "uqc": uqc,
+                "rt": rt, "qty": Decimal(0), "txval": Decimal(0),
+                "camt": Decimal(0), "samt": Decimal(0), "iamt": Decimal(0),
+            })
+            h["qty"] += li.quantity or 0
+            h["txval"] += (li.quantity or 0) * (li.rate or 0)
+            h["camt"] += li.cgst or 0
+            h["samt"] += li.sgst or 0
+            h["iamt"] += li.igst or 0
+            if not hsn:
+                # Listed after the section warnings, as when the HSN table
+                # was a second loop.
+                self.hsn_warnings.append(f"{inv.invoice_number}: line '{li.product_name}' has no HSN")
+
+    def result(self) -> dict:
+        """{"file": <upload as-is>, "meta": {counts, skipped, warnings}}."""
+        fp = self.period.fp
+        file_obj = {"gstin": self.gstin, "fp": fp, "version": "GST3.2.1", "hash": "hash"}
+        if self.b2b_data:
+            file_obj["b2b"] = list(self.b2b_data.values())
+        if self.b2cl_data:
+            file_obj["b2cl"] = list(self.b2cl_data.values())
+        if self.b2cs_agg:
+            file_obj["b2cs"] = [
+                {"sply_ty": b["sply_ty"], "pos": b["pos"], "typ": b["typ"], "rt": b["rt"],
+                 "txval": r2(b["txval"]),
+                 **({"iamt": r2(b["iamt"])} if b["sply_ty"] == "INTER"
+                    else {"camt": r2(b["camt"]), "samt": r2(b["samt"])}),
+                 "csamt": 0}
+                for b in self.b2cs_agg.values()
+            ]
+        if self.hsn_agg:
+            file_obj["hsn"] = {"data": [
+                {"num": i + 1, "hsn_sc": h["hsn_sc"], "desc": h["desc"], "uqc": h["uqc"],
+                 "qty": r2(h["qty"]), "rt": h["rt"], "txval": r2(h["txval"]),
+                 "camt": r2(h["camt"]), "samt": r2(h["samt"]),
+                 "iamt": r2(h["iamt"]), "csamt": 0}
+                for i, h in enumerate(self.hsn_agg.values())
+            ]}
+
+        total_txval = sum(
+            r2(b["txval"]) for b in self.b2cs_agg.values()
+        ) + sum(
+            i["itm_det"]["txval"] for g in self.b2b_data.values() for v in g["inv"] for i in v["itms"]
+        ) + sum(
+            i["itm_det"]["txval"] for g in self.b2cl_data.values() for v in g["inv"] for i in v["itms"]
+        )
+
+        return {
+            "file": file_obj,
+            "meta": {
+                "business": self.business.name, "gstin": self.gstin, "fp": fp,
+                "invoice_counts": self.counts,
+                "taxable_total": round(total_txval, 2),
+                "skipped": self.skipped, "warnings": self.warnings + self.hsn_warnings,
+            },
+        }
+
+
+def _rows(periods):
+    """Every outward invoice in `periods` with its lines, one row per line,
+    ordered by business, date, invoice, line."""
+    scope = Q()
+    for p in periods:
+        start, end = p.date_range()
+        scope |= Q(business_id=p.business.pk, invoice_date__gte=start, invoice_date__lt=end)
+    return (
+        Invoice.objects.filter(scope, type_of_invoice=INVOICE_TYPE_OUTWARD)
+        .order_by("business_id", "invoice_date", "id", "lineitem__id")
+        .values_list(*_INVOICE_FIELDS, *_LINE_FIELDS)
+        .iterator(chunk_size=2000)
+    )
+
+
+def build(periods: list[Period]) -> list[dict]:
+    """{"file", "meta"} for each period, in the order given.
+
+    Raises PortalFileError if a period's business has no GSTIN.
+    """
+    files = {p.key: _PeriodFile(p) for p in periods}
+    if not files:
+        return []
+    n = len(_INVOICE_FIELDS)
+    for invoice_row, rows in groupby(_rows(periods), key=itemgetter(*range(n))):
+        _inv_id, business_id, number, inv_date, total, c_gst, c_state = invoice_row
+        inv = SimpleNamespace(
+            invoice_number=number, invoice_date=inv_date, total_amount=total,
+            customer=SimpleNamespace(gst_number=c_gst, state_name=c_state),
+        )
+        items = [_Line(*row[n:]) for row in rows if row[n] is not None]
+        files[(business_id, inv_date.year, inv_date.month)].add(inv, items)
+    return [files[p.key].result() for p in periods]
+
+
+def bundle(businesses, months) -> tuple[bytes, dict]:
+    """ZIP of portal files for every business × month, plus a combined report.
+
+    Businesses that can't be filed (no GSTIN) are listed under `errors` in
+    the report rather than failing the batch. The report is also written
+    into the ZIP as meta.json.
+    """
+    errors, periods = [], []
+    for business in businesses:
+        try:
+            business_gstin(business)
+        except PortalFileError as e:
+            errors.append({"business": business.name, "business_id": business.pk, "error": str(e)})
+            continue
+        periods.extend(Period(business, y, m) for y, m in months)
+    if len(periods) > MAX_PERIODS:
+        raise PortalFileError(f"At most {MAX_PERIODS} business-months per batch.")
+
+    results = build(periods)
+    report = {
+        "periods": [
+            {**r["meta"], "filename": f"GSTR1_{r['meta']['gstin']}_{r['meta']['fp']}.json"}
+            for r in results
+        ],
+        "errors": errors,
+        "invoice_counts": {
+            k: sum(r["meta"]["invoice_counts"][k] for r in results) for k in ("b2b", "b2cl", "b2cs")
+        },
+        "warning_count": sum(len(r["meta"]["warnings"]) for r in results),
+        "skipped_count": sum(len(r["meta"]["skipped"]) for r in results),
+    }
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+        for r, entry in zip(results, report["periods"], strict=True):
+            zf.writestr(entry["filename"], json.dumps(r["file"], separators=(",", ":")))
+        zf.writestr("meta.json", json.dumps(report, indent=2, ensure_ascii=False))
+    return buf.getvalue(), report
@@ -9,9 +9,11 @@ Design notes:
   credit-note netting: for each credit note we try to find a matching
   invoice (same supplier_gstin + same tax-inclusive value) and mark
   that invoice as "fully cancelled" — it's then skipped on import.
-  Partial credit notes (no exact value match) are not auto-applied to
-  avoid silently mutating invoice amounts; they're surfaced in the
-  ImportResult so the user can handle them manually.
+  Several CNs that together add up to one invoice (within a rupee)
+  cancel it too. Partial credit notes are not auto-applied to avoid
+  silently mutating invoice amounts; they're surfaced in the
+  ImportResult, with their best candidate invoice, so the user can
+  handle them manually.
 
   Background: the v1 of this service imported the invoice sheet
   raw and ignored the note sheet entirely. On a real-world FY25-26
@@ -45,9 +47,12 @@ from __future__ import annotations
 
 import io
 import logging
-from dataclasses import dataclass, field
-from datetime import date, datetime
-from decimal import Decimal, InvalidOperation
+import os
+from bisect import bisect_right
+from collections import defaultdict, deque
+from dataclasses import dataclass, field, fields
+from datetime import date, datetime, timedelta
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
 from typing import Iterable
 
 import pandas as pd
@@ -55,6 +60,7 @@ from django.db import transaction
 
 from billing.constants import INVOICE_TYPE_INWARD
 from billing.models import Business, Customer, Invoice, LineItem
+from billing.services import excel, rollups, typeahead
 
 logger = logging.getLogger(__name__)
 
@@ -113,6 +119,35 @@ class GSTR2ANote:
     sgst: Decimal
 
 
+# Credit-note netting (see `_match_credit_notes`). Suppliers round CN
+# values, so a group of CNs nets an invoice within a rupee; a CN is only
+# paired with invoices dated up to six months before it.
+CN_NETTING_TOLERANCE = Decimal("1.00")
+CN_MATCH_WINDOW_DAYS = 180
+CN_MAX_CANDIDATES = 20
+# Match statuses that cancel the invoice outright.
+CN_CANCELLING = ("exact", "netted")
+
+
+@dataclass
+class CreditNoteMatch:
+    """One row of the credit-note match table.
+
+    status: "exact" (cancels `invoice` alone), "netted" (cancels it with
+    other CNs), "partial" (`invoice` is the best candidate, not cancelled),
+    "unmatched" (no candidate) or "debit" (debit note, never netted).
+    """
+
+    note: GSTR2ANote
+    status: str
+    invoice: GSTR2ARow | None = None
+    score: float = 0.0
+
+    @property
+    def invoice_key(self) -> tuple | None:
+        return _row_key(self.invoice) if self.invoice else None
+
+
 @dataclass
 class FilePreview:
     """Per-file summary returned by `preview_file`."""
@@ -129,6 +164,8 @@ class FilePreview:
     cancelled_invoice_keys: set = field(default_factory=set)
     # credit notes that had no matching invoice — flagged for the user
     partial_notes: list[GSTR2ANote] = field(default_factory=list)
+    # every note with its status / best candidate invoice and score
+    note_matches: list[CreditNoteMatch] = field(default_factory=list)
     parse_errors: list[str] = field(default_factory=list)
 
 
@@ -166,29 +203,58 @@ def _to_decimal(v) -> Decimal:
         return Decimal("0")
 
 
-def _to_date(v) -> date | None:
-    """Coerce 2A's date cell to a date.
+# Column converters. A 10k-row 2A used to spend most of its parse in
+# iterrows() + per-cell coercion; these work a column at a time and only
+# build one Decimal per distinct value.
+
+_DATE_FORMATS = ("%d/%m/%Y", "%d-%m-%Y", "%Y-%m-%d", "%d/%m/%y")
+
+
+def _col(df: pd.DataFrame, name: str) -> pd.Series:
+    if name in df.columns:
+        return df[name]
+    return pd.Series([None] * len(df), index=df.index, dtype=object)
+
+
+def _text_column(col: pd.Series) -> list[str]:
+    """Stripped strings; blank cells become ""."""
+    return [
+        "" if v is None else str(int(v) if isinstance(v, float) and v.is_integer() else v).strip()
+        for v in col.astype(object).where(col.notna(), None)
+    ]
+
+
+def _decimal_column(col: pd.Series) -> list[Decimal]:
+    """Cell values as Decimal; blanks and non-numbers are 0."""
+    nums = pd.to_numeric(col, errors="coerce")
+    lookup = {
+        v: _to_decimal(int(v) if float(v).is_integer() else v)
+        for v in nums.dropna().unique()
+    }
+    return [lookup.get(v, Decimal("0")) for v in nums]
+
+
+def _date_column(col: pd.Series) -> list[date | None]:
+    """Coerce 2A's date cells to dates (None when unparseable).
 
     2A files use DD/MM/YYYY strings (sometimes DD-MM-YYYY) regardless of
-    Excel's locale because the GSTN portal emits them as text. pandas
-    sometimes still parses them as datetime objects when the cell type
-    is set, so we handle both.
+    Excel's locale because the GSTN portal emits them as text. The reader
+    sometimes still hands back datetime objects when the cell type is
+    set, so we handle both: real dates pass through, strings are tried
+    against each format in turn, a whole column at a time.
     """
-    if v is None or (isinstance(v, float) and pd.isna(v)):
-        return None
-    if isinstance(v, datetime):
-        return v.date()
-    if isinstance(v, date):
-        return v
-    s = str(v).strip()
-    if not s:
-        return None
-    for fmt in ("%d/%m/%Y", "%d-%m-%Y", "%Y-%m-%d", "%d/%m/%y"):
-        try:
-            return datetime.strptime(s, fmt).date()
-        except ValueError:
-            continue
-    return None
+    col = col.astype(object)
+    out = pd.Series(pd.NaT, index=col.index, dtype="datetime64[ns]")
+    is_date = col.map(lambda v: isinstance(v, (datetime, date)))
+    if is_date.any():
+        out[is_date] = pd.to_datetime(col[is_date])
+    text = col.where(col.map(lambda v: isinstance(v, str)), None).str.strip()
+    for fmt in _DATE_FORMATS:
+        todo = out.isna() & text.notna()
+        if not todo.any():
+            break
+        out[todo] = pd.to_datetime(text[todo], format=fmt, errors="coerce")
+    return [None if pd.isna(v) else v.date() for v in out]
 
 
 def _extract_recipient_gstin(header_row_0: str) -> str:
@@ -199,16 +265,37 @@ def _extract_recipient_gstin(header_row_0: str) -> str:
     return m.group(1) if m else ""
 
 
+def _row_key(row: GSTR2ARow) -> tuple:
+    return (row.supplier_gstin, row.invoice_number, row.invoice_date)
+
+
+def _paise(value: Decimal) -> int:
+    return int((value * 100).to_integral_value(ROUND_HALF_UP))
+
+
+def _note_fit(note: GSTR2ANote, inv: GSTR2ARow, remaining: Decimal) -> float:
+    """0-1 score for netting `note` against what is left of `inv`."""
+    if abs(remaining - note.note_value) <= CN_NETTING_TOLERANCE:
+        value_fit = 1.0
+    else:
+        value_fit = float(note.note_value / remaining) if remaining > 0 else 0.0
+    if note.note_date is None:
+        date_fit = 0.5
+    else:
+        days = (note.note_date - inv.invoice_date).days
+        date_fit = max(0.0, 1 - days / CN_MATCH_WINDOW_DAYS)
+    return round(0.7 * value_fit + 0.3 * date_fit, 3)
+
+
 def _match_credit_notes(
     invoices: list[GSTR2ARow], notes: list[GSTR2ANote]
-) -> tuple[set, list[GSTR2ANote]]:
-    """Pair each credit note with an invoice it fully cancels.
+) -> list[CreditNoteMatch]:
+    """Pair credit notes with the invoices they cancel; one table row per note.
 
-    Matching key is `(supplier_gstin, tax_inclusive_value)` — a credit
-    note fully cancels an invoice when both numbers line up to the
-    paisa. Pairing is greedy and one-to-one: a CN that finds a match
-    consumes that invoice from the candidate pool, so two CNs at the
-    same value won't both claim the same invoice.
+    Pass 1 — exact: a credit note fully cancels an invoice when supplier
+    GSTIN and tax-inclusive value line up to the paisa. Pairing is greedy
+    and one-to-one in file order: a CN that finds a match consumes that
+    invoice, so two CNs at the same value won't both claim it.
 
     Why tax_inclusive value (not invoice number): the 2A export does
     NOT populate the `Invoice No`/`Invoice Date` columns on note rows
@@ -216,183 +303,251 @@ def _match_credit_notes(
     require them. Tax-inclusive value at the paisa-level is unique
     enough in practice (jewellery invoices are rarely round numbers).
 
-    Returns `(cancelled_keys, partial_notes)`. `cancelled_keys` is a
-    set of `(supplier_gstin, invoice_number, invoice_date)` tuples
-    that should be skipped on import. `partial_notes` is the CNs we
-    couldn't pair — surfaced to the user for manual handling.
+    Pass 2 — netting: each remaining CN is scored (`_note_fit`) against
+    the supplier's invoices dated up to CN_MATCH_WINDOW_DAYS before it
+    (nearest CN_MAX_CANDIDATES, with enough value left) and allocated to
+    the best one. An invoice whose CNs add up to its value within
+    CN_NETTING_TOLERANCE is cancelled ("netted" — e.g. a marketplace
+    order returned in two shipments); otherwise its CNs stay "partial",
+    with the invoice as their best candidate for the user to review.
+
+    Both passes work off indexes built once — value buckets and a
+    date-sorted list per supplier — so a file with hundreds of returns
+    from one supplier costs O(invoices + notes · CN_MAX_CANDIDATES)
+    instead of a scan of every invoice per note.
     """
-    cancelled_keys: set = set()
-    used_invoice_keys: set = set()
-    partials: list[GSTR2ANote] = []
+    by_value: dict[tuple, deque] = defaultdict(deque)
+    by_supplier: dict[str, list[GSTR2ARow]] = defaultdict(list)
+    seen: set = set()
+    for inv in invoices:
+        if _row_key(inv) in seen:  # repeated row — it can only be cancelled once
+            continue
+        seen.add(_row_key(inv))
+        by_value[(inv.supplier_gstin, _paise(inv.invoice_value))].append(inv)
+        by_supplier[inv.supplier_gstin].append(inv)
+
+    table: list[CreditNoteMatch] = []
+    used: set = set()
+    pending: list[CreditNoteMatch] = []
     for note in notes:
         # Only Credit notes reduce ITC. Debit notes add to it (rare in
         # GSTR-2A — usually appear in 2B for the recipient's own debit
-        # notes, not the supplier's). Treat debits as partial for now.
+        # notes, not the supplier's). Never netted.
         if (note.note_type or "").strip().lower() != "credit":
-            partials.append(note)
+            table.append(CreditNoteMatch(note, "debit"))
             continue
-        match_inv = None
-        for inv in invoices:
-            inv_key = (inv.supplier_gstin, inv.invoice_number, inv.invoice_date)
-            if inv_key in used_invoice_keys:
-                continue
-            if (
-                inv.supplier_gstin == note.supplier_gstin
-                and abs(inv.invoice_value - note.note_value) < Decimal("0.01")
+        bucket = by_value.get((note.supplier_gstin, _paise(note.note_value)))
+        if bucket:
+            inv = bucket.popleft()
+            used.add(_row_key(inv))
+            table.append(CreditNoteMatch(note, "exact", inv, 1.0))
+        else:
+            match = CreditNoteMatch(note, "unmatched")
+            table.append(match)
+            pending.append(match)
+
+    if not pending:
+        return table
+
+    for rows in by_supplier.values():
+        rows.sort(key=lambda r: r.invoice_date)
+    dates = {g: [r.invoice_date for r in rows] for g, rows in by_supplier.items()}
+    remaining: dict[tuple, Decimal] = {}
+    allocated: dict[tuple, list[CreditNoteMatch]] = defaultdict(list)
+    window = timedelta(days=CN_MATCH_WINDOW_DAYS)
+
+    for match in pending:
+        note = match.note
+        rows = by_supplier.get(note.supplier_gstin, [])
+        hi = len(rows) if note.note_date is None else bisect_right(dates[note.supplier_gstin], note.note_date)
+        best, best_rank, looked = None, None, 0
+        for inv in reversed(rows[:hi]):
+            if looked >= CN_MAX_CANDIDATES or (
+                note.note_date is not None and inv.invoice_date < note.note_date - window
             ):
-                match_inv = inv_key
                 break
-        if match_inv:
-            cancelled_keys.add(match_inv)
-            used_invoice_keys.add(match_inv)
-        else:
-            partials.append(note)
-    return cancelled_keys, partials
+            key = _row_key(inv)
+            if key in used:
+                continue
+            looked += 1
+            left = remaining.get(key, inv.invoice_value)
+            if note.note_value > left + CN_NETTING_TOLERANCE:
+                continue
+            rank = (_note_fit(note, inv, left), inv.invoice_date)
+            if best_rank is None or rank > best_rank:
+                best, best_rank = inv, rank
+        if best is None:
+            continue
+        key = _row_key(best)
+        remaining[key] = remaining.get(key, best.invoice_value) - note.note_value
+        match.invoice, match.score, match.status = best, best_rank[0], "partial"
+        allocated[key].append(match)
+
+    for key, matches in allocated.items():
+        if abs(remaining[key]) <= CN_NETTING_TOLERANCE:
+            for match in matches:
+                match.status = "netted"
+    return table
+
+
+def _sheet_frame(rows: list[list]) -> pd.DataFrame | None:
+    """Rows 3+ of a raw sheet framed under the row-2 column headers, blank
+    supplier rows dropped. None when the sheet has no data rows."""
+    if len(rows) < 4:
+        return None
+    headers = ["" if x is None else str(x).strip() for x in rows[2]]
+    df = pd.DataFrame(rows[3:], columns=headers, dtype=object)
+    if "Supplier Name" not in df.columns:
+        return None
+    return df[df["Supplier Name"].notna()].reset_index(drop=True)
 
 
-def _parse_note_sheet(xl: pd.ExcelFile) -> list[GSTR2ANote]:
+def _parse_note_sheet(rows: list[list] | None) -> list[GSTR2ANote]:
     """Best-effort parse of the `note` sheet. Returns [] if missing
     or empty — credit-note netting just becomes a no-op."""
-    if "note" not in xl.sheet_names:
-        return []
-    try:
-        df_raw = xl.parse("note", header=None)
-    except Exception:
+    df = _sheet_frame(rows or [])
+    if df is None:
         return []
-    if df_raw.shape[0] < 4:
-        return []
-    headers = [str(x).strip() for x in df_raw.iloc[2].tolist()]
-    df = df_raw.iloc[3:].copy()
-    df.columns = headers
-    # Drop rows where Supplier Name is null (header artefacts / blank rows)
-    if "Supplier Name" not in df.columns:
-        return []
-    df = df[df["Supplier Name"].notna()].reset_index(drop=True)
-    notes: list[GSTR2ANote] = []
-    for _, r in df.iterrows():
-        try:
-            notes.append(GSTR2ANote(
-                supplier_name=str(r.get("Supplier Name", "")).strip(),
-                supplier_gstin=str(r.get("GSTIN", "")).strip().upper(),
-                note_number=str(r.get("Note No", "")).strip(),
-                note_date=_to_date(r.get("Note Date")),
-                note_type=str(r.get("Note Type", "")).strip(),
-                note_value=_to_decimal(r.get("Note Value")),
-                taxable_value=_to_decimal(r.get("Taxable Value")),
-                igst=_to_decimal(r.get("IGST")),
-                cgst=_to_decimal(r.get("CGST")),
-                sgst=_to_decimal(r.get("SGST")),
-            ))
-        except Exception:
-            # Don't fail the whole import for one malformed note row.
-            continue
-    return notes
+    return [
+        GSTR2ANote(*values)
+        for values in zip(
+            _text_column(_col(df, "Supplier Name")),
+            [g.upper() for g in _text_column(_col(df, "GSTIN"))],
+            _text_column(_col(df, "Note No")),
+            _date_column(_col(df, "Note Date")),
+            _text_column(_col(df, "Note Type")),
+            _decimal_column(_col(df, "Note Value")),
+            _decimal_column(_col(df, "Taxable Value")),
+            _decimal_column(_col(df, "IGST")),
+            _decimal_column(_col(df, "CGST")),
+            _decimal_column(_col(df, "SGST")),
+            strict=True,
+        )
+    ]
 
 
-def preview_file(file_path_or_buffer, filename: str | None = None) -> FilePreview:
+def parse_file(file_path_or_buffer, filename: str | None = None, engines=None) -> FilePreview:
     """Parse one 2A file into a structured preview without touching the DB.
 
     `file_path_or_buffer` can be a path string or a file-like object
-    (the API endpoint will pass an `InMemoryUploadedFile`).
+    (the API endpoint will pass an `InMemoryUploadedFile`). The business
+    match is left empty — `preview_file` fills it in — so this is safe to
+    run in a worker process with no database connection.
+
+    Only the `invoice` and `note` sheets are read, through the fastest
+    reader available (`billing.services.excel`; `engines` picks one).
     """
     fname = filename or (file_path_or_buffer if isinstance(file_path_or_buffer, str) else "(uploaded)")
     parse_errors: list[str] = []
 
-    try:
-        xl = pd.ExcelFile(file_path_or_buffer)
-    except Exception as e:
+    def failed(message):
         return FilePreview(
             filename=fname, recipient_header="", recipient_gstin="",
             matched_business_id=None, matched_business_name="",
             parsed_rows=[],
-            parse_errors=[f"Could not open file: {e!s}"],
+            parse_errors=[message],
         )
 
-    if "invoice" not in xl.sheet_names:
-        return FilePreview(
-            filename=fname, recipient_header="", recipient_gstin="",
-            matched_business_id=None, matched_business_name="",
-            parsed_rows=[],
-            parse_errors=[f"Missing 'invoice' sheet. Found: {xl.sheet_names}"],
-        )
+    try:
+        book = excel.read_sheets(file_path_or_buffer, ("invoice", "note"), engines=engines)
+    except Exception as e:
+        return failed(f"Could not open file: {e!s}")
 
-    df_raw = xl.parse("invoice", header=None)
-    if df_raw.shape[0] < 4:
-        return FilePreview(
-            filename=fname, recipient_header="", recipient_gstin="",
-            matched_business_id=None, matched_business_name="",
-            parsed_rows=[],
-            parse_errors=["File has no data rows."],
-        )
+    if "invoice" not in book.sheets:
+        return failed(f"Missing 'invoice' sheet. Found: {book.sheet_names}")
+
+    raw = book.sheets["invoice"]
+    if len(raw) < 4:
+        return failed("File has no data rows.")
 
     header_row_0 = " ".join(
-        str(x) for x in df_raw.iloc[0].dropna().tolist() if str(x).strip()
+        str(x) for x in raw[0] if x is not None and str(x).strip()
     )
     recipient_gstin = _extract_recipient_gstin(header_row_0)
 
     # Row 2 is the column headers; data starts row 3.
-    headers = [str(x).strip() for x in df_raw.iloc[2].tolist()]
-    df = df_raw.iloc[3:].copy()
-    df.columns = headers
-    df = df[df.get("Supplier Name").notna()].reset_index(drop=True)
-
-    matched_biz = None
-    if recipient_gstin:
-        matched_biz = Business.objects.filter(gst_number=recipient_gstin).first()
+    df = _sheet_frame(raw)
+    if df is None:
+        return failed("Missing 'Supplier Name' column.")
 
+    dates = _date_column(_col(df, "Invoice Date"))
+    raw_dates = _col(df, "Invoice Date").tolist()
     rows: list[GSTR2ARow] = []
-    for idx, r in df.iterrows():
-        try:
-            inv_date = _to_date(r.get("Invoice Date"))
-            if not inv_date:
-                parse_errors.append(
-                    f"Row {idx + 4}: unparseable invoice date {r.get('Invoice Date')!r}"
-                )
-                continue
-            rows.append(GSTR2ARow(
-                supplier_name=str(r.get("Supplier Name", "")).strip(),
-                supplier_gstin=str(r.get("GSTIN", "")).strip().upper(),
-                supplier_state=str(r.get("State", "")).strip().upper(),
-                pos=str(r.get("POS", "")).strip().upper(),
-                invoice_number=str(r.get("Invoice No", "")).strip(),
-                invoice_date=inv_date,
-                invoice_value=_to_decimal(r.get("Invoice Value")),
-                taxable_value=_to_decimal(r.get("Taxable Value")),
-                igst=_to_decimal(r.get("IGST")),
-                cgst=_to_decimal(r.get("CGST")),
-                sgst=_to_decimal(r.get("SGST")),
-                cess=_to_decimal(r.get("CESS")),
-                filed_3b=str(r.get("3B Status", "")).strip().lower() == "filed",
-                reverse_charge=str(r.get("RC", "")).strip().upper() in ("YES", "Y", "TRUE"),
-            ))
-        except Exception as e:
-            parse_errors.append(f"Row {idx + 4}: {e!s}")
+    for idx, values in enumerate(zip(
+        _text_column(_col(df, "Supplier Name")),
+        [g.upper() for g in _text_column(_col(df, "GSTIN"))],
+        [v.upper() for v in _text_column(_col(df, "State"))],
+        [v.upper() for v in _text_column(_col(df, "POS"))],
+        _text_column(_col(df, "Invoice No")),
+        dates,
+        _decimal_column(_col(df, "Invoice Value")),
+        _decimal_column(_col(df, "Taxable Value")),
+        _decimal_column(_col(df, "IGST")),
+        _decimal_column(_col(df, "CGST")),
+        _decimal_column(_col(df, "SGST")),
+        _decimal_column(_col(df, "CESS")),
+        [v.lower() == "filed" for v in _text_column(_col(df, "3B Status"))],
+        [v.upper() in ("YES", "Y", "TRUE") for v in _text_column(_col(df, "RC"))],
+        strict=True,
+    )):
+        if values[5] is None:
+            parse_errors.append(
+                f"Row {idx + 4}: unparseable invoice date {raw_dates[idx]!r}"
+            )
+            continue
+        rows.append(GSTR2ARow(*values))
 
     # Parse the note sheet and net it against invoices. Fully-matched
     # credit notes cancel out their invoices (skipped on import).
     # Unmatched / partial CNs are reported but not auto-applied.
-    notes = _parse_note_sheet(xl)
-    cancelled_keys, partials = _match_credit_notes(rows, notes)
+    notes = _parse_note_sheet(book.sheets.get("note"))
+    matches = _match_credit_notes(rows, notes)
 
     return FilePreview(
         filename=fname,
         recipient_header=header_row_0,
         recipient_gstin=recipient_gstin,
-        matched_business_id=matched_biz.id if matched_biz else None,
-        matched_business_name=matched_biz.name if matched_biz else "",
+        matched_business_id=None,
+        matched_business_name="",
         parsed_rows=rows,
         parsed_notes=notes,
-        cancelled_invoice_keys=cancelled_keys,
-        partial_notes=partials,
+        cancelled_invoice_keys={m.invoice_key for m in matches if m.status in CN_CANCELLING},
+        partial_notes=[m.note for m in matches if m.status not in CN_CANCELLING],
+        note_matches=matches,
         parse_errors=parse_errors,
     )
 
 
+def _match_business(preview: FilePreview) -> FilePreview:
+    """Fill in the Business the file's recipient GSTIN belongs to."""
+    matched_biz = None
+    if preview.recipient_gstin:
+        matched_biz = Business.objects.filter(gst_number=preview.recipient_gstin).first()
+    preview.matched_business_id = matched_biz.id if matched_biz else None
+    preview.matched_business_name = matched_biz.name if matched_biz else ""
+    return preview
+
+
+def preview_file(file_path_or_buffer, filename: str | None = None) -> FilePreview:
+    """`parse_file` plus the recipient-GSTIN → Business match."""
+    return _match_business(parse_file(file_path_or_buffer, filename=filename))
+
+
 # ── import ─────────────────────────────────────────────────────────────
 
 
-def _find_or_create_supplier(row: GSTR2ARow, dry_run: bool) -> tuple[Customer | None, bool]:
-    """Return `(customer, was_created)` matching the row's GSTIN.
+def _prefetch_suppliers(gstins) -> dict:
+    """`{gstin: Customer}` for the file's GSTINs already in the DB, in one
+    query. The lowest pk wins if a GSTIN is on two rows."""
+    found: dict = {}
+    for cust in Customer.objects.filter(gst_number__in=list(gstins)).order_by("pk"):
+        found.setdefault(cust.gst_number, cust)
+    return found
+
+
+def _new_suppliers(rows: list[GSTR2ARow], known: dict) -> list[Customer]:
+    """Unsaved Customers for the GSTINs in `rows` that aren't in `known`,
+    one per GSTIN in file order, with names made unique in memory.
 
     GSTIN is the source of truth — name matching is unreliable for
     multi-state suppliers (SKYMART INDIA has 06/08/24 state GSTINs,
@@ -404,65 +559,99 @@ def _find_or_create_supplier(row: GSTR2ARow, dry_run: bool) -> tuple[Customer |
     Disambiguation strategy when name is taken by a different GSTIN:
       1. `NAME (STATE)`           e.g. "SKYMART INDIA (RAJASTHAN)"
       2. If still taken (rare): `NAME · GSTIN` (always unique)
+
+    The names already taken are read in one query up front and the set
+    grows as names are handed out, so two new suppliers in one file can't
+    claim the same name either.
     """
-    if not row.supplier_gstin:
-        return None, False
-    existing = Customer.objects.filter(gst_number=row.supplier_gstin).first()
-    if existing:
-        return existing, False
-    if dry_run:
-        # Don't actually create on dry-run, but tell the caller we would have.
-        # Returning None signals "would create" so the import counter is honest.
-        return None, True
-
-    base_name = (row.supplier_name or row.supplier_gstin)[:255]
-    final_name = base_name
-    if Customer.objects.filter(name=final_name).exists():
-        # First try state suffix — human-readable.
-        state = (row.supplier_state or "").strip()
-        if state:
-            candidate = f"{base_name} ({state})"[:255]
-            if not Customer.objects.filter(name=candidate).exists():
-                final_name = candidate
-        # Fall back to GSTIN suffix — guaranteed unique.
-        if final_name == base_name or Customer.objects.filter(name=final_name).exists():
-            final_name = f"{base_name[:230]} · {row.supplier_gstin}"[:255]
-
-    cust = Customer.objects.create(
-        name=final_name,
-        gst_number=row.supplier_gstin,
-        state_name=row.supplier_state[:255] if row.supplier_state else "",
-    )
-    # 2A rows carry no address; the registry does. Empty fields only.
     from billing.gstin import enrich_customer
 
-    enrich_customer(cust)
-    return cust, True
-
-
-def _invoice_exists(business_id: int, customer_id: int, inv_no: str, inv_date: date) -> bool:
-    """Dedup probe. Idempotency relies on this — be conservative.
+    firsts: dict = {}
+    for row in rows:
+        if row.supplier_gstin and row.supplier_gstin not in known:
+            firsts.setdefault(row.supplier_gstin, row)
+    if not firsts:
+        return []
 
-    Match is exact on (business, customer, invoice_number, invoice_date).
-    `invoice_number` is compared case-insensitively because GSTN
-    sometimes normalises casing differently across re-downloads.
+    def base_and_state(row):
+        base = (row.supplier_name or row.supplier_gstin)[:255]
+        state = (row.supplier_state or "").strip()
+        return base, (f"{base} ({state})"[:255] if state else None)
+
+    candidates = set()
+    for row in firsts.values():
+        candidates.update(n for n in base_and_state(row) if n)
+    taken = set(Customer.objects.filter(name__in=candidates).values_list("name", flat=True))
+
+    new = []
+    for gstin, row in firsts.items():
+        base_name, with_state = base_and_state(row)
+        final_name = base_name
+        if final_name in taken:
+            # State suffix first — human-readable; else the GSTIN suffix,
+            # which is guaranteed unique.
+            final_name = (
+                with_state if with_state and with_state not in taken
+                else f"{base_name[:230]} · {gstin}"[:255]
+            )
+        taken.add(final_name)
+        cust = Customer(
+            name=final_name,
+            gst_number=gstin,
+            state_name=row.supplier_state[:255] if row.supplier_state else "",
+        )
+        # 2A rows carry no address; the registry does. Empty fields only,
+        # filled before the insert so it costs no extra UPDATE.
+        enrich_customer(cust, save=False)
+        new.append(cust)
+    return new
+
+
+def _existing_invoice_keys(business_id: int, suppliers, rows: list[GSTR2ARow]) -> set:
+    """Dedup probe for the whole file. Idempotency relies on this — be
+    conservative.
+
+    Natural keys `(customer_id, lower(invoice_number), invoice_date)` of
+    the business's invoices from these suppliers over the file's date
+    span, in one query. `invoice_number` is compared case-insensitively
+    because GSTN sometimes normalises casing differently across
+    re-downloads.
     """
-    return Invoice.objects.filter(
-        business_id=business_id,
-        customer_id=customer_id,
-        invoice_number__iexact=inv_no,
-        invoice_date=inv_date,
-    ).exists()
+    supplier_ids = {c.pk for c in suppliers}
+    if not supplier_ids or not rows:
+        return set()
+    dates = [r.invoice_date for r in rows]
+    return {
+        (cid, number.lower(), d)
+        for cid, number, d in Invoice.objects.filter(
+            business_id=business_id,
+            customer_id__in=supplier_ids,
+            invoice_date__range=(min(dates), max(dates)),
+        ).values_list("customer_id", "invoice_number", "invoice_date")
+    }
 
 
 def import_file(
-    file_path_or_buffer,
+    file_path_or_buffer=None,
     *,
     dry_run: bool = False,
     filename: str | None = None,
+    parsed: FilePreview | None = None,
 ) -> ImportResult:
-    """Parse + import one 2A file. Idempotent — safe to re-run."""
-    preview = preview_file(file_path_or_buffer, filename=filename)
+    """Parse + import one 2A file. Idempotent — safe to re-run.
+
+    The DB work is batched, so the query count doesn't grow with the file:
+    one query for the suppliers already known by GSTIN, one for the names
+    new suppliers would clash with, one for the invoice natural keys
+    already present, then bulk_create for new suppliers, invoices and
+    their synthetic line items.
+
+    `parsed` is a `parse_file` result from elsewhere (a worker process);
+    the file itself is then not read again.
+    """
+    if parsed is None:
+        parsed = parse_file(file_path_or_buffer, filename=filename)
+    preview = _match_business(parsed)
     fname = preview.filename
     result = ImportResult(filename=fname)
     result.errors.extend(preview.parse_errors)
@@ -494,29 +683,50 @@ def import_file(
     )
     # Surface partial credit notes regardless of dry-run/live — these
     # are informational, the import doesn't act on them either way.
-    for n in preview.partial_notes:
+    for m in preview.note_matches:
+        if m.status in CN_CANCELLING:
+            continue
+        n = m.note
+        if m.invoice:
+            hint = (f" → best candidate {m.invoice.invoice_number} ({m.invoice.invoice_date}) "
+                    f"₹{m.invoice.invoice_value}, score {m.score:.2f}")
+        else:
+            hint = " (debit note)" if m.status == "debit" else " → no candidate invoice"
         result.partial_credit_notes.append(
             f"  ~ partial CN {n.note_number} from {n.supplier_name} "
-            f"₹{n.note_value} (-₹{n.cgst + n.sgst + n.igst} ITC)"
+            f"₹{n.note_value} (-₹{n.cgst + n.sgst + n.igst} ITC){hint}"
         )
 
-    try:
-      with transaction.atomic():
-        for row in preview.parsed_rows:
-            # Skip rows that a credit note fully cancelled. This is the
-            # main behaviour change from v1 — previously these slipped
-            # through as phantom invoices and had to be manually deleted.
-            row_key = (row.supplier_gstin, row.invoice_number, row.invoice_date)
-            if row_key in preview.cancelled_invoice_keys:
-                result.skipped_credit_noted += 1
-                result.skipped_detail.append(
-                    f"  CN-cancelled {row.invoice_number} from {row.supplier_name} "
-                    f"({row.invoice_date}) ₹{row.invoice_value}"
-                )
-                continue
+    # Skip rows that a credit note fully cancelled. This is the main
+    # behaviour change from v1 — previously these slipped through as
+    # phantom invoices and had to be manually deleted.
+    live_rows = []
+    for row in preview.parsed_rows:
+        row_key = (row.supplier_gstin, row.invoice_number, row.invoice_date)
+        if row_key in preview.cancelled_invoice_keys:
+            result.skipped_credit_noted += 1
+            result.skipped_detail.append(
+                f"  CN-cancelled {row.invoice_number} from {row.supplier_name} "
+                f"({row.invoice_date}) ₹{row.invoice_value}"
+            )
+        else:
+            live_rows.append(row)
 
-            cust, was_created = _find_or_create_supplier(row, dry_run=dry_run)
-            if dry_run and was_created:
+    try:
+      with transaction.atomic(), rollups.resync() as rollup:
+        suppliers = _prefetch_suppliers({r.supplier_gstin for r in live_rows if r.supplier_gstin})
+        existing_keys = _existing_invoice_keys(business_id, suppliers.values(), live_rows)
+        if not dry_run:
+            new_suppliers = Customer.objects.bulk_create(_new_suppliers(live_rows, suppliers))
+            if new_suppliers:
+                typeahead.invalidate(typeahead.CUSTOMERS)
+            suppliers.update((c.gst_number, c) for c in new_suppliers)
+            result.created_suppliers += len(new_suppliers)
+
+        to_create: list[tuple[Invoice, GSTR2ARow, Customer]] = []
+        for row in live_rows:
+            cust = suppliers.get(row.supplier_gstin) if row.supplier_gstin else None
+            if dry_run and cust is None and row.supplier_gstin:
                 # Count phantom creation for the preview report
                 result.created_suppliers += 1
                 # We don't have a customer to dedup against; assume new invoice
@@ -538,9 +748,8 @@ def import_file(
                     f"Row for {row.supplier_name!r} has no GSTIN — skipped."
                 )
                 continue
-            if was_created:
-                result.created_suppliers += 1
-            if _invoice_exists(business_id, cust.id, row.invoice_number, row.invoice_date):
+            key = (cust.pk, row.invoice_number.lower(), row.invoice_date)
+            if key in existing_keys:
                 result.skipped_duplicates += 1
                 result.skipped_detail.append(
                     f"  DUP {row.invoice_number} from {cust.name} ({row.invoice_date}) ₹{row.invoice_value}"
@@ -558,31 +767,18 @@ def import_file(
                     )
                 continue
 
-            # Real write — invoice + one synthetic line item
-            invoice = Invoice.objects.create(
+            # A repeat of this row later in the same file is a duplicate.
+            existing_keys.add(key)
+            to_create.append((Invoice(
                 business_id=business_id,
                 customer=cust,
                 invoice_number=row.invoice_number,
                 invoice_date=row.invoice_date,
                 type_of_invoice=INVOICE_TYPE_INWARD,
-                # bulk_create below skips the resync signal, so this stored
+                # bulk_create skips the resync signal, so this stored
                 # total IS the final value (and equals the line amount).
                 total_amount=row.invoice_value,
-            )
-            LineItem.objects.bulk_create([LineItem(
-                invoice=invoice,
-                customer=cust,
-                product_name=f"GSTR-2A import · {row.supplier_name[:80]}",
-                hsn_code="",  # 2A doesn't expose per-line HSN
-                gst_tax_rate=row.gst_tax_rate,
-                quantity=Decimal("1"),
-                rate=row.taxable_value,
-                cgst=row.cgst,
-                sgst=row.sgst,
-                igst=row.igst,
-                amount=row.invoice_value,  # tax-inclusive (matches app contract)
-                unit="lot",
-            )])
+            ), row, cust))
             result.created_invoices += 1
             result.created_line_items += 1
             result.created_detail.append(
@@ -593,6 +789,31 @@ def import_file(
                     f"  ! 3B-not-filed: {row.invoice_number} from {cust.name} ₹{row.invoice_value}"
                 )
 
+        if to_create:
+            # Real write — invoices, then one synthetic line item each
+            invoices = Invoice.objects.bulk_create([inv for inv, _, _ in to_create], batch_size=500)
+            rollup.add(*(inv.pk for inv in invoices))
+            LineItem.objects.bulk_create(
+                [
+                    LineItem(
+                        invoice=invoice,
+                        customer=cust,
+                        product_name=f"GSTR-2A import · {row.supplier_name[:80]}",
+                        hsn_code="",  # 2A doesn't expose per-line HSN
+                        gst_tax_rate=row.gst_tax_rate,
+                        quantity=Decimal("1"),
+                        rate=row.taxable_value,
+                        cgst=row.cgst,
+                        sgst=row.sgst,
+                        igst=row.igst,
+                        amount=row.invoice_value,  # tax-inclusive (matches app contract)
+                        unit="lot",
+                    )
+                    for invoice, row, cust in to_create
+                ],
+                batch_size=500,
+            )
+
         if dry_run:
             # Inside the atomic() block — mark for rollback on exit.
             transaction.set_rollback(True)
@@ -608,8 +829,140 @@ def import_file(
     return result
 
 
+# ── multi-file import ──────────────────────────────────────────────────
+
+
+def _init_parse_worker():
+    # Spawned workers start from a bare interpreter; importing this module
+    # pulls in the models, which needs the app registry.
+    import django
+
+    django.setup()
+
+
+def _parse_in_worker(source, filename):
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    return parse_file(source, filename=filename)
+
+
+def _source_for_worker(path_or_buffer):
+    """A picklable stand-in for `path_or_buffer`: the path, or its bytes."""
+    if isinstance(path_or_buffer, (str, os.PathLike)):
+        return os.fspath(path_or_buffer)
+    if hasattr(path_or_buffer, "seek"):
+        path_or_buffer.seek(0)
+    return path_or_buffer.read()
+
+
+def resolve_jobs(jobs: int | None, n_files: int) -> int:
+    """Worker count for `n_files`: `jobs` (0/None = one per CPU), never more
+    than there are files or CPUs — parsing is CPU-bound."""
+    cpus = os.cpu_count() or 1
+    return max(1, min(jobs or cpus, cpus, n_files))
+
+
+def _parsed_in_pool(sources, filenames, workers):
+    """Yield `parse_file` results in input order while the pool works ahead.
+
+    A pool that dies (OOM-killed worker) is dropped and the remaining
+    files are parsed inline.
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    from concurrent.futures.process import BrokenProcessPool
+
+    # spawn, not fork: the parent holds DB connections (and may be a
+    # threaded web worker); the children only parse.
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_parse_worker,
+    ) as pool:
+        futures = [
+            pool.submit(_parse_in_worker, src, name)
+            for src, name in zip(sources, filenames, strict=True)
+        ]
+        for i, future in enumerate(futures):
+            try:
+                yield future.result()
+            except BrokenProcessPool:
+                logger.warning("GSTR-2A parse pool died; parsing the rest inline")
+                for src, name in zip(sources[i:], filenames[i:], strict=True):
+                    yield _parse_in_worker(src, name)
+                return
+
+
 def import_files(
-    paths_or_buffers: Iterable, *, dry_run: bool = False
+    paths_or_buffers: Iterable,
+    *,
+    dry_run: bool = False,
+    jobs: int = 1,
+    filenames: list[str] | None = None,
+    on_result=None,
 ) -> list[ImportResult]:
-    """Convenience for batching multiple files in one call."""
-    return [import_file(p, dry_run=dry_run) for p in paths_or_buffers]
+    """Import several 2A files; one ImportResult per file, in input order.
+
+    With `jobs` > 1 the files are parsed in a process pool (see
+    `resolve_jobs`) — parsing is the CPU-bound part and touches no DB.
+    The DB writes stay in this process and run one file at a time in
+    input order, each in its own `import_file` transaction, as soon as
+    that file's parse is ready. A batch therefore takes roughly as long
+    as its slowest parse plus the (short) writes, and the results, dedup
+    and supplier creation come out exactly as a sequential run would.
+
+    `on_result(result)` is called after each file, for progress output.
+    """
+    items = list(paths_or_buffers)
+    names = list(filenames) if filenames else [
+        p if isinstance(p, str) else "(uploaded)" for p in items
+    ]
+    workers = resolve_jobs(jobs, len(items))
+
+    if workers > 1:
+        sources = [_source_for_worker(p) for p in items]
+        parsed_iter = _parsed_in_pool(sources, names, workers)
+    else:
+        parsed_iter = (parse_file(p, filename=n) for p, n in zip(items, names, strict=True))
+
+    results = []
+    for parsed in parsed_iter:
+        result = import_file(dry_run=dry_run, parsed=parsed)
+        results.append(result)
+        if on_result:
+            on_result(result)
+    return results
+
+
+def merge_results(results: Iterable[ImportResult], filename: str = "(all files)") -> ImportResult:
+    """Sum per-file results into one: counters add up and the detail lists
+    are concatenated in file order, so the merge is deterministic."""
+    total = ImportResult(filename=filename)
+    for result in results:
+        for f in fields(ImportResult):
+            if f.name == "filename":
+                continue
+            setattr(total, f.name, getattr(total, f.name) + getattr(result, f.name))
+    return total
+
+
+def enqueue_import(named_files, *, dry_run: bool = False, jobs: int = 1, user=None):
+    """Copy `(label, file)` pairs into storage and queue a `gstr2a_import`
+    job for the `run_jobs` worker. Returns the Job."""
+    from django.core.files import File
+    from django.core.files.storage import default_storage
+
+    from billing.services import jobs as job_queue
+
+    names, labels = [], {}
+    for label, fh in named_files:
+        name = default_storage.save(
+            f"jobs/uploads/{os.path.basename(label)}", File(fh)
+        )
+        names.append(name)
+        labels[name] = label
+    return job_queue.enqueue(
+        "gstr2a_import",
+        {"files": names, "labels": labels, "dry_run": dry_run, "jobs": jobs},
+        user=user,
+    )
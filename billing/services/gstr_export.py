@@ -0,0 +1,288 @@
+"""GSTR-1 / GSTR-3B / 2B payload behind `/invoices/gstr_export/`.
+
+The endpoint used to load every invoice in range with its line items
+prefetched and walk them in Python once per section (B2B, B2CS, B2CL, then
+the HSN summary re-read every line again), accumulating floats. At a
+year's volume that was the whole LineItem table as model instances.
+
+Each section is now one query:
+
+* HSN summary and B2CS are GROUP BYs over LineItem — nothing per invoice
+  or per line comes back to Python;
+* GSTR-3B is a GROUP BY over LineItem on invoice type;
+* the 2B list reads each inward invoice's tax from the denormalised totals
+  on Invoice (billing/services/invoice_totals.py) and its taxable value
+  from a per-invoice GROUP BY over LineItem. Invoice.taxable_total is
+  rounded to 3 places per invoice, while quantity × rate carries up to 6,
+  so the taxable figures are summed from the lines as they always were;
+* only the invoice-wise sections (B2B, B2CL) fetch rows: one narrow
+  `values_list` per candidate invoice and one per its lines.
+
+That is a fixed seven queries whatever the range. Sums are taken in
+Decimal by the database and converted to float once, rather than summed
+as floats line by line, so a total can differ from the old payload in
+its last binary digit; every other value, and the ordering, is as before.
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from types import SimpleNamespace
+
+from django.db.models import F, Max, Min, Q, Sum, Value
+from django.db.models.functions import Coalesce, Left, Length, Trim, Upper
+
+from billing.constants import B2CL_THRESHOLD, INVOICE_TYPE_INWARD, INVOICE_TYPE_OUTWARD
+from billing.models import Invoice, LineItem
+from billing.tax_rules import is_interstate, state_code
+
+_TAXABLE = Sum(F("quantity") * F("rate"))
+
+
+def _rate(gst_tax_rate) -> float:
+    """Rate in percent, whether stored as a fraction (0.03) or percent (3)."""
+    return float(gst_tax_rate) * 100 if gst_tax_rate <= 1 else float(gst_tax_rate)
+
+
+def _date(d) -> str:
+    return d.strftime("%d-%m-%Y") if d else ""
+
+
+def _party(gst_number, state_name):
+    """Stand-in with the two attributes tax_rules reads off a Business/Customer."""
+    return SimpleNamespace(gst_number=gst_number, state_name=state_name)
+
+
+# ── Place-of-supply rules in SQL ──
+# The same decisions as the Python loops made per invoice: registered = the
+# customer's trimmed GSTIN is 15+ characters; interstate = the SQL twin of
+# tax_rules.is_interstate (GSTIN prefixes when both sides have one, else
+# upper-cased state names, else intra). TRIM only strips spaces where
+# str.strip() strips any whitespace; GSTINs and state names don't carry tabs.
+
+def _classified(invoices):
+    def clean(path):
+        return Trim(Coalesce(F(path), Value("")))
+
+    return invoices.annotate(
+        _b_gstin=clean("business__gst_number"),
+        _c_gstin=clean("customer__gst_number"),
+        _b_state=Upper(clean("business__state_name")),
+        _c_state=Upper(clean("customer__state_name")),
+    ).annotate(
+        _b_len=Length("_b_gstin"),
+        _c_len=Length("_c_gstin"),
+        _b_code=Left("_b_gstin", 2),
+        _c_code=Left("_c_gstin", 2),
+    )
+
+
+REGISTERED = Q(_c_len__gte=15)
+_BOTH_GSTINS = Q(_b_len__gte=2, _c_len__gte=2)
+INTERSTATE = (
+    (_BOTH_GSTINS & ~Q(_b_code=F("_c_code")))
+    | (~_BOTH_GSTINS & ~Q(_b_state="") & ~Q(_c_state="") & ~Q(_b_state=F("_c_state")))
+)
+
+
+def _ids(invoices):
+    return invoices.order_by().values("id")
+
+
+# ── GSTR-1 ──
+
+def _invoice_wise(outward):
+    """B2B and B2CL: the only sections that list invoices and their lines."""
+    candidates = _classified(outward).filter(
+        REGISTERED | Q(total_amount__gt=B2CL_THRESHOLD)
+    )
+    rows = list(candidates.values_list(
+        "id", "invoice_number", "invoice_date", "total_amount",
+        "customer__gst_number", "customer__state_name",
+        "business__gst_number", "business__state_name",
+    ))
+    lines = defaultdict(list)
+    for invoice_id, *line in (
+        LineItem.objects.filter(invoice__in=_ids(candidates))
+        .order_by("invoice_id", "id")
+        .values_list("invoice_id", "id", "quantity", "rate", "gst_tax_rate", "cgst", "sgst", "igst")
+    ):
+        lines[invoice_id].append(line)
+
+    b2b_data, b2cl = {}, []
+    for invoice_id, number, inv_date, total, c_gst, c_state, b_gst, b_state in rows:
+        cust_gst = c_gst.strip() if c_gst else ""
+        if cust_gst and len(cust_gst) >= 15:
+            if cust_gst not in b2b_data:
+                b2b_data[cust_gst] = {"ctin": cust_gst, "inv": []}
+            b2b_data[cust_gst]["inv"].append({
+                "inum": number,
+                "idt": _date(inv_date),
+                "val": float(total),
+                "pos": c_gst[:2] if c_gst else "",
+                "rchrg": "N",
+                "inv_typ": "R",
+                "itms": [{
+                    "num": int(line_id),
+                    "itm_det": {
+                        "txval": float(qty * rate),
+                        "rt": _rate(gst_rate),
+                        "camt": float(cgst),
+                        "samt": float(sgst),
+                        "iamt": float(igst),
+                    },
+                } for line_id, qty, rate, gst_rate, cgst, sgst, igst in lines[invoice_id]],
+            })
+            continue
+
+        # Unregistered and over the threshold: B2CL if it crosses states and
+        # the customer's state is known.
+        customer = _party(c_gst, c_state)
+        if not is_interstate(_party(b_gst, b_state), customer):
+            continue  # Intra-state goes to B2CS
+        cust_state = state_code(customer)
+        if not cust_state:
+            continue  # No place of supply to report against
+        b2cl.append({
+            "pos": cust_state,
+            "inv": [{
+                "inum": number,
+                "idt": _date(inv_date),
+                "val": float(total),
+                "itms": [{
+                    "num": int(line_id),
+                    "itm_det": {"txval": float(qty * rate), "rt": _rate(gst_rate), "iamt": float(igst)},
+                } for line_id, qty, rate, gst_rate, cgst, sgst, igst in lines[invoice_id]],
+            }],
+        })
+    return list(b2b_data.values()), b2cl
+
+
+def _b2cs(outward):
+    """Unregistered intra-state supplies, by (seller state, rate).
+
+    Grouped per seller GSTIN/state in SQL, then merged on the state code
+    those resolve to. Buckets come out in the order the old loop first
+    met them: latest invoice date first, then line order.
+    """
+    intra_b2c = _classified(outward).filter(~REGISTERED & ~INTERSTATE)
+    groups = (
+        LineItem.objects.filter(invoice__in=_ids(intra_b2c))
+        .order_by()
+        .values("invoice__business__gst_number", "invoice__business__state_name", "gst_tax_rate")
+        .annotate(
+            txval=_TAXABLE, camt=Sum("cgst"), samt=Sum("sgst"),
+            latest=Max("invoice__invoice_date"), first_line=Min("id"),
+        )
+        .order_by("-latest", "first_line")
+    )
+    b2cs = {}
+    for g in groups:
+        pos = state_code(_party(g["invoice__business__gst_number"], g["invoice__business__state_name"]))
+        rate = _rate(g["gst_tax_rate"])
+        key = f"{pos}-{rate}"
+        if key not in b2cs:
+            b2cs[key] = {"pos": pos, "rt": rate, "txval": 0, "camt": 0, "samt": 0, "typ": "OE"}
+        b2cs[key]["txval"] += float(g["txval"] or 0)
+        b2cs[key]["camt"] += float(g["camt"] or 0)
+        b2cs[key]["samt"] += float(g["samt"] or 0)
+    return list(b2cs.values())
+
+
+def _hsn(outward):
+    """HSN summary over outward lines; blank and missing codes file as "0"."""
+    groups = (
+        LineItem.objects.filter(invoice__in=_ids(outward))
+        .order_by()
+        .values("hsn_code")
+        .annotate(
+            qty=Sum("quantity"), txval=_TAXABLE,
+            camt=Sum("cgst"), samt=Sum("sgst"), iamt=Sum("igst"),
+            first_line=Min("id"),
+        )
+        .order_by("first_line")
+    )
+    hsn = {}
+    for g in groups:
+        code = g["hsn_code"] or "0"
+        if code not in hsn:
+            hsn[code] = {"hsn_sc": code, "qty": 0, "txval": 0, "camt": 0, "samt": 0, "iamt": 0}
+        for f in ("qty", "txval", "camt", "samt", "iamt"):
+            hsn[code][f] += float(g[f] or 0)
+    return list(hsn.values())
+
+
+# ── GSTR-3B / 2B ──
+
+def _gstr3b(invoices):
+    zero = {"txval": 0, "cgst": 0, "sgst": 0, "igst": 0}
+    totals = {INVOICE_TYPE_OUTWARD: zero, INVOICE_TYPE_INWARD: zero}
+    for row in (
+        LineItem.objects.filter(invoice__in=_ids(invoices))
+        .order_by()
+        .values("invoice__type_of_invoice")
+        .annotate(txval=_TAXABLE, cgst=Sum("cgst"), sgst=Sum("sgst"), igst=Sum("igst"))
+    ):
+        totals[row["invoice__type_of_invoice"]] = {k: row[k] or 0 for k in zero}
+    ot, it = totals[INVOICE_TYPE_OUTWARD], totals[INVOICE_TYPE_INWARD]
+    return {
+        "sup_details": {
+            "osup_det": {"txval": float(ot["txval"]), "camt": float(ot["cgst"]), "samt": float(ot["sgst"]), "iamt": float(ot["igst"])},
+        },
+        "itc_elg": {
+            # "OTH" = all other ITC (GSTR-3B table 4(A)(5)). This used to say
+            # "IMPG" (import of goods), which files every rupee of domestic
+            # purchase tax under imports.
+            "itc_avl": [{"ty": "OTH", "iamt": float(it["igst"]), "camt": float(it["cgst"]), "samt": float(it["sgst"])}],
+        },
+        "intr_ltfee": {
+            "intr_details": {"iamt": 0, "camt": 0, "samt": 0},
+        },
+        "tax_pmt": {
+            "cgst": float(ot["cgst"] - it["cgst"]),
+            "sgst": float(ot["sgst"] - it["sgst"]),
+            "igst": float(ot["igst"] - it["igst"]),
+        },
+    }
+
+
+def _inward_list(invoices):
+    """Basic 2B matching list: each inward invoice with its tax and taxable value."""
+    inward = invoices.filter(type_of_invoice=INVOICE_TYPE_INWARD)
+    taxable = dict(
+        LineItem.objects.filter(invoice__in=_ids(inward))
+        .order_by()
+        .values("invoice_id")
+        .annotate(txval=_TAXABLE)
+        .values_list("invoice_id", "txval")
+    )
+    return [
+        {
+            "invoice_number": number,
+            "invoice_date": _date(inv_date),
+            "supplier_name": name,
+            "supplier_gstin": gstin or "",
+            "taxable_value": float(taxable.get(invoice_id) or 0),
+            "tax_amount": float(cgst + sgst + igst),
+            "total": float(total),
+        }
+        for invoice_id, number, inv_date, name, gstin, cgst, sgst, igst, total in inward.values_list(
+            "id", "invoice_number", "invoice_date", "customer__name", "customer__gst_number",
+            "cgst_total", "sgst_total", "igst_total", "total_amount",
+        )
+    ]
+
+
+def build(invoices) -> dict:
+    """The gstr_export payload for an Invoice queryset (the list's filters)."""
+    # Re-rooted on plain ids: list filters such as ?no_hsn=1 join LineItem
+    # and DISTINCT, which would multiply the GROUP BY sums below.
+    ordering = invoices.query.order_by or Invoice._meta.ordering
+    invoices = Invoice.objects.filter(pk__in=_ids(invoices)).order_by(*ordering)
+    outward = invoices.filter(type_of_invoice=INVOICE_TYPE_OUTWARD)
+    b2b, b2cl = _invoice_wise(outward)
+    return {
+        "gstr1": {"b2b": b2b, "b2cs": _b2cs(outward), "b2cl": b2cl, "hsn": {"data": _hsn(outward)}},
+        "gstr3b": _gstr3b(invoices),
+        "gstr2b": {"inward_invoices": _inward_list(invoices)},
+    }
@@ -0,0 +1,204 @@
+"""Upload normalisation for the AI extractor and the invoice source preview.
+
+Every image headed for Gemini — and every stored bill's browser preview —
+goes through `normalize`: decode (HEIC via pillow-heif), bound the longest
+side to MAX_IMAGE_DIM, re-encode as JPEG q88. It used to be a full decode,
+a LANCZOS resize from full resolution and an `optimize=True` encode every
+time; on a 12 MP phone photo that is hundreds of ms of GIL-held CPU in a
+sync worker. Now (the encode settings are unchanged):
+
+  - a small baseline JPEG that is already within bounds is passed through
+    untouched (no decode of the pixels at all, just the header);
+  - JPEGs are decoded with `Image.draft()`, letting libjpeg scale by 1/2,
+    1/4 or 1/8 while it decodes instead of materialising every pixel;
+  - other formats resize with `reducing_gap`, a cheap box reduce before
+    the LANCZOS pass.
+
+The result for the last few inputs is memoised by content hash, so the
+OCR image and the source preview of the same upload cost one decode.
+
+`normalize_many` fans a batch out over a process pool (AI_IMAGE_WORKERS)
+once it is big enough to repay the IPC; `scripts/bench_normalize_image.py`
+measures the old and new paths over a directory of sample images.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+MAX_IMAGE_DIM = 1568
+JPEG_QUALITY = 88
+# Baseline JPEGs up to this size (and within MAX_IMAGE_DIM) are sent as-is.
+PASSTHROUGH_MAX_BYTES = 600 * 1024
+# Batches smaller than this (total input bytes) normalise inline: a few
+# small images finish before a worker round-trip would.
+POOL_MIN_BATCH_BYTES = 2 * 1024 * 1024
+# Recent results kept for the OCR/preview reuse (outputs are ~100-300 KB).
+RECENT_MAX = 16
+
+
+class ImageDecodeError(ValueError):
+    """The bytes are not an image Pillow (+ pillow-heif) can open."""
+
+
+def _register_heif():
+    try:
+        from pillow_heif import register_heif_opener
+
+        register_heif_opener()
+    except ImportError:  # pragma: no cover — HEIC just won't decode
+        pass
+
+
+# Pool workers import this module fresh (spawn), so they need the opener too.
+_register_heif()
+
+_recent: OrderedDict = OrderedDict()
+_recent_lock = threading.Lock()
+
+
+def _is_passthrough(img, size: int, max_dim: int) -> bool:
+    return (
+        img.format == "JPEG"
+        and img.mode in ("RGB", "L")
+        and not img.info.get("progressive")
+        and max(img.size) <= max_dim
+        and size <= PASSTHROUGH_MAX_BYTES
+    )
+
+
+def _normalize(image_bytes: bytes, max_dim: int) -> bytes:
+    from PIL import Image  # lazy — only loaded on the image paths
+
+    try:
+        img = Image.open(io.BytesIO(image_bytes))
+    except Exception as e:
+        raise ImageDecodeError(str(e)) from e
+
+    if _is_passthrough(img, len(image_bytes), max_dim):
+        return image_bytes
+
+    scale = max_dim / max(img.size)
+    target = None
+    if scale < 1:
+        target = (max(1, int(img.width * scale)), max(1, int(img.height * scale)))
+        if img.format == "JPEG":
+            # Asks libjpeg for the largest 1/n scale still >= target on both
+            # sides; must happen before load().
+            img.draft("RGB", target)
+    try:
+        # HEIC + some RAW formats need an explicit load() to materialise.
+        img.load()
+    except Exception as e:
+        raise ImageDecodeError(str(e)) from e
+
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    if target and img.size != target:
+        img = img.resize(target, Image.Resampling.LANCZOS, reducing_gap=3.0)
+    buf = io.BytesIO()
+    # Quality 88 is the OCR sweet spot — sub-100KB on most invoices,
+    # no visible compression artefacts on printed text. `optimize` costs
+    # ~4 ms and saves ~30% of the upload.
+    img.save(buf, format="JPEG", quality=JPEG_QUALITY, optimize=True)
+    return buf.getvalue()
+
+
+def normalize(image_bytes: bytes, max_dim: int = MAX_IMAGE_DIM) -> bytes:
+    """JPEG bytes for `image_bytes`, longest side <= max_dim.
+
+    Raises ImageDecodeError when the input can't be decoded.
+    """
+    key = (hashlib.sha256(image_bytes).digest(), max_dim)
+    with _recent_lock:
+        if key in _recent:
+            _recent.move_to_end(key)
+            return _recent[key]
+    out = _normalize(image_bytes, max_dim)
+    with _recent_lock:
+        _recent[key] = out
+        while len(_recent) > RECENT_MAX:
+            _recent.popitem(last=False)
+    return out
+
+
+def _safe_normalize(image_bytes: bytes, max_dim: int):
+    # Pool side: hand back the error instead of raising, so one bad upload
+    # doesn't look like a broken worker.
+    try:
+        return normalize(image_bytes, max_dim)
+    except ImageDecodeError as e:
+        return e
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def pool_workers() -> int:
+    from django.conf import settings
+
+    configured = getattr(settings, "AI_IMAGE_WORKERS", 0)
+    return configured or min(4, os.cpu_count() or 1)
+
+
+def _get_pool(workers: int):
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool._max_workers != workers:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            # spawn, not fork: the parent is a threaded web worker holding
+            # DB connections; the children only need PIL.
+            _pool = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True)
+            _pool = None
+
+
+def use_pool(batch, workers: int | None = None) -> bool:
+    workers = workers or pool_workers()
+    return (
+        workers > 1
+        and len(batch) > 1
+        and sum(len(b) for b in batch) >= POOL_MIN_BATCH_BYTES
+    )
+
+
+def normalize_many(batch, max_dim: int = MAX_IMAGE_DIM, workers: int | None = None) -> list:
+    """Normalise a list of image bytes across the process pool.
+
+    Returns one entry per input, in order: the JPEG bytes, or the
+    ImageDecodeError for that input. A pool that dies (OOM-killed worker)
+    is dropped and the batch finishes inline.
+    """
+    global _pool
+    from concurrent.futures.process import BrokenProcessPool
+
+    workers = workers or pool_workers()
+    try:
+        pool = _get_pool(workers)
+        return list(pool.map(_safe_normalize, batch, [max_dim] * len(batch)))
+    except BrokenProcessPool:
+        logger.warning("Image normalisation pool died; finishing the batch inline")
+        with _pool_lock:
+            _pool = None
+        return [_safe_normalize(b, max_dim) for b in batch]
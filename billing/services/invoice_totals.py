@@ -0,0 +1,119 @@
+"""Denormalised line totals on `Invoice` (taxable/cgst/sgst/igst/line_count).
+
+List endpoints and the inward register used to aggregate LineItem per row
+— correlated subqueries on /invoices/, a Python loop over `lineitem_set`
+on /inward-bills/. The totals now live on the invoice and are kept current
+where the lines are written:
+
+* `rollups.resync()` already re-reads every invoice a bulk path touched
+  (the same GROUP BY feeds the rollup), and writes these from it on exit;
+* the LineItem save/delete signals (billing/signals.py) refresh the one
+  invoice a single-line write touched.
+
+`Invoice.save()` never writes them on an update, so a stale instance can't
+clobber them. `rebuild()` / `check()` back the `rebuild_invoice_totals`
+command for the backfill and for drift after raw SQL fixes.
+"""
+
+from __future__ import annotations
+
+from decimal import Decimal
+
+from django.db.models import Count, F, Sum
+
+from billing.models import Invoice, LineItem
+
+FIELDS = Invoice.LINE_TOTAL_FIELDS
+# Same tolerance as the rollup check: SQLite sums decimals as floats.
+DRIFT_TOLERANCE = Decimal("0.01")
+_ID_CHUNK = 500
+
+AGGREGATES = {
+    "taxable_total": Sum(F("quantity") * F("rate")),
+    "cgst_total": Sum("cgst"),
+    "sgst_total": Sum("sgst"),
+    "igst_total": Sum("igst"),
+    "line_count": Count("id"),
+}
+
+
+def _clean(row: dict) -> dict:
+    return {
+        f: (row.get(f) or 0) if f == "line_count" else Decimal(row.get(f) or 0)
+        for f in FIELDS
+    }
+
+
+def aggregate_one(invoice_id: int, **extra) -> dict:
+    """This invoice's totals in one query; `extra` aggregates ride along."""
+    row = LineItem.objects.filter(invoice_id=invoice_id).aggregate(**AGGREGATES, **extra)
+    return {**_clean(row), **{k: row[k] for k in extra}}
+
+
+def computed(invoice_ids) -> dict[int, dict]:
+    """{invoice_id: totals} from LineItem; invoices without lines get zeros."""
+    ids = list(invoice_ids)
+    out = {i: _clean({}) for i in ids}
+    for start in range(0, len(ids), _ID_CHUNK):
+        rows = (
+            LineItem.objects.filter(invoice_id__in=ids[start:start + _ID_CHUNK])
+            .order_by()
+            .values("invoice_id")
+            .annotate(**AGGREGATES)
+        )
+        for row in rows:
+            out[row["invoice_id"]] = _clean(row)
+    return out
+
+
+def write(totals: dict[int, dict]) -> None:
+    """Store {invoice_id: totals}, one UPDATE per chunk."""
+    Invoice.objects.bulk_update(
+        [Invoice(pk=invoice_id, **values) for invoice_id, values in totals.items()],
+        FIELDS,
+        batch_size=_ID_CHUNK,
+    )
+
+
+def _invoices(business_id=None):
+    invoices = Invoice.objects.order_by("id")
+    if business_id:
+        invoices = invoices.filter(business_id=business_id)
+    return invoices
+
+
+def _invoice_ids(business_id=None) -> list[int]:
+    return list(_invoices(business_id).values_list("id", flat=True))
+
+
+def rebuild(business_id=None) -> int:
+    """Recompute every invoice's totals (or one business's). Returns the count."""
+    totals = computed(_invoice_ids(business_id))
+    write(totals)
+    return len(totals)
+
+
+def check(business_id=None) -> list[dict]:
+    """Invoices whose stored totals differ from their line items.
+
+    One entry per drifted invoice: `id`, `invoice_number`, and `expected` /
+    `stored` dicts of the fields that disagree.
+    """
+    expected = computed(_invoice_ids(business_id))
+    drift = []
+    for row in _invoices(business_id).values("id", "invoice_number", *FIELDS):
+        want = expected.get(row["id"])
+        if want is None:  # created since the first read
+            continue
+        bad = [
+            f for f in FIELDS
+            if abs(Decimal(want[f]) - Decimal(row[f])) >= (1 if f == "line_count" else DRIFT_TOLERANCE)
+        ]
+        if bad:
+            drift.append({
+                "id": row["id"],
+                "invoice_number": row["invoice_number"],
+                "expected": {f: want[f] for f in bad},
+                "stored": {f: row[f] for f in bad},
+            })
+    return drift
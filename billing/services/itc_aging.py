@@ -0,0 +1,139 @@
+"""ITC aging against the Sec 16(4) cut-off, answered in SQL.
+
+ITC on an inward invoice must be claimed by Nov 30 of the FY *following*
+the invoice date, else it's forfeit. gst_summary used to join every inward
+invoice to its line items for the tax, then loop in Python working out each
+one's FY, cutoff, days left and bucket on every GST page load.
+
+The cutoff is a step function of invoice_date: every invoice in FY Y-(Y+1)
+shares Nov 30, Y+1. So "cutoff on or before day L" is the same as
+"invoice_date before Apr 1 of some year", and each bucket is an invoice_date
+range. The bucket counts and tax are one GROUP BY over a CASE on those
+boundaries. The urgent list is `ORDER BY invoice_date, id LIMIT n`, which
+is also cutoff order. Both run on the (type_of_invoice, invoice_date) index,
+with no stored column to keep in step across the bulk import paths. Tax
+comes from the denormalised totals on Invoice (billing/services/invoice_totals.py).
+"""
+
+from __future__ import annotations
+
+from datetime import date, timedelta
+
+from django.db.models import Case, CharField, Count, DecimalField, F, Q, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+from billing.constants import INVOICE_TYPE_INWARD
+from billing.models import Invoice
+
+# Bucket → (label, days-to-cutoff upper bound). Checked in this order; an
+# invoice lands in the first bucket whose bound it is under.
+BUCKETS = {
+    "expired": ("Past Sec 16(4) cutoff (forfeit)", -1),
+    "fresh": ("≤ 60 days to cutoff", 60),
+    "warning": ("60–180 days", 180),
+    "stale": ("180+ days (still claimable)", None),
+}
+# Response order, as gst_summary returned them.
+BUCKET_ORDER = ("fresh", "warning", "stale", "expired")
+
+_TAX = F("cgst_total") + F("sgst_total") + F("igst_total")
+
+
+def cutoff_for(invoice_date: date) -> date:
+    """Nov 30 of the FY after the one `invoice_date` falls in."""
+    fy_start = invoice_date.year if invoice_date.month >= 4 else invoice_date.year - 1
+    return date(fy_start + 1, 11, 30)
+
+
+def _dated_before(limit: date) -> date:
+    """First invoice date whose cutoff is after `limit`. Every earlier date
+    has a cutoff on or before it."""
+    last_fy = limit.year - 1 if limit >= date(limit.year, 11, 30) else limit.year - 2
+    return date(last_fy + 1, 4, 1)
+
+
+def boundaries(today: date) -> dict[str, date | None]:
+    """{bucket: invoice_date upper bound (exclusive)}; None = unbounded."""
+    return {
+        bucket: _dated_before(today + timedelta(days=days)) if days is not None else None
+        for bucket, (_, days) in BUCKETS.items()
+    }
+
+
+def bucket_q(bucket: str, today: date) -> Q:
+    """Invoices in `bucket` (or "urgent": fresh + expired) as an invoice_date range."""
+    bounds = boundaries(today)
+    order = list(BUCKETS)
+    if bucket == "urgent":
+        return Q(invoice_date__lt=bounds["fresh"])
+    idx = order.index(bucket)
+    q = Q(invoice_date__isnull=False)
+    if bounds[bucket] is not None:
+        q &= Q(invoice_date__lt=bounds[bucket])
+    if idx:
+        q &= Q(invoice_date__gte=bounds[order[idx - 1]])
+    return q
+
+
+def _bucket_case(today: date) -> Case:
+    bounds = boundaries(today)
+    return Case(
+        *(When(invoice_date__lt=bound, then=Value(bucket))
+          for bucket, bound in bounds.items() if bound is not None),
+        default=Value("stale"),
+        output_field=CharField(),
+    )
+
+
+def inward(invoices):
+    """Dated inward invoices among `invoices`, re-rooted on ids so list
+    filters that join LineItem (and DISTINCT) can't multiply the sums."""
+    return Invoice.objects.filter(
+        pk__in=invoices.order_by().values("pk"),
+        type_of_invoice=INVOICE_TYPE_INWARD,
+        invoice_date__isnull=False,
+    )
+
+
+def buckets(invoices, today: date) -> dict:
+    """{bucket: {"label", "count", "tax"}} — one GROUP BY."""
+    out = {b: {"label": BUCKETS[b][0], "count": 0, "tax": 0.0} for b in BUCKET_ORDER}
+    for row in (
+        inward(invoices).order_by()
+        .annotate(bucket=_bucket_case(today))
+        .values("bucket")
+        .annotate(
+            count=Count("id"),
+            tax=Coalesce(Sum(_TAX), Value(0), output_field=DecimalField()),
+        )
+    ):
+        out[row["bucket"]]["count"] = row["count"]
+        out[row["bucket"]]["tax"] = float(row["tax"])
+    return out
+
+
+def rows(invoices, today: date, bucket: str | None = None):
+    """Inward invoices in cutoff order (most overdue first), as dicts for
+    `row()`. Narrowed to one bucket — or "urgent" — when given."""
+    qs = inward(invoices)
+    if bucket:
+        qs = qs.filter(bucket_q(bucket, today))
+    return (
+        qs.annotate(bucket=_bucket_case(today), tax=_TAX)
+        .order_by("invoice_date", "id")
+        .values("id", "invoice_number", "invoice_date", "total_amount", "tax", "bucket")
+    )
+
+
+def row(r: dict, today: date) -> dict:
+    cutoff = cutoff_for(r["invoice_date"])
+    return {
+        "id": r["id"],
+        "invoice_number": r["invoice_number"],
+        "invoice_date": r["invoice_date"].isoformat(),
+        "total_amount": float(r["total_amount"]),
+        "tax": float(r["tax"]),
+        "cutoff": cutoff.isoformat(),
+        "days_left": (cutoff - today).days,
+        "bucket": r["bucket"],
+    }
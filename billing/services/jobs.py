@@ -0,0 +1,202 @@
+"""Database-backed background jobs.
+
+Report generation, GSTR exports and bulk imports used to run inside the
+request, so a big file hit the gunicorn timeout and tied up that worker for
+everyone else meanwhile. The slow endpoints now accept `async=1`: they
+`enqueue()` a Job row and return its id straight away, and the `run_jobs`
+management command — a plain loop over the Job table, no Redis or broker —
+claims rows and runs the handler registered for their kind.
+
+Handlers are plain functions registered with `@handler("<kind>")` that take
+the Job and return a JSON-serialisable result (or save `job.artifact`). They
+live next to the views they wrap, in billing/api/jobs.py. Inside a handler,
+`report_progress(done, total)` updates the percentage `/api/jobs/<id>/`
+shows; outside a job it is a no-op, so shared code can call it freely.
+
+Claiming is a conditional UPDATE (`status=queued` → `running`), so several
+workers can poll the same table without double-running a job on any backend.
+A worker that dies mid-job leaves its row `running`; `requeue_stale()` puts
+such rows back in the queue (or fails them after MAX_ATTEMPTS).
+
+Finished jobs are kept for JOB_RETENTION_DAYS so their results stay
+downloadable, then `purge_finished()` deletes them together with their
+artifact and the uploads they were queued with; `run_jobs` calls it hourly.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import socket
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db.models import F
+from django.utils import timezone
+
+from billing.models import Job
+
+logger = logging.getLogger(__name__)
+
+# A job whose worker vanished is retried this many times in total before it
+# is marked failed (some inputs crash the process every time).
+MAX_ATTEMPTS = 3
+
+HANDLERS = {}
+
+_current = threading.local()
+
+
+class JobError(Exception):
+    """A handler failed in an expected way; the message is shown to the user."""
+
+
+def handler(kind):
+    """Register the decorated function as the runner for jobs of `kind`."""
+
+    def register(func):
+        HANDLERS[kind] = func
+        return func
+
+    return register
+
+
+def enqueue(kind, params=None, user=None):
+    """Queue a job and return it. The worker picks it up on its next poll."""
+    if kind not in dict(Job.KIND_CHOICES):
+        raise ValueError(f"Unknown job kind {kind!r}")
+    return Job.objects.create(kind=kind, params=params or {}, user=user)
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"[:64]
+
+
+def report_progress(done, total):
+    """Record `done` of `total` for the job running on this thread, if any.
+
+    Writes only when the whole-percent value moves forward, and caps at 99 —
+    100 means the result is actually stored. Call it outside atomic blocks:
+    a progress UPDATE inside a transaction isn't visible until it commits.
+    """
+    job = getattr(_current, "job", None)
+    if job is None or total <= 0:
+        return
+    percent = min(99, int(done * 100 / total))
+    if percent <= job.progress:
+        return
+    job.progress = percent
+    Job.objects.filter(pk=job.pk).update(progress=percent, updated_at=timezone.now())
+
+
+def claim(worker=None):
+    """Atomically move the oldest queued job to running and return it.
+
+    Returns None when the queue is empty. Losing a race to another worker
+    just means trying the next candidate.
+    """
+    worker = worker or worker_name()
+    while True:
+        pk = (
+            Job.objects.filter(status=Job.STATUS_QUEUED)
+            .order_by("created_at", "id")
+            .values_list("pk", flat=True)
+            .first()
+        )
+        if pk is None:
+            return None
+        now = timezone.now()
+        claimed = Job.objects.filter(pk=pk, status=Job.STATUS_QUEUED).update(
+            status=Job.STATUS_RUNNING,
+            worker=worker,
+            started_at=now,
+            updated_at=now,
+            attempts=F("attempts") + 1,
+        )
+        if claimed:
+            return Job.objects.get(pk=pk)
+
+
+def run(job):
+    """Run a claimed job to completion and store its outcome on the row."""
+    func = HANDLERS.get(job.kind)
+    _current.job = job
+    try:
+        if func is None:
+            raise JobError(f"No handler registered for job kind {job.kind!r}.")
+        result = func(job)
+    except Exception as exc:
+        if not isinstance(exc, JobError):
+            logger.exception("Job %s (%s) crashed", job.pk, job.kind)
+        job.status = Job.STATUS_FAILED
+        job.error = str(exc) or exc.__class__.__name__
+    else:
+        job.status = Job.STATUS_SUCCEEDED
+        job.result = result
+        job.progress = 100
+    finally:
+        _current.job = None
+
+    job.finished_at = timezone.now()
+    job.save(update_fields=[
+        "status", "result", "artifact", "error", "progress", "finished_at", "updated_at",
+    ])
+    return job
+
+
+def requeue_stale(older_than=timedelta(minutes=30)):
+    """Return abandoned running jobs to the queue; fail the ones out of retries.
+
+    "Abandoned" means no progress write for `older_than` — pick it well above
+    the longest gap between progress updates of any handler.
+    """
+    cutoff = timezone.now() - older_than
+    stale = Job.objects.filter(status=Job.STATUS_RUNNING, updated_at__lt=cutoff)
+    failed = stale.filter(attempts__gte=MAX_ATTEMPTS).update(
+        status=Job.STATUS_FAILED,
+        error="Worker stopped responding; giving up after repeated attempts.",
+        finished_at=timezone.now(),
+        updated_at=timezone.now(),
+    )
+    requeued = stale.filter(attempts__lt=MAX_ATTEMPTS).update(
+        status=Job.STATUS_QUEUED, worker="", updated_at=timezone.now(),
+    )
+    return requeued, failed
+
+
+def run_pending(worker=None, max_jobs=None):
+    """Claim and run queued jobs until the queue is empty (or `max_jobs`)."""
+    done = 0
+    while max_jobs is None or done < max_jobs:
+        job = claim(worker)
+        if job is None:
+            break
+        run(job)
+        done += 1
+    return done
+
+
+def purge_finished(older_than=None):
+    """Delete jobs finished more than `older_than` ago (default
+    JOB_RETENTION_DAYS), their artifact files and stored uploads.
+
+    Files go before the row, so an interrupted purge leaves the row to be
+    retried rather than orphaned files. Returns the number of jobs deleted.
+    """
+    if older_than is None:
+        older_than = timedelta(days=settings.JOB_RETENTION_DAYS)
+    cutoff = timezone.now() - older_than
+    expired = Job.objects.filter(
+        status__in=[Job.STATUS_SUCCEEDED, Job.STATUS_FAILED], finished_at__lt=cutoff,
+    )
+    purged = 0
+    for job in expired.iterator():
+        for name in job.params.get("files") or []:
+            default_storage.delete(name)
+        if job.artifact:
+            job.artifact.delete(save=False)
+        job.delete()
+        purged += 1
+    return purged
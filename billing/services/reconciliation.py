@@ -0,0 +1,239 @@
+"""GSTR-2A/2B reconciliation against booked inward invoices.
+
+`reconcile_file` parses a portal download with `preview_file` (the same
+parse the 2A import uses), joins it against the business's inward
+`Invoice` rows and stores the outcome as a ReconciliationRun with one
+ReconciliationItem per portal row / unmatched booked invoice:
+
+  matched            same supplier GSTIN + invoice number, dates within
+                     the window, amounts within the tolerance;
+  mismatched_amount  same invoice, amounts further apart than that;
+  missing_in_books   on the portal, not booked — ITC you could claim;
+  missing_in_2b      booked, but the supplier hasn't reported it — ITC at
+                     risk until they do.
+
+Invoice numbers are compared on a normalised key (`invoice_number_key`):
+suppliers and data-entry disagree on case, separators and zero padding
+("INV/0042/24-25" vs "inv-42/24-25", "GST/24-25/0042" vs "GST/24-25/42").
+A portal row whose key finds nothing falls back to the same GSTIN + amount
+within the date window, flagged as a number difference.
+
+The join is one query for the booked invoices in the file's period and
+two dict indexes over them, so a year of 2A data reconciles in a single
+pass. Rows a credit note fully cancelled are left out, as on import.
+"""
+
+from __future__ import annotations
+
+import re
+from calendar import monthrange
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import transaction
+
+from billing.constants import INVOICE_TYPE_INWARD
+from billing.models import Business, Invoice, ReconciliationItem, ReconciliationRun
+from billing.services.gstr2a_import import CN_CANCELLING, preview_file
+
+AMOUNT_TOLERANCE = Decimal("1.00")
+DATE_WINDOW_DAYS = 7
+
+_SEPARATORS = re.compile(r"[^A-Z0-9]+")
+_LEADING_ZEROS = re.compile(r"(?<![0-9])0+(?=[0-9])")
+
+
+class ReconciliationError(ValueError):
+    """The file can't be reconciled (unreadable, or no business to match)."""
+
+
+def invoice_number_key(number: str) -> str:
+    """Case, separators and zero padding folded away: "GST/24-25/0042" ->
+    "GST24/25/42", "inv-2" -> "INV2".
+
+    Zero padding is dropped per alphanumeric run, and a "/" is kept between
+    two runs of digits, so "10/01" matches "10/1" but "1/23" and "12/3" stay
+    apart.
+    """
+    key = ""
+    for run in _SEPARATORS.split((number or "").upper()):
+        if not run:
+            continue
+        if key[-1:].isdigit() and run[0].isdigit():
+            key += "/"
+        key += _LEADING_ZEROS.sub("", run)
+    return key
+
+
+def _paise(value: Decimal) -> int:
+    return int((value * 100).to_integral_value(ROUND_HALF_UP))
+
+
+@dataclass
+class Reconciliation:
+    """In-memory outcome of `reconcile`; `reconcile_file` persists it."""
+
+    period_start: date | None
+    period_end: date | None
+    items: list[ReconciliationItem] = field(default_factory=list)
+
+    def count(self, status: str) -> int:
+        return sum(1 for item in self.items if item.status == status)
+
+
+def _period(rows) -> tuple[date | None, date | None]:
+    if not rows:
+        return None, None
+    first = min(r.invoice_date for r in rows)
+    last = max(r.invoice_date for r in rows)
+    return first.replace(day=1), last.replace(day=monthrange(last.year, last.month)[1])
+
+
+def reconcile(
+    preview,
+    business_id: int,
+    *,
+    amount_tolerance: Decimal = AMOUNT_TOLERANCE,
+    date_window_days: int = DATE_WINDOW_DAYS,
+) -> Reconciliation:
+    """Classify `preview`'s rows against the business's booked inward invoices."""
+    cancelled = {
+        m.invoice_key for m in preview.note_matches if m.status in CN_CANCELLING
+    }
+    rows = [
+        r for r in preview.parsed_rows
+        if (r.supplier_gstin, r.invoice_number, r.invoice_date) not in cancelled
+    ]
+    period_start, period_end = _period(rows)
+    outcome = Reconciliation(period_start, period_end)
+    if not rows:
+        return outcome
+
+    window = timedelta(days=date_window_days)
+    books = list(
+        Invoice.objects.filter(
+            business_id=business_id,
+            type_of_invoice=INVOICE_TYPE_INWARD,
+            invoice_date__gte=period_start - window,
+            invoice_date__lte=period_end + window,
+        )
+        .exclude(customer__gst_number__isnull=True)
+        .exclude(customer__gst_number="")
+        .values(
+            "id", "invoice_number", "invoice_date", "total_amount",
+            "customer__gst_number", "customer__name",
+        )
+        .order_by("invoice_date", "id")
+    )
+    by_number: dict[tuple, list[dict]] = defaultdict(list)
+    by_amount: dict[tuple, list[dict]] = defaultdict(list)
+    for book in books:
+        gstin = book["customer__gst_number"].strip().upper()
+        by_number[(gstin, invoice_number_key(book["invoice_number"]))].append(book)
+        by_amount[(gstin, _paise(book["total_amount"]))].append(book)
+    used: set[int] = set()
+
+    def closest(candidates, when):
+        best = None
+        for book in candidates:
+            gap = abs(book["invoice_date"] - when)
+            if book["id"] in used or gap > window:
+                continue
+            if best is None or gap < abs(best["invoice_date"] - when):
+                best = book
+        return best
+
+    for row in rows:
+        item = ReconciliationItem(
+            supplier_gstin=row.supplier_gstin,
+            supplier_name=row.supplier_name[:255],
+            invoice_number=row.invoice_number[:255],
+            invoice_date=row.invoice_date,
+            portal_amount=row.invoice_value,
+        )
+        book = closest(by_number.get((row.supplier_gstin, invoice_number_key(row.invoice_number)), ()), row.invoice_date)
+        if book is None:
+            book = closest(by_amount.get((row.supplier_gstin, _paise(row.invoice_value)), ()), row.invoice_date)
+            if book is not None:
+                item.note = f"Booked as {book['invoice_number']}"[:255]
+        if book is None:
+            item.status = ReconciliationItem.STATUS_MISSING_IN_BOOKS
+        else:
+            used.add(book["id"])
+            item.invoice_id = book["id"]
+            item.books_amount = book["total_amount"]
+            if abs(book["total_amount"] - row.invoice_value) <= amount_tolerance:
+                item.status = ReconciliationItem.STATUS_MATCHED
+            else:
+                item.status = ReconciliationItem.STATUS_MISMATCHED_AMOUNT
+                item.note = (item.note + "; " if item.note else "") + (
+                    f"Differs by ₹{(row.invoice_value - book['total_amount']).quantize(Decimal('0.01'))}"
+                )
+        outcome.items.append(item)
+
+    # Booked invoices in the file's months the portal didn't report.
+    for book in books:
+        if book["id"] in used or not (period_start <= book["invoice_date"] <= period_end):
+            continue
+        outcome.items.append(ReconciliationItem(
+            status=ReconciliationItem.STATUS_MISSING_IN_2B,
+            supplier_gstin=book["customer__gst_number"].strip().upper(),
+            supplier_name=book["customer__name"][:255],
+            invoice_number=book["invoice_number"],
+            invoice_date=book["invoice_date"],
+            books_amount=book["total_amount"],
+            invoice_id=book["id"],
+        ))
+    return outcome
+
+
+def reconcile_file(
+    file_path_or_buffer,
+    *,
+    filename: str | None = None,
+    business_id: int | None = None,
+    user=None,
+    amount_tolerance: Decimal = AMOUNT_TOLERANCE,
+    date_window_days: int = DATE_WINDOW_DAYS,
+) -> ReconciliationRun:
+    """Parse a 2A/2B download, reconcile it and save the run.
+
+    The business defaults to the one the file's recipient GSTIN matches.
+    Raises ReconciliationError when the file can't be read or no business
+    applies.
+    """
+    preview = preview_file(file_path_or_buffer, filename=filename)
+    if not preview.parsed_rows and preview.parse_errors:
+        raise ReconciliationError(preview.parse_errors[0])
+    business_id = business_id or preview.matched_business_id
+    if business_id is None:
+        raise ReconciliationError(
+            f"No Business found for recipient GSTIN '{preview.recipient_gstin}'."
+        )
+    if not Business.objects.filter(pk=business_id).exists():
+        raise ReconciliationError(f"Business {business_id} not found.")
+
+    outcome = reconcile(
+        preview, business_id,
+        amount_tolerance=amount_tolerance, date_window_days=date_window_days,
+    )
+    with transaction.atomic():
+        run = ReconciliationRun.objects.create(
+            business_id=business_id,
+            source_filename=preview.filename[:255],
+            period_start=outcome.period_start,
+            period_end=outcome.period_end,
+            amount_tolerance=amount_tolerance,
+            date_window_days=date_window_days,
+            matched=outcome.count(ReconciliationItem.STATUS_MATCHED),
+            mismatched_amount=outcome.count(ReconciliationItem.STATUS_MISMATCHED_AMOUNT),
+            missing_in_books=outcome.count(ReconciliationItem.STATUS_MISSING_IN_BOOKS),
+            missing_in_2b=outcome.count(ReconciliationItem.STATUS_MISSING_IN_2B),
+            user=user,
+        )
+        for item in outcome.items:
+            item.run = run
+        ReconciliationItem.objects.bulk_create(outcome.items, batch_size=500)
+    return run
@@ -0,0 +1,234 @@
+"""Versioned cache for the dashboard's aggregate endpoints.
+
+stats, gst_summary, distribution, monthly_totals, totals, data_quality and
+the customer/product `top` lists recompute their aggregates on every call,
+and the dashboard fires most of them on every load. Their responses are now
+cached under
+
+    (endpoint, normalised query params, today, data versions)
+
+where the data versions are `DataVersion` rows:
+
+  - "business:<id>", bumped by every write to that business's invoices or
+    line items — the model signals (billing/signals.py) for one-off saves
+    and `rollups.resync()` on exit for the bulk paths, which between them
+    cover every write that has to keep MonthlyTaxRollup in step;
+  - "masters", bumped by Customer / Product / Business changes, since the
+    responses carry names and GSTINs.
+
+A request filtered to one business keys on that business's row and
+"masters", so a write elsewhere doesn't evict it; anything else keys on
+every row. Nothing is ever stale: a write moves a version and the old
+entries are simply never read again (they age out with TIMEOUT).
+
+The versions are in the database rather than the Django cache because the
+default cache is locmem, one per gunicorn worker: a counter there would
+only move in the worker that took the write. In the database they move for
+every worker, and only when the write commits — a request racing an open
+transaction reads the old version together with the old rows. Reading them
+is one indexed query. The entries themselves go to `CACHES["default"]`;
+with locmem each worker fills its own, with Redis they're shared.
+
+The same versions give the list endpoints and the invoice print payload
+strong ETags (`conditional()`, `etag()`): a hash of the endpoint, the
+normalised params and the versions. The SPA re-fetches those on every
+navigation; when the browser's If-None-Match still matches, the view
+answers 304 before running the list query or serialising anything.
+Versions are read before the data, so a body is never older than its tag.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponseNotModified
+from django.utils import timezone
+from django.utils.http import parse_etags
+from rest_framework.response import Response
+
+from billing.models import DataVersion
+
+MASTERS = "masters"
+
+TIMEOUT = getattr(settings, "RESPONSE_CACHE_TIMEOUT", 60 * 60)
+
+_ENTRY_KEY = "respcache:entry:{}:{}"
+_COUNTER_KEY = "respcache:{}:{}"
+
+# Endpoints wrapped by `cached()`, for stats().
+ENDPOINTS: list[str] = []
+
+
+def _incr(key: str) -> None:
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def _scope(business_id) -> str:
+    return f"business:{business_id}"
+
+
+def invalidate(business_ids=()) -> None:
+    """Invoice data changed for these businesses."""
+    DataVersion.bump({_scope(b) for b in business_ids if b})
+
+
+def invalidate_masters() -> None:
+    """A customer, product or business changed."""
+    DataVersion.bump({MASTERS})
+
+
+def versions(business_id=None) -> str:
+    """The data versions a response covering `business_id` (None = all
+    businesses) depends on, as one string."""
+    rows = DataVersion.objects.order_by("scope")
+    if business_id:
+        rows = rows.filter(scope__in=[_scope(business_id), MASTERS])
+    return ",".join(f"{scope}={version}" for scope, version in rows.values_list("scope", "version"))
+
+
+def _business_id(value):
+    try:
+        return int(value) or None
+    except (TypeError, ValueError):
+        return None
+
+
+def _normalised(params) -> str:
+    """Query params with blanks dropped and the rest sorted, so `?a=1&b=`
+    and `?b=&a=1` come out the same."""
+    return urlencode(sorted(
+        (name, value)
+        for name, values in params.lists()
+        for value in values
+        if value not in ("", None)
+    ))
+
+
+def key(endpoint: str, params, business_param: str) -> str:
+    """Cache key for a request to `endpoint` with query `params` (a QueryDict).
+
+    Today's date is part of it because several endpoints default to the
+    current month or FY.
+    """
+    state = versions(_business_id(params.get(business_param)))
+    digest = hashlib.sha1(f"{_normalised(params)}|{state}".encode()).hexdigest()
+    return _ENTRY_KEY.format(endpoint, f"{timezone.localdate().isoformat()}:{digest}")
+
+
+def _count(endpoint: str, outcome: str) -> None:
+    _incr(_COUNTER_KEY.format(outcome, endpoint))
+
+
+def cached(endpoint: str, business_param: str = "business_id"):
+    """Serve a GET action from the cache; store its 200 responses.
+
+    `business_param` is the query param that narrows the endpoint to one
+    business. Responses carry `X-Cache: HIT` or `MISS`.
+    """
+    ENDPOINTS.append(endpoint)
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(self, request, *args, **kwargs):
+            entry_key = key(endpoint, request.query_params, business_param)
+            data = cache.get(entry_key)
+            if data is not None:
+                _count(endpoint, "hits")
+                return Response(data, headers={"X-Cache": "HIT"})
+            _count(endpoint, "misses")
+            response = view(self, request, *args, **kwargs)
+            if response.status_code == 200 and getattr(response, "data", None) is not None:
+                cache.set(entry_key, response.data, TIMEOUT)
+            response["X-Cache"] = "MISS"
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+# ── Conditional GET ──
+
+
+def etag(endpoint: str, params, business_id=None, *parts) -> str:
+    """Strong ETag for `endpoint` with query `params`, over the data versions
+    of `business_id` (None = every business). `parts` are any path
+    arguments, such as an invoice id."""
+    state = versions(business_id)
+    raw = "|".join([endpoint, _normalised(params), *map(str, parts), state])
+    return f'"{hashlib.sha1(raw.encode()).hexdigest()}"'
+
+
+def matches(request, value: str) -> bool:
+    """True when the request's If-None-Match covers `tag`. GZipMiddleware
+    weakens the tags it compresses, so "W/" prefixes are ignored."""
+    header = request.META.get("HTTP_IF_NONE_MATCH")
+    if not header:
+        return False
+    sent = parse_etags(header)
+    return "*" in sent or value in {t.removeprefix("W/") for t in sent}
+
+
+def with_etag(response, value: str):
+    response["ETag"] = value
+    # Authenticated data: the browser may keep it, but must revalidate.
+    response["Cache-Control"] = "private, no-cache"
+    return response
+
+
+def not_modified(value: str):
+    return with_etag(HttpResponseNotModified(), value)
+
+
+def conditional(endpoint: str, business_param: str | None = None):
+    """ETag a GET view and answer 304 when the client's copy is current.
+
+    `business_param` is the query param that narrows the response to one
+    business; without it the tag covers every business.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(self, request, *args, **kwargs):
+            business_id = _business_id(request.query_params.get(business_param)) if business_param else None
+            value = etag(endpoint, request.query_params, business_id, *kwargs.values())
+            if matches(request, value):
+                return not_modified(value)
+            response = view(self, request, *args, **kwargs)
+            if response.status_code == 200:
+                with_etag(response, value)
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def stats() -> dict:
+    """Hit/miss counters per endpoint, and overall. They're kept in the
+    Django cache, so with locmem they count this worker only."""
+    names = [_COUNTER_KEY.format(o, e) for e in ENDPOINTS for o in ("hits", "misses")]
+    found = cache.get_many(names)
+    endpoints = {
+        e: {o: found.get(_COUNTER_KEY.format(o, e), 0) for o in ("hits", "misses")}
+        for e in ENDPOINTS
+    }
+    hits = sum(e["hits"] for e in endpoints.values())
+    misses = sum(e["misses"] for e in endpoints.values())
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": round(hits / (hits + misses), 4) if hits + misses else None,
+        "endpoints": endpoints,
+    }
+
+
+def reset_stats() -> None:
+    cache.delete_many([_COUNTER_KEY.format(o, e) for e in ENDPOINTS for o in ("hits", "misses")])
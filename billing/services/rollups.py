@@ -0,0 +1,467 @@
+"""Maintenance and read helpers for `MonthlyTaxRollup`.
+
+The rollup holds, per (business, month, type, GST rate, HSN), the sums the
+reporting endpoints used to recompute from LineItem on every request. It is
+kept current by *per-invoice* deltas: before a write we read an invoice's
+contribution from the DB and subtract it, after the write we read it again
+and add it. Working a whole invoice at a time (rather than line by line)
+is what lets the invoice-level counters — invoice_count and invoice_total,
+booked against one bucket per invoice — stay exact when lines move between
+buckets.
+
+Write paths use it in one of two ways:
+
+* Bulk paths (invoice create/update_line_items, CSV/AI/GSTR-2A imports,
+  inward capture) wrap their work in `resync()`. The context suspends the
+  per-row signal handlers and recomputes only the invoices it was told
+  about — existing ones at entry, newly created ones via `tracker.add()`.
+  The same re-read refreshes the invoices' denormalised line totals
+  (billing/services/invoice_totals.py) and drops the cached aggregate
+  responses of every business it saw (billing/services/response_cache.py).
+
+* Everything else (admin edits, shell fixes, single-line API calls) goes
+  through the receivers in billing/signals.py, which call the same
+  `RollupDelta` helpers.
+
+Reads go through `rollup_totals()`, which serves whole months from the
+rollup and aggregates the partial months at either end of a date range live,
+so callers can pass arbitrary dates.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, QuerySet, Sum
+from django.utils import timezone
+
+from billing.models import Invoice, LineItem, MonthlyTaxRollup
+from billing.services import invoice_totals, response_cache
+
+# Order matters: RollupDelta stores bucket values as lists in this order.
+SUM_FIELDS = (
+    "taxable",
+    "cgst",
+    "sgst",
+    "igst",
+    "amount",
+    "quantity",
+    "line_count",
+    "invoice_count",
+    "invoice_total",
+)
+KEY_FIELDS = ("business_id", "month", "type_of_invoice", "gst_tax_rate", "hsn_code")
+
+_RATE_QUANT = Decimal("0.0001")
+_ZERO_RATE = Decimal("0").quantize(_RATE_QUANT)
+# SQLite sums decimals as floats, so rebuilt and incremental figures can
+# differ in the last few places. Anything under a paisa is not drift.
+DRIFT_TOLERANCE = Decimal("0.01")
+_ID_CHUNK = 500
+
+_state = threading.local()
+
+
+def month_start(d: date) -> date:
+    return d.replace(day=1)
+
+
+def _zero_bucket() -> list:
+    return [Decimal("0")] * 6 + [0, 0, Decimal("0")]
+
+
+def _suspended() -> bool:
+    return getattr(_state, "tracker", None) is not None
+
+
+class RollupDelta:
+    """Signed per-bucket changes, accumulated in memory and written by `apply()`."""
+
+    def __init__(self):
+        self.buckets: dict[tuple, list] = defaultdict(_zero_bucket)
+        # Per-invoice line totals seen along the way, in the shape of
+        # Invoice.LINE_TOTAL_FIELDS; resync() stores the post-write ones.
+        self.line_totals: dict[int, dict] = {}
+        # Businesses whose invoices were read, for the response cache.
+        self.business_ids: set[int] = set()
+
+    def add_invoices(self, invoice_ids, sign: int = 1) -> RollupDelta:
+        """Add (sign=1) or subtract (sign=-1) the current DB contribution of
+        the given invoices. Accepts an id list or an Invoice queryset."""
+        if isinstance(invoice_ids, QuerySet):
+            self._add_chunk(invoice_ids.values("id"), sign)
+            return self
+        ids = list(dict.fromkeys(i for i in invoice_ids if i))
+        for start in range(0, len(ids), _ID_CHUNK):
+            self._add_chunk(ids[start:start + _ID_CHUNK], sign)
+        return self
+
+    def _add_chunk(self, ids, sign: int):
+        headers = {
+            h[0]: h[1:]
+            for h in Invoice.objects.filter(id__in=ids)
+            .order_by()
+            .values_list("id", "business_id", "invoice_date", "type_of_invoice", "total_amount")
+        }
+        if not headers:
+            return
+        lines = (
+            LineItem.objects.filter(invoice_id__in=ids)
+            .order_by()
+            .values("invoice_id", "gst_tax_rate", "hsn_code")
+            .annotate(
+                taxable=Sum(F("quantity") * F("rate")),
+                s_cgst=Sum("cgst"),
+                s_sgst=Sum("sgst"),
+                s_igst=Sum("igst"),
+                s_amount=Sum("amount"),
+                s_quantity=Sum("quantity"),
+                n=Count("id"),
+            )
+        )
+        per_invoice: dict[int, dict] = defaultdict(dict)
+        for row in lines:
+            rate = Decimal(row["gst_tax_rate"] or 0).quantize(_RATE_QUANT)
+            hsn = row["hsn_code"] or ""
+            slot = per_invoice[row["invoice_id"]].setdefault((rate, hsn), _zero_bucket())
+            slot[0] += Decimal(row["taxable"] or 0)
+            slot[1] += Decimal(row["s_cgst"] or 0)
+            slot[2] += Decimal(row["s_sgst"] or 0)
+            slot[3] += Decimal(row["s_igst"] or 0)
+            slot[4] += Decimal(row["s_amount"] or 0)
+            slot[5] += Decimal(row["s_quantity"] or 0)
+            slot[6] += row["n"]
+
+        for invoice_id, (business_id, invoice_date, inv_type, total) in headers.items():
+            self.business_ids.add(business_id)
+            slots = per_invoice.get(invoice_id) or {(_ZERO_RATE, ""): _zero_bucket()}
+            self.line_totals[invoice_id] = dict(zip(
+                invoice_totals.FIELDS,
+                [sum((v[i] for v in slots.values()), Decimal("0")) for i in range(4)]
+                + [sum(v[6] for v in slots.values())],
+                strict=True,
+            ))
+            if not invoice_date:
+                continue
+            # Invoice-level counters ride on the lowest bucket so they're
+            # booked exactly once, and deterministically across re-reads.
+            slots[min(slots)][7] += 1
+            slots[min(slots)][8] += Decimal(total or 0)
+            head = (business_id, month_start(invoice_date), inv_type or "")
+            for (rate, hsn), vals in slots.items():
+                bucket = self.buckets[head + (rate, hsn)]
+                for i, v in enumerate(vals):
+                    bucket[i] += sign * v
+
+    def merge(self, other: RollupDelta) -> RollupDelta:
+        self.business_ids |= other.business_ids
+        for key, vals in other.buckets.items():
+            bucket = self.buckets[key]
+            for i, v in enumerate(vals):
+                bucket[i] += v
+        return self
+
+    def apply(self):
+        """Write the accumulated deltas with F() increments, inserting
+        buckets that don't exist yet and dropping ones that emptied out."""
+        touched = set()
+        now = timezone.now()
+        for key, vals in self.buckets.items():
+            if not any(vals):
+                continue
+            lookup = dict(zip(KEY_FIELDS, key, strict=True))
+            changes = {f: F(f) + v for f, v in zip(SUM_FIELDS, vals, strict=True) if v}
+            touched.add(key[0])
+            if MonthlyTaxRollup.objects.filter(**lookup).update(updated_at=now, **changes):
+                continue
+            try:
+                with transaction.atomic():
+                    MonthlyTaxRollup.objects.create(**lookup, **dict(zip(SUM_FIELDS, vals, strict=True)))
+            except IntegrityError:
+                # Another writer inserted the bucket between our UPDATE and
+                # INSERT — it exists now, so the increment will land.
+                MonthlyTaxRollup.objects.filter(**lookup).update(updated_at=now, **changes)
+        if touched:
+            MonthlyTaxRollup.objects.filter(
+                business_id__in=touched, line_count=0, invoice_count=0
+            ).delete()
+        self.buckets.clear()
+
+
+class _Tracker:
+    def __init__(self):
+        self.before = RollupDelta()
+        self.invoice_ids: set[int] = set()
+
+    def snapshot(self, invoice_ids):
+        """Record the pre-write contribution of invoices that already exist."""
+        fresh = [i for i in invoice_ids if i and i not in self.invoice_ids]
+        if fresh:
+            self.before.add_invoices(fresh, sign=-1)
+            self.invoice_ids.update(fresh)
+
+    def add(self, *invoice_ids):
+        """Register invoices created inside the block (no prior contribution)."""
+        self.invoice_ids.update(i for i in invoice_ids if i)
+
+
+@contextmanager
+def resync(invoice_ids=()):
+    """Recompute the rollup contribution of a batch of invoices around a write.
+
+    Existing invoices the block will touch go in `invoice_ids`; invoices it
+    creates are registered with `tracker.add(pk)`. Per-row signal handlers
+    are suspended for the duration, so every invoice touched inside the block
+    must be one or the other. Nested calls fold into the outermost block.
+    On exception nothing is written — the surrounding transaction is rolling
+    back anyway.
+    """
+    outer = getattr(_state, "tracker", None)
+    if outer is not None:
+        outer.snapshot(list(invoice_ids))
+        yield outer
+        return
+    tracker = _Tracker()
+    tracker.snapshot(list(invoice_ids))
+    _state.tracker = tracker
+    try:
+        yield tracker
+    finally:
+        _state.tracker = None
+    after = RollupDelta().add_invoices(sorted(tracker.invoice_ids))
+    tracker.before.merge(after).apply()
+    invoice_totals.write(after.line_totals)
+    response_cache.invalidate(tracker.before.business_ids | after.business_ids)
+
+
+# ── signal-driven maintenance (see billing/signals.py) ────────────────
+
+
+def _pending() -> dict:
+    if not hasattr(_state, "pending"):
+        _state.pending = {}
+    return _state.pending
+
+
+def invoice_header_changing(invoice) -> bool:
+    """True when a save would move an existing invoice's figures between
+    buckets or change its booked total."""
+    old = (
+        Invoice.objects.filter(pk=invoice.pk)
+        .values_list("business_id", "invoice_date", "type_of_invoice", "total_amount")
+        .first()
+    )
+    if old is None:
+        return False
+    # The business it's moving from needs its response cache dropped too.
+    invoice._stored_business_id = old[0]
+    try:
+        new_date = invoice.invoice_date
+        if isinstance(new_date, str):
+            new_date = date.fromisoformat(new_date[:10])
+        new_total = Decimal(str(invoice.total_amount or 0))
+    except (ValueError, ArithmeticError):
+        # Malformed input — the save itself will reject it; resync anyway.
+        return True
+    return (
+        old[0] != invoice.business_id
+        or not new_date
+        or month_start(old[1]) != month_start(new_date)
+        or old[2] != invoice.type_of_invoice
+        or Decimal(old[3] or 0) != new_total
+    )
+
+
+def before_write(instance, invoice_ids):
+    if _suspended():
+        return
+    instance._rollup_before = RollupDelta().add_invoices(invoice_ids, sign=-1)
+    instance._rollup_invoice_ids = list(invoice_ids)
+
+
+def after_write(instance):
+    if _suspended():
+        return
+    before = getattr(instance, "_rollup_before", None)
+    ids = getattr(instance, "_rollup_invoice_ids", None)
+    if before is None:
+        return
+    before.merge(RollupDelta().add_invoices(ids)).apply()
+    instance._rollup_before = instance._rollup_invoice_ids = None
+
+
+def before_delete(invoice_id, *, owner: str):
+    """Snapshot an invoice about to lose rows. A cascade fires pre_delete for
+    the invoice and every line before deleting anything, so the first caller
+    snapshots and later ones only upgrade ownership to the invoice."""
+    if _suspended() or not invoice_id:
+        return
+    pending = _pending()
+    if invoice_id in pending:
+        if owner == "invoice":
+            pending[invoice_id][1] = "invoice"
+        return
+    pending[invoice_id] = [RollupDelta().add_invoices([invoice_id], sign=-1), owner]
+
+
+def after_delete(invoice_id, *, owner: str):
+    """Apply the post-delete state. Line deletes inside an invoice cascade
+    leave it to the invoice's own post_delete, which runs once the invoice
+    row is gone too."""
+    if _suspended() or not invoice_id:
+        return
+    pending = _pending()
+    entry = pending.get(invoice_id)
+    if entry is None or (entry[1] == "invoice" and owner != "invoice"):
+        return
+    del pending[invoice_id]
+    entry[0].merge(RollupDelta().add_invoices([invoice_id])).apply()
+
+
+# ── reads ─────────────────────────────────────────────────────────────
+
+
+def _full_month_span(start_date, end_date):
+    """First and last month-start fully covered by [start_date, end_date]."""
+    first = None
+    if start_date:
+        first = start_date if start_date.day == 1 else month_start(month_start(start_date) + timedelta(days=32))
+    last = None
+    if end_date:
+        next_day = end_date + timedelta(days=1)
+        last = month_start(end_date) if next_day.day == 1 else month_start(month_start(end_date) - timedelta(days=1))
+    return first, last
+
+
+def rollup_totals(
+    group_by,
+    *,
+    business_id=None,
+    type_of_invoice=None,
+    start_date=None,
+    end_date=None,
+) -> list[dict]:
+    """Sum the rollup over `group_by` (any of KEY_FIELDS) for a date range.
+
+    Whole months come from MonthlyTaxRollup; leading/trailing partial months
+    are aggregated live from their invoices with the same bucketing rules,
+    so the result matches what the rollup would say if it were per-day.
+    Each row carries the group_by keys plus every SUM_FIELDS total.
+    """
+    group_by = tuple(group_by)
+    merged: dict[tuple, list] = defaultdict(_zero_bucket)
+
+    first, last = _full_month_span(start_date, end_date)
+    if first is None or last is None or first <= last:
+        qs = MonthlyTaxRollup.objects.all()
+        if business_id:
+            qs = qs.filter(business_id=business_id)
+        if type_of_invoice:
+            qs = qs.filter(type_of_invoice=type_of_invoice)
+        if first is not None:
+            qs = qs.filter(month__gte=first)
+        if last is not None:
+            qs = qs.filter(month__lte=last)
+        for row in qs.order_by().values(*group_by).annotate(**{f"s_{f}": Sum(f) for f in SUM_FIELDS}):
+            bucket = merged[tuple(row[g] for g in group_by)]
+            for i, f in enumerate(SUM_FIELDS):
+                bucket[i] += row[f"s_{f}"] or 0
+
+    edges = []
+    if first is not None and last is not None and first > last:
+        # The whole range sits inside a single month.
+        edges.append((start_date, end_date))
+    else:
+        if start_date and first is not None and start_date < first:
+            edges.append((start_date, first - timedelta(days=1)))
+        if end_date and last is not None:
+            after_last = month_start(last + timedelta(days=32))
+            if end_date >= after_last:
+                edges.append((after_last, end_date))
+    for lo, hi in edges:
+        invoices = Invoice.objects.filter(invoice_date__range=[lo, hi])
+        if business_id:
+            invoices = invoices.filter(business_id=business_id)
+        if type_of_invoice:
+            invoices = invoices.filter(type_of_invoice=type_of_invoice)
+        live = RollupDelta().add_invoices(invoices)
+        for key, vals in live.buckets.items():
+            full = dict(zip(KEY_FIELDS, key, strict=True))
+            bucket = merged[tuple(full[g] for g in group_by)]
+            for i, v in enumerate(vals):
+                bucket[i] += v
+
+    return [
+        {**dict(zip(group_by, key, strict=True)), **dict(zip(SUM_FIELDS, vals, strict=True))}
+        for key, vals in merged.items()
+        if vals[6] or vals[7]
+    ]
+
+
+# ── rebuild / consistency ─────────────────────────────────────────────
+
+
+def expected_buckets(business_id=None) -> dict[tuple, list]:
+    """Recompute every bucket from Invoice/LineItem (the ground truth)."""
+    invoices = Invoice.objects.all()
+    if business_id:
+        invoices = invoices.filter(business_id=business_id)
+    delta = RollupDelta()
+    delta.add_invoices(list(invoices.order_by("id").values_list("id", flat=True)))
+    return {k: v for k, v in delta.buckets.items() if v[6] or v[7]}
+
+
+def rebuild(business_id=None) -> int:
+    """Replace the rollup (or one business's slice of it) with a fresh
+    recomputation. Returns the number of buckets written."""
+    expected = expected_buckets(business_id)
+    with transaction.atomic():
+        stale = MonthlyTaxRollup.objects.all()
+        if business_id:
+            stale = stale.filter(business_id=business_id)
+        stale.delete()
+        MonthlyTaxRollup.objects.bulk_create(
+            [
+                MonthlyTaxRollup(**dict(zip(KEY_FIELDS, key, strict=True)), **dict(zip(SUM_FIELDS, vals, strict=True)))
+                for key, vals in expected.items()
+            ],
+            batch_size=500,
+        )
+    return len(expected)
+
+
+def check(business_id=None) -> list[dict]:
+    """Compare the stored rollup with a fresh recomputation.
+
+    Returns one entry per bucket that differs: its key, plus `expected` and
+    `stored` dicts of the fields that disagree. Empty list means consistent.
+    """
+    expected = expected_buckets(business_id)
+    stored_qs = MonthlyTaxRollup.objects.all()
+    if business_id:
+        stored_qs = stored_qs.filter(business_id=business_id)
+    stored = {
+        tuple(r[k] if k != "gst_tax_rate" else Decimal(r[k]).quantize(_RATE_QUANT) for k in KEY_FIELDS):
+        [r[f] for f in SUM_FIELDS]
+        for r in stored_qs.values(*KEY_FIELDS, *SUM_FIELDS)
+    }
+    drift = []
+    for key in sorted(set(expected) | set(stored), key=str):
+        want = expected.get(key) or _zero_bucket()
+        have = stored.get(key) or _zero_bucket()
+        bad = [
+            f for f, w, h in zip(SUM_FIELDS, want, have, strict=True)
+            if abs(Decimal(w) - Decimal(h)) >= (1 if isinstance(w, int) else DRIFT_TOLERANCE)
+        ]
+        if bad:
+            drift.append({
+                **dict(zip(KEY_FIELDS, key, strict=True)),
+                "expected": {f: want[SUM_FIELDS.index(f)] for f in bad},
+                "stored": {f: have[SUM_FIELDS.index(f)] for f in bad},
+            })
+    return drift
@@ -0,0 +1,148 @@
+"""Ranked cross-entity search behind the command palette (/api/search/?q=).
+
+One query per entity type (customers, products, invoices), each limited to
+a handful of rows and merged by score. A row matches when one of its
+search fields contains the term, or — on PostgreSQL — when the term is
+word-similar to it (pg_trgm `<%`), which catches typos like "shre ram".
+Both conditions are served by the UPPER(col) gin_trgm_ops indexes from
+migration 0042, so a lookup stays an index scan at 100k customers. That
+needs at least one whole trigram in the term, hence MIN_QUERY_LENGTH = 3.
+
+Scores run 0..1 per field, best field wins: 1.0 for an exact match, 0.9
+for a prefix match, otherwise pg_trgm's word similarity (PostgreSQL) or a
+flat 0.5 for a substring hit (SQLite, which has no trigram support).
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from django.db import connection
+from django.db.models import Case, FloatField, Func, Lookup, Q, Value, When
+from django.db.models.functions import Greatest, Upper
+
+from billing.models import Customer, Invoice, Product
+
+# pg_trgm indexes three-character trigrams; a shorter term can't narrow the
+# gin index, so every row would be read, scored and sorted.
+MIN_QUERY_LENGTH = 3
+DEFAULT_LIMIT = 5
+MAX_LIMIT = 20
+
+
+class WordSimilarity(Func):
+    function = "WORD_SIMILARITY"
+    output_field = FloatField()
+
+
+class WordSimilarTo(Lookup):
+    """`needle <% haystack`: word similarity above pg_trgm's threshold."""
+
+    lookup_name = "word_similar_to"
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} <%% {rhs}", (*lhs_params, *rhs_params)
+
+
+@dataclass
+class SearchHit:
+    type: str
+    id: int
+    label: str
+    detail: str
+    score: float
+
+
+def _ranked(queryset, fields, term):
+    """`queryset` narrowed to rows matching `term`, annotated with `score`."""
+    needle = Value(term.upper())
+    trigram = connection.vendor == "postgresql"
+    match = Q()
+    scores = []
+    for name in fields:
+        match |= Q(**{f"{name}__icontains": term})
+        if trigram:
+            match |= Q(WordSimilarTo(needle, Upper(name)))
+        scores.append(Case(
+            When(**{f"{name}__iexact": term}, then=Value(1.0)),
+            When(**{f"{name}__istartswith": term}, then=Value(0.9)),
+            default=WordSimilarity(needle, Upper(name)) if trigram else Value(0.5),
+            output_field=FloatField(),
+        ))
+    score = Greatest(*scores) if len(scores) > 1 else scores[0]
+    return queryset.filter(match).annotate(score=score)
+
+
+def _customers(term, limit, business_id):
+    rows = (
+        _ranked(Customer.objects.all(), ("name", "gst_number", "mobile_number"), term)
+        .order_by("-score", "name")
+        .values("id", "name", "gst_number", "mobile_number", "score")[:limit]
+    )
+    return [
+        SearchHit("customer", r["id"], r["name"], r["gst_number"] or r["mobile_number"] or "", r["score"])
+        for r in rows
+    ]
+
+
+def _products(term, limit, business_id):
+    rows = (
+        _ranked(Product.objects.all(), ("name",), term)
+        .order_by("-score", "name")
+        .values("id", "name", "hsn_code", "gst_tax_rate", "score")[:limit]
+    )
+    return [
+        SearchHit(
+            "product", r["id"], r["name"],
+            f"HSN {r['hsn_code']} · {(r['gst_tax_rate'] * 100).normalize():f}%", r["score"],
+        )
+        for r in rows
+    ]
+
+
+def _invoices(term, limit, business_id):
+    invoices = Invoice.objects.all()
+    if business_id is not None:
+        invoices = invoices.filter(business_id=business_id)
+    rows = (
+        _ranked(invoices, ("invoice_number",), term)
+        .order_by("-score", "-invoice_date", "-id")
+        .values("id", "invoice_number", "invoice_date", "type_of_invoice", "customer__name", "score")[:limit]
+    )
+    return [
+        SearchHit(
+            "invoice", r["id"], f"#{r['invoice_number']}",
+            f"{r['customer__name']} · {r['invoice_date']:%d %b %Y} · {r['type_of_invoice']}", r["score"],
+        )
+        for r in rows
+    ]
+
+
+SEARCHERS = {
+    "customer": _customers,
+    "product": _products,
+    "invoice": _invoices,
+}
+
+
+def search(term: str, *, types=None, limit: int = DEFAULT_LIMIT, business_id=None) -> list[SearchHit]:
+    """Best `limit` hits per entity type, merged best-first.
+
+    Terms shorter than MIN_QUERY_LENGTH return nothing. Ties keep the
+    SEARCHERS order (customers, products, invoices).
+    """
+    term = (term or "").strip()
+    if len(term) < MIN_QUERY_LENGTH:
+        return []
+    limit = max(1, min(limit, MAX_LIMIT))
+    hits = []
+    for kind, searcher in SEARCHERS.items():
+        if types and kind not in types:
+            continue
+        hits.extend(searcher(term, limit, business_id))
+    for hit in hits:
+        hit.score = round(float(hit.score), 3)
+    hits.sort(key=lambda h: -h.score)
+    return hits
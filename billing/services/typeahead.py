@@ -0,0 +1,135 @@
+"""In-process typeahead index for product and customer autocomplete.
+
+The invoice form hits /products/search/ and /customers/search/ on nearly
+every keystroke, and against a remote database each of those was a ~100 ms
+round-trip for a master list that changes a few times a day. Each worker
+now keeps the whole list in memory — products with hsn_code / gst_tax_rate
+/ default_unit, customers with their GSTIN and businesses — built lazily on
+the first lookup:
+
+  - `entries`: model instances in name order (what the views serialize);
+  - `postings`: every two-letter substring of the search text mapped to the
+    entries containing it. A term's candidates are the intersection of its
+    bigrams' lists, confirmed with a substring test, so matching keeps the
+    `icontains` semantics the endpoints had (prefix hits included) without
+    scanning the list.
+
+Freshness: each kind has a version in a `DataVersion` row
+("typeahead:product" / "typeahead:customer"). Product / Customer saves and
+deletes, Customer.businesses changes (billing/signals.py) and the
+bulk_create paths that skip signals call `invalidate()`, which drops this
+worker's copy and bumps the row inside the writing transaction; every other
+worker reads the new version on its next lookup — one indexed query — and
+rebuilds. The version lives in the database, not the Django cache, because
+that cache is locmem, one per gunicorn worker: a counter there never
+reached the others, which kept serving old HSN codes and tax rates to
+`LineItem.create_line_item_for_invoice`.
+"""
+
+from __future__ import annotations
+
+import heapq
+import threading
+from dataclasses import dataclass, field
+
+PRODUCTS = "product"
+CUSTOMERS = "customer"
+
+_VERSION_SCOPE = "typeahead:{}"
+
+_indexes: dict[str, _Index] = {}
+_lock = threading.Lock()
+
+
+def _bigrams(text: str) -> set[str]:
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+@dataclass
+class _Index:
+    version: int
+    entries: list
+    haystacks: list[str]
+    postings: dict[str, list[int]] = field(default_factory=dict)
+    by_name: dict = field(default_factory=dict)
+
+    def __post_init__(self):
+        for i, text in enumerate(self.haystacks):
+            for gram in _bigrams(text):
+                self.postings.setdefault(gram, []).append(i)
+        self.by_name = {entry.name: entry for entry in self.entries}
+
+    def search(self, term: str, limit: int) -> list:
+        needle = term.upper()
+        if len(needle) < 2:
+            hits = (i for i, text in enumerate(self.haystacks) if needle in text)
+        else:
+            lists = sorted((self.postings.get(g, ()) for g in _bigrams(needle)), key=len)
+            candidates = set(lists[0]).intersection(*lists[1:])
+            hits = (i for i in candidates if needle in self.haystacks[i])
+        return [self.entries[i] for i in heapq.nsmallest(limit, hits)]
+
+
+def _build_products(version: int) -> _Index:
+    from billing.models import Product
+
+    products = list(Product.objects.order_by("name"))
+    return _Index(version, products, [p.name.upper() for p in products])
+
+
+def _build_customers(version: int) -> _Index:
+    from billing.models import Customer
+
+    customers = list(Customer.objects.prefetch_related("businesses").order_by("name"))
+    # NUL between fields so a bigram never spans name and GSTIN.
+    return _Index(
+        version, customers,
+        [f"{c.name}\x00{c.gst_number or ''}".upper() for c in customers],
+    )
+
+
+_BUILDERS = {
+    PRODUCTS: _build_products,
+    CUSTOMERS: _build_customers,
+}
+
+
+def _index(kind: str) -> _Index:
+    from billing.models import DataVersion
+
+    version = DataVersion.current(_VERSION_SCOPE.format(kind))
+    index = _indexes.get(kind)
+    if index is None or index.version != version:
+        with _lock:
+            index = _indexes.get(kind)
+            if index is None or index.version != version:
+                index = _indexes[kind] = _BUILDERS[kind](version)
+    return index
+
+
+def invalidate(kind: str) -> None:
+    """Drop `kind` here and make every other worker rebuild it once this
+    write commits."""
+    from billing.models import DataVersion
+
+    _indexes.pop(kind, None)
+    DataVersion.bump([_VERSION_SCOPE.format(kind)])
+
+
+def search_products(term: str, limit: int = 20) -> list:
+    """Products whose name contains `term` (case-insensitive), by name."""
+    return _index(PRODUCTS).search(term, limit)
+
+
+def first_products(limit: int = 20) -> list:
+    return _index(PRODUCTS).entries[:limit]
+
+
+def search_customers(term: str, limit: int = 10) -> list:
+    """Customers whose name or GSTIN contains `term`, by name."""
+    return _index(CUSTOMERS).search(term, limit)
+
+
+def product_by_name(name: str):
+    """The Product named exactly `name`, or None."""
+    return _index(PRODUCTS).by_name.get(name)
@@ -1,8 +1,9 @@
 from django.db.models import Sum
-from django.db.models.signals import post_delete, post_save
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
 from django.dispatch import receiver
 
-from billing.models import Invoice, LineItem
+from billing.models import Business, Customer, Invoice, ITCReclaimLedger, LineItem, Product
+from billing.services import invoice_totals, response_cache, rollups, typeahead
 
 # Safety net for one-off saves (admin edits, shell fixes). Every bulk path —
 # invoice create/update_line_items, inward capture, CSV/AI/GSTR-2A imports —
@@ -13,13 +14,13 @@ from billing.models import Invoice, LineItem
 def _resync_invoice_total(invoice):
     """Sum in SQL, write with .update() (no Invoice.save() side effects), and
     keep the in-memory instance in step — callers hold references to it and a
-    later instance.save() must not write a stale total back."""
-    total = (
-        LineItem.objects.filter(invoice_id=invoice.id).aggregate(t=Sum("amount"))["t"]
-        or 0
-    )
-    Invoice.objects.filter(id=invoice.id).update(total_amount=total)
-    invoice.total_amount = total
+    later instance.save() must not write a stale total back. The line totals
+    (taxable/tax heads/line count) come from the same aggregate."""
+    values = invoice_totals.aggregate_one(invoice.id, total_amount=Sum("amount"))
+    values["total_amount"] = values["total_amount"] or 0
+    Invoice.objects.filter(id=invoice.id).update(**values)
+    for name, value in values.items():
+        setattr(invoice, name, value)
 
 
 @receiver(post_save, sender=LineItem)
@@ -34,3 +35,136 @@ def update_invoice_total_on_line_item_delete(sender, instance, **kwargs):
     except Invoice.DoesNotExist:
         # Cascade delete — the invoice went first.
         pass
+
+
+# ── MonthlyTaxRollup upkeep ──
+# Same safety-net role for the rollup: the bulk paths wrap their writes in
+# rollups.resync(), which suspends these. Registered after the total
+# receivers above so the post-write snapshot sees the resynced total.
+
+
+@receiver(pre_save, sender=LineItem)
+def snapshot_rollup_before_line_item_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    ids = [instance.invoice_id]
+    if not instance._state.adding:
+        old_invoice_id = (
+            LineItem.objects.filter(pk=instance.pk).values_list("invoice_id", flat=True).first()
+        )
+        if old_invoice_id and old_invoice_id != instance.invoice_id:
+            ids.append(old_invoice_id)
+    rollups.before_write(instance, ids)
+
+
+@receiver(post_save, sender=LineItem)
+def update_rollup_on_line_item_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        rollups.after_write(instance)
+
+
+@receiver(pre_save, sender=Invoice)
+def snapshot_rollup_before_invoice_save(sender, instance, raw=False, **kwargs):
+    if raw or instance._state.adding:
+        return
+    if rollups.invoice_header_changing(instance):
+        rollups.before_write(instance, [instance.pk])
+
+
+@receiver(post_save, sender=Invoice)
+def update_rollup_on_invoice_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        instance._rollup_before = rollups.RollupDelta()
+        instance._rollup_invoice_ids = [instance.pk]
+    rollups.after_write(instance)
+
+
+@receiver(pre_delete, sender=Invoice)
+def snapshot_rollup_before_invoice_delete(sender, instance, **kwargs):
+    rollups.before_delete(instance.pk, owner="invoice")
+
+
+@receiver(post_delete, sender=Invoice)
+def update_rollup_on_invoice_delete(sender, instance, **kwargs):
+    rollups.after_delete(instance.pk, owner="invoice")
+
+
+@receiver(pre_delete, sender=LineItem)
+def snapshot_rollup_before_line_item_delete(sender, instance, **kwargs):
+    rollups.before_delete(instance.invoice_id, owner="line")
+
+
+@receiver(post_delete, sender=LineItem)
+def update_rollup_on_line_item_delete(sender, instance, **kwargs):
+    rollups.after_delete(instance.invoice_id, owner="line")
+
+
+# ── Typeahead index upkeep ──
+# The autocomplete index (billing/services/typeahead.py) holds the product
+# and customer masters in memory; any change to them drops it everywhere.
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_product_typeahead(sender, **kwargs):
+    typeahead.invalidate(typeahead.PRODUCTS)
+
+
+@receiver(post_save, sender=Customer)
+@receiver(post_delete, sender=Customer)
+@receiver(m2m_changed, sender=Customer.businesses.through)
+def invalidate_customer_typeahead(sender, **kwargs):
+    # m2m_changed fires pre_ and post_ each change; act once, after it.
+    action = kwargs.get("action")
+    if action and not action.startswith("post_"):
+        return
+    typeahead.invalidate(typeahead.CUSTOMERS)
+
+
+# ── Response cache upkeep ──
+# Cached aggregate responses (billing/services/response_cache.py) are keyed
+# on per-business data versions. One-off writes bump them here; the bulk
+# paths' rollups.resync() bumps them on exit.
+
+
+@receiver(post_save, sender=Invoice)
+@receiver(post_delete, sender=Invoice)
+def invalidate_invoice_responses(sender, instance, **kwargs):
+    # _stored_business_id is set by rollups.invoice_header_changing() when
+    # the save may have moved the invoice from another business.
+    response_cache.invalidate(
+        [instance.business_id, getattr(instance, "_stored_business_id", None)]
+    )
+
+
+@receiver(post_save, sender=LineItem)
+@receiver(post_delete, sender=LineItem)
+def invalidate_line_item_responses(sender, instance, **kwargs):
+    try:
+        business_id = instance.invoice.business_id
+    except Invoice.DoesNotExist:
+        # Cascade delete — the invoice's own post_delete covers it.
+        return
+    response_cache.invalidate([business_id])
+
+
+@receiver(post_save, sender=ITCReclaimLedger)
+@receiver(post_delete, sender=ITCReclaimLedger)
+def invalidate_ledger_responses(sender, instance, **kwargs):
+    response_cache.invalidate([instance.business_id])
+
+
+@receiver(post_save, sender=Business)
+@receiver(post_delete, sender=Business)
+@receiver(post_save, sender=Customer)
+@receiver(post_delete, sender=Customer)
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(m2m_changed, sender=Customer.businesses.through)
+def invalidate_master_responses(sender, **kwargs):
+    action = kwargs.get("action")
+    if action and not action.startswith("post_"):
+        return
+    response_cache.invalidate_masters()
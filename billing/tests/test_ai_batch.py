@@ -0,0 +1,114 @@
+"""Batch AI extraction — images fan out over the live Gemini keys and each
+result streams back as an NDJSON line the moment it is ready.
+
+The Gemini call itself is stubbed (`_extract_via_gemini`); everything around
+it — key rotation, cooldowns, the slot queue, the response shape — is real.
+"""
+
+import json
+import threading
+import time
+from unittest.mock import patch
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from django.urls import reverse
+
+from billing.tests.test_base import BaseAPITestCase
+from billing.utils import AIInvoiceProcessingError, AIInvoiceProcessor
+
+KEYS = ["AIzaKeyNumberOne-0001", "AIzaKeyNumberTwo-0002", "AIzaKeyNumberThree-0003"]
+
+
+class FakeGemini:
+    """Stands in for the network call; records which keys ran concurrently."""
+
+    def __init__(self, delay=0.05, fail_keys=()):
+        self.delay = delay
+        self.fail_keys = set(fail_keys)
+        self.lock = threading.Lock()
+        self.in_flight = []
+        self.max_parallel = 0
+        self.overlap = False
+        self.used = []
+
+    def __call__(self, processor, key, image_bytes, mime, prompt):
+        with self.lock:
+            self.overlap |= key in self.in_flight
+            self.in_flight.append(key)
+            self.max_parallel = max(self.max_parallel, len(self.in_flight))
+            self.used.append(key)
+        try:
+            time.sleep(self.delay)
+            if key in self.fail_keys:
+                raise AIInvoiceProcessingError("429 RESOURCE_EXHAUSTED. Please retry in 30s.")
+            return {"invoice_number": image_bytes.decode(), "invoice_date": "2026-05-01",
+                    "customer_name": "Someone", "line_items": []}
+        finally:
+            with self.lock:
+                self.in_flight.remove(key)
+
+
+@override_settings(GEMINI_API_KEYS=",".join(KEYS), GEMINI_API_KEY="")
+class AIBatchProcessingTest(BaseAPITestCase):
+    def setUp(self):
+        super().setUp()
+        AIInvoiceProcessor._key_cooldowns.clear()
+        self.addCleanup(AIInvoiceProcessor._key_cooldowns.clear)
+        normalize = patch.object(
+            AIInvoiceProcessor, "_normalize_image", staticmethod(lambda b, m: (b, "image/jpeg"))
+        )
+        normalize.start()
+        self.addCleanup(normalize.stop)
+
+    def _post(self, fake, count=6, extra=()):
+        files = [
+            SimpleUploadedFile(f"{i}.jpg", f"INV-{i}".encode(), content_type="image/jpeg")
+            for i in range(count)
+        ] + list(extra)
+        # A plain function so it binds like the real method.
+        stub = lambda processor, *args: fake(processor, *args)  # noqa: E731
+        with patch.object(AIInvoiceProcessor, "_extract_via_gemini", stub):
+            resp = self.client.post(
+                reverse("ai-invoice-process-batch"), {"images": files}, format="multipart"
+            )
+            self.assertEqual(resp.status_code, 200)
+            self.assertEqual(resp["Content-Type"], "application/x-ndjson")
+            lines = [json.loads(line) for line in b"".join(resp.streaming_content).splitlines()]
+        return lines[:-1], lines[-1]
+
+    def test_one_worker_per_live_key_never_sharing_a_key(self):
+        fake = FakeGemini()
+        results, summary = self._post(fake, count=9)
+        self.assertEqual(fake.max_parallel, 3)
+        self.assertFalse(fake.overlap)
+        self.assertEqual(summary, {"done": True, "processed": 9, "failed": 0})
+        self.assertEqual(
+            sorted(r["data"]["invoice_number"] for r in results),
+            sorted(f"INV-{i}" for i in range(9)),
+        )
+        for r in results:
+            self.assertEqual(r["data"]["invoice_number"], f"INV-{r['index']}")
+            self.assertEqual(r["key_total"], 3)
+
+    def test_cooled_down_key_shrinks_the_pool(self):
+        AIInvoiceProcessor._set_cooldown(KEYS[1], 600)
+        fake = FakeGemini()
+        _, summary = self._post(fake, count=4)
+        self.assertEqual(fake.max_parallel, 2)
+        self.assertNotIn(KEYS[1], fake.used)
+        self.assertEqual(summary["failed"], 0)
+
+    def test_quota_error_rotates_to_another_key_and_cools_it(self):
+        fake = FakeGemini(fail_keys={KEYS[0]})
+        results, summary = self._post(fake, count=6)
+        self.assertEqual(summary["failed"], 0)
+        self.assertTrue(AIInvoiceProcessor._is_cooled_down(KEYS[0]))
+        self.assertTrue(all(r["key_index"] in (2, 3) for r in results))
+
+    def test_bad_upload_is_reported_without_failing_the_batch(self):
+        pdf = SimpleUploadedFile("scan.pdf", b"%PDF", content_type="application/pdf")
+        results, summary = self._post(FakeGemini(), count=2, extra=[pdf])
+        bad = [r for r in results if not r["ok"]]
+        self.assertEqual([(b["index"], b["filename"]) for b in bad], [(2, "scan.pdf")])
+        self.assertEqual(summary, {"done": True, "processed": 3, "failed": 1})
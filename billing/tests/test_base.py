@@ -2,12 +2,25 @@ from decimal import Decimal
 
 from django.contrib.auth.models import User, Group
 from django.test import TestCase
+from django.urls import reverse
 from rest_framework.test import APIClient
 
 from billing.constants import INVOICE_TYPE_OUTWARD
 from billing.models import Business, Customer, Invoice, LineItem, Product
 
 
+def line_payload(qty="1", rate="100", gst="0.03", hsn="711319"):
+    """One intra-state line item as the invoice API takes it."""
+    taxable = Decimal(qty) * Decimal(rate)
+    tax = taxable * Decimal(gst)
+    return {
+        "product_name": "Ring", "hsn_code": hsn, "gst_tax_rate": gst,
+        "quantity": qty, "rate": rate, "unit": "gms",
+        "cgst": str(tax / 2), "sgst": str(tax / 2), "igst": "0",
+        "amount": str(taxable + tax),
+    }
+
+
 class BaseAPITestCase(TestCase):
     """Base test case for API tests with common setup methods."""
 
@@ -87,3 +100,13 @@ class BaseAPITestCase(TestCase):
 
         # Update the invoice total amount
         self.invoice.save()
+
+    def post_invoice(self, number, inv_date, lines, inv_type=INVOICE_TYPE_OUTWARD):
+        """Create an invoice with `lines` through the API; returns it."""
+        resp = self.client.post(reverse("invoice-list"), {
+            "business": self.business.id, "customer": self.customer.id,
+            "invoice_number": number, "invoice_date": inv_date,
+            "type_of_invoice": inv_type, "line_items": lines,
+        }, format="json")
+        self.assertEqual(resp.status_code, 201, resp.data)
+        return Invoice.objects.get(pk=resp.data["id"])
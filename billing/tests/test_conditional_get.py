@@ -0,0 +1,97 @@
+"""ETag / If-None-Match on the list endpoints and the invoice print payload."""
+
+from decimal import Decimal
+
+from django.urls import reverse
+
+from billing.constants import INVOICE_TYPE_OUTWARD
+from billing.models import AuditLog, Business, Invoice, LineItem
+from billing.tests.test_base import BaseAPITestCase
+
+
+class ConditionalGetTest(BaseAPITestCase):
+    def get(self, url, etag=None, **params):
+        headers = {"HTTP_IF_NONE_MATCH": etag} if etag else {}
+        return self.client.get(url, params, **headers)
+
+    def assertNotModified(self, url, **params):
+        first = self.get(url, **params)
+        self.assertEqual(first.status_code, 200)
+        self.assertTrue(first["ETag"].startswith('"'))
+        self.assertEqual(first["Cache-Control"], "private, no-cache")
+        again = self.get(url, first["ETag"], **params)
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again.content, b"")
+        self.assertEqual(again["ETag"], first["ETag"])
+        return first["ETag"]
+
+    def _add_line(self, invoice):
+        LineItem.objects.create(
+            invoice=invoice, customer=self.customer, product_name="Test Product",
+            quantity=Decimal("1"), rate=Decimal("100"), amount=Decimal("100"),
+        )
+
+    def test_every_list_answers_304_when_unchanged(self):
+        for name in ("invoice-list", "customer-list", "product-list", "business-list"):
+            with self.subTest(name):
+                self.assertNotModified(reverse(name))
+
+    def test_304_skips_the_list_query(self):
+        url = reverse("invoice-list")
+        etag = self.get(url)["ETag"]
+        # The role check and the data-version lookup; no list query.
+        with self.assertNumQueries(2):
+            self.assertEqual(self.get(url, etag).status_code, 304)
+
+    def test_gzip_weakened_tag_still_matches(self):
+        url = reverse("product-list")
+        etag = self.get(url)["ETag"]
+        self.assertEqual(self.get(url, f"W/{etag}").status_code, 304)
+
+    def test_params_are_part_of_the_tag(self):
+        url = reverse("invoice-list")
+        etag = self.get(url)["ETag"]
+        resp = self.get(url, etag, type_of_invoice="inward")
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotEqual(resp["ETag"], etag)
+
+    def test_invoice_write_changes_the_tag(self):
+        url = reverse("invoice-list")
+        etag = self.assertNotModified(url)
+        self._add_line(self.invoice)
+        resp = self.get(url, etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotEqual(resp["ETag"], etag)
+
+    def test_other_business_write_keeps_a_scoped_tag(self):
+        url = reverse("invoice-list")
+        other = Business.objects.create(name="Other Business", state_name="MAHARASHTRA")
+        invoice = Invoice.objects.create(
+            invoice_number="O-1", invoice_date="2023-01-05", business=other,
+            customer=self.customer, type_of_invoice=INVOICE_TYPE_OUTWARD,
+        )
+        scoped = self.assertNotModified(url, business_id=self.business.pk)
+        unscoped = self.get(url)["ETag"]
+        self._add_line(invoice)
+        self.assertEqual(self.get(url, scoped, business_id=self.business.pk).status_code, 304)
+        self.assertEqual(self.get(url, unscoped).status_code, 200)
+
+    def test_master_edit_changes_customer_list_tag(self):
+        url = reverse("customer-list")
+        etag = self.assertNotModified(url)
+        self.customer.name = "Renamed Customer"
+        self.customer.save()
+        resp = self.get(url, etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data["results"][0]["name"], "Renamed Customer")
+
+    def test_print_answers_304_and_still_logs(self):
+        url = reverse("invoice-print", args=[self.invoice.pk])
+        etag = self.assertNotModified(url)
+        self.assertEqual(
+            AuditLog.objects.filter(action="printed", entity_id=self.invoice.pk).count(), 2,
+        )
+        self._add_line(self.invoice)
+        resp = self.get(url, etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(resp.data["line_items"]), 2)
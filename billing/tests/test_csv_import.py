@@ -1,5 +1,7 @@
 import io
 import uuid
+from decimal import Decimal
+from unittest.mock import patch
 
 from django.contrib.auth.models import User, Group
 from django.test import TransactionTestCase
@@ -355,3 +357,159 @@ class CSVImportTestCase(TransactionTestCase):
 
         # Verify a new invoice was created
         self.assertEqual(Invoice.objects.count(), 2)  # Both the old and new invoice
+
+
+class InvoiceCSVColumnarImportTest(TransactionTestCase):
+    """The column-wise import: tax per customer's state, catalog rates, and a
+    query count that doesn't grow with the number of invoices."""
+
+    def setUp(self):
+        from billing.models import Product
+
+        self.business = Business.objects.create(
+            name="Columnar Business", gst_number="27AADCB2230M1Z3", state_name="MAHARASHTRA"
+        )
+        self.local = Customer.objects.create(name="Local", gst_number="27AADCB2230M1Z4")
+        self.remote = Customer.objects.create(name="Remote", gst_number="29AADCB2230M1Z4")
+        # No GSTIN: interstate-ness falls back to the state name.
+        self.b2c = Customer.objects.create(name="Walk In", state_name="Karnataka")
+        for c in (self.local, self.remote, self.b2c):
+            c.businesses.add(self.business)
+        Product.objects.create(name="Silver Coin", hsn_code="7106", gst_tax_rate="0.05")
+
+    def _csv(self, rows):
+        return (
+            "invoice_number,invoice_date,customer_name,product_name,quantity,rate\n"
+            + "".join(f"{r}\n" for r in rows)
+        ).encode()
+
+    def test_tax_split_follows_customer_state_and_catalog_rate(self):
+        result = process_invoice_csv(
+            self._csv([
+                "A1,2024-05-01,Local,Silver Coin,2,100",
+                "A1,2024-05-01,Local,Unknown Thing,1,100",
+                "A2,2024-05-02,Remote,Silver Coin,1,200",
+                "A3,2024-05-03,Walk In,Silver Coin,1,100",
+            ]),
+            self.business.id,
+        )
+        self.assertEqual(
+            (result["invoices_created"], result["line_items_created"], result["errors"]), (3, 4, [])
+        )
+        coin, other = LineItem.objects.filter(invoice__invoice_number="A1").order_by("id")
+        self.assertEqual((coin.cgst, coin.sgst, coin.igst, coin.amount), (5, 5, 0, 210))
+        self.assertEqual((other.hsn_code, other.gst_tax_rate, other.amount), ("711319", Decimal("0.03"), 103))
+        self.assertEqual(Invoice.objects.get(invoice_number="A1").total_amount, 313)
+        remote = LineItem.objects.get(invoice__invoice_number="A2")
+        self.assertEqual((remote.cgst, remote.igst), (0, 10))
+        self.assertEqual(LineItem.objects.get(invoice__invoice_number="A3").igst, 5)
+
+    def test_bad_amounts_are_reported_and_the_rest_imported(self):
+        result = process_invoice_csv(
+            self._csv([
+                "B1,2024-05-01,Local,Silver Coin,two,100",
+                "B1,2024-05-01,Local,Silver Coin,1,100",
+            ]),
+            self.business.id,
+        )
+        self.assertEqual(result["line_items_created"], 1)
+        self.assertIn("Error creating line item for invoice B1", result["errors"][0])
+        self.assertEqual(Invoice.objects.get(invoice_number="B1").total_amount, 105)
+
+    def test_query_count_does_not_grow_with_invoices(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        # Warm-up import: the month's rollup row is created on first write.
+        process_invoice_csv(self._csv(["W0,2024-06-01,Local,Silver Coin,1,100"]), self.business.id)
+        counts = []
+        for n, prefix in ((2, "S"), (20, "L")):
+            rows = [f"{prefix}{i},2024-06-01,Local,Silver Coin,1,100" for i in range(n)]
+            with CaptureQueriesContext(connection) as ctx:
+                result = process_invoice_csv(self._csv(rows), self.business.id)
+            self.assertEqual(result["invoices_created"], n)
+            counts.append(len(ctx))
+        self.assertEqual(counts[0], counts[1])
+
+
+class InvoiceCSVChunkedImportTest(TransactionTestCase):
+    """Streaming import: chunks commit separately, cut on invoice boundaries,
+    and a failed run can be resumed from the reported row offset."""
+
+    def setUp(self):
+        self.business = Business.objects.create(name="Chunked Business", gst_number="27AADCB2230M1Z3")
+        self.customer = Customer.objects.create(name="Local", gst_number="27AADCB2230M1Z4")
+        self.customer.businesses.add(self.business)
+        # Invoices of 1, 3, 2 and 1 rows: with 2-row chunks, C2 straddles two.
+        self.content = (
+            "invoice_number,invoice_date,customer_name,product_name,quantity,rate\n"
+            + "".join(
+                f"C{n},2024-07-01,Local,Item {i},1,100\n"
+                for i, n in enumerate([1, 2, 2, 2, 3, 3, 4])
+            )
+        ).encode()
+
+    def test_invoices_spanning_chunks_are_imported_whole(self):
+        result = process_invoice_csv(io.BytesIO(self.content), self.business.id, chunk_size=2)
+        self.assertTrue(result["completed"])
+        self.assertEqual((result["invoices_created"], result["line_items_created"]), (4, 7))
+        self.assertEqual(LineItem.objects.filter(invoice__invoice_number="C2").count(), 3)
+        self.assertGreater(len(result["chunks"]), 1)
+        self.assertEqual(sum(c["rows"] for c in result["chunks"]), 7)
+        self.assertEqual(result["next_row"], 7)
+
+    def test_failed_chunk_stops_the_import_and_resume_finishes_it(self):
+        real_bulk_create = LineItem.objects.bulk_create
+        calls = []
+
+        def flaky(objs, **kwargs):
+            calls.append(1)
+            if len(calls) == 2:
+                raise RuntimeError("connection lost")
+            return real_bulk_create(objs, **kwargs)
+
+        with patch.object(LineItem.objects, "bulk_create", flaky):
+            first = process_invoice_csv(self.content, self.business.id, chunk_size=2)
+        self.assertFalse(first["completed"])
+        self.assertIn("connection lost", first["errors"][-1])
+        self.assertFalse(first["chunks"][-1]["ok"])
+        committed = set(Invoice.objects.values_list("invoice_number", flat=True))
+        self.assertEqual(committed, {"C1"})  # the failed chunk rolled back
+
+        second = process_invoice_csv(
+            self.content, self.business.id, start_row=first["next_row"], chunk_size=2
+        )
+        self.assertTrue(second["completed"])
+        self.assertEqual(second["errors"], [])
+        self.assertEqual(Invoice.objects.count(), 4)
+        self.assertEqual(LineItem.objects.count(), 7)
+
+    def test_error_messages_are_capped_but_counted(self):
+        rows = "".join(",2024-07-01,Local,Item,1,100\n" for _ in range(5))
+        content = b"invoice_number,invoice_date,customer_name,product_name,quantity,rate\n" + rows.encode()
+        with patch("billing.utils.CSV_IMPORT_MAX_ERRORS", 3):
+            result = process_invoice_csv(content, self.business.id)
+        self.assertEqual((len(result["errors"]), result["error_count"]), (3, 5))
+
+    def test_endpoint_streams_the_upload_and_accepts_start_row(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        user = User.objects.create_user(username="chunked", password="x")
+        admin_group, _ = Group.objects.get_or_create(name="admin")
+        user.groups.add(admin_group)
+        client = APIClient()
+        client.force_authenticate(user=user)
+        response = client.post(
+            reverse("csv-import"),
+            {
+                "file": SimpleUploadedFile("big.csv", self.content, content_type="text/csv"),
+                "business_id": self.business.id,
+                "start_row": 4,  # C1 and C2 came in on an earlier run
+            },
+            format="multipart",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        self.assertEqual(
+            sorted(Invoice.objects.values_list("invoice_number", flat=True)), ["C3", "C4"]
+        )
+        self.assertEqual((response.data["start_row"], response.data["next_row"]), (4, 7))
@@ -0,0 +1,101 @@
+"""Extraction cache — an identical upload under the same prompt and model is
+answered from the ExtractionCache table without spending a Gemini call.
+"""
+
+import json
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from billing.models import ExtractionCache
+from billing.services import extraction_cache
+from billing.tests.test_base import BaseAPITestCase
+from billing.utils import AIInvoiceProcessor
+
+
+@override_settings(GEMINI_API_KEYS="AIzaKeyNumberOne-0001,AIzaKeyNumberTwo-0002", GEMINI_API_KEY="")
+class ExtractionCacheTest(BaseAPITestCase):
+    def setUp(self):
+        super().setUp()
+        AIInvoiceProcessor._key_cooldowns.clear()
+        extraction_cache.reset_stats()
+        self.calls = []
+
+        def fake_gemini(processor, key, image_bytes, mime, prompt):
+            self.calls.append(image_bytes)
+            return {"invoice_number": image_bytes.decode(), "invoice_date": "2026-05-01",
+                    "customer_name": "Someone", "line_items": []}
+
+        for name, value in (
+            ("_normalize_image", staticmethod(lambda b, m: (b, "image/jpeg"))),
+            ("_extract_via_gemini", fake_gemini),
+        ):
+            p = patch.object(AIInvoiceProcessor, name, value)
+            p.start()
+            self.addCleanup(p.stop)
+
+    def _process(self, content=b"BILL-1", **data):
+        image = SimpleUploadedFile("bill.jpg", content, content_type="image/jpeg")
+        resp = self.client.post(
+            reverse("ai-invoice-process"), {"image": image, **data}, format="multipart"
+        )
+        self.assertEqual(resp.status_code, 200, resp.data)
+        return resp.data
+
+    def test_repeat_upload_is_served_from_cache(self):
+        first = self._process()
+        second = self._process()
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(second["data"], first["data"])
+        self.assertEqual(first["cache"]["hit"], False)
+        self.assertEqual(second["cache"], {"hit": True, "hits": 1, "lookups": 2, "hit_rate": 0.5})
+        self.assertIsNone(second["key_index"])
+        self.assertEqual(ExtractionCache.objects.get().hits, 1)
+
+    def test_prompt_scope_is_part_of_the_key(self):
+        self._process()
+        self._process(business_id=self.business.id)  # customer list joins the prompt
+        self._process(content=b"BILL-2")
+        self.assertEqual(len(self.calls), 3)
+
+    def test_expired_entries_miss_and_are_refreshed(self):
+        self._process()
+        ExtractionCache.objects.update(created_at=timezone.now() - timedelta(days=31))
+        self.assertFalse(self._process()["cache"]["hit"])
+        self.assertEqual(len(self.calls), 2)
+        self.assertTrue(self._process()["cache"]["hit"])
+
+    @override_settings(AI_EXTRACTION_CACHE_MAX_ENTRIES=2)
+    def test_least_recently_used_entry_is_evicted(self):
+        self._process(b"A")
+        self._process(b"B")
+        ExtractionCache.objects.filter(result__invoice_number="B").update(
+            last_used_at=timezone.now() - timedelta(hours=1)
+        )
+        self._process(b"A")  # hit; A is now the most recent
+        self._process(b"C")  # over the cap: B goes
+        self.assertEqual(
+            sorted(ExtractionCache.objects.values_list("result__invoice_number", flat=True)),
+            ["A", "C"],
+        )
+
+    def test_batch_reads_cache_once_and_dedupes_repeats(self):
+        self._process(b"OLD")
+        files = [
+            SimpleUploadedFile(f"{i}.jpg", content, content_type="image/jpeg")
+            for i, content in enumerate([b"OLD", b"NEW", b"NEW"])
+        ]
+        resp = self.client.post(
+            reverse("ai-invoice-process-batch"), {"images": files}, format="multipart"
+        )
+        lines = [json.loads(line) for line in b"".join(resp.streaming_content).splitlines()]
+        by_index = {line["index"]: line for line in lines[:-1]}
+        self.assertEqual(self.calls, [b"OLD", b"NEW"])
+        self.assertTrue(by_index[0]["cache"]["hit"])
+        self.assertEqual(by_index[1]["data"]["invoice_number"], "NEW")
+        self.assertEqual(by_index[2]["data"]["invoice_number"], "NEW")
+        self.assertEqual(lines[-1]["failed"], 0)
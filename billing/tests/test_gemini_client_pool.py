@@ -0,0 +1,102 @@
+"""Gemini client pool — one shared client per API key, built lazily,
+reused across requests and threads, dropped when the key stops authenticating.
+"""
+
+import threading
+import time
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, override_settings
+
+from billing.services.gemini_clients import GeminiClientPool
+from billing.utils import AIInvoiceProcessingError, AIInvoiceProcessor
+
+KEYS = ["AIzaKeyNumberOne-0001", "AIzaKeyNumberTwo-0002"]
+
+
+class FakeClient:
+    def __init__(self, api_key):
+        self.api_key = api_key
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class GeminiClientPoolTest(SimpleTestCase):
+    def setUp(self):
+        self.built = []
+
+        def factory(api_key):
+            time.sleep(0.01)  # widen the race window in the threaded test
+            client = FakeClient(api_key)
+            self.built.append(client)
+            return client
+
+        self.pool = GeminiClientPool(factory=factory)
+
+    def test_client_is_created_once_per_key_and_reused(self):
+        first = self.pool.get(KEYS[0])
+        self.assertIs(self.pool.get(KEYS[0]), first)
+        self.assertIsNot(self.pool.get(KEYS[1]), first)
+        stats = self.pool.stats()
+        self.assertEqual((stats["clients"], stats["hits"], stats["misses"]), (2, 1, 2))
+
+    def test_concurrent_first_use_builds_a_single_client(self):
+        got = []
+        threads = [threading.Thread(target=lambda: got.append(self.pool.get(KEYS[0])))
+                   for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(self.built), 1)
+        self.assertTrue(all(c is self.built[0] for c in got))
+        self.assertEqual(self.pool.stats()["hits"], 7)
+
+    def test_invalidate_closes_and_rebuilds_on_next_use(self):
+        old = self.pool.get(KEYS[0])
+        self.pool.invalidate(KEYS[0])
+        self.assertTrue(old.closed)
+        self.assertIsNot(self.pool.get(KEYS[0]), old)
+        self.assertEqual(self.pool.stats()["invalidations"], 1)
+
+    def test_timed_call_feeds_latency_percentiles(self):
+        for _ in range(3):
+            with self.pool.timed_call():
+                time.sleep(0.005)
+        stats = self.pool.stats()
+        self.assertEqual(stats["calls"], 3)
+        self.assertGreaterEqual(stats["call_p95_ms"], stats["call_p50_ms"])
+        self.assertGreater(stats["call_p50_ms"], 0)
+
+
+@override_settings(GEMINI_API_KEYS=",".join(KEYS), GEMINI_API_KEY="")
+class KeyRotationInvalidationTest(SimpleTestCase):
+    def setUp(self):
+        AIInvoiceProcessor._key_cooldowns.clear()
+        self.addCleanup(AIInvoiceProcessor._key_cooldowns.clear)
+        self.pool = GeminiClientPool(factory=FakeClient)
+        p = patch("billing.services.gemini_clients.client_pool", self.pool)
+        p.start()
+        self.addCleanup(p.stop)
+
+    def _rotate(self, error):
+        def fake(processor, key, *args):
+            self.pool.get(key)
+            if key == KEYS[0]:
+                raise AIInvoiceProcessingError(error)
+            return {"invoice_number": "X"}
+
+        with patch.object(AIInvoiceProcessor, "_extract_via_gemini", fake):
+            return AIInvoiceProcessor()._extract_with_rotation(b"img", "image/jpeg", "prompt")
+
+    def test_auth_failure_drops_the_keys_client(self):
+        self._rotate("403 PERMISSION_DENIED. API key not valid.")
+        self.assertEqual(self.pool.stats()["invalidations"], 1)
+        self.assertEqual(self.pool.stats()["clients"], 1)
+
+    def test_quota_failure_keeps_the_client(self):
+        self._rotate("429 RESOURCE_EXHAUSTED. Please retry in 30s.")
+        self.assertEqual(self.pool.stats()["invalidations"], 0)
+        self.assertEqual(self.pool.stats()["clients"], 2)
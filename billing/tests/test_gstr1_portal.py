@@ -5,12 +5,20 @@ the case the old gstr_export dropped entirely: inter-state B2C at or under
 the B2CL threshold, which must land in b2cs as an INTER row.
 """
 
+import io
 import json
+import tempfile
+import zipfile
 from decimal import Decimal as D
+from io import StringIO
+from pathlib import Path
 
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
-from billing.models import Customer, Invoice, LineItem
+from billing.models import Business, Customer, Invoice, LineItem
 from billing.tests.test_base import BaseAPITestCase
 
 
@@ -19,6 +27,9 @@ class Gstr1PortalJsonTest(BaseAPITestCase):
 
     def setUp(self):
         super().setUp()
+        self._parties()
+
+    def _parties(self):
         # Business GSTIN 22AAAAA0000A1Z5 → state 22. The base fixture pairs it
         # with state_name MAHARASHTRA; align the name so the B2C direction
         # fallback (state-name comparison) agrees with the GSTIN.
@@ -177,3 +188,87 @@ class Gstr1PortalJsonTest(BaseAPITestCase):
         resp = self.client.get(reverse("invoice-gstr1-portal-json"),
                                {"business_id": self.business.id})
         self.assertEqual(resp.status_code, 400)
+
+
+class Gstr1PortalBatchTest(BaseAPITestCase):
+    """Many businesses × months in one pass, as a ZIP of per-period files."""
+
+    _invoice = Gstr1PortalJsonTest._invoice
+    _get = Gstr1PortalJsonTest._get
+    _standard_fixture = Gstr1PortalJsonTest._standard_fixture
+    _parties = Gstr1PortalJsonTest._parties
+
+    def setUp(self):
+        super().setUp()
+        self._parties()
+        self.other = Business.objects.create(
+            workspace_id=1, name="Second Firm", gst_number="08EEEEE0000E1Z5", state_name="RAJASTHAN",
+        )
+        self.no_gstin = Business.objects.create(workspace_id=1, name="Unregistered Firm", gst_number="")
+
+    def _batch(self, **params):
+        return self.client.get(reverse("invoice-gstr1-portal-batch"), params)
+
+    def _open(self, resp):
+        self.assertEqual(resp.status_code, 200, getattr(resp, "data", None))
+        self.assertEqual(resp["Content-Type"], "application/zip")
+        zf = zipfile.ZipFile(io.BytesIO(resp.content))
+        return {name: json.loads(zf.read(name)) for name in zf.namelist()}
+
+    def test_each_file_matches_the_single_period_endpoint(self):
+        self._standard_fixture()
+        self._invoice(self.b2c_intra, "AUG-1", "7777", cgst="116.66", sgst="116.66", date="2026-08-02")
+        Invoice.objects.create(
+            workspace_id=1, business=self.other, customer=self.reg_intra, invoice_number="X-1",
+            invoice_date="2026-08-09", type_of_invoice="outward", total_amount=0,
+        )
+        files = self._open(self._batch(
+            business_ids=f"{self.business.id},{self.other.id}", from_month="2026-07", to_month="2026-08",
+        ))
+        self.assertEqual(sorted(files), [
+            "GSTR1_08EEEEE0000E1Z5_072026.json", "GSTR1_08EEEEE0000E1Z5_082026.json",
+            "GSTR1_22AAAAA0000A1Z5_072026.json", "GSTR1_22AAAAA0000A1Z5_082026.json", "meta.json",
+        ])
+        for month in (7, 8):
+            single = json.loads(json.dumps(self._get(month=month).data))
+            self.assertEqual(files[f"GSTR1_22AAAAA0000A1Z5_{month:02d}2026.json"], single["file"])
+            meta = next(p for p in files["meta.json"]["periods"] if p["fp"] == f"{month:02d}2026"
+                        and p["gstin"] == "22AAAAA0000A1Z5")
+            self.assertEqual({k: v for k, v in meta.items() if k != "filename"}, single["meta"])
+        other_aug = next(p for p in files["meta.json"]["periods"] if p["fp"] == "082026"
+                         and p["gstin"] == "08EEEEE0000E1Z5")
+        self.assertEqual(other_aug["skipped"], ["X-1 / 2026-08-09: no line items"])
+
+    def test_one_query_for_all_periods(self):
+        self._standard_fixture()
+        with CaptureQueriesContext(connection) as one:
+            self._batch(business_ids=str(self.business.id), from_month="2026-07")
+        with CaptureQueriesContext(connection) as six:
+            self._batch(business_ids=f"{self.business.id},{self.other.id}",
+                        from_month="2026-06", to_month="2026-08")
+        self.assertEqual(len(one), len(six))
+
+    def test_business_without_gstin_is_reported_not_fatal(self):
+        files = self._open(self._batch(from_month="2026-07"))
+        errors = files["meta.json"]["errors"]
+        self.assertEqual([e["business_id"] for e in errors], [self.no_gstin.id])
+        self.assertIn("GSTR1_22AAAAA0000A1Z5_072026.json", files)
+
+    def test_bad_months_are_400(self):
+        for params in (
+            {}, {"from_month": "2026-13"}, {"from_month": "2016-05"},
+            {"from_month": "2026-08", "to_month": "2026-07"},
+        ):
+            self.assertEqual(self._batch(**params).status_code, 400)
+
+    def test_management_command_writes_the_same_zip(self):
+        self._standard_fixture()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "q.zip"
+            call_command("export_gstr1_json", "--from", "2026-07", "--business", str(self.business.id),
+                         "-o", str(path), stdout=StringIO())
+            with zipfile.ZipFile(path) as zf:
+                self.assertEqual(
+                    json.loads(zf.read("GSTR1_22AAAAA0000A1Z5_072026.json")),
+                    json.loads(json.dumps(self._get().data["file"])),
+                )
@@ -0,0 +1,373 @@
+"""GSTR-2A import — suppliers resolved by GSTIN, idempotent re-imports,
+credit-note netting, and a query count that doesn't grow with the file.
+"""
+
+import io
+import os
+import shutil
+import tempfile
+from datetime import date
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from openpyxl import Workbook
+
+from billing.models import Business, Customer, Invoice, Job, LineItem
+from billing.services import excel, gstr2a_import
+from billing.services.gstr2a_import import import_file, import_files, merge_results, parse_file
+from billing.tests.test_base import BaseAPITestCase
+
+RECIPIENT = "22AAAAA0000A1Z5"
+INVOICE_HEADERS = [
+    "Supplier Name", "GSTIN", "State", "POS", "Invoice No", "Invoice Date",
+    "Invoice Value", "Taxable Value", "IGST", "CGST", "SGST", "CESS", "3B Status", "RC",
+]
+NOTE_HEADERS = [
+    "Supplier Name", "GSTIN", "Note No", "Note Date", "Note Type", "Note Value",
+    "Taxable Value", "IGST", "CGST", "SGST",
+]
+
+
+def half_tax(taxable):
+    return (Decimal(str(taxable)) * Decimal("0.015")).quantize(Decimal("0.01"))
+
+
+def invoice_value(taxable):
+    return Decimal(str(taxable)) + 2 * half_tax(taxable)
+
+
+def build_2a_file(invoices, notes=(), recipient=RECIPIENT):
+    """A 2A export as the GSTN portal lays it out: recipient on row 0,
+    column headers on row 2, data from row 3.
+
+    `invoices` are `(supplier, gstin, number, "DD/MM/YYYY", taxable)` tuples,
+    taxed intra-state at 3%; `notes` are `(supplier, gstin, number, value)`
+    credit notes.
+    """
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "invoice"
+    ws.append([f"TEST RECIPIENT ({recipient})"])
+    ws.append([])
+    ws.append(INVOICE_HEADERS)
+    for supplier, gstin, number, when, taxable in invoices:
+        half = half_tax(taxable)
+        ws.append([
+            supplier, gstin, "CHHATTISGARH", "CHHATTISGARH", number, when,
+            float(invoice_value(taxable)), float(taxable), 0, float(half), float(half), 0, "Filed", "No",
+        ])
+    ns = wb.create_sheet("note")
+    ns.append([f"TEST RECIPIENT ({recipient})"])
+    ns.append([])
+    ns.append(NOTE_HEADERS)
+    for supplier, gstin, number, value in notes:
+        ns.append([supplier, gstin, number, "15/05/2024", "Credit", float(value), 0, 0, 0, 0])
+    buf = io.BytesIO()
+    wb.save(buf)
+    buf.seek(0)
+    return buf
+
+
+def supplier_rows(n, suppliers=3):
+    return [
+        (f"SUPPLIER {i % suppliers}", f"22BBBBB{i % suppliers:04d}B1Z5", f"inv-{i}", "10/05/2024", 1000 + i)
+        for i in range(n)
+    ]
+
+
+class GSTR2AImportTest(TestCase):
+    def setUp(self):
+        self.business = Business.objects.create(name="2A Recipient", gst_number=RECIPIENT)
+        lookup = patch("billing.gstin.lookup", side_effect=RuntimeError("offline"))
+        lookup.start()
+        self.addCleanup(lookup.stop)
+
+    def test_creates_suppliers_invoices_and_one_line_each(self):
+        result = import_file(build_2a_file(supplier_rows(6)), filename="may.xlsx")
+        self.assertEqual(result.errors, [])
+        self.assertEqual(
+            (result.created_suppliers, result.created_invoices, result.created_line_items), (3, 6, 6)
+        )
+        invoice = Invoice.objects.get(invoice_number="inv-4")
+        self.assertEqual((invoice.type_of_invoice, invoice.invoice_date), ("inward", date(2024, 5, 10)))
+        line = LineItem.objects.get(invoice=invoice)
+        self.assertEqual((line.rate, line.cgst, line.amount), (Decimal("1004"), Decimal("15.06"), invoice.total_amount))
+
+    def test_reimport_is_idempotent_ignoring_number_case(self):
+        import_file(build_2a_file(supplier_rows(4)))
+        again = [(s, g, n.upper(), d, t) for s, g, n, d, t in supplier_rows(4)]
+        result = import_file(build_2a_file(again))
+        self.assertEqual((result.created_invoices, result.skipped_duplicates), (0, 4))
+        self.assertEqual(Invoice.objects.count(), 4)
+
+    def test_repeated_row_in_one_file_is_a_duplicate(self):
+        rows = supplier_rows(2)
+        result = import_file(build_2a_file(rows + rows[:1]))
+        self.assertEqual((result.created_invoices, result.skipped_duplicates), (2, 1))
+
+    def test_new_supplier_name_clash_gets_state_then_gstin_suffix(self):
+        Customer.objects.create(name="SKYMART", gst_number="08SKYMART000Z1Z5")
+        Customer.objects.create(name="SKYMART (CHHATTISGARH)", gst_number="27SKYMART000Z1Z5")
+        result = import_file(build_2a_file([
+            ("SKYMART", "22SKYMART000Z1Z5", "s-1", "10/05/2024", 500),
+            ("ACME", "22ACME000000Z1Z5", "a-1", "10/05/2024", 500),
+            ("ACME", "22ACME000001Z1Z5", "a-2", "10/05/2024", 500),
+        ]))
+        self.assertEqual(result.created_suppliers, 3)
+        self.assertEqual(
+            Customer.objects.get(gst_number="22SKYMART000Z1Z5").name, "SKYMART · 22SKYMART000Z1Z5"
+        )
+        self.assertEqual(Customer.objects.get(gst_number="22ACME000000Z1Z5").name, "ACME")
+        self.assertEqual(Customer.objects.get(gst_number="22ACME000001Z1Z5").name, "ACME (CHHATTISGARH)")
+
+    def test_credit_noted_invoice_is_skipped(self):
+        rows = supplier_rows(2)
+        result = import_file(build_2a_file(rows, notes=[(rows[1][0], rows[1][1], "CN-1", invoice_value(rows[1][4]))]))
+        self.assertEqual((result.created_invoices, result.skipped_credit_noted), (1, 1))
+
+    def test_dry_run_writes_nothing(self):
+        result = import_file(build_2a_file(supplier_rows(3)), dry_run=True)
+        self.assertEqual(result.created_invoices, 3)
+        self.assertEqual((Invoice.objects.count(), Customer.objects.count()), (0, 0))
+
+    def test_query_count_is_constant_in_file_size(self):
+        import_file(build_2a_file(supplier_rows(3)))  # suppliers + month's rollup exist
+        counts = []
+        # SQLite caps parameters per statement; 40 rows stays in one insert batch.
+        for n, month in ((3, "06"), (40, "07")):
+            rows = [(s, g, f"{month}-{i}", f"10/{month}/2024", t) for i, (s, g, _, _, t) in enumerate(supplier_rows(n))]
+            Invoice.objects.create(  # warm the month's rollup row
+                business=self.business, customer=Customer.objects.first(), invoice_number=f"w{month}",
+                invoice_date=f"2024-{month}-01", type_of_invoice="inward",
+            )
+            with CaptureQueriesContext(connection) as ctx:
+                result = import_file(build_2a_file(rows))
+            self.assertEqual(result.created_invoices, n)
+            counts.append(len(ctx))
+        self.assertEqual(counts[0], counts[1])
+
+
+class GSTR2AParseTest(TestCase):
+    def test_readers_agree_with_the_pandas_fallback(self):
+        rows = supplier_rows(5)
+        buf = build_2a_file(rows, notes=[(rows[2][0], rows[2][1], "CN-1", invoice_value(rows[2][4]))])
+        fast = parse_file(buf, engines=["openpyxl"])
+        slow = parse_file(buf, engines=["pandas"])
+        self.assertEqual(fast.parse_errors, [])
+        self.assertEqual(
+            (fast.recipient_gstin, fast.parsed_rows, fast.parsed_notes, fast.cancelled_invoice_keys),
+            (slow.recipient_gstin, slow.parsed_rows, slow.parsed_notes, slow.cancelled_invoice_keys),
+        )
+        self.assertEqual(fast.parsed_rows[1].invoice_value, invoice_value(1001))
+
+    def test_reads_only_the_requested_sheets(self):
+        buf = build_2a_file(supplier_rows(1))
+        book = excel.read_sheets(buf, ("invoice",), engines=["openpyxl"])
+        self.assertEqual(book.sheet_names, ["invoice", "note"])
+        self.assertEqual(list(book.sheets), ["invoice"])
+
+    def test_cell_types_are_coerced_per_column(self):
+        wb = Workbook()
+        ws = wb.active
+        ws.title = "invoice"
+        ws.append([f"TEST RECIPIENT ({RECIPIENT})"])
+        ws.append([])
+        ws.append(INVOICE_HEADERS)
+        ws.append(["A", "22bbbbb0000b1z5", "", "", 1234, date(2024, 5, 3), 103, 100, 0, 1.5, 1.5, None, "Filed", "yes"])
+        ws.append(["B", "22BBBBB0001B1Z5", "", "", "x-2", "31-05-2024", "n/a", 100, 0, 0, 0, 0, "Not Filed", "No"])
+        ws.append(["C", "22BBBBB0002B1Z5", "", "", "x-3", "someday", 103, 100, 0, 1.5, 1.5, 0, "Filed", "No"])
+        buf = io.BytesIO()
+        wb.save(buf)
+        preview = parse_file(buf)
+        first, second = preview.parsed_rows
+        self.assertEqual(
+            (first.supplier_gstin, first.invoice_number, first.invoice_date, first.cgst, first.cess, first.reverse_charge),
+            ("22BBBBB0000B1Z5", "1234", date(2024, 5, 3), Decimal("1.5"), Decimal("0"), True),
+        )
+        self.assertEqual((second.invoice_date, second.invoice_value, second.filed_3b), (date(2024, 5, 31), Decimal("0"), False))
+        self.assertEqual(preview.parse_errors, ["Row 6: unparseable invoice date 'someday'"])
+
+    def test_unreadable_file_is_reported(self):
+        preview = parse_file(io.BytesIO(b"not a workbook"))
+        self.assertEqual(preview.parsed_rows, [])
+        self.assertTrue(preview.parse_errors[0].startswith("Could not open file"))
+
+
+def inv_row(number, value, when=date(2024, 5, 10), gstin="22BBBBB0000B1Z5"):
+    value = Decimal(value)
+    return gstr2a_import.GSTR2ARow(
+        supplier_name="AMAZON", supplier_gstin=gstin, supplier_state="", pos="",
+        invoice_number=number, invoice_date=when, invoice_value=value, taxable_value=value,
+        igst=Decimal("0"), cgst=Decimal("0"), sgst=Decimal("0"), cess=Decimal("0"),
+        filed_3b=True, reverse_charge=False,
+    )
+
+
+def credit_note(number, value, when=date(2024, 5, 20), gstin="22BBBBB0000B1Z5", kind="Credit"):
+    value = Decimal(value)
+    return gstr2a_import.GSTR2ANote(
+        supplier_name="AMAZON", supplier_gstin=gstin, note_number=number, note_date=when,
+        note_type=kind, note_value=value, taxable_value=value,
+        igst=Decimal("0"), cgst=Decimal("0"), sgst=Decimal("0"),
+    )
+
+
+class CreditNoteMatchTest(TestCase):
+    def _table(self, invoices, notes):
+        return [
+            (m.note.note_number, m.status, m.invoice.invoice_number if m.invoice else None)
+            for m in gstr2a_import._match_credit_notes(invoices, notes)
+        ]
+
+    def test_exact_matches_pair_one_to_one_in_file_order(self):
+        invoices = [inv_row("A", "500.00"), inv_row("B", "500.00"), inv_row("C", "999.99")]
+        notes = [credit_note("CN1", "500"), credit_note("CN2", "500"), credit_note("CN3", "500")]
+        self.assertEqual(self._table(invoices, notes), [
+            ("CN1", "exact", "A"), ("CN2", "exact", "B"), ("CN3", "partial", "C"),
+        ])
+
+    def test_notes_adding_up_to_an_invoice_net_it(self):
+        invoices = [inv_row("ORDER-1", "1500.00"), inv_row("ORDER-2", "4000.00")]
+        notes = [credit_note("R1", "1000.00"), credit_note("R2", "499.40"), credit_note("R3", "900")]
+        self.assertEqual(self._table(invoices, notes), [
+            ("R1", "netted", "ORDER-1"), ("R2", "netted", "ORDER-1"), ("R3", "partial", "ORDER-2"),
+        ])
+        # R2 leaves ₹0.60 on ORDER-1 — inside the rupee tolerance, 10 days out.
+        self.assertEqual(gstr2a_import._match_credit_notes(invoices, notes)[1].score, 0.983)
+
+    def test_candidates_respect_supplier_and_date_window(self):
+        invoices = [
+            inv_row("OLD", "5000", when=date(2023, 1, 5)),
+            inv_row("LATER", "5000", when=date(2024, 6, 1)),
+            inv_row("OTHER", "5000", gstin="27ZZZZZ0000Z1Z5"),
+        ]
+        notes = [credit_note("CN1", "100", when=date(2024, 5, 20)), credit_note("DN1", "100", kind="Debit")]
+        self.assertEqual(self._table(invoices, notes), [("CN1", "unmatched", None), ("DN1", "debit", None)])
+
+    def test_import_reports_best_candidate_for_partial_notes(self):
+        Business.objects.create(name="2A Recipient", gst_number=RECIPIENT)
+        rows = supplier_rows(2)
+        with patch("billing.gstin.lookup", side_effect=RuntimeError("offline")):
+            result = import_file(build_2a_file(rows, notes=[(rows[0][0], rows[0][1], "CN-9", 100)]), dry_run=True)
+        self.assertEqual(len(result.partial_credit_notes), 1)
+        self.assertIn("CN-9", result.partial_credit_notes[0])
+        self.assertIn("best candidate inv-0 (2024-05-10)", result.partial_credit_notes[0])
+
+
+def two_files():
+    """May and June; June repeats one May invoice and adds a new supplier."""
+    may = supplier_rows(4)
+    june = [may[0], ("NEW SUPPLIER", "22CCCCC0000C1Z5", "n-1", "10/06/2024", 700)]
+    return build_2a_file(may), build_2a_file(june)
+
+
+class GSTR2AMultiFileImportTest(TestCase):
+    def setUp(self):
+        self.business = Business.objects.create(name="2A Recipient", gst_number=RECIPIENT)
+        lookup = patch("billing.gstin.lookup", side_effect=RuntimeError("offline"))
+        lookup.start()
+        self.addCleanup(lookup.stop)
+
+    def _summary(self, results):
+        return [
+            (r.filename, r.created_invoices, r.created_suppliers, r.skipped_duplicates)
+            for r in results
+        ]
+
+    def test_pooled_parse_matches_sequential_import(self):
+        expected = [("may.xlsx", 4, 3, 0), ("june.xlsx", 1, 1, 1)]
+        seen = []
+        with patch("billing.services.gstr2a_import.os.cpu_count", return_value=2), \
+                patch("billing.services.gstr2a_import._parsed_in_pool", wraps=gstr2a_import._parsed_in_pool) as pool:
+            results = import_files(
+                two_files(), jobs=2, filenames=["may.xlsx", "june.xlsx"], on_result=seen.append
+            )
+        self.assertEqual(pool.call_args.args[2], 2)
+        self.assertEqual(self._summary(results), expected)
+        self.assertEqual(seen, results)
+        self.assertEqual(Invoice.objects.count(), 5)
+
+        Invoice.objects.all().delete()
+        Customer.objects.all().delete()
+        sequential = import_files(two_files(), filenames=["may.xlsx", "june.xlsx"])
+        self.assertEqual(self._summary(sequential), expected)
+
+    def test_merge_results_sums_counters_in_file_order(self):
+        results = import_files(two_files(), filenames=["may.xlsx", "june.xlsx"])
+        total = merge_results(results)
+        self.assertEqual(
+            (total.created_invoices, total.created_line_items, total.created_suppliers, total.skipped_duplicates),
+            (5, 5, 4, 1),
+        )
+        self.assertEqual(total.created_detail, results[0].created_detail + results[1].created_detail)
+
+    def test_command_jobs_option_reports_merged_total(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        paths = []
+        for name, buf in zip(("may.xlsx", "june.xlsx"), two_files(), strict=True):
+            paths.append(os.path.join(tmp, name))
+            with open(paths[-1], "wb") as fh:
+                fh.write(buf.getvalue())
+        out = io.StringIO()
+        call_command("import_gstr2a", *paths, "--jobs", "2", stdout=out)
+        self.assertIn("TOTAL: 5 invoices  created, 1 dedup'd", out.getvalue())
+        self.assertLess(out.getvalue().index("may.xlsx"), out.getvalue().index("june.xlsx"))
+
+
+_MEDIA = tempfile.mkdtemp(prefix="gstr2a_test_")
+
+
+@override_settings(MEDIA_ROOT=_MEDIA)
+class GSTR2AImportAPITest(BaseAPITestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(_MEDIA, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+        lookup = patch("billing.gstin.lookup", side_effect=RuntimeError("offline"))
+        lookup.start()
+        self.addCleanup(lookup.stop)
+
+    def _uploads(self):
+        return [
+            SimpleUploadedFile(name, buf.getvalue())
+            for name, buf in zip(("may.xlsx", "june.xlsx"), two_files(), strict=True)
+        ]
+
+    def test_import_returns_per_file_results_and_total(self):
+        before = Invoice.objects.count()
+        resp = self.client.post(reverse("gstr2a-import"), {"files": self._uploads(), "jobs": "2"})
+        self.assertEqual(resp.status_code, 200, resp.data)
+        self.assertEqual([f["filename"] for f in resp.data["files"]], ["may.xlsx", "june.xlsx"])
+        self.assertEqual((resp.data["total"]["created_invoices"], resp.data["total"]["skipped_duplicates"]), (5, 1))
+        self.assertEqual(Invoice.objects.count(), before + 5)
+
+    def test_dry_run_and_validation(self):
+        resp = self.client.post(reverse("gstr2a-import"), {"files": self._uploads(), "dry_run": "1"})
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.data["dry_run"])
+        self.assertFalse(Invoice.objects.filter(type_of_invoice="inward").exists())
+        self.assertEqual(self.client.post(reverse("gstr2a-import"), {}).status_code, 400)
+        bad = self.client.post(reverse("gstr2a-import"), {"files": self._uploads(), "jobs": "x"})
+        self.assertEqual(bad.status_code, 400)
+
+    def test_async_queues_job_with_same_result(self):
+        from billing.services import jobs
+
+        resp = self.client.post(reverse("gstr2a-import"), {"files": self._uploads(), "jobs": "2", "async": "1"})
+        self.assertEqual(resp.status_code, 202)
+        self.assertEqual(Job.objects.get(pk=resp.data["id"]).params["jobs"], 2)
+        self.assertEqual(jobs.run_pending(), 1)
+        job = Job.objects.get(pk=resp.data["id"])
+        self.assertEqual(job.status, Job.STATUS_SUCCEEDED, job.error)
+        self.assertEqual([f["filename"] for f in job.result["files"]], ["may.xlsx", "june.xlsx"])
+        self.assertEqual(job.result["total"]["created_invoices"], 5)
@@ -5,10 +5,14 @@ These only bite at filing time, which is the worst moment to discover them.
 
 from decimal import Decimal as D
 
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from billing.constants import B2CL_THRESHOLD, INVOICE_TYPE_INWARD, INVOICE_TYPE_OUTWARD
 from billing.models import Customer, Invoice, LineItem
+from billing.services import gstr_export
+from billing.tax_rules import is_interstate
 from billing.tests.test_base import BaseAPITestCase
 
 
@@ -168,3 +172,117 @@ class ApiNotFoundTest(BaseAPITestCase):
     def test_frontend_routes_still_serve_the_shell(self):
         resp = self.client.get("/billing/invoice/list")
         self.assertEqual(resp.status_code, 200)
+
+
+class GSTRExportEngineTest(BaseAPITestCase):
+    """Section contents and the fixed query count of the set-based export."""
+
+    def setUp(self):
+        super().setUp()
+        self.local_b2c = Customer.objects.create(
+            workspace_id=1, name="WALK-IN LOCAL", gst_number="", state_name="MAHARASHTRA",
+        )
+        self.far_b2c = Customer.objects.create(
+            workspace_id=1, name="WALK-IN FAR", gst_number=None, state_name="KERALA",
+        )
+
+    def _mk(self, customer, number, lines, inv_type=INVOICE_TYPE_OUTWARD, inv_date="2026-05-01"):
+        inv = Invoice.objects.create(
+            workspace_id=1, business=self.business, customer=customer,
+            invoice_number=number, invoice_date=inv_date, type_of_invoice=inv_type, total_amount=0,
+        )
+        for hsn, rate, taxable, igst in lines:
+            taxable, tax = D(taxable), D(taxable) * D(rate)
+            LineItem.objects.create(
+                workspace_id=1, customer=customer, invoice=inv, product_name="Gold",
+                hsn_code=hsn, gst_tax_rate=D(rate), quantity=D("1"), rate=taxable,
+                cgst=D("0") if igst else tax / 2, sgst=D("0") if igst else tax / 2,
+                igst=tax if igst else D("0"), amount=taxable + tax, unit="gms",
+            )
+        inv.refresh_from_db()
+        return inv
+
+    def _export(self):
+        resp = self.client.get(reverse("invoice-gstr-export"))
+        self.assertEqual(resp.status_code, 200)
+        return resp.data
+
+    def test_sections(self):
+        b2b = self._mk(self.customer, "B2B-1", [("711319", "0.03", "1000", False), ("7113", "0.05", "200", False)])
+        self._mk(self.local_b2c, "B2CS-1", [("711319", "0.03", "500", False), ("", "0.03", "100", False)],
+                 inv_date="2026-05-02")
+        self._mk(self.far_b2c, "B2CL-1", [("711319", "0.03", "200000", True)])
+        self._mk(self.customer, "PUR-1", [("711319", "0.03", "400", False)], inv_type=INVOICE_TYPE_INWARD)
+        data = self._export()
+        gstr1 = data["gstr1"]
+
+        ctins = {row["ctin"]: row["inv"] for row in gstr1["b2b"]}
+        self.assertEqual([i["inum"] for i in ctins["22BBBBB0000B1Z5"]], ["B2B-1", "INV-001"])
+        b2b_items = ctins["22BBBBB0000B1Z5"][0]["itms"]
+        self.assertEqual([i["num"] for i in b2b_items], list(b2b.lineitem_set.order_by("id").values_list("id", flat=True)))
+        self.assertEqual(b2b_items[1]["itm_det"], {"txval": 200.0, "rt": 5.0, "camt": 5.0, "samt": 5.0, "iamt": 0.0})
+
+        self.assertEqual(gstr1["b2cs"], [
+            {"pos": "22", "rt": 3.0, "txval": 600.0, "camt": 9.0, "samt": 9.0, "typ": "OE"},
+        ])
+        self.assertEqual([(r["pos"], r["inv"][0]["inum"]) for r in gstr1["b2cl"]], [("32", "B2CL-1")])
+        self.assertEqual(gstr1["b2cl"][0]["inv"][0]["itms"][0]["itm_det"]["iamt"], 6000.0)
+
+        hsn = {row["hsn_sc"]: row for row in gstr1["hsn"]["data"]}
+        self.assertEqual(sorted(hsn), ["0", "7113", "711319"])
+        self.assertEqual(hsn["711319"]["txval"], 1000 + 1000 + 500 + 200000)
+        self.assertEqual(hsn["711319"]["qty"], 4.0)
+
+        self.assertEqual(data["gstr3b"]["sup_details"]["osup_det"]["txval"], 202800.0)
+        self.assertEqual(data["gstr3b"]["itc_elg"]["itc_avl"][0]["camt"], 6.0)
+        self.assertEqual(data["gstr2b"]["inward_invoices"], [{
+            "invoice_number": "PUR-1", "invoice_date": "01-05-2026", "supplier_name": "Test Customer",
+            "supplier_gstin": "22BBBBB0000B1Z5", "taxable_value": 400.0, "tax_amount": 12.0, "total": 412.0,
+        }])
+
+    def test_taxable_values_keep_sub_paisa_precision(self):
+        # quantity × rate carries six places; Invoice.taxable_total keeps three.
+        for number, inv_type in (("OUT-6DP", INVOICE_TYPE_OUTWARD), ("IN-6DP", INVOICE_TYPE_INWARD)):
+            inv = Invoice.objects.create(
+                workspace_id=1, business=self.business, customer=self.customer,
+                invoice_number=number, invoice_date="2026-05-01", type_of_invoice=inv_type,
+            )
+            LineItem.objects.create(
+                workspace_id=1, customer=self.customer, invoice=inv, product_name="Gold",
+                hsn_code="711319", gst_tax_rate=D("0.03"), quantity=D("2.345"), rate=D("36.711"),
+                amount=D("86.087"), unit="gms",
+            )
+        data = self._export()
+        self.assertAlmostEqual(data["gstr3b"]["sup_details"]["osup_det"]["txval"], 1086.087295, places=6)
+        self.assertAlmostEqual(data["gstr2b"]["inward_invoices"][0]["taxable_value"], 86.087295, places=6)
+
+    def test_query_count_does_not_grow_with_invoices(self):
+        self._mk(self.local_b2c, "S-0", [("711319", "0.03", "100", False)])
+        with CaptureQueriesContext(connection) as few:
+            self._export()
+        for n in range(1, 6):
+            self._mk(self.customer, f"R-{n}", [("711319", "0.03", "100", False)] * 2)
+            self._mk(self.far_b2c, f"F-{n}", [("711319", "0.03", "150000", True)])
+        with CaptureQueriesContext(connection) as many:
+            data = self._export()
+        self.assertEqual(len(data["gstr1"]["b2cl"]), 5)
+        self.assertEqual(len(few), len(many))
+
+    def test_sql_place_of_supply_matches_tax_rules(self):
+        parties = [
+            ("22BBBBB0000B1Z5", "MAHARASHTRA"), ("27CCCCC0000C1Z5", ""), ("", "KERALA"),
+            (None, " chhattisgarh "), ("", ""), ("  ", None),
+        ]
+        for n, (gst, state) in enumerate(parties):
+            customer = Customer.objects.create(workspace_id=1, name=f"P{n}", gst_number=gst, state_name=state)
+            Invoice.objects.create(
+                workspace_id=1, business=self.business, customer=customer,
+                invoice_number=f"P-{n}", invoice_date="2026-05-01", total_amount=0,
+            )
+        classified = gstr_export._classified(Invoice.objects.all())
+        inter = set(classified.filter(gstr_export.INTERSTATE).values_list("id", flat=True))
+        registered = set(classified.filter(gstr_export.REGISTERED).values_list("id", flat=True))
+        for inv in Invoice.objects.select_related("business", "customer"):
+            gst = (inv.customer.gst_number or "").strip()
+            self.assertEqual(inv.id in registered, len(gst) >= 15, inv.invoice_number)
+            self.assertEqual(inv.id in inter, is_interstate(inv.business, inv.customer), inv.invoice_number)
@@ -0,0 +1,75 @@
+"""Image normalisation — the fast paths in billing/services/images.py keep
+the AI/preview contract: JPEG out, longest side <= MAX_IMAGE_DIM.
+"""
+
+import io
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, override_settings
+from PIL import Image
+
+from billing.services import images
+from billing.utils import AIInvoiceProcessingError, AIInvoiceProcessor
+
+
+def _encode(size, fmt="JPEG", mode="RGB", **kw):
+    buf = io.BytesIO()
+    Image.new(mode, size, "white").save(buf, format=fmt, **kw)
+    return buf.getvalue()
+
+
+class NormalizeImageTest(SimpleTestCase):
+    def setUp(self):
+        images._recent.clear()
+
+    def _open(self, data):
+        return Image.open(io.BytesIO(data))
+
+    def test_small_baseline_jpeg_passes_through(self):
+        data = _encode((800, 600))
+        self.assertIs(images.normalize(data), data)
+
+    def test_large_jpeg_is_downscaled(self):
+        out = images.normalize(_encode((4032, 3024), quality=90))
+        img = self._open(out)
+        self.assertEqual((img.format, img.size), ("JPEG", (1568, 1176)))
+
+    def test_progressive_and_non_jpeg_inputs_are_reencoded(self):
+        for data in (_encode((800, 600), progressive=True), _encode((300, 200), "PNG", "RGBA")):
+            out = images.normalize(data)
+            self.assertNotEqual(out, data)
+            img = self._open(out)
+            self.assertEqual((img.format, img.mode, img.size[0] <= 1568), ("JPEG", "RGB", True))
+
+    def test_repeat_input_reuses_the_first_decode(self):
+        data = _encode((2000, 1000), "PNG")
+        with patch.object(images, "_normalize", wraps=images._normalize) as spy:
+            first = images.normalize(data)
+            self.assertIs(images.normalize(data), first)
+        self.assertEqual(spy.call_count, 1)
+
+    def test_undecodable_bytes_raise_the_processor_error(self):
+        with self.assertRaisesMessage(AIInvoiceProcessingError, "Could not decode image"):
+            AIInvoiceProcessor._normalize_image(b"%PDF-1.4", "application/pdf")
+
+
+@override_settings(GEMINI_API_KEYS="AIzaKeyNumberOne-0001", GEMINI_API_KEY="", AI_IMAGE_WORKERS=2)
+class NormalizePoolTest(SimpleTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        images.shutdown_pool()
+        super().tearDownClass()
+
+    def test_batch_over_the_pool_keeps_order_and_reports_bad_uploads(self):
+        uploads = [
+            (0, _encode((3136, 2000)), "image/jpeg"),
+            (1, b"not an image", "image/jpeg"),
+            (2, _encode((500, 400), "PNG"), "image/png"),
+        ]
+        with patch.object(images, "POOL_MIN_BATCH_BYTES", 0):
+            self.assertTrue(images.use_pool([raw for _, raw, _ in uploads]))
+            results = AIInvoiceProcessor()._normalize_uploads(uploads)
+        self.assertEqual([pos for pos, _ in results], [0, 1, 2])
+        self.assertEqual(Image.open(io.BytesIO(results[0][1][0])).size, (1568, 1000))
+        self.assertIsInstance(results[1][1], AIInvoiceProcessingError)
+        self.assertEqual(results[2][1][1], "image/jpeg")
@@ -0,0 +1,90 @@
+"""Multi-select bulk actions on /invoices/: delete, print, export."""
+
+import csv
+import io
+from decimal import Decimal
+
+from django.contrib.auth.models import Group, User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from billing.models import AuditLog, Invoice, LineItem
+from billing.services import invoice_totals, rollups
+from billing.tests.test_base import BaseAPITestCase, line_payload
+
+
+class InvoiceBulkActionsTest(BaseAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.a = self.post_invoice("B-1", "2026-05-10", [line_payload(), line_payload(qty="2")])
+        self.b = self.post_invoice("B-2", "2026-05-11", [line_payload(rate="250")])
+
+    def post(self, name, body):
+        return self.client.post(reverse(f"invoice-{name}"), body, format="json")
+
+    def test_bulk_print_matches_single_print(self):
+        resp = self.post("bulk-print", {"ids": [self.a.pk, self.b.pk]})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data["count"], 2)
+        by_id = {p["invoice"]["id"]: p for p in resp.data["invoices"]}
+        for invoice in (self.a, self.b):
+            single = self.client.get(reverse("invoice-print", args=[invoice.pk])).data
+            # SQLite's SUM drops the column scale ("-0" vs "-0.000").
+            for payload in (by_id[invoice.pk], single):
+                payload["round_off"] = Decimal(payload["round_off"])
+            self.assertEqual(by_id[invoice.pk], single)
+        self.assertEqual(
+            AuditLog.objects.filter(action="printed", entity_id__in=[self.a.pk, self.b.pk]).count(), 4,
+        )
+
+    def test_bulk_print_query_count_is_flat(self):
+        with CaptureQueriesContext(connection) as two:
+            self.post("bulk-print", {"ids": [self.a.pk, self.b.pk]})
+        more = [self.post_invoice(f"B-{n}", "2026-05-12", [line_payload()]).pk for n in range(3, 8)]
+        with CaptureQueriesContext(connection) as seven:
+            resp = self.post("bulk-print", {"ids": [self.a.pk, self.b.pk, *more]})
+        self.assertEqual(resp.data["count"], 7)
+        self.assertEqual(len(two), len(seven))
+
+    def test_bulk_delete_removes_invoices_lines_and_audits_each(self):
+        resp = self.post("bulk-delete", {"ids": [self.a.pk, self.b.pk]})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data["deleted"], 2)
+        self.assertFalse(Invoice.objects.filter(pk__in=[self.a.pk, self.b.pk]).exists())
+        self.assertFalse(LineItem.objects.filter(invoice_id__in=[self.a.pk, self.b.pk]).exists())
+        logs = AuditLog.objects.filter(action="deleted", entity="invoice")
+        self.assertEqual(sorted(logs.values_list("entity_id", flat=True)), sorted([self.a.pk, self.b.pk]))
+        self.assertEqual(logs.get(entity_id=self.a.pk).snapshot["invoice_number"], "B-1")
+        self.assertTrue(Invoice.objects.filter(pk=self.invoice.pk).exists())
+        self.assertEqual(rollups.check(), [])
+        self.assertEqual(invoice_totals.check(), [])
+
+    def test_bulk_delete_is_admin_only(self):
+        editor = User.objects.create_user(username="editor", password="x")
+        editor.groups.add(Group.objects.get_or_create(name="editor")[0])
+        self.client.force_authenticate(user=editor)
+        resp = self.post("bulk-delete", {"ids": [self.a.pk]})
+        self.assertEqual(resp.status_code, 403)
+        self.assertTrue(Invoice.objects.filter(pk=self.a.pk).exists())
+
+    def test_all_matching_uses_the_list_filters(self):
+        url = reverse("invoice-bulk-print") + "?invoice_number=B-2"
+        resp = self.client.post(url, {"all_matching": True}, format="json")
+        self.assertEqual([p["invoice"]["invoice_number"] for p in resp.data["invoices"]], ["B-2"])
+
+    def test_selection_is_required(self):
+        for body in ({}, {"ids": "1,2"}, {"all_matching": False}):
+            self.assertEqual(self.post("bulk-delete", body).status_code, 400)
+        self.assertEqual(Invoice.objects.count(), 3)
+
+    def test_bulk_export_csv(self):
+        resp = self.post("bulk-export", {"ids": [self.a.pk]})
+        self.assertEqual(resp.status_code, 200)
+        rows = list(csv.reader(io.StringIO(resp.content.decode())))
+        self.assertEqual(rows[0][0], "Invoice Number")
+        self.assertEqual(rows[1], [
+            "B-1", "2026-05-10", "Test Customer", "22BBBBB0000B1Z5", "Test Business", "outward",
+            "300.00", "4.50", "4.50", "0.00", "309.00", "2",
+        ])
+        self.assertTrue(AuditLog.objects.filter(action="exported", entity="invoice").exists())
@@ -0,0 +1,87 @@
+"""Denormalised line totals on Invoice stay equal to their line items across
+write paths, and the list endpoints read them instead of LineItem.
+
+Write-path tests end with `invoice_totals.check()` — the checker behind
+`rebuild_invoice_totals --check` — returning no drift.
+"""
+
+from decimal import Decimal as D
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from billing.constants import INVOICE_TYPE_INWARD
+from billing.models import Invoice, LineItem
+from billing.services import invoice_totals
+from billing.tests.test_base import BaseAPITestCase, line_payload
+
+
+class InvoiceLineTotalsTest(BaseAPITestCase):
+    def assertConsistent(self):
+        self.assertEqual(invoice_totals.check(), [])
+
+    def totals(self, invoice):
+        return Invoice.objects.values_list(*Invoice.LINE_TOTAL_FIELDS).get(pk=invoice.pk)
+
+    def test_fixture_invoice_is_filled_by_signals(self):
+        self.assertEqual(self.totals(self.invoice), (D("1000"), D("90"), D("90"), D("0"), 1))
+        self.assertConsistent()
+
+    def test_api_create_and_update_line_items(self):
+        inv = self.post_invoice("T-1", "2026-05-10", [line_payload(), line_payload(qty="2")])
+        self.assertEqual(self.totals(inv), (D("300"), D("4.5"), D("4.5"), D("0"), 2))
+        resp = self.client.post(
+            reverse("invoice-update-line-items", args=[inv.pk]),
+            {"line_items": [line_payload(rate="50")]}, format="json",
+        )
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data["line_count"], 1)
+        self.assertEqual(self.totals(inv), (D("50"), D("0.75"), D("0.75"), D("0"), 1))
+        self.assertConsistent()
+
+    def test_one_off_line_writes_and_stale_instance_saves(self):
+        stale = Invoice.objects.get(pk=self.invoice.pk)
+        LineItem.objects.create(
+            invoice=self.invoice, customer=self.customer, product_name="Chain",
+            quantity=D("2"), rate=D("100"), amount=D("206"), cgst=D("3"), sgst=D("3"),
+        )
+        self.assertEqual(self.invoice.line_count, 2)  # the held instance follows along
+        stale.invoice_number = "INV-001A"
+        stale.save()
+        self.assertEqual(self.totals(self.invoice)[4], 2)
+        self.line_item.delete()
+        self.assertEqual(self.totals(self.invoice), (D("200"), D("3"), D("3"), D("0"), 1))
+        self.assertConsistent()
+
+    def test_invoice_list_reads_stored_totals(self):
+        self.post_invoice("T-2", "2026-05-10", [line_payload(), line_payload()])
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(reverse("invoice-list"), {"invoice_number": "T-2"})
+        row = resp.data["results"][0]
+        self.assertEqual((D(row["total_tax"]), row["line_item_count"]), (D("6.00"), 2))
+        self.assertFalse([q for q in ctx.captured_queries if "billing_lineitem" in q["sql"]])
+
+        empty = self.client.get(reverse("invoice-list"), {"empty": "1"})
+        self.assertEqual(empty.data["count"], 0)
+
+    def test_inward_register_reads_stored_totals(self):
+        self.post_invoice("T-3", "2026-05-10", [line_payload(rate="1000")], inv_type=INVOICE_TYPE_INWARD)
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(reverse("inward-bill-list"))
+        row = resp.data["results"][0]
+        self.assertEqual((row["taxable"], row["cgst"], row["sgst"], row["igst"]), ("1000.00", "15.00", "15.00", "0.00"))
+        self.assertFalse([q for q in ctx.captured_queries if "billing_lineitem" in q["sql"]])
+
+    def test_rebuild_command_check_and_repair(self):
+        Invoice.objects.filter(pk=self.invoice.pk).update(cgst_total=D("999"), line_count=7)
+        with self.assertRaises(CommandError):
+            call_command("rebuild_invoice_totals", "--check", stdout=StringIO())
+        call_command("rebuild_invoice_totals", stdout=StringIO())
+        out = StringIO()
+        call_command("rebuild_invoice_totals", "--check", stdout=out)
+        self.assertIn("consistent", out.getvalue())
+        self.assertConsistent()
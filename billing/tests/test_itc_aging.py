@@ -0,0 +1,110 @@
+"""ITC aging (Sec 16(4)): SQL buckets agree with the per-invoice rule, and
+the standalone endpoint pages them."""
+
+from datetime import date, timedelta
+from decimal import Decimal as D
+
+from django.urls import reverse
+
+from billing.constants import INVOICE_TYPE_INWARD
+from billing.models import Invoice, LineItem
+from billing.services import itc_aging
+from billing.tests.test_base import BaseAPITestCase
+
+
+def python_bucket(invoice_date, today):
+    """The loop gst_summary used to run per invoice."""
+    days_left = (itc_aging.cutoff_for(invoice_date) - today).days
+    if days_left < 0:
+        return "expired"
+    if days_left <= 60:
+        return "fresh"
+    if days_left <= 180:
+        return "warning"
+    return "stale"
+
+
+class ItcAgingBoundaryTest(BaseAPITestCase):
+    def test_cutoff_is_nov_30_of_the_following_fy(self):
+        self.assertEqual(itc_aging.cutoff_for(date(2025, 4, 1)), date(2026, 11, 30))
+        self.assertEqual(itc_aging.cutoff_for(date(2026, 3, 31)), date(2026, 11, 30))
+
+    def test_date_ranges_match_the_per_invoice_rule(self):
+        days = [date(2022, 1, 1) + timedelta(days=n) for n in range(0, 1800, 7)]
+        for today in (date(2026, 10, 17), date(2026, 11, 30), date(2026, 12, 1),
+                      date(2027, 3, 31), date(2027, 6, 3), date(2027, 10, 2)):
+            for d in days:
+                expected = python_bucket(d, today)
+                hits = [b for b in itc_aging.BUCKETS if self._match(itc_aging.bucket_q(b, today), d)]
+                self.assertEqual(hits, [expected], (today, d))
+
+    def _match(self, q, d):
+        # Evaluate the invoice_date range Q against one date in Python.
+        for child in q.children:
+            if isinstance(child, tuple):
+                lookup, value = child
+                if lookup == "invoice_date__lt" and not d < value:
+                    return False
+                if lookup == "invoice_date__gte" and not d >= value:
+                    return False
+            elif not self._match(child, d):
+                return False
+        return True
+
+
+class ItcAgingEndpointTest(BaseAPITestCase):
+    def setUp(self):
+        super().setUp()
+        today = date.today()
+        self.today = today
+        # Three years back is always forfeit; today's invoice is always 180+
+        # days out (the nearest cutoff from Mar 31 is Nov 30, 244 days).
+        self.expired = self._inward("OLD-1", today.replace(year=today.year - 3, day=1), "1000")
+        self.stale = self._inward("NEW-1", today, "2000")
+        self.empty = Invoice.objects.create(
+            business=self.business, customer=self.customer, invoice_number="NEW-2",
+            invoice_date=today, type_of_invoice=INVOICE_TYPE_INWARD,
+        )
+
+    def _inward(self, number, inv_date, taxable):
+        inv = Invoice.objects.create(
+            business=self.business, customer=self.customer, invoice_number=number,
+            invoice_date=inv_date, type_of_invoice=INVOICE_TYPE_INWARD,
+        )
+        tax = D(taxable) * D("0.015")
+        LineItem.objects.create(
+            invoice=inv, customer=self.customer, product_name="Gold", hsn_code="7113",
+            gst_tax_rate=D("0.03"), quantity=D("1"), rate=D(taxable),
+            cgst=tax, sgst=tax, igst=D("0"), amount=D(taxable) + 2 * tax,
+        )
+        return inv
+
+    def test_buckets_and_rows(self):
+        resp = self.client.get(reverse("invoice-itc-aging"))
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(list(resp.data["buckets"]), ["fresh", "warning", "stale", "expired"])
+        self.assertEqual(resp.data["buckets"]["expired"]["count"], 1)
+        self.assertEqual(resp.data["buckets"]["expired"]["tax"], 30.0)
+        self.assertEqual(resp.data["buckets"]["stale"], {
+            "label": "180+ days (still claimable)", "count": 2, "tax": 60.0,
+        })
+        self.assertEqual(resp.data["count"], 3)
+        first = resp.data["results"][0]
+        self.assertEqual((first["invoice_number"], first["bucket"], first["tax"]), ("OLD-1", "expired", 30.0))
+        self.assertLess(first["days_left"], 0)
+        self.assertEqual(first["cutoff"], itc_aging.cutoff_for(self.expired.invoice_date).isoformat())
+
+    def test_urgent_filter_and_paging(self):
+        resp = self.client.get(reverse("invoice-itc-aging"), {"bucket": "urgent"})
+        self.assertEqual([r["invoice_number"] for r in resp.data["results"]], ["OLD-1"])
+        paged = self.client.get(reverse("invoice-itc-aging"), {"bucket": "stale", "page_size": 1})
+        self.assertEqual(paged.data["count"], 2)
+        self.assertEqual(len(paged.data["results"]), 1)
+        self.assertIsNotNone(paged.data["next"])
+        self.assertEqual(self.client.get(reverse("invoice-itc-aging"), {"bucket": "soon"}).status_code, 400)
+
+    def test_list_filters_apply_and_summary_no_longer_carries_aging(self):
+        resp = self.client.get(reverse("invoice-itc-aging"), {"business_id": self.business.id + 1})
+        self.assertEqual(resp.data["count"], 0)
+        self.assertEqual(resp.data["buckets"]["expired"]["count"], 0)
+        self.assertNotIn("itc_aging", self.client.get(reverse("invoice-gst-summary")).data)
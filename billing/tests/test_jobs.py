@@ -0,0 +1,132 @@
+"""Background jobs — `async=1` queues the same work the endpoint does inline,
+`run_jobs` runs it, and /api/jobs/<id>/ hands back the identical result.
+"""
+
+import io
+import json
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from openpyxl import load_workbook
+from rest_framework.test import APIClient
+
+from billing.models import Job
+from billing.services import jobs
+from billing.tests.test_base import BaseAPITestCase
+
+_MEDIA = tempfile.mkdtemp(prefix="jobs_test_")
+
+
+@override_settings(MEDIA_ROOT=_MEDIA)
+class JobTest(BaseAPITestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(_MEDIA, ignore_errors=True)
+        super().tearDownClass()
+
+    def _status(self, job_id, client=None):
+        return (client or self.client).get(reverse("job-detail", args=[job_id]))
+
+    def test_async_report_produces_workbook_artifact(self):
+        resp = self.client.post(reverse("generate-report"), {
+            "start_date": "2023-01-01", "end_date": "2023-01-31", "async": 1,
+        }, format="json")
+        self.assertEqual(resp.status_code, 202)
+        self.assertEqual(resp.data["status"], Job.STATUS_QUEUED)
+
+        self.assertEqual(jobs.run_pending(), 1)
+        data = self._status(resp.data["id"]).data
+        self.assertEqual(data["status"], Job.STATUS_SUCCEEDED, data["error"])
+        self.assertEqual(data["progress"], 100)
+        self.assertEqual(data["result"]["filename"], "invoices_January 2023.xlsx")
+        self.assertTrue(data["artifact_url"].startswith("/api/media/jobs/"))
+
+        artifact = APIClient().get(data["artifact_url"])
+        self.assertEqual(artifact.status_code, 200)
+        wb = load_workbook(io.BytesIO(b"".join(artifact.streaming_content)))
+        self.assertIn("Test Business", wb.sheetnames)
+
+    def test_async_gstr_export_result_matches_sync_response(self):
+        url = reverse("invoice-gstr-export")
+        sync = self.client.get(url, {"business_id": self.business.id})
+        queued = self.client.get(url, {"business_id": self.business.id, "async": "1"})
+        self.assertEqual(queued.status_code, 202)
+        jobs.run_pending()
+        data = self._status(queued.data["id"]).data
+        self.assertEqual(data["status"], Job.STATUS_SUCCEEDED, data["error"])
+        self.assertEqual(data["result"], json.loads(json.dumps(sync.data)))
+
+    def test_invalid_request_is_rejected_before_queueing(self):
+        resp = self.client.get(reverse("invoice-gstr1-portal-json"), {"async": "1"})
+        self.assertEqual(resp.status_code, 400)
+        self.assertFalse(Job.objects.exists())
+
+    def test_replay_runs_as_the_requester(self):
+        # Queued, then the account is removed before the worker gets to it:
+        # the replay is unauthenticated and must be refused, not run as nobody.
+        resp = self.client.post(reverse("bulk-invoice-import"), {
+            "invoices": [{"invoiceNumber": "X-1"}], "async": True,
+        }, format="json")
+        self.assertEqual(resp.status_code, 202)
+        self.user.delete()
+
+        jobs.run_pending()
+        job = Job.objects.get(pk=resp.data["id"])
+        self.assertEqual(job.status, Job.STATUS_FAILED)
+        self.assertIn("credentials", job.error.lower())
+
+    def test_jobs_are_private_to_their_owner(self):
+        job = jobs.enqueue("gstr_export", {"path": "/api/invoices/gstr_export/"}, user=self.user)
+        other = User.objects.create_user(username="someone", password="x")
+        client = APIClient()
+        client.force_authenticate(other)
+        self.assertEqual(self._status(job.pk, client).status_code, 404)
+        self.assertEqual(self._status(job.pk).status_code, 200)
+
+    def test_claim_is_exclusive_and_stale_jobs_are_requeued(self):
+        job = jobs.enqueue("gstr_export", {}, user=self.user)
+        claimed = jobs.claim("w1")
+        self.assertEqual(claimed.pk, job.pk)
+        self.assertIsNone(jobs.claim("w2"))
+
+        Job.objects.filter(pk=job.pk).update(updated_at=timezone.now() - timedelta(hours=2))
+        self.assertEqual(jobs.requeue_stale(timedelta(minutes=30)), (1, 0))
+        self.assertEqual(jobs.claim("w2").attempts, 2)
+
+    def test_finished_jobs_are_purged_with_their_files(self):
+        upload = default_storage.save("jobs/uploads/may.xlsx", ContentFile(b"2a"))
+        old = jobs.enqueue("gstr2a_import", {"files": [upload]}, user=self.user)
+        old.artifact.save("old.xlsx", ContentFile(b"report"), save=False)
+        old.status = Job.STATUS_SUCCEEDED
+        old.finished_at = timezone.now() - timedelta(days=15)
+        old.save()
+        recent = jobs.enqueue("gstr_export", {}, user=self.user)
+        Job.objects.filter(pk=recent.pk).update(status=Job.STATUS_FAILED, finished_at=timezone.now())
+        queued = jobs.enqueue("gstr_export", {}, user=self.user)
+
+        with override_settings(JOB_RETENTION_DAYS=14):
+            self.assertEqual(jobs.purge_finished(), 1)
+        self.assertEqual(set(Job.objects.values_list("pk", flat=True)), {recent.pk, queued.pk})
+        self.assertFalse(default_storage.exists(upload))
+        self.assertFalse(default_storage.exists(old.artifact.name))
+
+    def test_run_jobs_command_drains_queue(self):
+        jobs.enqueue("gstr_export", {"path": "/api/invoices/gstr_export/"}, user=self.user)
+        jobs.enqueue("gstr_export", {"path": "/api/invoices/gstr_export/"}, user=None)
+        out = StringIO()
+        call_command("run_jobs", "--once", stdout=out)
+        self.assertIn("Processed 2 job(s)", out.getvalue())
+        # No user → the replayed request is unauthenticated and refused.
+        self.assertEqual(
+            sorted(Job.objects.values_list("status", flat=True)),
+            [Job.STATUS_FAILED, Job.STATUS_SUCCEEDED],
+        )
@@ -0,0 +1,107 @@
+"""Opt-in keyset pagination (`?cursor=`) and `?count=estimate` on the big
+list endpoints."""
+
+import base64
+import json
+from datetime import date
+from itertools import chain
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from billing.constants import INVOICE_TYPE_OUTWARD
+from billing.models import AuditLog, Customer, Invoice
+from billing.tests.test_base import BaseAPITestCase
+
+
+class KeysetPaginationTest(BaseAPITestCase):
+    def setUp(self):
+        super().setUp()
+        # Several invoices per date so the id tiebreaker has work to do.
+        for i in range(11):
+            Invoice.objects.create(
+                invoice_number=f"K-{i:02d}",
+                invoice_date=date(2024, 1, 1 + i // 3),
+                business=self.business,
+                customer=self.customer,
+                type_of_invoice=INVOICE_TYPE_OUTWARD,
+            )
+
+    def walk(self, url, params):
+        pages, response = [], self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, 200, response.data)
+            pages.append([row["id"] for row in response.data["results"]])
+            if not response.data["next"]:
+                return pages, response
+            response = self.client.get(response.data["next"])
+
+    def test_cursor_pages_match_page_number_order(self):
+        url = reverse("invoice-list")
+        expected = [row["id"] for row in self.client.get(url, {"page_size": 100}).data["results"]]
+        pages, last = self.walk(url, {"cursor": "", "page_size": 4})
+        self.assertEqual([len(p) for p in pages], [4, 4, 4])
+        self.assertEqual(list(chain.from_iterable(pages)), expected)
+        self.assertNotIn("count", last.data)
+
+        back = self.client.get(last.data["previous"])
+        self.assertEqual([row["id"] for row in back.data["results"]], pages[1])
+        first = self.client.get(back.data["previous"])
+        self.assertEqual([row["id"] for row in first.data["results"]], pages[0])
+        self.assertIsNone(first.data["previous"])
+
+    def test_cursor_follows_requested_ordering(self):
+        url = reverse("invoice-list")
+        pages, _ = self.walk(url, {"cursor": "", "page_size": 5, "ordering": "invoice_number"})
+        numbers = dict(Invoice.objects.values_list("id", "invoice_number"))
+        walked = [numbers[pk] for pk in list(chain.from_iterable(pages))]
+        self.assertEqual(walked, sorted(walked))
+
+    def test_later_pages_skip_count_and_offset(self):
+        url = reverse("invoice-list")
+        second = self.client.get(url, {"cursor": "", "page_size": 4}).data["next"]
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(second)
+        sql = " ".join(q["sql"] for q in ctx.captured_queries).upper()
+        self.assertNotIn("COUNT(", sql.split("FROM")[0])
+        self.assertNotIn("OFFSET", sql)
+
+    def test_bad_cursor_is_404(self):
+        response = self.client.get(reverse("invoice-list"), {"cursor": "bm9wZQ"})
+        self.assertEqual(response.status_code, 404)
+
+        # Right key columns, too few values: refused, not paged on a prefix.
+        short = json.dumps({
+            "k": ["invoice_date", "created_at", "pk"],
+            "p": ["2024-01-02", "2024-01-02T00:00:00+00:00"],
+            "r": 0,
+        })
+        token = base64.urlsafe_b64encode(short.encode()).decode()
+        response = self.client.get(reverse("invoice-list"), {"cursor": token})
+        self.assertEqual(response.status_code, 404)
+
+    def test_nullable_ordering_is_rejected(self):
+        response = self.client.get(
+            reverse("customer-list"), {"cursor": "", "ordering": "gst_number"}
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_customer_and_audit_log_lists(self):
+        for i in range(4):
+            Customer.objects.create(name=f"Keyset Customer {i}")
+        pages, last = self.walk(reverse("customer-list"), {"cursor": "", "page_size": 2})
+        self.assertEqual(sum(len(p) for p in pages), Customer.objects.count())
+        self.assertIn("invoice_count", last.data["results"][0])
+
+        for i in range(5):
+            AuditLog.objects.create(action="printed", entity="invoice", entity_id=i, entity_name=str(i))
+        pages, _ = self.walk(reverse("auditlog-list"), {"cursor": "", "page_size": 2})
+        expected = list(AuditLog.objects.order_by("-timestamp", "-id").values_list("id", flat=True))
+        self.assertEqual(list(chain.from_iterable(pages)), expected)
+
+    def test_count_estimate_falls_back_to_exact_count(self):
+        url = reverse("invoice-list")
+        self.assertEqual(self.client.get(url, {"count": "estimate"}).data["count"], 12)
+        response = self.client.get(url, {"cursor": "", "count": "estimate"})
+        self.assertEqual(response.data["count"], 12)
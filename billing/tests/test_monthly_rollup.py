@@ -0,0 +1,146 @@
+"""MonthlyTaxRollup stays equal to a fresh recomputation across write paths,
+and the endpoints that read it return the same figures as live aggregation.
+
+Every test ends with `rollups.check()` — the consistency checker behind
+`rebuild_rollups --check` — returning no drift.
+"""
+
+from decimal import Decimal as D
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.urls import reverse
+
+from billing.constants import INVOICE_TYPE_INWARD, INVOICE_TYPE_OUTWARD
+from billing.models import Business, Invoice, LineItem, MonthlyTaxRollup
+from billing.services import invoice_totals, rollups
+from billing.tests.test_base import BaseAPITestCase, line_payload
+
+
+class MonthlyRollupTest(BaseAPITestCase):
+    def assertConsistent(self):
+        self.assertEqual(rollups.check(), [])
+
+    def test_fixture_invoice_is_booked_by_signals(self):
+        self.assertTrue(MonthlyTaxRollup.objects.filter(business=self.business).exists())
+        self.assertConsistent()
+
+    def test_api_create_books_lines_and_invoice_once(self):
+        self.post_invoice("R-1", "2026-05-10", [line_payload(hsn="7113"), line_payload(hsn="7114")])
+        rows = MonthlyTaxRollup.objects.filter(month="2026-05-01")
+        self.assertEqual(sum(r.line_count for r in rows), 2)
+        self.assertEqual(sum(r.invoice_count for r in rows), 1)
+        self.assertConsistent()
+
+    def test_update_line_items_moves_invoice_between_months(self):
+        inv = self.post_invoice("R-2", "2026-05-10", [line_payload()])
+        resp = self.client.post(
+            reverse("invoice-update-line-items", args=[inv.pk]),
+            {"invoice": {"invoice_date": "2026-06-02"},
+             "line_items": [line_payload(qty="2", gst="0.05")]},
+            format="json",
+        )
+        self.assertEqual(resp.status_code, 200)
+        self.assertFalse(MonthlyTaxRollup.objects.filter(month="2026-05-01").exists())
+        june = MonthlyTaxRollup.objects.get(month="2026-06-01")
+        self.assertEqual(june.gst_tax_rate, D("0.05"))
+        self.assertConsistent()
+
+    def test_one_off_line_saves_and_deletes(self):
+        inv = self.post_invoice("R-3", "2026-05-10", [line_payload()])
+        li = LineItem.objects.create(
+            invoice=inv, customer=self.customer, product_name="Chain", hsn_code="7113",
+            gst_tax_rate=D("0.03"), quantity=D("1"), rate=D("50"),
+            cgst=D("0.75"), sgst=D("0.75"), igst=D("0"), amount=D("51.5"),
+        )
+        self.assertConsistent()
+        li.gst_tax_rate = D("0.05")
+        li.save()
+        self.assertConsistent()
+        li.delete()
+        self.assertConsistent()
+
+    def test_invoice_header_edit_and_cascade_delete(self):
+        inv = self.post_invoice("R-4", "2026-05-10", [line_payload(), line_payload(hsn="7114")])
+        inv.type_of_invoice = INVOICE_TYPE_INWARD
+        inv.save()
+        self.assertConsistent()
+        inv.delete()
+        self.assertFalse(MonthlyTaxRollup.objects.filter(month="2026-05-01").exists())
+        self.assertConsistent()
+
+    def test_ai_create_books_the_inter_firm_inward_mirror(self):
+        buyer = Business.objects.create(name="Buyer Firm", state_name="MAHARASHTRA")
+        resp = self.client.post(reverse("ai-invoice-create"), {
+            "business_id": self.business.id,
+            "inter_firm": True,
+            "inter_firm_buyer_business_id": buyer.id,
+            "invoice_data": {
+                "customer_name": self.customer.name,
+                "customer_gst_number": self.customer.gst_number,
+                "invoice_number": "IF-1", "invoice_date": "2026-05-10",
+                "line_items": [{"product_name": "Ring", "hsn_code": "711319",
+                                "quantity": "2", "rate": "100", "gst_tax_rate": "0.03"}],
+            },
+        }, format="json")
+        self.assertEqual(resp.status_code, 200, resp.data)
+        mirror = Invoice.objects.get(pk=resp.data["inward_invoice_id"])
+        self.assertEqual(mirror.type_of_invoice, INVOICE_TYPE_INWARD)
+        self.assertEqual(mirror.taxable_total, D("200"))
+        self.assertEqual(mirror.line_count, 1)
+        self.assertConsistent()
+        self.assertEqual(invoice_totals.check(), [])
+
+    def test_empty_invoice_counts_toward_totals(self):
+        Invoice.objects.create(
+            business=self.business, customer=self.customer, invoice_number="E-1",
+            invoice_date="2026-05-03", type_of_invoice=INVOICE_TYPE_INWARD, total_amount="50",
+        )
+        self.assertConsistent()
+        totals = self.client.get(reverse("invoice-stats")).data["totals"]
+        self.assertEqual(totals["count"], Invoice.objects.count())
+        self.assertAlmostEqual(totals["inward"], 50.0, places=2)
+
+    def test_rollup_reads_match_live_aggregation_on_partial_months(self):
+        self.post_invoice("R-5", "2026-04-28", [line_payload(rate="10")])
+        self.post_invoice("R-6", "2026-05-15", [line_payload(rate="20")])
+        self.post_invoice("R-7", "2026-06-03", [line_payload(rate="40")])
+        params = {"start_date": "2026-04-20", "end_date": "2026-06-02"}
+        via_rollup = self.client.get(reverse("invoice-stats"), params).data
+        # customer_id forces the live path; the fixture customer owns every invoice.
+        live = self.client.get(
+            reverse("invoice-stats"), {**params, "customer_id": self.customer.id}
+        ).data
+        self.assertEqual(via_rollup["totals"], live["totals"])
+        self.assertEqual(via_rollup["monthly"], live["monthly"])
+        self.assertEqual(via_rollup["tax_distribution"], live["tax_distribution"])
+        self.assertEqual(via_rollup["totals"]["count"], 2)
+
+        summary = self.client.get(reverse("invoice-gst-summary"), params).data
+        live_summary = self.client.get(
+            reverse("invoice-gst-summary"), {**params, "customer_id": self.customer.id}
+        ).data
+        self.assertEqual(summary["rate_slabs"], live_summary["rate_slabs"])
+        self.assertEqual(summary["hsn_summary"], live_summary["hsn_summary"])
+        self.assertEqual(summary["gstr3b"], live_summary["gstr3b"])
+
+    def test_performance_reads_rollup(self):
+        self.post_invoice("R-8", "2026-05-15", [line_payload(rate="20")])
+        resp = self.client.get(reverse("business-performance"))
+        row = next(r for r in resp.data if r["id"] == self.business.id)
+        expected = sum(
+            i.total_amount for i in Invoice.objects.filter(type_of_invoice=INVOICE_TYPE_OUTWARD)
+        )
+        self.assertAlmostEqual(float(row["outward_total"]), float(expected), places=2)
+        self.assertEqual(row["outward_count"], 2)
+
+    def test_rebuild_command_check_and_repair(self):
+        self.post_invoice("R-9", "2026-05-15", [line_payload()])
+        MonthlyTaxRollup.objects.filter(month="2026-05-01").update(cgst=D("999"))
+        with self.assertRaises(CommandError):
+            call_command("rebuild_rollups", "--check", stdout=StringIO())
+        call_command("rebuild_rollups", stdout=StringIO())
+        out = StringIO()
+        call_command("rebuild_rollups", "--check", stdout=out)
+        self.assertIn("consistent", out.getvalue())
@@ -0,0 +1,119 @@
+"""GSTR-2A/2B reconciliation — portal rows joined to booked inward invoices
+by GSTIN + normalised number, date window and amount tolerance."""
+
+import io
+import os
+import tempfile
+from datetime import date
+from decimal import Decimal
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from billing.models import Customer, Invoice, ReconciliationItem, ReconciliationRun
+from billing.services import reconciliation
+from billing.services.gstr2a_import import preview_file
+from billing.tests.test_base import BaseAPITestCase
+from billing.tests.test_gstr2a_import import build_2a_file, invoice_value
+
+SUPPLIER_GSTIN = "22BBBBB0000B1Z5"
+
+
+class ReconciliationTest(BaseAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.supplier = Customer.objects.create(name="SUPPLIER", gst_number=SUPPLIER_GSTIN)
+        self.portal = build_2a_file([
+            ("SUPPLIER", SUPPLIER_GSTIN, "INV/0001", "10/05/2024", 1000),
+            ("SUPPLIER", SUPPLIER_GSTIN, "inv-2", "12/05/2024", 2000),
+            ("SUPPLIER", SUPPLIER_GSTIN, "inv-3", "14/05/2024", 3000),
+            ("SUPPLIER", SUPPLIER_GSTIN, "inv-4", "20/05/2024", 4000),
+        ])
+        self.book("inv-1", date(2024, 5, 12), invoice_value(1000) + Decimal("0.50"))  # within tolerance
+        self.book("INV2", date(2024, 5, 12), invoice_value(2000) - 50)                 # amount differs
+        self.book("X-99", date(2024, 5, 18), invoice_value(4000))                      # number differs
+        self.book("inv-5", date(2024, 5, 25), Decimal("5000"))                         # not on portal
+        self.book("inv-6", date(2024, 8, 1), Decimal("6000"))                          # outside the period
+
+    def book(self, number, when, amount):
+        return Invoice.objects.create(
+            business=self.business, customer=self.supplier, invoice_number=number,
+            invoice_date=when, type_of_invoice="inward", total_amount=amount,
+        )
+
+    def test_invoice_number_key_folds_case_separators_and_padding(self):
+        key = reconciliation.invoice_number_key
+        self.assertEqual(key("INV/0042/24-25"), "INV42/24/25")
+        self.assertEqual(key(" inv-42/24-25 "), "INV42/24/25")
+        self.assertEqual(key("007"), "7")
+        self.assertEqual(key("INV0042"), "INV42")
+        self.assertEqual(key("GST/24-25/0042"), key("GST/24-25/42"))
+        self.assertEqual(key("10/01"), key("10/1"))
+        self.assertNotEqual(key("1/23"), key("12/3"))
+        self.assertEqual(key("0/0"), "0/0")
+
+    def test_rows_are_classified_in_one_query(self):
+        preview = preview_file(self.portal)
+        with CaptureQueriesContext(connection) as ctx:
+            outcome = reconciliation.reconcile(preview, self.business.id)
+        self.assertEqual(len(ctx), 1)
+        self.assertEqual(
+            [(i.status, i.invoice_number, i.note) for i in outcome.items],
+            [
+                ("matched", "INV/0001", ""),
+                ("mismatched_amount", "inv-2", "Differs by ₹50.00"),
+                ("missing_in_books", "inv-3", ""),
+                ("matched", "inv-4", "Booked as X-99"),
+                ("missing_in_2b", "inv-5", ""),
+            ],
+        )
+        self.assertEqual((outcome.period_start, outcome.period_end), (date(2024, 5, 1), date(2024, 5, 31)))
+
+    def test_date_window_limits_the_join(self):
+        outcome = reconciliation.reconcile(preview_file(self.portal), self.business.id, date_window_days=1)
+        statuses = [i.status for i in outcome.items]
+        # inv-1 (booked 2 days late) and inv-4 (2 days early) no longer pair,
+        # so each shows up missing on both sides.
+        self.assertEqual(statuses.count("missing_in_books"), 3)
+        self.assertEqual(statuses.count("missing_in_2b"), 3)
+
+    def test_run_is_persisted_and_paged_through_the_api(self):
+        resp = self.client.post(
+            reverse("reconciliationrun-list"),
+            {"file": SimpleUploadedFile("may-2a.xlsx", self.portal.getvalue())},
+        )
+        self.assertEqual(resp.status_code, 201, resp.data)
+        self.assertEqual(
+            (resp.data["matched"], resp.data["mismatched_amount"], resp.data["missing_in_books"], resp.data["missing_in_2b"]),
+            (2, 1, 1, 1),
+        )
+        run = ReconciliationRun.objects.get(pk=resp.data["id"])
+        self.assertEqual((run.business, run.source_filename), (self.business, "may-2a.xlsx"))
+
+        items = self.client.get(
+            reverse("reconciliationrun-items", args=[run.pk]), {"status": "missing_in_2b"}
+        )
+        self.assertEqual(items.data["count"], 1)
+        self.assertEqual(items.data["results"][0]["invoice_number"], "inv-5")
+        self.assertEqual(self.client.get(reverse("reconciliationrun-list")).data["count"], 1)
+
+    def test_api_rejects_unknown_recipient(self):
+        resp = self.client.post(
+            reverse("reconciliationrun-list"),
+            {"file": SimpleUploadedFile("x.xlsx", build_2a_file([], recipient="27ZZZZZ0000Z1Z5").getvalue())},
+        )
+        self.assertEqual(resp.status_code, 400)
+        self.assertFalse(ReconciliationRun.objects.exists())
+
+    def test_command_prints_summary_and_problem_rows(self):
+        with tempfile.NamedTemporaryFile(suffix=".xlsx", delete=False) as fh:
+            fh.write(self.portal.getvalue())
+        self.addCleanup(os.unlink, fh.name)
+        out = io.StringIO()
+        call_command("reconcile_gstr2a", fh.name, stdout=out)
+        self.assertIn("Missing in books:  1", out.getvalue())
+        self.assertIn("inv-3", out.getvalue())
+        self.assertEqual(ReconciliationItem.objects.count(), 5)
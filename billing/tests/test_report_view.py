@@ -142,7 +142,9 @@ class ReportViewTestCase(BaseAPITestCase):
         }
         response = self.client.post(reverse("generate-report"), data, format="json")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        wb = load_workbook(io.BytesIO(response.content), data_only=True)
+        wb = load_workbook(
+            io.BytesIO(b"".join(response.streaming_content)), data_only=True
+        )
         sheet = wb["Test Business Report"]
 
         net_rows = [
@@ -158,3 +160,54 @@ class ReportViewTestCase(BaseAPITestCase):
             for c in r:
                 if isinstance(c, str):
                     self.assertFalse(c.startswith("GRAND TOTAL"), f"additive row still present: {c}")
+
+    def test_report_is_streamed_with_full_section_layout(self):
+        """The workbook is written write-only and streamed back; the sheet
+        still carries the header block, one data row per line item and the
+        Grand Total for each supply type."""
+        import io
+
+        from openpyxl import load_workbook
+
+        today = datetime.now().date()
+        data = {
+            "start_date": today.replace(day=1).strftime("%Y-%m-%d"),
+            "end_date": today.strftime("%Y-%m-%d"),
+            "invoice_type": "both",
+        }
+        response = self.client.post(reverse("generate-report"), data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertIn('filename="invoices_', response["Content-Disposition"])
+
+        wb = load_workbook(io.BytesIO(b"".join(response.streaming_content)))
+        rows = list(wb["Test Business Report"].iter_rows(values_only=True))
+        labels = [r[5] for r in rows if len(r) > 5]
+        self.assertEqual(labels.count("Outward Supply"), 1)
+        self.assertEqual(labels.count("Inward Supply"), 1)
+        self.assertEqual(labels.count("Grand Total"), 2)
+        data_rows = [r for r in rows if r and r[0] == 1]
+        self.assertEqual({r[1] for r in data_rows}, {"OUT001", "IN001"})
+
+    def test_report_query_count_does_not_grow_with_range(self):
+        """The whole range is fetched in one query per business and split
+        into months in Python, so a year costs the same as a month."""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        today = datetime.now().date()
+
+        def count_queries(days):
+            data = {
+                "start_date": (today - timedelta(days=days)).strftime("%Y-%m-%d"),
+                "end_date": (today + timedelta(days=1)).strftime("%Y-%m-%d"),
+                "invoice_type": "both",
+            }
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.post(reverse("generate-report"), data, format="json")
+                b"".join(response.streaming_content)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return len(ctx.captured_queries)
+
+        self.assertEqual(count_queries(7), count_queries(365))
+        self.assertEqual(count_queries(7), count_queries(3 * 365))
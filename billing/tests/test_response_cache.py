@@ -0,0 +1,122 @@
+"""Versioned response cache on the aggregate endpoints: repeat loads hit,
+every write path that changes the figures misses."""
+
+from decimal import Decimal
+
+from django.contrib.auth.models import Group, User
+from django.db import connection
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from billing.constants import INVOICE_TYPE_OUTWARD
+from billing.models import Business, DataVersion, Invoice, LineItem
+from billing.services import response_cache
+from billing.tests.test_base import BaseAPITestCase, line_payload
+
+
+class ResponseCacheTest(BaseAPITestCase):
+    def setUp(self):
+        super().setUp()
+        response_cache.reset_stats()
+        self.other = Business.objects.create(name="Other Business", state_name="MAHARASHTRA")
+
+    def get(self, name, **params):
+        resp = self.client.get(reverse(name), params)
+        self.assertEqual(resp.status_code, 200)
+        return resp
+
+    def stats(self, **params):
+        return self.get("invoice-stats", **params)
+
+    def _other_invoice(self):
+        invoice = Invoice.objects.create(
+            invoice_number="O-1", invoice_date="2023-01-05", business=self.other,
+            customer=self.customer, type_of_invoice=INVOICE_TYPE_OUTWARD,
+        )
+        LineItem.objects.create(
+            invoice=invoice, customer=self.customer, product_name="Test Product",
+            quantity=Decimal("1"), rate=Decimal("500"), amount=Decimal("500"),
+        )
+        return invoice
+
+    def test_repeat_call_is_a_hit_with_the_same_payload(self):
+        first = self.stats()
+        second = self.stats()
+        self.assertEqual(first["X-Cache"], "MISS")
+        self.assertEqual(second["X-Cache"], "HIT")
+        self.assertEqual(first.data, second.data)
+        counters = response_cache.stats()["endpoints"]["invoices.stats"]
+        self.assertEqual(counters, {"hits": 1, "misses": 1})
+
+    def test_blank_and_reordered_params_share_an_entry(self):
+        self.stats(business_id=self.business.pk, type_of_invoice="")
+        url = reverse("invoice-stats") + f"?customer_id=&business_id={self.business.pk}"
+        self.assertEqual(self.client.get(url)["X-Cache"], "HIT")
+        self.assertEqual(self.stats(business_id=self.business.pk, type_of_invoice="inward")["X-Cache"], "MISS")
+
+    def test_line_item_signal_invalidates(self):
+        before = self.get("invoice-totals").data
+        LineItem.objects.create(
+            invoice=self.invoice, customer=self.customer, product_name="Test Product",
+            quantity=Decimal("1"), rate=Decimal("100"), amount=Decimal("100"),
+        )
+        after = self.get("invoice-totals")
+        self.assertEqual(after["X-Cache"], "MISS")
+        self.assertNotEqual(after.data, before)
+
+    def test_bulk_create_path_invalidates(self):
+        self.get("invoice-distribution")
+        self.post_invoice("RC-1", "2026-05-10", [line_payload(), line_payload(qty="2")])
+        self.assertEqual(self.get("invoice-distribution")["X-Cache"], "MISS")
+
+    def test_other_business_write_leaves_scoped_entry_alone(self):
+        self.stats(business_id=self.business.pk)
+        self.stats()
+        self._other_invoice()
+        self.assertEqual(self.stats(business_id=self.business.pk)["X-Cache"], "HIT")
+        self.assertEqual(self.stats()["X-Cache"], "MISS")
+        self.invoice.invoice_number = "INV-001-A"
+        self.invoice.save()
+        self.assertEqual(self.stats(business_id=self.business.pk)["X-Cache"], "MISS")
+
+    def test_moving_an_invoice_invalidates_the_old_business(self):
+        self.stats(business_id=self.business.pk)
+        self.invoice.business = self.other
+        self.invoice.save()
+        resp = self.stats(business_id=self.business.pk)
+        self.assertEqual(resp["X-Cache"], "MISS")
+
+    def test_master_edit_invalidates_top_customers(self):
+        self.get("customer-top")
+        self.customer.name = "Renamed Customer"
+        self.customer.save()
+        resp = self.get("customer-top")
+        self.assertEqual(resp["X-Cache"], "MISS")
+        self.assertIn("Renamed Customer", str(resp.data))
+
+    def test_membership_change_bumps_masters_once(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.customer.businesses.add(self.other)
+        bumps = [
+            q for q in ctx.captured_queries
+            if q["sql"].startswith("UPDATE") and "'masters'" in q["sql"]
+        ]
+        self.assertEqual(len(bumps), 1)
+
+    def test_versions_are_read_from_the_database(self):
+        # What another worker's committed write leaves behind: a moved
+        # DataVersion row, and nothing in this worker's cache.
+        self.get("invoice-gst-summary")
+        DataVersion.objects.filter(scope=f"business:{self.business.pk}").update(version=F("version") + 1)
+        self.assertEqual(self.get("invoice-gst-summary")["X-Cache"], "MISS")
+        self.assertEqual(self.get("invoice-gst-summary")["X-Cache"], "HIT")
+
+    def test_stats_endpoint_is_admin_only(self):
+        self.stats()
+        resp = self.get("response-cache-stats")
+        self.assertEqual(resp.data["misses"], 1)
+        viewer = User.objects.create_user(username="viewer", password="x")
+        viewer.groups.add(Group.objects.get_or_create(name="viewer")[0])
+        self.client.force_authenticate(user=viewer)
+        self.assertEqual(self.client.get(reverse("response-cache-stats")).status_code, 403)
@@ -0,0 +1,61 @@
+"""/api/search/ — ranked customer/product/invoice lookup for the command
+palette. SQLite runs the substring fallback; trigram similarity is
+PostgreSQL-only."""
+
+from decimal import Decimal
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from billing.constants import INVOICE_TYPE_OUTWARD
+from billing.models import Customer, Invoice, Product
+from billing.services import search
+from billing.tests.test_base import BaseAPITestCase
+
+
+class SearchTest(BaseAPITestCase):
+    def setUp(self):
+        super().setUp()
+        Customer.objects.create(name="SHREE RAM JEWELLERS", gst_number="27RAMJE0000R1Z5")
+        Customer.objects.create(name="RAMESH TRADERS", mobile_number="9800000001")
+        Product.objects.create(name="RAMPURI CHAIN", hsn_code="711319", gst_tax_rate=Decimal("0.03"))
+        Invoice.objects.create(
+            invoice_number="RAM-17", invoice_date="2024-04-02", business=self.business,
+            customer=self.customer, type_of_invoice=INVOICE_TYPE_OUTWARD,
+        )
+
+    def test_mixed_results_ranked_best_first(self):
+        resp = self.client.get(reverse("search"), {"q": "ram"})
+        self.assertEqual(resp.status_code, 200)
+        hits = [(r["type"], r["label"], r["score"]) for r in resp.data["results"]]
+        # Prefix matches (0.9) ahead of substring ones (0.5), customers
+        # before products before invoices on a tie.
+        self.assertEqual(hits, [
+            ("customer", "RAMESH TRADERS", 0.9),
+            ("product", "RAMPURI CHAIN", 0.9),
+            ("invoice", "#RAM-17", 0.9),
+            ("customer", "SHREE RAM JEWELLERS", 0.5),
+        ])
+        self.assertEqual(resp.data["results"][1]["detail"], "HSN 711319 · 3%")
+
+    def test_gstin_and_mobile_are_searched(self):
+        hits = search.search("27RAMJE")
+        self.assertEqual([(h.label, h.detail) for h in hits], [("SHREE RAM JEWELLERS", "27RAMJE0000R1Z5")])
+        self.assertEqual(search.search("9800000001")[0].score, 1.0)
+
+    def test_one_query_per_type_and_filters(self):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(reverse("search"), {"q": "ram", "types": "customer,invoice", "limit": 1})
+        # auth + one query per requested type
+        self.assertEqual(len([q for q in ctx.captured_queries if "billing_" in q["sql"]]), 2)
+        self.assertEqual([r["type"] for r in resp.data["results"]], ["customer", "invoice"])
+
+        other = self.client.get(reverse("search"), {"q": "ram", "types": "invoice", "business_id": 0})
+        self.assertEqual(other.data["results"], [])
+
+    def test_short_and_bad_queries(self):
+        for term in ("r", "ra"):
+            self.assertEqual(self.client.get(reverse("search"), {"q": term}).data["results"], [])
+        self.assertEqual(self.client.get(reverse("search"), {"q": "ram", "types": "user"}).status_code, 400)
+        self.assertEqual(self.client.get(reverse("search"), {"q": "ram", "business_id": "abc"}).status_code, 400)
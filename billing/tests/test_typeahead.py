@@ -0,0 +1,80 @@
+"""In-memory product/customer autocomplete index."""
+
+from decimal import Decimal
+
+from django.db import connection
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from billing.models import Customer, DataVersion, LineItem, Product
+from billing.services import typeahead
+from billing.tests.test_base import BaseAPITestCase
+
+
+class TypeaheadTest(BaseAPITestCase):
+    def setUp(self):
+        super().setUp()
+        Product.objects.create(name="GOLD RING", hsn_code="711319", gst_tax_rate=Decimal("0.03"))
+        Product.objects.create(name="RING BOX", hsn_code="420292", gst_tax_rate=Decimal("0.18"))
+        Customer.objects.create(name="SHREE RAM JEWELLERS", gst_number="27RAMJE0000R1Z5")
+
+    def test_product_search_matches_substrings_in_name_order(self):
+        resp = self.client.get(reverse("product-search"), {"product_name": "ring"})
+        self.assertEqual([p["name"] for p in resp.data], ["GOLD RING", "RING BOX"])
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(reverse("product-search"), {"product_name": "box"})
+        self.assertEqual([p["name"] for p in resp.data], ["RING BOX"])
+        self.assertFalse([q for q in ctx.captured_queries if "billing_product" in q["sql"]])
+
+    def test_customer_search_matches_name_or_gstin(self):
+        by_gstin = self.client.get(reverse("customer-search"), {"customer_name": "27ramje"})
+        self.assertEqual([c["name"] for c in by_gstin.data], ["SHREE RAM JEWELLERS"])
+        self.assertEqual(by_gstin.data[0]["businesses"], [])
+
+    def test_writes_invalidate_the_index(self):
+        self.assertEqual(typeahead.search_products("chain"), [])
+        chain = Product.objects.create(name="GOLD CHAIN", hsn_code="711319")
+        self.assertEqual(typeahead.search_products("chain"), [chain])
+        chain.delete()
+        self.assertEqual(typeahead.search_products("chain"), [])
+
+        customer = Customer.objects.get(name="SHREE RAM JEWELLERS")
+        customer.businesses.add(self.business)
+        hit = typeahead.search_customers("shree")[0]
+        self.assertEqual(list(hit.businesses.all()), [self.business])
+
+    def test_membership_change_bumps_the_customer_version_once(self):
+        customer = Customer.objects.get(name="SHREE RAM JEWELLERS")
+        with CaptureQueriesContext(connection) as ctx:
+            customer.businesses.add(self.business)
+        bumps = [
+            q for q in ctx.captured_queries
+            if q["sql"].startswith("UPDATE") and "typeahead:customer" in q["sql"]
+        ]
+        self.assertEqual(len(bumps), 1)
+
+    def test_another_workers_write_is_seen_through_the_version(self):
+        typeahead.search_products("ring")
+        # A write in another process: rows change, only the shared version moves.
+        Product.objects.filter(name="RING BOX").update(hsn_code="999999")
+        self.assertEqual(typeahead.product_by_name("RING BOX").hsn_code, "420292")
+        DataVersion.objects.filter(scope="typeahead:product").update(version=F("version") + 1)
+        self.assertEqual(typeahead.product_by_name("RING BOX").hsn_code, "999999")
+
+    def test_line_item_creation_sees_a_rate_change_made_by_another_worker(self):
+        typeahead._indexes.clear()
+        typeahead.product_by_name("GOLD RING")
+        # The other worker's save: the row and the version move, nothing
+        # touches this worker's copy or its process-local cache.
+        Product.objects.filter(name="GOLD RING").update(gst_tax_rate=Decimal("0.05"))
+        DataVersion.bump(["typeahead:product"])
+        item = LineItem.create_line_item_for_invoice("GOLD RING", 1, 100, self.invoice.id)
+        self.assertEqual(item.gst_tax_rate, Decimal("0.05"))
+
+    def test_line_item_creation_reads_product_from_the_index(self):
+        typeahead.product_by_name("GOLD RING")
+        with CaptureQueriesContext(connection) as ctx:
+            item = LineItem.create_line_item_for_invoice("GOLD RING", 2, 100, self.invoice.id)
+        self.assertEqual((item.hsn_code, item.gst_tax_rate), ("711319", Decimal("0.03")))
+        self.assertFalse([q for q in ctx.captured_queries if 'FROM "billing_product"' in q["sql"]])
@@ -1,4 +1,5 @@
 import base64
+import copy
 import io
 import json
 import logging
@@ -12,7 +13,6 @@ from django.conf import settings
 from django.db import transaction
 # AI extractor uses Google Gemini with multi-key rotation. See
 # AIInvoiceProcessor docstring for the routing logic.
-import google.genai as genai
 from google.genai import types
 
 # Register HEIC / HEIF opener on Pillow so iPhone photos can be decoded
@@ -348,291 +348,372 @@ def process_product_csv(file_content: bytes) -> dict[str, int | list[str]]:
     return result
 
 
-def process_invoice_csv(
-    file_content: bytes, business_id: int
-) -> dict[str, int | list[str]]:
-    """
-    Process a CSV file containing invoice data and create invoices and line items.
-
-    Expected CSV format:
-    invoice_number,invoice_date,customer_name,product_name,quantity,rate,hsn_code,gst_tax_rate
-
-    Returns a dictionary with counts of created invoices and any errors encountered.
-
-    Improvements:
-    1. Uses pandas for more robust CSV handling
-    2. Validates that customers exist in the database (doesn't create new ones)
-    3. Filters customers by business association to ensure data integrity
-    """
-    from billing.constants import GST_TAX_RATE, HSN_CODE
-    from billing.models import Business, Customer, Invoice, LineItem, Product
-
-    # Initialize result counters
-    logger.info(f"Processing invoices from CSV file: {file_content}")
-    result = {
-        "invoices_created": 0,
-        "line_items_created": 0,
-        "errors": [],
-    }
-
-    # Get the business
+def _decimal_or_none(value):
     try:
-        business = Business.objects.get(id=business_id)
-    except Business.DoesNotExist:
-        raise CSVImportError(f"Business with ID {business_id} does not exist")
-
-    logger.info(
-        f"Processing invoices from CSV file: {file_content} for business: {business}"
-    )
+        d = Decimal(str(value).strip())
+    except (ArithmeticError, ValueError):
+        return None
+    return d if d.is_finite() else None
+
+
+# Rows per chunk for the streaming invoice import. Chunks are cut on invoice
+# boundaries, so an actual chunk runs a few rows over or under.
+CSV_IMPORT_CHUNK_ROWS = 5000
+# Error messages kept in the result; `error_count` keeps counting past it.
+CSV_IMPORT_MAX_ERRORS = 1000
+
+INVOICE_CSV_REQUIRED_FIELDS = [
+    "invoice_number",
+    "invoice_date",
+    "customer_name",
+    "product_name",
+    "quantity",
+    "rate",
+]
+
+
+class _InvoiceCSVImport:
+    """State one invoice CSV import carries from chunk to chunk: lookups
+    already made, and the running result."""
+
+    def __init__(self, business, start_row):
+        self.business = business
+        self.customers = {}  # name -> Customer, or None if not linked to the business
+        self.interstate = {}  # customer name -> bool
+        self.products = {}  # name -> Product, or None if not in the catalog
+        self.result = {
+            "invoices_created": 0,
+            "line_items_created": 0,
+            "errors": [],
+            "error_count": 0,
+            "start_row": start_row,
+            "next_row": start_row,
+            "completed": False,
+            "chunks": [],
+        }
 
-    # Parse CSV file using pandas
-    try:
-        # Read CSV with pandas
-        csv_file = io.BytesIO(file_content)
+    def error(self, message):
+        self.result["error_count"] += 1
+        if len(self.result["errors"]) < CSV_IMPORT_MAX_ERRORS:
+            self.result["errors"].append(message)
+
+    def run_chunk(self, df) -> bool:
+        """Import one chunk in its own transaction (a savepoint when the
+        caller already holds one). On an unexpected failure the chunk rolls
+        back, is recorded, and False tells the caller to stop there."""
+        errors_before = self.result["error_count"]
+        stats = {"start_row": self.result["next_row"], "rows": len(df)}
         try:
-            df = pd.read_csv(csv_file)
+            invoices, lines = self._import(df)
         except Exception as e:
-            raise CSVImportError(f"Error reading CSV file: {e}")
-
-        logger.info(f"Processing number of invoices: {len(df)}")
-
-        # Check if dataframe is empty
-        if df.empty:
-            logger.info(f"No invoices found for business: {business}")
-            raise CSVImportError("CSV file is empty")
-
-        # Validate required fields
-        required_fields = [
-            "invoice_number",
-            "invoice_date",
-            "customer_name",
-            "product_name",
-            "quantity",
-            "rate",
-        ]
-
-        # Check if all required fields are present in the CSV
-        missing_fields = [field for field in required_fields if field not in df.columns]
-        if missing_fields:
-            raise CSVImportError(
-                f"Missing required fields in CSV: {', '.join(missing_fields)}"
+            logger.error(f"CSV import chunk at row {stats['start_row']} failed: {e}", exc_info=True)
+            self.error(f"Rows {stats['start_row']}-{stats['start_row'] + len(df) - 1} not imported: {e!s}")
+            self.result["chunks"].append(
+                {**stats, "ok": False, "errors": self.result["error_count"] - errors_before}
             )
+            return False
+        self.result["invoices_created"] += invoices
+        self.result["line_items_created"] += lines
+        self.result["next_row"] += len(df)
+        self.result["chunks"].append({
+            **stats,
+            "ok": True,
+            "invoices_created": invoices,
+            "line_items_created": lines,
+            "errors": self.result["error_count"] - errors_before,
+        })
+        return True
 
-        # Clean and validate data
-        # Convert to dict of records for easier processing
-        records = df.to_dict("records")
-
-        # Extract all unique customer names from the CSV
-        all_customer_names = set(str(row["customer_name"]).strip() for row in records)
-
-        # Get all existing customers associated with this business in a single query
-        existing_customers = {}
-        for customer in Customer.objects.filter(
-            name__in=all_customer_names, businesses=business
-        ):
-            existing_customers[customer.name] = customer
-
-        logger.info(f"Customers fetched: {len(existing_customers)}")
-
-        # Check if any customers are missing or not associated with this business
-        missing_customers = all_customer_names - set(existing_customers.keys())
-        if missing_customers:
-            for customer_name in missing_customers:
-                result["errors"].append(
-                    f"Customer '{customer_name}' does not exist or is not associated with business '{business.name}'. Related invoices will be skipped."
-                )
-
-        # Group rows by invoice number to handle multiple line items per invoice
-        invoice_data = {}
-        invoice_dates = {}
-
-        # First pass: collect invoice data and dates
-        for row in records:
-            # Validate invoice number is provided
-            if (
-                pd.isna(row["invoice_number"])
-                or str(row["invoice_number"]).strip() == ""
-            ):
-                result["errors"].append(
-                    f"Missing invoice number for row with customer '{str(row['customer_name']).strip()}' and product '{str(row['product_name']).strip()}'. All rows must have an invoice number."
+    def _lookup_customers(self, names):
+        from billing.models import Customer
+        from billing.tax_rules import is_interstate
+
+        unseen = set(names) - self.customers.keys()
+        if not unseen:
+            return
+        found = {
+            c.name: c
+            for c in Customer.objects.filter(name__in=unseen, businesses=self.business)
+        }
+        for name in unseen:
+            customer = self.customers[name] = found.get(name)
+            if customer is None:
+                self.error(
+                    f"Customer '{name}' does not exist or is not associated with business '{self.business.name}'. Related invoices will be skipped."
                 )
-                continue
-
-            invoice_number = str(row["invoice_number"]).strip()
-            customer_name = str(row["customer_name"]).strip()
-            invoice_date = row["invoice_date"]
-
-            # Skip if customer doesn't exist
-            if customer_name not in existing_customers:
-                continue
+            else:
+                self.interstate[name] = is_interstate(self.business, customer)
+
+    def _lookup_products(self, names):
+        from billing.models import Product
+
+        unseen = set(names) - self.products.keys()
+        if not unseen:
+            return
+        found = {
+            p.name: p
+            for p in Product.objects.filter(name__in=unseen).only(
+                "name", "hsn_code", "gst_tax_rate"
+            )
+        }
+        for name in unseen:
+            self.products[name] = found.get(name)
+
+    def _import(self, df) -> tuple:
+        from billing.constants import GST_TAX_RATE, HSN_CODE
+        from billing.models import Invoice, LineItem
+        from billing.services import rollups
+
+        business = self.business
+        self._lookup_customers(df["customer_name"])
+
+        no_number = df["invoice_number"] == ""
+        for customer_name, product_name in df.loc[
+            no_number, ["customer_name", "product_name"]
+        ].itertuples(index=False):
+            self.error(
+                f"Missing invoice number for row with customer '{customer_name}' and product '{product_name}'. All rows must have an invoice number."
+            )
+        linked = df["customer_name"].map(self.customers).notna()
+        df = df[~no_number & linked]
+
+        # One header per invoice number: the first row's date and customer.
+        heads = df.groupby("invoice_number", sort=False)[
+            ["invoice_date", "customer_name"]
+        ].first()
+        heads["date"] = pd.to_datetime(
+            heads["invoice_date"], format=DATE_FORMAT_YEAR_MONTH_DATE, errors="coerce"
+        )
+        dated = heads["date"].notna()
+        # Financial year (Apr-Mar) labelled by its starting calendar year.
+        heads["fy"] = heads["date"].dt.year - (heads["date"].dt.month < 4)
 
-            customer = existing_customers[customer_name]
-
-            if invoice_number not in invoice_data:
-                invoice_data[invoice_number] = {
-                    "invoice_info": {
-                        "invoice_number": invoice_number,
-                        "invoice_date": invoice_date,
-                        "customer_name": customer_name,
-                        "customer": customer,
-                    },
-                    "line_items": [],
-                }
-                # Store the date for financial year checking
-                invoice_dates[invoice_number] = invoice_date
-
-            # Add line item data
-            line_item = {
-                "product_name": str(row["product_name"]).strip(),
-                "quantity": row["quantity"],
-                "rate": row["rate"],
-                "hsn_code": row.get("hsn_code", None),  # Optional field
-                "gst_tax_rate": row.get("gst_tax_rate", None),  # Optional field
+        # Duplicate numbers in the same FY: one query over the FY span the
+        # chunk covers, instead of an EXISTS per invoice. Invoices committed
+        # by earlier chunks count, so a number can't be imported twice.
+        duplicate_invoice_numbers = []
+        if dated.any():
+            fy_min, fy_max = int(heads.loc[dated, "fy"].min()), int(heads.loc[dated, "fy"].max())
+            taken = {
+                (number, d.year - (d.month < 4))
+                for number, d in Invoice.objects.filter(
+                    business=business,
+                    invoice_number__in=list(heads.index[dated]),
+                    invoice_date__gte=datetime(fy_min, 4, 1).date(),
+                    invoice_date__lte=datetime(fy_max + 1, 3, 31).date(),
+                ).values_list("invoice_number", "invoice_date")
             }
-            invoice_data[invoice_number]["line_items"].append(line_item)
+            duplicate_invoice_numbers = [
+                number
+                for number, fy in heads.loc[dated, "fy"].items()
+                if (number, int(fy)) in taken
+            ]
+        if duplicate_invoice_numbers:
+            self.error(
+                f"Duplicate invoice numbers found in the same financial year: {', '.join(duplicate_invoice_numbers)}"
+            )
+        heads = heads.drop(index=duplicate_invoice_numbers)
 
-        logger.info(f"Invoices fetched: {len(invoice_data)}")
+        for invoice_number in heads.index[heads["date"].isna()]:
+            logger.warning(
+                f"Invalid date format for invoice {invoice_number}. Expected format: YYYY-MM-DD"
+            )
+            self.error(
+                f"Invalid date format for invoice {invoice_number}. Expected format: YYYY-MM-DD"
+            )
+        heads = heads[heads["date"].notna()]
+
+        # Line amounts, column-wise. Decimal (object) columns keep the exact
+        # arithmetic of the per-row version.
+        lines = df[df["invoice_number"].isin(heads.index)].copy()
+        lines["qty"] = lines["quantity"].map(_decimal_or_none)
+        lines["price"] = lines["rate"].map(_decimal_or_none)
+        bad = lines["qty"].isna() | lines["price"].isna()
+        for invoice_number, quantity, rate in lines.loc[
+            bad, ["invoice_number", "quantity", "rate"]
+        ].itertuples(index=False):
+            message = (
+                f"Error creating line item for invoice {invoice_number}: "
+                f"invalid quantity/rate {quantity!r}/{rate!r}"
+            )
+            logger.warning(message)
+            self.error(message)
+        lines = lines[~bad]
+
+        self._lookup_products(lines["product_name"])
+        product = lines["product_name"].map(self.products)
+        lines["hsn"] = product.map(lambda p: p.hsn_code, na_action="ignore").fillna(HSN_CODE)
+        lines["gst"] = product.map(lambda p: p.gst_tax_rate, na_action="ignore").fillna(
+            GST_TAX_RATE
+        )
+        igst_line = (
+            lines["invoice_number"].map(heads["customer_name"]).map(self.interstate).astype(bool)
+        )
+        net = lines["qty"] * lines["price"]
+        tax = net * lines["gst"]
+        zero = Decimal("0")
+        lines["igst"] = tax.where(igst_line, zero)
+        lines["cgst"] = (tax / 2).where(~igst_line, zero)
+        lines["amount"] = net + tax
+        totals = lines.groupby("invoice_number", sort=False)["amount"].sum()
+
+        with transaction.atomic(), rollups.resync() as rollup:
+            invoices = Invoice.objects.bulk_create(
+                [
+                    Invoice(
+                        business=business,
+                        customer=self.customers[head.customer_name],
+                        invoice_number=invoice_number,
+                        invoice_date=head.date.date(),
+                        type_of_invoice="outward",  # Default to outward invoice
+                        total_amount=totals.get(invoice_number, zero),
+                        workspace_id=1,
+                    )
+                    for invoice_number, head in heads.iterrows()
+                ],
+                batch_size=500,
+            )
+            rollup.add(*(invoice.pk for invoice in invoices))
+            by_number = {invoice.invoice_number: invoice for invoice in invoices}
+
+            # bulk_create skips the per-line signals; totals were set above.
+            LineItem.objects.bulk_create(
+                (
+                    LineItem(
+                        product_name=row.product_name,
+                        quantity=row.qty,
+                        rate=row.price,
+                        invoice_id=by_number[row.invoice_number].id,
+                        hsn_code=row.hsn,
+                        customer_id=by_number[row.invoice_number].customer_id,
+                        gst_tax_rate=row.gst,
+                        cgst=row.cgst,
+                        sgst=row.cgst,
+                        igst=row.igst,
+                        amount=row.amount,
+                    )
+                    for row in lines.itertuples(index=False)
+                ),
+                batch_size=1000,
+            )
+        return len(invoices), len(lines)
 
-        # Check for duplicate invoice numbers within the same financial year
-        duplicate_invoice_numbers = []
 
-        # Process each invoice date to determine its financial year
-        for invoice_number, date_str in invoice_dates.items():
-            try:
-                # Parse the date
-                invoice_date = datetime.strptime(
-                    date_str, DATE_FORMAT_YEAR_MONTH_DATE
-                ).date()
+def _stream_size(stream):
+    try:
+        here = stream.tell()
+        size = stream.seek(0, io.SEEK_END)
+        stream.seek(here)
+    except (AttributeError, OSError, ValueError):
+        return 0
+    else:
+        return size
 
-                # Determine financial year start date
-                fy_start_date = datetime(invoice_date.year, 4, 1).date()
-                if invoice_date.month < 4:  # Before April, use previous year's April
-                    fy_start_date = datetime(invoice_date.year - 1, 4, 1).date()
 
-                # Determine financial year end date
-                fy_end_date = datetime(fy_start_date.year + 1, 3, 31).date()
+def process_invoice_csv(
+    file_content, business_id: int, start_row: int = 0, chunk_size: int | None = None
+) -> dict:
+    """
+    Process a CSV file containing invoice data and create invoices and line items.
 
-                # Check if this invoice number already exists in the same financial year
-                existing = Invoice.objects.filter(
-                    business=business,
-                    invoice_number=invoice_number,
-                    invoice_date__gte=fy_start_date,
-                    invoice_date__lte=fy_end_date,
-                ).exists()
+    Expected CSV format:
+    invoice_number,invoice_date,customer_name,product_name,quantity,rate,hsn_code,gst_tax_rate
 
-                if existing:
-                    duplicate_invoice_numbers.append(invoice_number)
+    `file_content` is the raw bytes or an open binary file (an upload's temp
+    file). The file is streamed in chunks of `chunk_size` rows
+    (CSV_IMPORT_CHUNK_ROWS), so memory stays flat however large the export.
+
+    Customers must already exist and be linked to the business; their rows
+    are skipped otherwise. HSN and GST rate come from the product catalog
+    (defaults for unknown products), as for manually entered lines.
+
+    Each chunk is handled column-wise — one query each for new customers,
+    new products and existing invoice numbers, tax computed on whole
+    columns with interstate-ness resolved once per customer, bulk_create
+    for the writes — and commits in its own transaction. Chunks end on an
+    invoice boundary, so every invoice lands whole. If a chunk fails, the
+    import stops there with `completed: False`; `next_row` is the data-row
+    offset to pass back as `start_row` to resume. (An invoice whose rows
+    are scattered across chunks has its later rows reported as a duplicate
+    — keep each invoice's rows together.)
+
+    Returns counts, the first CSV_IMPORT_MAX_ERRORS error messages plus
+    `error_count`, and per-chunk stats under `chunks`.
+    """
+    from billing.models import Business
+    from billing.services import jobs
 
-            except ValueError:
-                # If date parsing fails, we'll catch it later in the validation
-                pass
+    # Get the business
+    try:
+        business = Business.objects.get(id=business_id)
+    except Business.DoesNotExist:
+        raise CSVImportError(f"Business with ID {business_id} does not exist")
 
-        # Report duplicate invoice numbers
-        if duplicate_invoice_numbers:
-            result["errors"].append(
-                f"Duplicate invoice numbers found in the same financial year: {', '.join(duplicate_invoice_numbers)}"
-            )
+    if isinstance(file_content, (bytes, bytearray)):
+        file_content = io.BytesIO(file_content)
+    total_bytes = _stream_size(file_content)
+    importer = _InvoiceCSVImport(business, start_row)
+    logger.info(f"Importing invoices for business {business} from row {start_row}")
 
-        # Remove duplicate invoice numbers from invoice_data
-        invoice_data = {
-            k: v for k, v in invoice_data.items() if k not in duplicate_invoice_numbers
-        }
+    try:
+        # Everything as text: numbers are parsed as Decimal, and invoice
+        # numbers must not come back as floats ("1001.0").
+        reader = pd.read_csv(
+            file_content,
+            dtype=str,
+            chunksize=chunk_size or CSV_IMPORT_CHUNK_ROWS,
+            skiprows=range(1, start_row + 1) if start_row else None,
+        )
+    except Exception as e:
+        raise CSVImportError(f"Error reading CSV file: {e}")
 
-        # Process each invoice with its line items in a transaction
-        with transaction.atomic():
-            # One catalog read for the whole file (Product.name is unique) —
-            # the old per-line helper SELECTed the product and the invoice
-            # again for every row.
-            products_by_name = {p.name: p for p in Product.objects.all()}
-            for invoice_number, data in invoice_data.items():
-                invoice_info = data["invoice_info"]
-                line_items_data = data["line_items"]
-
-                # Validate and parse invoice date
-                try:
-                    invoice_date = datetime.strptime(
-                        invoice_info["invoice_date"], DATE_FORMAT_YEAR_MONTH_DATE
-                    ).date()
-                except ValueError:
-                    logger.warning(
-                        f"Invalid date format for invoice {invoice_number}. Expected format: YYYY-MM-DD"
-                    )
-                    result["errors"].append(
-                        f"Invalid date format for invoice {invoice_number}. Expected format: YYYY-MM-DD"
+    buffer = None  # rows read but not yet imported
+    rows_read = 0
+    with reader:
+        while True:
+            try:
+                chunk = next(reader, None)
+            except Exception as e:  # malformed line mid-file
+                importer.error(f"Error reading CSV file after row {start_row + rows_read}: {e}")
+                break
+            if chunk is None:
+                if buffer is not None and not buffer.empty:
+                    importer.result["completed"] = importer.run_chunk(buffer)
+                elif rows_read:
+                    importer.result["completed"] = True
+                break
+
+            if not rows_read:
+                missing_fields = [f for f in INVOICE_CSV_REQUIRED_FIELDS if f not in chunk.columns]
+                if chunk.empty:
+                    break
+                if missing_fields:
+                    raise CSVImportError(
+                        f"Missing required fields in CSV: {', '.join(missing_fields)}"
                     )
-                    continue
-
-                # Create invoice with the customer (already validated)
-                invoice = Invoice.objects.create(
-                    business=business,
-                    customer=invoice_info["customer"],
-                    invoice_number=invoice_number,
-                    invoice_date=invoice_date,
-                    type_of_invoice="outward",  # Default to outward invoice
-                    workspace_id=1,
-                )
+            rows_read += len(chunk)
+            for col in ("invoice_number", "invoice_date", "customer_name", "product_name"):
+                chunk[col] = chunk[col].fillna("").str.strip()
 
-                print(f"Invoice {invoice_number} created with {invoice=}")
-
-                result["invoices_created"] += 1
-
-                # Line items are built in memory and bulk_created so the
-                # per-line resync signal doesn't re-sum the invoice once per
-                # row — imports are the largest n this code ever sees. Same
-                # math as LineItem.create_line_item_for_invoice, minus its
-                # two per-row SELECTs (product, invoice).
-                is_igst = invoice.is_igst_applicable
-                new_lis = []
-                new_total = Decimal("0")
-                for item_data in line_items_data:
-                    try:
-                        quantity = Decimal(str(item_data["quantity"]))
-                        rate = Decimal(str(item_data["rate"]))
-                        product = products_by_name.get(item_data["product_name"])
-                        hsn_code = product.hsn_code if product else HSN_CODE
-                        gst_rate = product.gst_tax_rate if product else GST_TAX_RATE
-                        net_amount = quantity * rate
-                        tax_amount = net_amount * gst_rate
-                        if is_igst:
-                            cgst, sgst, igst = Decimal("0"), Decimal("0"), tax_amount
-                        else:
-                            cgst = sgst = tax_amount / 2
-                            igst = Decimal("0")
-                        new_lis.append(
-                            LineItem(
-                                product_name=item_data["product_name"],
-                                quantity=quantity,
-                                rate=rate,
-                                invoice_id=invoice.id,
-                                hsn_code=hsn_code,
-                                customer_id=invoice.customer_id,
-                                gst_tax_rate=gst_rate,
-                                cgst=cgst,
-                                sgst=sgst,
-                                igst=igst,
-                                amount=net_amount + tax_amount,
-                            )
-                        )
-                        new_total += net_amount + tax_amount
-                        result["line_items_created"] += 1
-                    except Exception as e:
-                        logger.warning(
-                            f"Error creating line item for invoice {invoice_number}: {e!s}"
-                        )
-                        result["errors"].append(
-                            f"Error creating line item for invoice {invoice_number}: {e!s}"
-                        )
-
-                LineItem.objects.bulk_create(new_lis, batch_size=100)
-                invoice.total_amount = new_total
-                Invoice.objects.filter(pk=invoice.pk).update(total_amount=new_total)
-
-    except Exception as e:
-        if isinstance(e, CSVImportError):
-            raise
-        raise CSVImportError(f"Error processing CSV file: {e!s} as {result}")
-
-    return result
+            if buffer is None:
+                buffer = chunk
+                continue
+            # Import the buffer except its trailing invoice, whose rows may
+            # continue in this chunk; those move forward with it.
+            numbers = buffer["invoice_number"].to_numpy()
+            cut = len(numbers)
+            while cut and numbers[cut - 1] == numbers[-1]:
+                cut -= 1
+            if cut and not importer.run_chunk(buffer.iloc[:cut]):
+                break
+            buffer = pd.concat([buffer.iloc[cut:], chunk], ignore_index=True)
+            if total_bytes:
+                jobs.report_progress(file_content.tell(), total_bytes)
+
+    if not rows_read:
+        logger.info(f"No invoices found for business: {business}")
+        raise CSVImportError("CSV file is empty")
+    return importer.result
 
 
 class AIInvoiceProcessor:
@@ -720,12 +801,27 @@ class AIInvoiceProcessor:
         until = cls._key_cooldowns.get(cls._key_fp(key))
         return max(0.0, until - time.time()) if until else 0.0
 
+    def available_key_indexes(self) -> list:
+        """Positions (0-based) of the configured keys not currently cooled down."""
+        return [i for i, key in enumerate(self.gemini_keys) if not self._is_cooled_down(key)]
+
+    def _require_keys(self) -> None:
+        if not self.gemini_keys:
+            raise AIInvoiceProcessingError(
+                "No Gemini API key configured. Add GEMINI_API_KEYS "
+                "(comma-separated, free keys at "
+                "https://aistudio.google.com/apikey) to your .env."
+            )
+
     # ── public API ──────────────────────────────────────────────────
 
     def process_invoice_image(self, image_file, business_id: int | None = None) -> dict:
         """Extract structured data from an invoice image.
 
         Routing:
+          0. A byte-identical image under the same prompt and model was
+             extracted before → return the stored result from the
+             ExtractionCache table; no key is used.
           1. Iterate Gemini keys in declared order, skipping any in
              cooldown. First key that succeeds wins.
           2. On 429, mark the key cooled down for the retry-after
@@ -743,33 +839,189 @@ class AIInvoiceProcessor:
         the caller looks up the customer + business afterwards (used by
         the auto-detect-business flow on the AI Import page).
         """
-        from billing.models import Customer
+        from billing.services import extraction_cache
+
+        self._require_keys()
+        prompt = self._build_prompt(self._customer_names(business_id))
+        image_bytes, mime = self._read_image(image_file)
+
+        cache_key = extraction_cache.digest(image_bytes, prompt, self.gemini_model)
+        cached = extraction_cache.get(cache_key)
+        if cached is not None:
+            return self._cached_result(cached)
+
+        result = self._extract_with_rotation(image_bytes, mime, prompt)
+        return self._store_result(cache_key, result)
+
+    def process_batch(self, image_files, business_id: int | None = None):
+        """Extract many images concurrently, yielding `(position, result)`
+        pairs in completion order. `result` is the process_invoice_image
+        dict, or the AIInvoiceProcessingError that image raised.
+
+        Images are normalised up front (over the image process pool when
+        the batch is big enough, see services/images.py) and looked up in
+        the extraction cache in one query for the batch; hits are yielded
+        first.
+        The misses (each distinct image once) fan out over one worker per
+        key that isn't cooled down: each key is its own quota, so N live
+        keys give N parallel requests — a 30-image batch on 3 keys takes
+        about a third of the one-at-a-time wall time. Each call checks a
+        key out of a slot queue and starts its rotation there, so two
+        in-flight calls never share a key; on a 429 the call falls through
+        to the next key exactly as a single upload does, and the shared
+        `_key_cooldowns` keeps later calls off the cooled key. Workers make
+        no DB queries; results are cached back on the calling thread.
+        """
+        import queue
+        from concurrent.futures import ThreadPoolExecutor, as_completed
 
-        if not self.gemini_keys:
-            raise AIInvoiceProcessingError(
-                "No Gemini API key configured. Add GEMINI_API_KEYS "
-                "(comma-separated, free keys at "
-                "https://aistudio.google.com/apikey) to your .env."
-            )
+        from billing.services import extraction_cache
 
-        customer_names = []
-        if business_id:
-            customer_names = list(
-                Customer.objects.filter(businesses__id=business_id)
-                .values_list("name", flat=True)
-            )
+        self._require_keys()
+        prompt = self._build_prompt(self._customer_names(business_id))
+
+        uploads = []
+        for pos, image_file in enumerate(image_files):
+            try:
+                uploads.append((pos, *self._read_upload(image_file)))
+            except AIInvoiceProcessingError as e:
+                yield pos, e
+
+        pending = {}  # digest -> (image_bytes, mime, [positions])
+        for pos, normalized in self._normalize_uploads(uploads):
+            if isinstance(normalized, AIInvoiceProcessingError):
+                yield pos, normalized
+                continue
+            image_bytes, mime = normalized
+            cache_key = extraction_cache.digest(image_bytes, prompt, self.gemini_model)
+            pending.setdefault(cache_key, (image_bytes, mime, []))[2].append(pos)
+
+        for cache_key, cached in extraction_cache.get_many(pending).items():
+            for pos in pending.pop(cache_key)[2]:
+                yield pos, self._cached_result(cached)
+        if not pending:
+            return
+
+        # With every key cooled down, one worker is enough to report that.
+        live = self.available_key_indexes() or [0]
+        slots: queue.Queue = queue.Queue()
+        for index in live:
+            slots.put(index)
+
+        def work(image_bytes, mime):
+            first_key = slots.get()
+            try:
+                return self._extract_with_rotation(image_bytes, mime, prompt, first_key)
+            finally:
+                slots.put(first_key)
+
+        pool = ThreadPoolExecutor(
+            max_workers=min(len(live), len(pending)),
+            thread_name_prefix="ai-batch",
+        )
+        try:
+            futures = {
+                pool.submit(work, image_bytes, mime): cache_key
+                for cache_key, (image_bytes, mime, _) in pending.items()
+            }
+            for future in as_completed(futures):
+                cache_key = futures[future]
+                try:
+                    result = self._store_result(cache_key, future.result())
+                except AIInvoiceProcessingError as e:
+                    result = e
+                except Exception as e:
+                    logger.error(f"Unexpected error in AI batch extraction: {e}", exc_info=True)
+                    result = AIInvoiceProcessingError(
+                        "An unexpected error occurred while processing the invoice"
+                    )
+                positions = pending[cache_key][2]
+                for n, pos in enumerate(positions):
+                    # Same image uploaded twice in one batch: one call, a copy per position.
+                    yield pos, copy.deepcopy(result) if n and isinstance(result, dict) else result
+        finally:
+            # Client went away mid-stream: don't spend quota on the rest.
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    # ── extraction steps ───────────────────────────────────────────
+
+    @staticmethod
+    def _customer_names(business_id) -> list:
+        from billing.models import Customer
+
+        if not business_id:
+            return []
+        return list(
+            Customer.objects.filter(businesses__id=business_id)
+            .values_list("name", flat=True)
+        )
 
+    @staticmethod
+    def _read_upload(image_file) -> tuple:
         try:
             image_bytes = image_file.read()
         except Exception as e:
             raise AIInvoiceProcessingError(f"Could not read uploaded image: {e!s}")
 
-        mime = getattr(image_file, "content_type", "") or "image/jpeg"
-        image_bytes, mime = self._normalize_image(image_bytes, mime)
-        prompt = self._build_prompt(customer_names)
+        return image_bytes, getattr(image_file, "content_type", "") or "image/jpeg"
+
+    def _read_image(self, image_file) -> tuple:
+        return self._normalize_image(*self._read_upload(image_file))
+
+    def _normalize_uploads(self, uploads) -> list:
+        """`[(position, (jpeg, mime) or AIInvoiceProcessingError)]` for
+        `[(position, raw bytes, mime)]`. A batch big enough to repay the
+        IPC goes over the image process pool; the rest decode inline."""
+        from billing.services import images
 
+        if not images.use_pool([raw for _, raw, _ in uploads]):
+            out = []
+            for pos, raw, mime in uploads:
+                try:
+                    out.append((pos, self._normalize_image(raw, mime)))
+                except AIInvoiceProcessingError as e:
+                    out.append((pos, e))
+            return out
+
+        results = images.normalize_many(
+            [raw for _, raw, _ in uploads], self.MAX_IMAGE_DIM
+        )
+        return [
+            (pos, AIInvoiceProcessingError(self._decode_error(mime, r))
+             if isinstance(r, Exception) else (r, "image/jpeg"))
+            for (pos, _, mime), r in zip(uploads, results, strict=True)
+        ]
+
+    def _cached_result(self, cached: dict) -> dict:
+        from billing.services import extraction_cache
+
+        cached["_provider"] = "cache"
+        # No key was used; the UI shows "cached" instead of "Gemini #n/N".
+        cached["_key_index"] = None
+        cached["_key_total"] = len(self.gemini_keys)
+        cached["_cache"] = extraction_cache.stats(hit=True)
+        return cached
+
+    def _store_result(self, cache_key: str, result: dict) -> dict:
+        from billing.services import extraction_cache
+
+        extraction_cache.put(
+            cache_key,
+            self.gemini_model,
+            {k: v for k, v in result.items() if not k.startswith("_")},
+        )
+        result["_cache"] = extraction_cache.stats(hit=False)
+        return result
+
+    def _extract_with_rotation(
+        self, image_bytes: bytes, mime: str, prompt: str, first_key: int = 0
+    ) -> dict:
+        """Run the key rotation (steps 1-4 of process_invoice_image),
+        starting at `first_key` so concurrent callers spread over the pool."""
         last_error: AIInvoiceProcessingError | None = None
-        for idx, key in enumerate(self.gemini_keys, start=1):
+        ordered = list(enumerate(self.gemini_keys, start=1))
+        ordered = ordered[first_key:] + ordered[:first_key]
+        for idx, key in ordered:
             if self._is_cooled_down(key):
                 continue
             try:
@@ -788,9 +1040,16 @@ class AIInvoiceProcessor:
                     # recover quickly, and re-trying just burns the
                     # request slot.
                     retry_s = self._extract_retry_seconds(e)
+                    auth_failed = "403" in str(e) or "401" in str(e)
                     if retry_s is None:
-                        retry_s = 86400 if "403" in str(e) or "401" in str(e) else 3600
+                        retry_s = 86400 if auth_failed else 3600
                     self._set_cooldown(key, retry_s)
+                    if auth_failed:
+                        # A revoked/denied key's pooled client is dead
+                        # weight; rebuild it if the key ever comes back.
+                        from billing.services.gemini_clients import client_pool
+
+                        client_pool.invalidate(key)
                     logger.warning(
                         "Gemini key %s failed (%s), cooled down for %.0fs",
                         self._key_fp(key), str(e)[:80], retry_s,
@@ -841,36 +1100,38 @@ class AIInvoiceProcessor:
         google-genai exception str() dumps the entire error dict
         which is ugly when surfaced in a toast.
 
-        Creating a fresh client per call is fine — the SDK's startup
-        cost is ~50ms (mostly auth header setup). Caching clients per
-        key would marginally help under concurrent load but adds state
-        management we don't need yet.
+        The client comes from the process-wide pool (one per key, see
+        billing/services/gemini_clients.py): building one per call cost
+        ~50ms and threw away the keep-alive connection every time.
         """
-        client = genai.Client(api_key=key)
+        from billing.services.gemini_clients import client_pool
+
+        client = client_pool.get(key)
         try:
-            response = client.models.generate_content(
-                model=self.gemini_model,
-                contents=[
-                    {
-                        "role": "user",
-                        "parts": [
-                            {"text": prompt},
-                            {"inline_data": {"mime_type": mime, "data": image_bytes}},
-                        ],
-                    }
-                ],
-                config=types.GenerateContentConfig(
-                    candidate_count=1,
-                    # 4096 is the sweet spot. Benchmark measurements:
-                    #   8K → 12.6s (model pads output well past need)
-                    #   4K →  3-5s (current — comfortable headroom)
-                    #   2K →  truncates on pretty-printed JSON
-                    max_output_tokens=4096,
-                    temperature=0.0,
-                    response_mime_type="application/json",
-                    response_schema=self._build_schema(),
-                ),
-            )
+            with client_pool.timed_call():
+                response = client.models.generate_content(
+                    model=self.gemini_model,
+                    contents=[
+                        {
+                            "role": "user",
+                            "parts": [
+                                {"text": prompt},
+                                {"inline_data": {"mime_type": mime, "data": image_bytes}},
+                            ],
+                        }
+                    ],
+                    config=types.GenerateContentConfig(
+                        candidate_count=1,
+                        # 4096 is the sweet spot. Benchmark measurements:
+                        #   8K → 12.6s (model pads output well past need)
+                        #   4K →  3-5s (current — comfortable headroom)
+                        #   2K →  truncates on pretty-printed JSON
+                        max_output_tokens=4096,
+                        temperature=0.0,
+                        response_mime_type="application/json",
+                        response_schema=self._build_schema(),
+                    ),
+                )
         except Exception as e:
             # Try to pull a clean message out of the raw exception.
             raise AIInvoiceProcessingError(self._format_gemini_error(e))
@@ -1101,39 +1362,26 @@ Rules:
           - WebP / TIFF / odd colorspaces also normalised here.
           - Downscaling to MAX_IMAGE_DIM (1568px longest side) cuts
             latency on 4000px+ phone shots without losing OCR fidelity.
-          - Cost on a small image is ~50-100ms — well under the network
-            + Gemini round-trip, so always-on is a fair tradeoff for
-            removing the "model returned empty" failure mode that
-            occasionally hit on weird formats.
+
+        The work is in billing/services/images.py: small baseline JPEGs
+        pass straight through, big JPEGs decode at reduced scale, and the
+        result is memoised so the source preview reuses this decode.
 
         Returns `(bytes, "image/jpeg")` — always JPEG out.
         """
-        from PIL import Image  # lazy import — only loaded on AI path
+        from billing.services import images
 
         try:
-            img = Image.open(io.BytesIO(image_bytes))
-            # HEIC + some RAW formats need explicit load() to materialize
-            # before the BytesIO is closed.
-            img.load()
-        except Exception as e:
-            raise AIInvoiceProcessingError(
-                f"Could not decode image (format={mime!r}): {e!s}. "
-                "Supported formats: JPEG, PNG, HEIC."
-            )
-        if img.mode != "RGB":
-            img = img.convert("RGB")
-        max_dim = AIInvoiceProcessor.MAX_IMAGE_DIM
-        if max(img.size) > max_dim:
-            ratio = max_dim / max(img.size)
-            img = img.resize(
-                (int(img.width * ratio), int(img.height * ratio)),
-                Image.Resampling.LANCZOS,
-            )
-        buf = io.BytesIO()
-        # Quality 88 is the OCR sweet spot — sub-100KB on most invoices,
-        # no visible compression artefacts on printed text.
-        img.save(buf, format="JPEG", quality=88, optimize=True)
-        return buf.getvalue(), "image/jpeg"
+            return images.normalize(image_bytes, AIInvoiceProcessor.MAX_IMAGE_DIM), "image/jpeg"
+        except images.ImageDecodeError as e:
+            raise AIInvoiceProcessingError(AIInvoiceProcessor._decode_error(mime, e))
+
+    @staticmethod
+    def _decode_error(mime: str, e) -> str:
+        return (
+            f"Could not decode image (format={mime!r}): {e!s}. "
+            "Supported formats: JPEG, PNG, HEIC."
+        )
 
     @staticmethod
     def _convert_to_dict(data: dict) -> dict:
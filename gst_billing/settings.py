@@ -355,6 +355,18 @@ GEMINI_API_KEYS = os.getenv("GEMINI_API_KEYS", "")
 # measurable quality loss on printed invoices. Override per-environment
 # via .env for tougher scans. See AIInvoiceProcessor.DEFAULT_MODEL.
 GEMINI_VISION_MODEL = os.getenv("GEMINI_VISION_MODEL", "gemini-2.5-flash-lite")
+# Extraction cache (billing.services.extraction_cache): the same normalised
+# image + prompt + model returns the stored result instead of a Gemini call.
+# TTL bounds how stale a cached read can be after a prompt-side fix that
+# doesn't change the prompt text; the entry cap bounds the table (LRU).
+AI_EXTRACTION_CACHE_TTL_DAYS = int(os.getenv("AI_EXTRACTION_CACHE_TTL_DAYS", 30))
+AI_EXTRACTION_CACHE_MAX_ENTRIES = int(os.getenv("AI_EXTRACTION_CACHE_MAX_ENTRIES", 5000))
+# Processes used to normalise the images of a batch upload
+# (billing.services.images); 0 = min(4, CPU count). 1 keeps it inline.
+AI_IMAGE_WORKERS = int(os.getenv("AI_IMAGE_WORKERS", 0))
+# Days a finished background job (billing.services.jobs) keeps its row,
+# result file and stored uploads before `run_jobs` purges them.
+JOB_RETENTION_DAYS = int(os.getenv("JOB_RETENTION_DAYS", 14))
 # Ensure log dir exists — django.utils.log.configure_logging will fail to
 # attach the FileHandler otherwise (fresh checkouts and CI runners).
 os.makedirs(os.path.join(BASE_DIR, "logs"), exist_ok=True)
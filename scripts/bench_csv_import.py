@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+"""Benchmark the invoice CSV import on a generated file.
+
+Builds a throwaway business, customers and products, generates an invoice
+CSV of the requested size, runs `process_invoice_csv` on it and reports
+wall time and query count. Everything happens inside a transaction that is
+rolled back, but it holds that transaction (and the "masters" /
+"typeahead:*" DataVersion rows its saves bump) for the whole run, blocking
+every other master write meanwhile — run it against a development or
+scratch database, never a live one.
+
+    python scripts/bench_csv_import.py                    # 50,000 rows
+    python scripts/bench_csv_import.py --rows 5000 --lines-per-invoice 3
+    python scripts/bench_csv_import.py --write /tmp/invoices.csv   # keep the fixture
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "gst_billing.settings")
+
+import django
+
+django.setup()
+
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from billing.models import Business, Customer, Product
+from billing.utils import process_invoice_csv
+
+CSV_HEADER = "invoice_number,invoice_date,customer_name,product_name,quantity,rate,hsn_code,gst_tax_rate\n"
+
+
+def build_invoice_csv(rows, customers, products, lines_per_invoice=4, seed=0):
+    """Deterministic invoice CSV: `rows` lines, grouped `lines_per_invoice`
+    to an invoice, dates spread over one financial year."""
+    rnd = random.Random(seed)
+    out = [CSV_HEADER]
+    for i in range(rows):
+        number = i // lines_per_invoice + 1
+        day = 1 + (number * 7) % 365
+        month, dom = divmod(day - 1, 30)
+        date = f"{2025 + (month + 3) // 12}-{(month + 3) % 12 + 1:02d}-{min(dom + 1, 28):02d}"
+        out.append(
+            f"BENCH-{number},{date},{customers[number % len(customers)]},"
+            f"{rnd.choice(products)},{rnd.randint(1, 500) / 10},{rnd.randint(4000, 7000)},711319,0.03\n"
+        )
+    return "".join(out).encode()
+
+
+class _Rollback(Exception):
+    pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Time process_invoice_csv on a generated CSV (rolled back afterwards)."
+    )
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--lines-per-invoice", type=int, default=4)
+    parser.add_argument("--customers", type=int, default=200)
+    parser.add_argument("--write", help="Also save the generated CSV to this path.")
+    opts = parser.parse_args(argv)
+
+    customers = [f"Bench Customer {i}" for i in range(opts.customers)]
+    products = ["Gold Ring", "Gold Chain", "Silver Anklet", "Gold Bangle", "Unlisted Item"]
+    content = build_invoice_csv(opts.rows, customers, products, opts.lines_per_invoice)
+    if opts.write:
+        with open(opts.write, "wb") as fh:
+            fh.write(content)
+
+    try:
+        with transaction.atomic():
+            business = Business.objects.create(
+                name="CSV Bench Business", gst_number="27AADCB2230M1Z3", state_name="MAHARASHTRA"
+            )
+            for i, name in enumerate(customers):
+                # Every fifth customer is out of state, so both tax paths run.
+                gst = "29AADCB2230M1Z4" if i % 5 == 0 else "27AADCB2230M1Z4"
+                Customer.objects.create(name=name, gst_number=gst).businesses.add(business)
+            for name in products[:-1]:
+                Product.objects.get_or_create(name=name, defaults={"hsn_code": "7113", "gst_tax_rate": "0.03"})
+
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                result = process_invoice_csv(content, business.id)
+                elapsed = time.perf_counter() - started
+            raise _Rollback
+    except _Rollback:
+        pass
+
+    print(
+        f"{opts.rows} rows ({len(content) // 1024} KB): "
+        f"{result['invoices_created']} invoices, {result['line_items_created']} line items, "
+        f"{len(result['errors'])} errors"
+    )
+    print(f"{elapsed:.2f} s, {len(queries)} queries ({opts.rows / elapsed:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+"""Benchmark per-request Gemini client overhead against a local stub.
+
+Starts a throwaway HTTP server on 127.0.0.1 that answers generateContent
+with a canned extraction, points the SDK at it, and runs the real
+`AIInvoiceProcessor._extract_via_gemini` path N times twice: once building
+a fresh `genai.Client` per call (the old behaviour), once through the
+shared client pool. No network, no quota, no key needed.
+
+    python scripts/bench_gemini_client.py              # 200 calls per mode
+    python scripts/bench_gemini_client.py --calls 1000 --delay-ms 5
+
+--delay-ms adds server-side latency, to see the overhead against a
+realistic-ish response time rather than an instant stub.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "gst_billing.settings")
+
+import django
+
+django.setup()
+
+import google.genai as genai
+from django.test import override_settings
+from google.genai import types
+
+from billing.services import gemini_clients
+from billing.utils import AIInvoiceProcessor
+
+CANNED = {
+    "invoice_number": "BENCH-1",
+    "invoice_date": "2026-05-01",
+    "customer_name": "Bench Customer",
+    "line_items": [
+        {"product_name": "Gold Ornament", "quantity": 10, "rate": 6000, "gst_tax_rate": 0.03}
+    ],
+}
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so the client can keep the connection alive between calls.
+    protocol_version = "HTTP/1.1"
+    delay = 0.0
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if self.delay:
+            time.sleep(self.delay)
+        body = json.dumps({
+            "candidates": [{
+                "content": {"role": "model", "parts": [{"text": json.dumps(CANNED)}]},
+                "finishReason": "STOP",
+            }],
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _pct(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))]
+
+
+class FreshClientPool(gemini_clients.GeminiClientPool):
+    """The pre-pool behaviour: a new client for every call."""
+
+    def get(self, api_key):
+        return self._factory(api_key)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Measure Gemini client overhead (fresh client vs pooled) against a local stub."
+    )
+    parser.add_argument("--calls", type=int, default=200, help="Calls per mode (default 200).")
+    parser.add_argument("--delay-ms", type=float, default=0.0,
+                        help="Server-side delay per response, in ms.")
+    opts = parser.parse_args(argv)
+
+    handler = type("Handler", (_StubHandler,), {"delay": opts.delay_ms / 1000})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/"
+
+    def stub_client(api_key):
+        return genai.Client(api_key=api_key, http_options=types.HttpOptions(base_url=base_url))
+
+    key = "AIzaBenchmarkKey-000000000000"
+    modes = [
+        ("fresh client per call", FreshClientPool(factory=stub_client)),
+        ("pooled client", gemini_clients.GeminiClientPool(factory=stub_client)),
+    ]
+    original = gemini_clients.client_pool
+    results = {}
+    try:
+        with override_settings(GEMINI_API_KEYS=key, GEMINI_API_KEY=""):
+            processor = AIInvoiceProcessor()
+            for label, pool in modes:
+                gemini_clients.client_pool = pool
+                processor._extract_via_gemini(key, b"jpeg", "image/jpeg", "prompt")  # warm-up
+                samples = []
+                for _ in range(opts.calls):
+                    started = time.perf_counter()
+                    processor._extract_via_gemini(key, b"jpeg", "image/jpeg", "prompt")
+                    samples.append((time.perf_counter() - started) * 1000)
+                results[label] = samples
+                print(
+                    f"{label:24s} p50 {_pct(samples, 50):7.2f} ms   "
+                    f"p95 {_pct(samples, 95):7.2f} ms   mean {statistics.mean(samples):7.2f} ms"
+                )
+                pool.clear()
+    finally:
+        gemini_clients.client_pool = original
+        server.shutdown()
+        server.server_close()
+
+    before, after = results.values()
+    print(
+        f"Pooling saves {_pct(before, 50) - _pct(after, 50):.2f} ms at p50 and "
+        f"{_pct(before, 95) - _pct(after, 95):.2f} ms at p95 per request."
+    )
+
+
+if __name__ == "__main__":
+    main()
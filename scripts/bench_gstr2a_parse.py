@@ -0,0 +1,219 @@
+#!/usr/bin/env python
+"""Benchmark GSTR-2A parsing: the old pandas + iterrows() path vs
+`parse_file` on each available reader engine, and the old scan-per-note
+credit-note matcher vs the indexed one.
+
+    python scripts/bench_gstr2a_parse.py                     # 10,000 invoice rows
+    python scripts/bench_gstr2a_parse.py --rows 50000 --rounds 1
+    python scripts/bench_gstr2a_parse.py --file may-2a.xlsx  # a real download
+
+The synthetic file follows the portal layout (recipient on row 0, headers
+on row 2) with a note sheet of credit notes. Every engine's parse is
+checked against the legacy one, so a speed-up that changes the rows shows
+up as a mismatch instead of a win.
+"""
+
+import argparse
+import io
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import date, datetime
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "gst_billing.settings")
+
+import django
+
+django.setup()
+
+import pandas as pd
+from openpyxl import Workbook
+
+from billing.services import excel
+from billing.services.gstr2a_import import (
+    CN_CANCELLING,
+    GSTR2ANote,
+    GSTR2ARow,
+    _match_credit_notes,
+    _to_decimal,
+    parse_file,
+)
+
+INVOICE_HEADERS = [
+    "Supplier Name", "GSTIN", "State", "POS", "Invoice No", "Invoice Date",
+    "Invoice Value", "Taxable Value", "IGST", "CGST", "SGST", "CESS", "3B Status", "RC",
+]
+NOTE_HEADERS = [
+    "Supplier Name", "GSTIN", "Note No", "Note Date", "Note Type", "Note Value",
+    "Taxable Value", "IGST", "CGST", "SGST",
+]
+
+
+def build_2a_workbook(rows, notes=0, suppliers=150, seed=0):
+    """Deterministic 2A .xlsx bytes with `rows` invoices and `notes` credit notes."""
+    rnd = random.Random(seed)
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("invoice")
+    ws.append(["BENCH RECIPIENT (22AAAAA0000A1Z5)"])
+    ws.append([])
+    ws.append(INVOICE_HEADERS)
+    values = []
+    for i in range(rows):
+        s = i % suppliers
+        taxable = rnd.randint(5_000, 500_000) / 100
+        half = round(taxable * 0.015, 2)
+        value = round(taxable + 2 * half, 2)
+        values.append((s, value))
+        ws.append([
+            f"SUPPLIER {s}", f"22BBBBB{s:04d}B1Z5", "CHHATTISGARH", "CHHATTISGARH",
+            f"INV/{i}", f"{1 + i % 28:02d}/{1 + i % 12:02d}/2024",
+            value, taxable, 0, half, half, 0, "Filed" if i % 9 else "Not Filed", "No",
+        ])
+    ns = wb.create_sheet("note")
+    ns.append(["BENCH RECIPIENT (22AAAAA0000A1Z5)"])
+    ns.append([])
+    ns.append(NOTE_HEADERS)
+    for n in range(notes):
+        s, value = values[rnd.randrange(len(values))]
+        ns.append([f"SUPPLIER {s}", f"22BBBBB{s:04d}B1Z5", f"CN/{n}", "28/12/2024",
+                   "Credit", value, 0, 0, 0, 0])
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+def _legacy_match(invoices, notes):
+    """The pre-index matcher: scan every invoice for every credit note."""
+    cancelled, used = set(), set()
+    for note in notes:
+        if note.note_type.lower() != "credit":
+            continue
+        for inv in invoices:
+            key = (inv.supplier_gstin, inv.invoice_number, inv.invoice_date)
+            if key not in used and inv.supplier_gstin == note.supplier_gstin \
+                    and abs(inv.invoice_value - note.note_value) < Decimal("0.01"):
+                cancelled.add(key)
+                used.add(key)
+                break
+    return cancelled
+
+
+def _legacy_parse(data):
+    """The pre-vectorised parse (pd.ExcelFile + iterrows), for comparison."""
+
+    def to_date(v):
+        if v is None or (isinstance(v, float) and pd.isna(v)):
+            return None
+        if isinstance(v, datetime):
+            return v.date()
+        if isinstance(v, date):
+            return v
+        for fmt in ("%d/%m/%Y", "%d-%m-%Y", "%Y-%m-%d", "%d/%m/%y"):
+            try:
+                return datetime.strptime(str(v).strip(), fmt).date()
+            except ValueError:
+                continue
+        return None
+
+    xl = pd.ExcelFile(io.BytesIO(data))
+    df_raw = xl.parse("invoice", header=None)
+    df = df_raw.iloc[3:].copy()
+    df.columns = [str(x).strip() for x in df_raw.iloc[2].tolist()]
+    df = df[df.get("Supplier Name").notna()].reset_index(drop=True)
+    rows = []
+    for _, r in df.iterrows():
+        inv_date = to_date(r.get("Invoice Date"))
+        if not inv_date:
+            continue
+        rows.append(GSTR2ARow(
+            supplier_name=str(r.get("Supplier Name", "")).strip(),
+            supplier_gstin=str(r.get("GSTIN", "")).strip().upper(),
+            supplier_state=str(r.get("State", "")).strip().upper(),
+            pos=str(r.get("POS", "")).strip().upper(),
+            invoice_number=str(r.get("Invoice No", "")).strip(),
+            invoice_date=inv_date,
+            invoice_value=_to_decimal(r.get("Invoice Value")),
+            taxable_value=_to_decimal(r.get("Taxable Value")),
+            igst=_to_decimal(r.get("IGST")),
+            cgst=_to_decimal(r.get("CGST")),
+            sgst=_to_decimal(r.get("SGST")),
+            cess=_to_decimal(r.get("CESS")),
+            filed_3b=str(r.get("3B Status", "")).strip().lower() == "filed",
+            reverse_charge=str(r.get("RC", "")).strip().upper() in ("YES", "Y", "TRUE"),
+        ))
+    notes = []
+    if "note" in xl.sheet_names:
+        nf_raw = xl.parse("note", header=None)
+        nf = nf_raw.iloc[3:].copy()
+        nf.columns = [str(x).strip() for x in nf_raw.iloc[2].tolist()]
+        for _, r in nf[nf["Supplier Name"].notna()].iterrows():
+            notes.append(GSTR2ANote(
+                supplier_name=str(r.get("Supplier Name", "")).strip(),
+                supplier_gstin=str(r.get("GSTIN", "")).strip().upper(),
+                note_number=str(r.get("Note No", "")).strip(),
+                note_date=to_date(r.get("Note Date")),
+                note_type=str(r.get("Note Type", "")).strip(),
+                note_value=_to_decimal(r.get("Note Value")),
+                taxable_value=_to_decimal(r.get("Taxable Value")),
+                igst=_to_decimal(r.get("IGST")),
+                cgst=_to_decimal(r.get("CGST")),
+                sgst=_to_decimal(r.get("SGST")),
+            ))
+    _legacy_match(rows, notes)
+    return rows, notes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Time GSTR-2A parsing: legacy iterrows path vs parse_file per reader engine."
+    )
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--notes", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--file", help="Benchmark this 2A file instead of a generated one.")
+    opts = parser.parse_args(argv)
+
+    if opts.file:
+        with open(opts.file, "rb") as fh:
+            data = fh.read()
+    else:
+        data = build_2a_workbook(opts.rows, opts.notes)
+    print(f"Workbook: {len(data) // 1024} KB")
+
+    def timed(fn):
+        samples = []
+        for _ in range(opts.rounds):
+            started = time.perf_counter()
+            out = fn()
+            samples.append(time.perf_counter() - started)
+        return statistics.median(samples), out
+
+    legacy_s, (legacy_rows, legacy_notes) = timed(lambda: _legacy_parse(data))
+    print(f"{'legacy (pandas + iterrows)':28s} {legacy_s * 1000:>8.0f} ms  {len(legacy_rows)} rows")
+    for engine in excel.READERS:
+        elapsed, preview = timed(lambda engine=engine: parse_file(io.BytesIO(data), engines=[engine]))
+        if preview.parse_errors[:1] and not preview.parsed_rows:
+            print(f"{engine:28s} {'failed':>11s}  {preview.parse_errors[0]}")
+            continue
+        same = (preview.parsed_rows, preview.parsed_notes) == (legacy_rows, legacy_notes)
+        line = (f"{engine:28s} {elapsed * 1000:>8.0f} ms  {len(preview.parsed_rows)} rows, "
+                f"{len(preview.parsed_notes)} notes  ({legacy_s / elapsed:.1f}x)")
+        print(line if same else line + "  MISMATCH")
+
+    old_s, old_keys = timed(lambda: _legacy_match(legacy_rows, legacy_notes))
+    new_s, table = timed(lambda: _match_credit_notes(legacy_rows, legacy_notes))
+    exact = {m.invoice_key for m in table if m.status == "exact"}
+    netted = sum(m.status in CN_CANCELLING for m in table) - len(exact)
+    print(
+        f"Credit-note match, {len(legacy_notes)} notes: scan {old_s * 1000:.0f} ms, "
+        f"index {new_s * 1000:.0f} ms; {len(exact)} exact"
+        f"{' (same as scan)' if exact == old_keys else ' (DIFFERS from scan)'}, {netted} netted"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+"""Benchmark AI upload normalisation: the old full-decode path vs the
+draft/passthrough path in billing/services/images.py, and a batch inline
+vs over the process pool.
+
+    python scripts/bench_normalize_image.py                    # synthetic corpus
+    python scripts/bench_normalize_image.py --dir ~/bills      # your own photos
+    python scripts/bench_normalize_image.py --rounds 5 --workers 4
+
+Without --dir a corpus is generated in memory: 12 MP and 8 MP phone-style
+JPEGs, a progressive JPEG, a small baseline JPEG, a PNG scan and (with
+pillow-heif installed) a HEIC. Timings bypass the memo, so every round is
+a real decode.
+"""
+
+import argparse
+import io
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "gst_billing.settings")
+
+import django
+
+django.setup()
+
+from PIL import Image, ImageDraw
+
+from billing.services import images
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".heic", ".heif", ".webp", ".tif", ".tiff"}
+
+
+def _legacy_normalize(image_bytes, max_dim):
+    """The pre-fast-path implementation, kept here for comparison."""
+    img = Image.open(io.BytesIO(image_bytes))
+    img.load()
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    if max(img.size) > max_dim:
+        ratio = max_dim / max(img.size)
+        img = img.resize(
+            (int(img.width * ratio), int(img.height * ratio)), Image.Resampling.LANCZOS
+        )
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=88, optimize=True)
+    return buf.getvalue()
+
+
+def _synthetic_corpus():
+    def page(size):
+        img = Image.new("RGB", size, (245, 242, 235))
+        draw = ImageDraw.Draw(img)
+        step = max(12, size[1] // 120)
+        for y in range(step, size[1] - step, step):
+            draw.text((step, y), f"GOLD RING 22K  HSN 7113  QTY {y % 7}  RATE 6,{y % 1000:03d}.00",
+                      fill=(20, 20, 20))
+            draw.line((step, y + step - 2, size[0] - step, y + step - 2), fill=(200, 200, 200))
+        return img
+
+    def encode(img, fmt, **kw):
+        buf = io.BytesIO()
+        img.save(buf, format=fmt, **kw)
+        return buf.getvalue()
+
+    corpus = [
+        ("phone-12mp.jpg", encode(page((4032, 3024)), "JPEG", quality=92)),
+        ("phone-8mp.jpg", encode(page((3264, 2448)), "JPEG", quality=90)),
+        ("progressive.jpg", encode(page((2000, 1500)), "JPEG", quality=85, progressive=True)),
+        ("small-baseline.jpg", encode(page((1200, 900)), "JPEG", quality=85)),
+        ("scan.png", encode(page((2480, 1754)).convert("L"), "PNG")),
+    ]
+    try:
+        import pillow_heif  # noqa: F401
+
+        corpus.append(("iphone.heic", encode(page((4032, 3024)), "HEIF", quality=90)))
+    except Exception:
+        pass
+    return corpus
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Compare legacy vs fast image normalisation, and inline vs pooled batches."
+    )
+    parser.add_argument("--dir", help="Directory of sample images (default: synthetic corpus).")
+    parser.add_argument("--rounds", type=int, default=3, help="Timed rounds per image (default 3).")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="Pool size for the batch run (default AI_IMAGE_WORKERS).")
+    opts = parser.parse_args(argv)
+
+    if opts.dir:
+        corpus = [
+            (p.name, p.read_bytes())
+            for p in sorted(Path(opts.dir).expanduser().iterdir())
+            if p.suffix.lower() in IMAGE_SUFFIXES
+        ]
+    else:
+        corpus = _synthetic_corpus()
+    if not corpus:
+        print("No images found.", file=sys.stderr)
+        return
+
+    max_dim = images.MAX_IMAGE_DIM
+    legacy_total = fast_total = 0.0
+    print(f"{'image':24s} {'size':>9s} {'legacy ms':>10s} {'fast ms':>9s} {'out KB':>12s}")
+    for name, data in corpus:
+        timings = {}
+        outputs = {}
+        for label, fn in (("legacy", _legacy_normalize), ("fast", images._normalize)):
+            samples = []
+            for _ in range(opts.rounds):
+                started = time.perf_counter()
+                outputs[label] = fn(data, max_dim)
+                samples.append((time.perf_counter() - started) * 1000)
+            timings[label] = statistics.median(samples)
+        legacy_total += timings["legacy"]
+        fast_total += timings["fast"]
+        print(
+            f"{name[:24]:24s} {len(data) // 1024:>7d}KB {timings['legacy']:>10.1f} "
+            f"{timings['fast']:>9.1f} {len(outputs['legacy']) // 1024:>5d}->{len(outputs['fast']) // 1024:<5d}"
+        )
+    print(
+        f"Per-image total: legacy {legacy_total:.0f} ms, fast {fast_total:.0f} ms "
+        f"({legacy_total / max(fast_total, 0.001):.1f}x)"
+    )
+
+    workers = opts.workers or images.pool_workers()
+    batch = [data for _, data in corpus] * 2
+    started = time.perf_counter()
+    for data in batch:
+        images._normalize(data, max_dim)
+    inline_s = time.perf_counter() - started
+    if workers < 2:
+        print(f"Batch of {len(batch)} inline: {inline_s * 1000:.0f} ms (pool skipped: 1 worker)")
+        return
+    images.normalize_many(batch[:workers], max_dim, workers)  # spawn the workers
+    images._recent.clear()
+    started = time.perf_counter()
+    images.normalize_many(batch, max_dim, workers)
+    pooled_s = time.perf_counter() - started
+    images.shutdown_pool()
+    print(
+        f"Batch of {len(batch)}: inline {inline_s * 1000:.0f} ms, "
+        f"{workers}-process pool {pooled_s * 1000:.0f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -7,7 +7,7 @@ import { currentFY } from "@/utils/mockData";
 /**
  * On-demand GST compliance scanner.
  *
- * Hits the gst_summary endpoint once per session (per-day stable IDs make
+ * Hits the gst_summary and itc_aging endpoints once per session (per-day stable IDs make
  * notifications dedup themselves across reloads), turns the result into
  * actionable notifications:
  *
@@ -46,10 +46,13 @@ export function useComplianceScanner() {
       end_date: `${fyStart + 1}-03-31`,
     });
 
-    api.get<any>(`invoices/gst_summary/?${params.toString()}`)
-      .then((res) => {
+    Promise.all([
+      api.get<any>(`invoices/gst_summary/?${params.toString()}`),
+      api.get<any>(`invoices/itc_aging/?${params.toString()}&page_size=1`),
+    ])
+      .then(([res, agingRes]) => {
         const data = res.data || {};
-        const aging = data.itc_aging?.buckets || {};
+        const aging = agingRes.data?.buckets || {};
         const recon = data.gstr1_3b_recon || {};
 
         // ITC aging — urgent (≤60 days)
@@ -97,6 +97,36 @@ function useGSTSummary(bizFilter: string, startDate: string, endDate: string) {
   return { data, isLoading };
 }
 
+/** ITC aging buckets plus the "Action needed" rows (urgent = near or past
+ *  the Sec 16(4) cutoff, most overdue first). Its own endpoint, so the
+ *  summary payload doesn't carry it. */
+function useITCAging(bizFilter: string, startDate: string, endDate: string) {
+  const [data, setData] = useState<any>(null);
+  const [isLoading, setIsLoading] = useState(true);
+
+  const fetchAging = useCallback(async () => {
+    if (!localStorage.getItem("gst_access_token")) return;
+    setIsLoading(true);
+    try {
+      const params = new URLSearchParams();
+      params.set("start_date", startDate);
+      params.set("end_date", endDate);
+      params.set("bucket", "urgent");
+      params.set("page_size", "50");
+      if (bizFilter !== "all") params.set("business_id", bizFilter);
+      const res = await api.get<any>(`invoices/itc_aging/?${params.toString()}`);
+      setData({ buckets: res.data.buckets, urgent_invoices: res.data.results });
+    } catch (e) {
+      logger.error("Failed to fetch ITC aging", e);
+    } finally {
+      setIsLoading(false);
+    }
+  }, [bizFilter, startDate, endDate]);
+
+  useEffect(() => { fetchAging(); }, [fetchAging]);
+  return { data, isLoading };
+}
+
 /** Fetch dashboard stats for the monthly tax-trend chart */
 function useGSTStats(selectedFY: string, bizFilter: string) {
   const [data, setData] = useState<any>(null);
@@ -196,6 +226,7 @@ export default function GSTSummary() {
 
   const { data: gstData, isLoading: gstLoading } = useGSTSummary(bizFilter, startDate, endDate);
   const { data: statsData, isLoading: statsLoading } = useGSTStats(selectedFY, bizFilter);
+  const { data: agingData, isLoading: agingLoading } = useITCAging(bizFilter, startDate, endDate);
   const isFilingTab = activeTab !== "summary";
   const { data: exportData, isLoading: exportLoading } = useGSTRExport(isFilingTab, bizFilter, startDate, endDate);
 
@@ -244,7 +275,7 @@ export default function GSTSummary() {
   // True while gstData is still in flight — used to gate stat cards and the
   // readiness card so they don't flash "₹0" / "No data" before the API
   // resolves.
-  const isHydrating = gstLoading || statsLoading;
+  const isHydrating = gstLoading || statsLoading || agingLoading;
 
   // Filing-export data
   const exGstr1 = exportData?.gstr1;
@@ -379,9 +410,9 @@ export default function GSTSummary() {
     }
   };
 
-  // GSTR-3B Table 4 + reconciliation + aging from gstData (server-side)
+  // GSTR-3B Table 4 + reconciliation from gstData; aging from its own endpoint
   const table4 = gstData?.gstr3b_table4;
-  const aging = gstData?.itc_aging;
+  const aging = agingData;
   const recon = gstData?.gstr1_3b_recon;
   const reconHasIssue = recon && Math.abs(recon.variance || 0) > 0.5;
 
@@ -1132,7 +1163,7 @@ export default function GSTSummary() {
               </p>
             </div>
 
-            {summaryLoading ? (
+            {agingLoading ? (
               <div className="p-8 text-center text-muted-foreground text-sm flex items-center justify-center gap-2"><Loader2 className="w-4 h-4 animate-spin" /> Loading aging…</div>
             ) : aging ? (
               <>